@@ -1,11 +1,12 @@
 """Route optimization for delivery."""
-import math
 from typing import List, Dict, Tuple
 from flask import current_app
 
+from sas_management.services.route_planner import route_planner
+
 
 class RouteOptimizer:
-    """Simple route optimizer using nearest-neighbor algorithm."""
+    """Route optimizer backed by the dispatch route planner (2-opt/Or-opt local search)."""
     
     def __init__(self):
         self.mock_mode = False
@@ -17,7 +18,7 @@ class RouteOptimizer:
         return_to_start: bool = True
     ) -> Dict[str, any]:
         """
-        Optimize delivery route using nearest-neighbor algorithm.
+        Optimize the visiting order of delivery locations.
         
         Args:
             start_location: (lat, lng) tuple of starting point
@@ -36,51 +37,23 @@ class RouteOptimizer:
                     'mock': False
                 }
             
-            # Convert to list of tuples with metadata
-            points = [
-                {
-                    'coords': (loc['lat'], loc['lng']),
-                    'data': loc
-                }
-                for loc in delivery_locations
+            stops = [
+                {'latitude': loc['lat'], 'longitude': loc['lng'], 'index': idx}
+                for idx, loc in enumerate(delivery_locations)
             ]
+            km, minutes = route_planner.matrix([tuple(start_location)] + [(loc['lat'], loc['lng']) for loc in delivery_locations])
+            if not return_to_start:
+                # An open route: driving back to the start costs nothing
+                for row in km:
+                    row[0] = 0.0
             
-            # Nearest-neighbor algorithm
-            route = []
-            current = start_location
-            remaining = points.copy()
-            total_distance = 0
-            
-            while remaining:
-                # Find nearest point
-                nearest = None
-                nearest_dist = float('inf')
-                nearest_idx = -1
-                
-                for idx, point in enumerate(remaining):
-                    dist = self._haversine_distance(
-                        current,
-                        point['coords']
-                    )
-                    if dist < nearest_dist:
-                        nearest_dist = dist
-                        nearest = point
-                        nearest_idx = idx
-                
-                if nearest:
-                    route.append(nearest['data'])
-                    total_distance += nearest_dist
-                    current = nearest['coords']
-                    remaining.pop(nearest_idx)
-            
-            # Return to start if requested
-            if return_to_start and route:
-                final_dist = self._haversine_distance(current, start_location)
-                total_distance += final_dist
+            plan = route_planner.plan(stops, [{'id': None, 'capacity': None}], depot=start_location, matrix=(km, minutes))
+            visits = plan['routes'][0]['stops'] if plan['routes'] else []
+            total_distance = plan['total_distance']
             
             return {
                 'success': True,
-                'route': route,
+                'route': [delivery_locations[stop['index']] for stop in visits],
                 'total_distance': total_distance,  # in kilometers
                 'total_distance_km': round(total_distance, 2),
                 'mock': False
@@ -90,29 +63,6 @@ class RouteOptimizer:
                 current_app.logger.exception(f"Route optimization error: {e}")
             return {'success': False, 'error': str(e)}
     
-    def _haversine_distance(
-        self,
-        point1: Tuple[float, float],
-        point2: Tuple[float, float]
-    ) -> float:
-        """
-        Calculate distance between two lat/lng points using Haversine formula.
-        
-        Returns distance in kilometers.
-        """
-        R = 6371  # Earth radius in km
-        
-        lat1, lon1 = math.radians(point1[0]), math.radians(point1[1])
-        lat2, lon2 = math.radians(point2[0]), math.radians(point2[1])
-        
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-        
-        a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-        c = 2 * math.asin(math.sqrt(a))
-        
-        return R * c
-    
     def batch_optimize(
         self,
         start_location: Tuple[float, float],
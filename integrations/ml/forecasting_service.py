@@ -1,20 +1,22 @@
 """ML forecasting service for sales and demand prediction."""
 import os
+from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 from flask import current_app
 
 try:
-    import pandas as pd
     import numpy as np
-    from sklearn.linear_model import LinearRegression
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    np = None
+
+try:
+    import pandas as pd
     PANDAS_AVAILABLE = True
-    SKLEARN_AVAILABLE = True
 except ImportError:
     PANDAS_AVAILABLE = False
-    SKLEARN_AVAILABLE = False
     pd = None
-    np = None
-    LinearRegression = None
 
 try:
     from prophet import Prophet
@@ -29,7 +31,7 @@ class ForecastingService:
     
     def __init__(self):
         self.mock_mode = os.getenv('INTEGRATIONS_MOCK', 'false').lower() == 'true'
-        self.enabled = (PANDAS_AVAILABLE and SKLEARN_AVAILABLE) and not self.mock_mode
+        self.enabled = NUMPY_AVAILABLE and not self.mock_mode
         
         if not self.enabled and current_app:
             current_app.logger.warning(
@@ -87,36 +89,30 @@ class ForecastingService:
         historical_data: List[Tuple[str, float]],
         horizon: int
     ) -> Dict[str, any]:
-        """Simple linear regression forecast."""
+        """Simple linear regression forecast (least-squares line over day offsets)."""
         try:
-            df = pd.DataFrame(historical_data, columns=['date', 'value'])
-            df['date'] = pd.to_datetime(df['date'])
-            df = df.sort_values('date')
-            df['days'] = (df['date'] - df['date'].min()).dt.days
-            
-            X = df[['days']].values
-            y = df['value'].values
+            points = sorted((datetime.strptime(str(d)[:10], '%Y-%m-%d').date(), float(v)) for d, v in historical_data)
+            first_date, last_date = points[0][0], points[-1][0]
+            days = np.array([(d - first_date).days for d, _ in points], dtype=float)
+            values = np.array([v for _, v in points])
             
-            model = LinearRegression()
-            model.fit(X, y)
+            if len(np.unique(days)) > 1:
+                slope, intercept = np.polyfit(days, values, 1)
+            else:
+                slope, intercept = 0.0, float(values.mean())
             
             # Predict future
-            last_day = df['days'].max()
-            future_days = np.arange(last_day + 1, last_day + 1 + horizon)
-            predictions = model.predict(future_days.reshape(-1, 1))
-            
-            # Generate forecast dates
-            last_date = df['date'].max()
-            forecast_dates = pd.date_range(start=last_date + pd.Timedelta(days=1), periods=horizon)
+            future_days = days[-1] + np.arange(1, horizon + 1)
+            predictions = intercept + slope * future_days
             
             forecast = [
                 {
-                    'date': date.strftime('%Y-%m-%d'),
+                    'date': (last_date + timedelta(days=i + 1)).strftime('%Y-%m-%d'),
                     'predicted': float(pred),
                     'lower_bound': float(pred * 0.9),
                     'upper_bound': float(pred * 1.1)
                 }
-                for date, pred in zip(forecast_dates, predictions)
+                for i, pred in enumerate(predictions)
             ]
             
             return {
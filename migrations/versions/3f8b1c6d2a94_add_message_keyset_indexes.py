@@ -0,0 +1,38 @@
+"""Add message keyset indexes
+
+(scope, id) indexes for the cursor-paginated message APIs: channel chat,
+direct message threads, event threads and department boards are read as
+``WHERE scope = ? AND id > ? ORDER BY id``.
+
+Revision ID: 3f8b1c6d2a94
+Revises: 7c41e9a2d5f3
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3f8b1c6d2a94'
+down_revision = '7c41e9a2d5f3'
+branch_labels = None
+depends_on = None
+
+
+# (index name, table, columns) - mirrors the __table_args__ in models.py
+KEYSET_INDEXES = [
+    ('ix_message_channel_id', 'message', ['channel', 'id']),
+    ('ix_direct_message_thread_id_id', 'direct_message', ['thread_id', 'id']),
+    ('ix_event_message_thread_id_id', 'event_message', ['thread_id', 'id']),
+    ('ix_department_message_department_id', 'department_message', ['department', 'id']),
+]
+
+
+def upgrade():
+    for name, table, columns in KEYSET_INDEXES:
+        op.create_index(name, table, columns, unique=False, if_not_exists=True)
+
+
+def downgrade():
+    for name, table, _columns in reversed(KEYSET_INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
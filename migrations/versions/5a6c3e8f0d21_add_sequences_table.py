@@ -0,0 +1,33 @@
+"""Add sequences table
+
+Atomic per-prefix, per-day counters for POS order, receipt and production
+references (replacing LIKE 'PREFIX-YYYYMMDD-%' scans of the target tables).
+
+Revision ID: 5a6c3e8f0d21
+Revises: 9d2e7a4c1b58
+Create Date: 2026-10-16 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5a6c3e8f0d21'
+down_revision = '9d2e7a4c1b58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('sequences',
+    sa.Column('prefix', sa.String(length=40), nullable=False),
+    sa.Column('period', sa.String(length=20), nullable=False),
+    sa.Column('value', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('prefix', 'period'),
+    if_not_exists=True
+    )
+
+
+def downgrade():
+    op.drop_table('sequences', if_exists=True)
@@ -0,0 +1,51 @@
+"""Add hot-path index pack
+
+Covers the filters and sort keys used by the dashboard and list pages
+(events by date/status/client, invoice status, pipeline stage, POS shift
+orders, attendance, shift roster, chat channels and the activity log),
+which previously all ran as full table scans.
+
+Revision ID: 7c41e9a2d5f3
+Revises: b486e3a03516
+Create Date: 2026-10-16 09:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '7c41e9a2d5f3'
+down_revision = 'b486e3a03516'
+branch_labels = None
+depends_on = None
+
+
+# (index name, table, columns) - mirrors the __table_args__ in models.py
+INDEX_PACK = [
+    ('ix_event_event_date', 'event', ['event_date']),
+    ('ix_event_date', 'event', ['date']),
+    ('ix_event_status_event_date', 'event', ['status', 'event_date']),
+    ('ix_event_client_id', 'event', ['client_id']),
+    ('ix_invoice_status_due_date', 'invoice', ['status', 'due_date']),
+    ('ix_invoice_event_id', 'invoice', ['event_id']),
+    ('ix_incoming_lead_pipeline_stage_timestamp', 'incoming_lead', ['pipeline_stage', 'timestamp']),
+    ('ix_pos_order_shift_id_status', 'pos_order', ['shift_id', 'status']),
+    ('ix_pos_order_status_created_at', 'pos_order', ['status', 'created_at']),
+    ('ix_attendance_employee_id_clock_in', 'attendance', ['employee_id', 'clock_in']),
+    ('ix_attendance_clock_in', 'attendance', ['clock_in']),
+    ('ix_shift_assignment_assignment_date', 'shift_assignment', ['assignment_date', 'employee_id']),
+    ('ix_message_channel_timestamp', 'message', ['channel', 'timestamp']),
+    ('ix_activity_logs_timestamp', 'activity_logs', ['timestamp']),
+    ('ix_activity_logs_user_id_timestamp', 'activity_logs', ['user_id', 'timestamp']),
+]
+
+
+def upgrade():
+    # Databases bootstrapped with db.create_all() may already have these
+    for name, table, columns in INDEX_PACK:
+        op.create_index(name, table, columns, unique=False, if_not_exists=True)
+
+
+def downgrade():
+    for name, table, _columns in reversed(INDEX_PACK):
+        op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,35 @@
+"""Add pos_shift_counter
+
+Running per-shift totals backing the POS X/Z reports.  Existing shifts are
+seeded lazily from their orders the first time a report is read.
+
+Revision ID: 9d2e7a4c1b58
+Revises: 3f8b1c6d2a94
+Create Date: 2026-10-16 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d2e7a4c1b58'
+down_revision = '3f8b1c6d2a94'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('pos_shift_counter',
+    sa.Column('shift_id', sa.Integer(), nullable=False),
+    sa.Column('key', sa.String(length=80), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('amount', sa.Numeric(precision=16, scale=2), nullable=False),
+    sa.ForeignKeyConstraint(['shift_id'], ['pos_shift.id'], ),
+    sa.PrimaryKeyConstraint('shift_id', 'key'),
+    if_not_exists=True
+    )
+
+
+def downgrade():
+    op.drop_table('pos_shift_counter', if_exists=True)
@@ -0,0 +1,54 @@
+"""Add floor plan revisions and change log
+
+Editors autosave JSON-Patch deltas against a revision number instead of the
+whole layout: floor_plan.data holds the layout at snapshot_revision and
+floor_plan_change holds the patches after it until they are compacted.
+thumbnail_updated_at lets listings link to the thumbnail without reading
+the PNG.
+
+Revision ID: a4d7e2c9f615
+Revises: f2b8d5a1c937
+Create Date: 2026-10-16 23:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4d7e2c9f615'
+down_revision = 'f2b8d5a1c937'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('floor_plan', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('revision', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('snapshot_revision', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('thumbnail_updated_at', sa.DateTime(), nullable=True))
+
+    op.execute("UPDATE floor_plan SET thumbnail_updated_at = COALESCE(updated_at, created_at) WHERE thumbnail IS NOT NULL")
+
+    op.create_table('floor_plan_change',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('floor_plan_id', sa.Integer(), nullable=False),
+    sa.Column('revision', sa.Integer(), nullable=False),
+    sa.Column('patch', sa.Text(), nullable=False),
+    sa.Column('created_by', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['floor_plan_id'], ['floor_plan.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['created_by'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('floor_plan_id', 'revision', name='uq_floor_plan_change_revision'),
+    if_not_exists=True
+    )
+
+
+def downgrade():
+    op.drop_table('floor_plan_change', if_exists=True)
+
+    with op.batch_alter_table('floor_plan', schema=None) as batch_op:
+        batch_op.drop_column('thumbnail_updated_at')
+        batch_op.drop_column('snapshot_revision')
+        batch_op.drop_column('revision')
@@ -0,0 +1,48 @@
+"""Add ledger_monthly_balance and journal indexes
+
+Per-account, per-month debit/credit totals for the ledger reports, plus the
+entry_date / entry_id / account_id indexes their range queries use.  Fill
+the snapshots for existing journals with `flask ledger rebuild`.
+
+Revision ID: a9e3d6b2c714
+Revises: f4c8a1e6b293
+Create Date: 2026-10-16 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9e3d6b2c714'
+down_revision = 'f4c8a1e6b293'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('ledger_monthly_balance',
+    sa.Column('account_id', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('debit', sa.Numeric(precision=16, scale=2), nullable=False),
+    sa.Column('credit', sa.Numeric(precision=16, scale=2), nullable=False),
+    sa.Column('line_count', sa.Integer(), nullable=False),
+    sa.Column('computed_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['account_id'], ['account.id'], ),
+    sa.PrimaryKeyConstraint('account_id', 'month'),
+    if_not_exists=True
+    )
+    op.create_index('ix_ledger_monthly_balance_month', 'ledger_monthly_balance', ['month'],
+                    unique=False, if_not_exists=True)
+    op.create_index('ix_journal_entry_entry_date', 'journal_entry', ['entry_date'], unique=False, if_not_exists=True)
+    op.create_index('ix_journal_entry_line_entry_id', 'journal_entry_line', ['entry_id'], unique=False, if_not_exists=True)
+    op.create_index('ix_journal_entry_line_account_id', 'journal_entry_line', ['account_id'],
+                    unique=False, if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_journal_entry_line_account_id', table_name='journal_entry_line', if_exists=True)
+    op.drop_index('ix_journal_entry_line_entry_id', table_name='journal_entry_line', if_exists=True)
+    op.drop_index('ix_journal_entry_entry_date', table_name='journal_entry', if_exists=True)
+    op.drop_index('ix_ledger_monthly_balance_month', table_name='ledger_monthly_balance', if_exists=True)
+    op.drop_table('ledger_monthly_balance', if_exists=True)
@@ -0,0 +1,42 @@
+"""Add pos_reference_block
+
+Records which terminal each offline reference block was reserved for, so
+offline sync can tell a reference the device was given from one it made
+up or copied from another terminal.
+
+Revision ID: b6e3f1a8d402
+Revises: a4d7e2c9f615
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6e3f1a8d402'
+down_revision = 'a4d7e2c9f615'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('pos_reference_block',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('device_id', sa.Integer(), nullable=False),
+    sa.Column('prefix', sa.String(length=40), nullable=False),
+    sa.Column('period', sa.String(length=20), nullable=False),
+    sa.Column('first', sa.Integer(), nullable=False),
+    sa.Column('last', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['device_id'], ['pos_device.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    if_not_exists=True
+    )
+    op.create_index('ix_pos_reference_block_device_period', 'pos_reference_block', ['device_id', 'period'],
+                    unique=False, if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_pos_reference_block_device_period', table_name='pos_reference_block', if_exists=True)
+    op.drop_table('pos_reference_block', if_exists=True)
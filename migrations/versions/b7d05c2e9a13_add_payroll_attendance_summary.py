@@ -0,0 +1,39 @@
+"""Add payroll_attendance_summary
+
+Per-period, per-employee days/hours worked reused by incremental payroll runs.
+
+Revision ID: b7d05c2e9a13
+Revises: e1b4f7a9c302
+Create Date: 2026-10-16 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d05c2e9a13'
+down_revision = 'e1b4f7a9c302'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('payroll_attendance_summary',
+    sa.Column('period_start', sa.Date(), nullable=False),
+    sa.Column('period_end', sa.Date(), nullable=False),
+    sa.Column('employee_id', sa.Integer(), nullable=False),
+    sa.Column('days_worked', sa.Integer(), nullable=False),
+    sa.Column('hours_worked', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('computed_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['employee_id'], ['employee.id'], ),
+    sa.PrimaryKeyConstraint('period_start', 'period_end', 'employee_id'),
+    if_not_exists=True
+    )
+    op.create_index('ix_payroll_attendance_summary_employee_id', 'payroll_attendance_summary',
+                    ['employee_id', 'period_start', 'period_end'], unique=False, if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_payroll_attendance_summary_employee_id', table_name='payroll_attendance_summary', if_exists=True)
+    op.drop_table('payroll_attendance_summary', if_exists=True)
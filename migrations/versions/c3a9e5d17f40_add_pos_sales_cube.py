@@ -0,0 +1,45 @@
+"""Add pos_sales_cube
+
+Hourly POS sales rollup per terminal and product category, plus the
+pos_order (status, order_time) and order_id indexes used to refresh a
+bucket.  Existing orders are folded in with ``flask pos-sales-cube rebuild``.
+
+Revision ID: c3a9e5d17f40
+Revises: b7d05c2e9a13
+Create Date: 2026-10-16 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3a9e5d17f40'
+down_revision = 'b7d05c2e9a13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('pos_sales_cube',
+    sa.Column('bucket_date', sa.Date(), nullable=False),
+    sa.Column('hour', sa.SmallInteger(), nullable=False),
+    sa.Column('device_id', sa.Integer(), nullable=False),
+    sa.Column('category', sa.String(length=100), nullable=False),
+    sa.Column('orders', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Numeric(precision=16, scale=2), nullable=False),
+    sa.Column('paid_amount', sa.Numeric(precision=16, scale=2), nullable=False),
+    sa.PrimaryKeyConstraint('bucket_date', 'hour', 'device_id', 'category'),
+    if_not_exists=True
+    )
+    op.create_index('ix_pos_order_status_order_time', 'pos_order', ['status', 'order_time'], unique=False, if_not_exists=True)
+    op.create_index('ix_pos_order_line_order_id', 'pos_order_line', ['order_id'], unique=False, if_not_exists=True)
+    op.create_index('ix_pos_payment_order_id', 'pos_payment', ['order_id'], unique=False, if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_pos_payment_order_id', table_name='pos_payment', if_exists=True)
+    op.drop_index('ix_pos_order_line_order_id', table_name='pos_order_line', if_exists=True)
+    op.drop_index('ix_pos_order_status_order_time', table_name='pos_order', if_exists=True)
+    op.drop_table('pos_sales_cube', if_exists=True)
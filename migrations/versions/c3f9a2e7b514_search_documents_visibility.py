@@ -0,0 +1,66 @@
+"""Add search_documents with a visibility flag
+
+search_documents used to be created only by the app's startup hook.  It is
+now a migrated table, with ``visible`` recording whether the record matches
+its type's visibility filter (active clients, published courses, ...) so
+searches can filter before the per-type limit.
+
+The documents are backfilled here when the table is new or empty, or when
+``visible`` was just added (the server default would mark archived records
+visible).  On large databases this can take a while; it is the same work as
+``flask search-index rebuild``, which can be run again at any time.
+
+Downgrading drops the table; the app's startup hook would recreate it
+without the backfill, so run the rebuild after upgrading again.
+
+Revision ID: c3f9a2e7b514
+Revises: b6e3f1a8d402
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3f9a2e7b514'
+down_revision = 'b6e3f1a8d402'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('search_documents',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('entity', sa.String(length=50), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('body', sa.Text(), nullable=False),
+    sa.Column('visible', sa.Boolean(), nullable=False, server_default=sa.true()),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('entity', 'entity_id', name='uq_search_documents_entity'),
+    if_not_exists=True
+    )
+
+    bind = op.get_bind()
+    added = 'visible' not in {c['name'] for c in sa.inspect(bind).get_columns('search_documents')}
+    if added:
+        with op.batch_alter_table('search_documents', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('visible', sa.Boolean(), nullable=False, server_default=sa.true()))
+
+    empty = bind.execute(sa.text('SELECT 1 FROM search_documents LIMIT 1')).first() is None
+    if added or empty:
+        from sas_management.services import search_service  # noqa: F401 - registers searchable models
+        from sas_management.services.search_index import search_index
+
+        tables = set(sa.inspect(bind).get_table_names())
+        keys = [key for key, searchable in search_index.types.items() if searchable.model.__tablename__ in tables]
+        search_index.rebuild(keys, connection=bind)
+
+
+def downgrade():
+    # The search backend's FTS table and triggers are created at startup;
+    # the triggers go with search_documents, the SQLite FTS table does not.
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute('DROP TABLE IF EXISTS search_documents_fts')
+    op.drop_table('search_documents', if_exists=True)
@@ -0,0 +1,57 @@
+"""Forecast source/model columns and upsert keys
+
+Adds source and model_name to bi_sales_forecast and model_name/confidence to
+bi_bakery_demand, and makes (source, forecast_date) and (item_id,
+forecast_date) unique so forecast runs can bulk-upsert.  Duplicate rows are
+collapsed to the newest before the unique indexes are built.
+
+Revision ID: d8f2b6a41e75
+Revises: c3a9e5d17f40
+Create Date: 2026-10-16 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8f2b6a41e75'
+down_revision = 'c3a9e5d17f40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('bi_sales_forecast', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('source', sa.String(length=50), nullable=True))
+        batch_op.add_column(sa.Column('model_name', sa.String(length=50), nullable=True))
+
+    with op.batch_alter_table('bi_bakery_demand', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('model_name', sa.String(length=50), nullable=True))
+        batch_op.add_column(sa.Column('confidence', sa.Float(), nullable=True))
+
+    op.execute(
+        "DELETE FROM bi_sales_forecast WHERE id NOT IN "
+        "(SELECT MAX(id) FROM bi_sales_forecast GROUP BY source, forecast_date)"
+    )
+    op.execute(
+        "DELETE FROM bi_bakery_demand WHERE id NOT IN "
+        "(SELECT MAX(id) FROM bi_bakery_demand GROUP BY item_id, forecast_date)"
+    )
+    op.create_index('ux_bi_sales_forecast_source_forecast_date', 'bi_sales_forecast',
+                    ['source', 'forecast_date'], unique=True, if_not_exists=True)
+    op.create_index('ux_bi_bakery_demand_item_id_forecast_date', 'bi_bakery_demand',
+                    ['item_id', 'forecast_date'], unique=True, if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ux_bi_bakery_demand_item_id_forecast_date', table_name='bi_bakery_demand', if_exists=True)
+    op.drop_index('ux_bi_sales_forecast_source_forecast_date', table_name='bi_sales_forecast', if_exists=True)
+
+    with op.batch_alter_table('bi_bakery_demand', schema=None) as batch_op:
+        batch_op.drop_column('confidence')
+        batch_op.drop_column('model_name')
+
+    with op.batch_alter_table('bi_sales_forecast', schema=None) as batch_op:
+        batch_op.drop_column('model_name')
+        batch_op.drop_column('source')
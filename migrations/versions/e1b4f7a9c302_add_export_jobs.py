@@ -0,0 +1,43 @@
+"""Add export_jobs
+
+Background CSV/XLSX exports for ranges too large to stream inside a request.
+
+Revision ID: e1b4f7a9c302
+Revises: 5a6c3e8f0d21
+Create Date: 2026-10-16 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e1b4f7a9c302'
+down_revision = '5a6c3e8f0d21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('export_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('token', sa.String(length=64), nullable=False),
+    sa.Column('kind', sa.String(length=50), nullable=False),
+    sa.Column('fmt', sa.String(length=10), nullable=False),
+    sa.Column('params', sa.JSON(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('row_count', sa.Integer(), nullable=False),
+    sa.Column('file_path', sa.String(length=500), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_by', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['created_by'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('token'),
+    if_not_exists=True
+    )
+
+
+def downgrade():
+    op.drop_table('export_jobs', if_exists=True)
@@ -0,0 +1,34 @@
+"""Add pos_order.client_uuid
+
+Terminal-generated order id used as the idempotency key of offline sync:
+a batch that is sent again after a dropped connection reports its orders
+as already synced instead of creating them twice.
+
+Revision ID: e7a2c4f9b816
+Revises: c5e2a7d91f48
+Create Date: 2026-10-16 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7a2c4f9b816'
+down_revision = 'c5e2a7d91f48'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('pos_order', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('client_uuid', sa.String(length=36), nullable=True))
+
+    op.create_index('ux_pos_order_client_uuid', 'pos_order', ['client_uuid'], unique=True, if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ux_pos_order_client_uuid', table_name='pos_order', if_exists=True)
+
+    with op.batch_alter_table('pos_order', schema=None) as batch_op:
+        batch_op.drop_column('client_uuid')
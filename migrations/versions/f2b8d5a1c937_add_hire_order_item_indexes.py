@@ -0,0 +1,28 @@
+"""Add hire_order_item indexes
+
+The hire availability index loads and refreshes bookings per item and per
+order; both lookups were full scans of hire_order_item.
+
+Revision ID: f2b8d5a1c937
+Revises: e7a2c4f9b816
+Create Date: 2026-10-16 23:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b8d5a1c937'
+down_revision = 'e7a2c4f9b816'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_hire_order_item_item_id', 'hire_order_item', ['item_id'], unique=False, if_not_exists=True)
+    op.create_index('ix_hire_order_item_order_id', 'hire_order_item', ['order_id'], unique=False, if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_hire_order_item_order_id', table_name='hire_order_item', if_exists=True)
+    op.drop_index('ix_hire_order_item_item_id', table_name='hire_order_item', if_exists=True)
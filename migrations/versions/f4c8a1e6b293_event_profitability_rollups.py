@@ -0,0 +1,49 @@
+"""Event profitability rollup keys and dirty queue
+
+Makes bi_event_profitability.event_id unique so rollups can bulk-upsert
+(duplicate rows are collapsed to the newest first) and adds
+bi_event_profitability_dirty, the queue of events whose rollup is stale.
+
+Revision ID: f4c8a1e6b293
+Revises: d8f2b6a41e75
+Create Date: 2026-10-16 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4c8a1e6b293'
+down_revision = 'd8f2b6a41e75'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(
+        "DELETE FROM bi_event_profitability WHERE id NOT IN "
+        "(SELECT MAX(id) FROM bi_event_profitability GROUP BY event_id)"
+    )
+    op.create_index('ux_bi_event_profitability_event_id', 'bi_event_profitability',
+                    ['event_id'], unique=True, if_not_exists=True)
+
+    op.create_table(
+        'bi_event_profitability_dirty',
+        sa.Column('event_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('marked_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('event_id'),
+    )
+    op.create_index('ix_bi_event_profitability_dirty_marked_at', 'bi_event_profitability_dirty', ['marked_at'])
+
+    # Queue every completed event so the first refresher pass backfills them
+    op.execute(
+        "INSERT INTO bi_event_profitability_dirty (event_id, marked_at) "
+        "SELECT id, CURRENT_TIMESTAMP FROM event WHERE status = 'Completed'"
+    )
+
+
+def downgrade():
+    op.drop_index('ix_bi_event_profitability_dirty_marked_at', table_name='bi_event_profitability_dirty')
+    op.drop_table('bi_event_profitability_dirty')
+    op.drop_index('ux_bi_event_profitability_event_id', table_name='bi_event_profitability', if_exists=True)
@@ -1,10 +1,11 @@
 """
 SAS AI Chat Engine - Context-aware, system-aware intelligence core.
 """
-from sqlalchemy import func
 from sas_management.models import db
 from flask import session
+from sas_management.ai import intent_matcher
 from sas_management.ai.knowledge import SYSTEM_KNOWLEDGE
+from sas_management.services.ai_metrics import ai_metrics
 
 # Safe model imports for counting
 try:
@@ -64,6 +65,9 @@ INTENTS = {
     "everything": ["everything", "all", "overview", "summary", "complete", "full", "system"]
 }
 
+intent_matcher.register("chat", INTENTS)
+intent_matcher.register("chat.followup", {"followup": ["how about", "what about"]})
+
 # Safe model imports
 try:
     from sas_management.models import InventoryItem, Ingredient, Invoice, AccountingPayment, Transaction, ProductionOrder, Task, Event
@@ -87,31 +91,21 @@ def detect_intent(text: str, last_intent: str = None) -> tuple:
         tuple: (intent, score) where score is number of keyword matches
     """
     text_lower = text.lower()
+    found = intent_matcher.match(text_lower)
     
     # Handle follow-up questions
-    if "how about" in text_lower or "what about" in text_lower:
+    if found.has("chat.followup"):
         if last_intent:
             return (last_intent, 10)  # High confidence for follow-ups
         # Extract topic after "how about" or "what about"
         topic = text_lower.replace("how about", "").replace("what about", "").strip()
-        for intent, keywords in INTENTS.items():
-            matches = sum(1 for kw in keywords if kw in topic)
-            if matches > 0:
-                return (intent, matches)
-    
-    # Score all intents
-    intent_scores = {}
-    for intent, keywords in INTENTS.items():
-        score = sum(1 for kw in keywords if kw in text_lower)
-        if score > 0:
-            intent_scores[intent] = score
-    
-    if not intent_scores:
-        return (None, 0)
-    
-    # Return best match
-    best_intent = max(intent_scores.items(), key=lambda x: x[1])
-    return best_intent
+        topic_found = intent_matcher.match(topic)
+        intent = topic_found.first("chat")
+        if intent:
+            return (intent, topic_found.scores("chat")[intent])
+    
+    # Best scoring intent (earliest in INTENTS on ties)
+    return found.best("chat")
 
 
 def get_inventory_response(is_admin: bool = True) -> str:
@@ -121,18 +115,10 @@ def get_inventory_response(is_admin: bool = True) -> str:
         return response.replace("**", "")
     
     try:
-        total_items = db.session.query(func.count(InventoryItem.id)).scalar() or 0
+        total_items = ai_metrics.get("inventory.items") or 0
         
         # Count low stock items
-        low_stock = 0
-        if hasattr(InventoryItem, 'stock_count'):
-            low_stock = db.session.query(func.count(InventoryItem.id)).filter(
-                InventoryItem.stock_count <= 10
-            ).scalar() or 0
-        elif hasattr(InventoryItem, 'quantity'):
-            low_stock = db.session.query(func.count(InventoryItem.id)).filter(
-                InventoryItem.quantity <= 10
-            ).scalar() or 0
+        low_stock = (ai_metrics.get("inventory.low_stock") or {}).get("count", 0)
         
         if is_admin:
             # Admin sees full details
@@ -168,26 +154,17 @@ def get_accounting_response(is_admin: bool = True) -> str:
             response = "Accounting Overview:\n\n"
             
             if Invoice:
-                total_invoices = db.session.query(func.count(Invoice.id)).scalar() or 0
-                response += f"• Total invoices: {total_invoices}\n"
+                invoices = ai_metrics.get("invoices.overview", can_view_sensitive=is_admin) or {}
+                response += f"• Total invoices: {invoices.get('count', 0)}\n"
                 
-                # Try to get outstanding balance
-                if hasattr(Invoice, 'total_amount_ugx') and hasattr(Invoice, 'status'):
-                    outstanding = db.session.query(
-                        func.coalesce(func.sum(Invoice.total_amount_ugx), 0)
-                    ).filter(
-                        Invoice.status != "Paid"
-                    ).scalar() or 0
-                    if outstanding > 0:
-                        response += f"• Outstanding balance: {outstanding:,.2f} UGX\n"
+                outstanding = invoices.get("outstanding_amount", 0)
+                if outstanding > 0:
+                    response += f"• Outstanding balance: {outstanding:,.2f} UGX\n"
             
             if Payment:
-                total_payments = db.session.query(func.count(Payment.id)).scalar() or 0
-                total_revenue = db.session.query(
-                    func.coalesce(func.sum(Payment.amount), 0)
-                ).scalar() or 0
-                response += f"• Total payments: {total_payments}\n"
-                response += f"• Total revenue: {total_revenue:,.2f} UGX\n"
+                payments = ai_metrics.get("payments.overview", can_view_sensitive=is_admin) or {}
+                response += f"• Total payments: {payments.get('count', 0)}\n"
+                response += f"• Total revenue: {payments.get('total_amount', 0):,.2f} UGX\n"
             
             response += "\n" + SYSTEM_KNOWLEDGE["accounting"]
         else:
@@ -216,15 +193,11 @@ def get_production_response(is_admin: bool = True) -> str:
             response = "Production Status:\n\n"
             
             if ProductionOrder:
-                active_orders = db.session.query(func.count(ProductionOrder.id)).filter(
-                    ProductionOrder.status != "Completed"
-                ).scalar() or 0
+                active_orders = ai_metrics.get("production.active_orders") or 0
                 response += f"• Active production orders: {active_orders}\n"
             
             if Task:
-                pending_tasks = db.session.query(func.count(Task.id)).filter(
-                    Task.status == "Pending"
-                ).scalar() or 0
+                pending_tasks = ai_metrics.get("tasks.pending") or 0
                 response += f"• Pending tasks: {pending_tasks}\n"
             
             response += "\n" + SYSTEM_KNOWLEDGE["production"]
@@ -246,7 +219,7 @@ def get_events_response(is_admin: bool = True) -> str:
         return response.replace("**", "")
     
     try:
-        total_events = db.session.query(func.count(Event.id)).scalar() or 0
+        total_events = ai_metrics.get("events.total") or 0
         
         if is_admin:
             response = f"Events Overview:\n\n"
@@ -271,9 +244,8 @@ def get_revenue_response(is_admin: bool = True) -> str:
     
     try:
         if is_admin:
-            total_revenue = db.session.query(
-                func.coalesce(func.sum(Payment.amount), 0)
-            ).scalar() or 0
+            payments = ai_metrics.get("payments.overview", can_view_sensitive=is_admin) or {}
+            total_revenue = payments.get("total_amount", 0)
             
             response = f"Revenue Summary:\n\n"
             response += f"• Total revenue: {total_revenue:,.2f} UGX\n"
@@ -468,7 +440,7 @@ def process_message(text: str, user_id: int = None) -> dict:
         if "staff" in text_lower or "employee" in text_lower or last_topic == "staff" or last_topic == "hr":
             try:
                 if Staff:
-                    count = db.session.query(func.count(Staff.id)).scalar() or 0
+                    count = ai_metrics.get("users.total") or 0
                     session["ai_last_intent"] = "staff"
                     session["clarification_count"] = 0
                     response = f"You currently have {count} staff members."
@@ -503,7 +475,7 @@ def process_message(text: str, user_id: int = None) -> dict:
         if "venue" in text_lower or "venues" in text_lower or last_topic == "venues":
             try:
                 if Venue:
-                    count = db.session.query(func.count(Venue.id)).scalar() or 0
+                    count = ai_metrics.get("venues.total") or 0
                     session["ai_last_intent"] = "venues"
                     session["clarification_count"] = 0
                     response = f"You currently have {count} event venues."
@@ -537,7 +509,7 @@ def process_message(text: str, user_id: int = None) -> dict:
         if "event" in text_lower or last_topic == "events":
             try:
                 if Event:
-                    count = db.session.query(func.count(Event.id)).scalar() or 0
+                    count = ai_metrics.get("events.total") or 0
                     session["ai_last_intent"] = "events"
                     session["clarification_count"] = 0
                     response = f"You currently have {count} events."
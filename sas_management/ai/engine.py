@@ -3,15 +3,7 @@ from typing import Optional, Tuple, Dict, Any
 
 from flask import current_app
 
-from sas_management.models import (
-    db,
-    Event,
-    Client,
-    Employee,
-    InventoryItem,
-    Invoice,
-    InvoiceStatus,
-)
+from sas_management.ai import intent_matcher
 from sas_management.ai.actions import get_actions
 from sas_management.ai.analytics_explainer import analytics_explainer
 from sas_management.ai.memory import conversation_memory
@@ -22,6 +14,7 @@ from sas_management.ai.permission_checks import (
     can_use_ai_memory,
     can_use_ai_scheduling,
 )
+from sas_management.services.ai_metrics import ai_metrics
 from sas_management.utils.permissions import can_use_ai, can_access_sensitive_ai_data
 
 
@@ -44,6 +37,32 @@ _SENSITIVE_KEYWORDS = (
 )
 
 
+# Keyword groups for the intent matcher; order decides which intent wins.
+ENGINE_INTENTS = {
+    "events_count": ("how many events", "events do we have"),
+    "hires_count": ("hires", "hire orders", "rentals"),
+    "staff_count": ("staff", "employees"),
+    "clients_count": ("clients", "customers"),
+    "revenue_summary": ("revenue", "sales", "income"),
+    "inventory_count": ("inventory", "stock"),
+}
+intent_matcher.register("engine.intent", ENGINE_INTENTS)
+intent_matcher.register("engine.analytics", {
+    "explain": ("explain", "why", "what does this mean", "analysis", "trend", "performance"),
+    "metric": ("revenue", "sales", "event", "events", "staff", "employee", "employees",
+               "inventory", "stock", "dashboard"),
+})
+intent_matcher.register("engine.action_trigger", {
+    "report": ("generate report", "create report", "report", "summarize", "summary",
+               "overview", "analysis", "plan"),
+})
+intent_matcher.register("engine.action", {
+    "events_report": ("event", "events"),
+    "revenue_summary": ("revenue", "sales", "income"),
+    "staff_overview": ("staff", "employee", "employees", "hr", "human resources"),
+})
+
+
 def _looks_sensitive(text: Optional[str]) -> bool:
     """
     Heuristic check to avoid storing obviously sensitive payloads in memory.
@@ -209,7 +228,7 @@ class SASAIEngine:
 
         # Route to read-only system query handlers.
         try:
-            text = self._handle_intent(intent)
+            text = self._handle_intent(intent, user)
         except Exception as e:  # Fail-safe: never crash callers
             logger.warning("SASAIEngine intent handler error (%s): %s", intent, e)
             text = None
@@ -230,33 +249,11 @@ class SASAIEngine:
 
         Returns (action_name, needs_clarification).
         """
-        q = (question or "").lower()
-
-        keywords = (
-            "generate report",
-            "create report",
-            "report",
-            "summarize",
-            "summary",
-            "overview",
-            "analysis",
-            "plan",
-        )
-        if not any(k in q for k in keywords):
+        found = intent_matcher.match(question)
+        if not found.has("engine.action_trigger"):
             return None, False
 
-        topic_events = any(k in q for k in ("event", "events"))
-        topic_revenue = any(k in q for k in ("revenue", "sales", "income"))
-        topic_staff = any(k in q for k in ("staff", "employee", "employees", "hr", "human resources"))
-
-        matches = []
-        if topic_events:
-            matches.append("events_report")
-        if topic_revenue:
-            matches.append("revenue_summary")
-        if topic_staff:
-            matches.append("staff_overview")
-
+        matches = found.labels("engine.action")
         if len(matches) == 1:
             return matches[0], False
 
@@ -265,63 +262,17 @@ class SASAIEngine:
 
     def _detect_intent(self, question: Optional[str]) -> Optional[str]:
         """
-        Map natural language question to a concrete system intent.
-
-        INTENTS:
-        - events_count → ["how many events", "events do we have"]
-        - hires_count → ["hires", "hire orders", "rentals"]
-        - staff_count → ["staff", "employees"]
-        - clients_count → ["clients", "customers"]
-        - revenue_summary → ["revenue", "sales", "income"]
-        - inventory_count → ["inventory", "stock"]
+        Map natural language question to a concrete system intent
+        (keywords in ENGINE_INTENTS).
         """
-        q = (question or "").lower()
+        found = intent_matcher.match(question)
 
         # Analytics explanation intent: "explain" + metric references.
-        analytics_keywords = (
-            "explain",
-            "why",
-            "what does this mean",
-            "analysis",
-            "trend",
-            "performance",
-        )
-        if any(k in q for k in analytics_keywords) and any(
-            kw in q
-            for kw in (
-                "revenue",
-                "sales",
-                "event",
-                "events",
-                "staff",
-                "employee",
-                "employees",
-                "inventory",
-                "stock",
-                "dashboard",
-            )
-        ):
+        if found.has("engine.analytics", "explain") and found.has("engine.analytics", "metric"):
             return "analytics_explanation"
 
-        if "how many events" in q or "events do we have" in q:
-            return "events_count"
-
-        if any(kw in q for kw in ("hires", "hire orders", "rentals")):
-            return "hires_count"
-
-        if any(kw in q for kw in ("staff", "employees")):
-            return "staff_count"
-
-        if any(kw in q for kw in ("clients", "customers")):
-            return "clients_count"
-
-        if any(kw in q for kw in ("revenue", "sales", "income")):
-            return "revenue_summary"
-
-        if any(kw in q for kw in ("inventory", "stock")):
-            return "inventory_count"
-
-        return None
+        # First matching intent in ENGINE_INTENTS order
+        return found.first("engine.intent")
 
     # ---------------------------------------------------------------------
     # Scheduling helpers – in-memory, descriptive only
@@ -423,51 +374,29 @@ class SASAIEngine:
     # Intent handlers – READ-ONLY queries with graceful failure
     # ---------------------------------------------------------------------
 
-    def _handle_intent(self, intent: str) -> Optional[str]:
-        if intent == "events_count":
-            count = self._safe_count(Event, "Event")
-            if count is None:
-                return None
-            return self._system_message("Total events", int(count))
-
-        if intent == "hires_count":
-            # Hire orders are stored in the hire_order table via Order model.
-            from sas_management.models import Order
-
-            count = self._safe_count(Order, "HireOrder")
-            if count is None:
-                return None
-            return self._system_message("Total hire orders", int(count))
-
-        if intent == "staff_count":
-            count = self._safe_count(Employee, "Employee")
-            if count is None:
-                return None
-            return self._system_message("Total staff (employees)", int(count))
-
-        if intent == "clients_count":
-            count = self._safe_count(Client, "Client")
-            if count is None:
-                return None
-            return self._system_message("Total clients", int(count))
-
-        if intent == "inventory_count":
-            count = self._safe_count(InventoryItem, "InventoryItem")
-            if count is None:
-                return None
-            return self._system_message("Tracked inventory items", int(count))
-
-        if intent == "revenue_summary":
-            total = self._safe_revenue_total()
-            if total is None:
-                return None
-            # Simple all-time summary from paid invoices.
-            label = "Total revenue from paid invoices (all time)"
-            # Format as integer for readability
-            return self._system_message(label, f"{total:,.0f}")
-
-        # Unknown intent should be treated as "no data"
-        return None
+    # Intent -> (shared AI metric, answer label)
+    INTENT_METRICS = {
+        "events_count": ("events.total", "Total events"),
+        "hires_count": ("hire_orders.total", "Total hire orders"),
+        "staff_count": ("employees.total", "Total staff (employees)"),
+        "clients_count": ("clients.total", "Total clients"),
+        "inventory_count": ("inventory.items", "Tracked inventory items"),
+        "revenue_summary": ("revenue.paid_total", "Total revenue from paid invoices (all time)"),
+    }
+
+    def _handle_intent(self, intent: str, user=None) -> Optional[str]:
+        if intent not in self.INTENT_METRICS:
+            # Unknown intent should be treated as "no data"
+            return None
+
+        name, label = self.INTENT_METRICS[intent]
+        value = ai_metrics.get(name, user)
+        if value is None:
+            return None
+        if isinstance(value, float):
+            # Format amounts as integers for readability
+            return self._system_message(label, f"{value:,.0f}")
+        return self._system_message(label, int(value))
 
     # ---------------------------------------------------------------------
     # Analytics explanations – READ-ONLY, descriptive only
@@ -634,40 +563,6 @@ class SASAIEngine:
 
         return self._format_action_result(title, body)
 
-    def _safe_count(self, model, model_name: str) -> Optional[int]:
-        """
-        Safely count rows for a given model.
-
-        Returns None on any error so callers can fall back gracefully.
-        """
-        try:
-            return db.session.query(db.func.count(model.id)).scalar()
-        except Exception as e:
-            logger.warning("SASAIEngine count error for %s: %s", model_name, e)
-            return None
-
-    def _safe_revenue_total(self) -> Optional[float]:
-        """
-        Safely compute total revenue from paid invoices.
-
-        This uses existing accounting models and performs a single aggregate
-        query. Returns None on error.
-        """
-        try:
-            total_paid = (
-                db.session.query(
-                    db.func.coalesce(db.func.sum(Invoice.total_amount_ugx), 0)
-                )
-                .filter(Invoice.status == InvoiceStatus.Paid)
-                .scalar()
-            )
-            if total_paid is None:
-                return None
-            return float(total_paid or 0.0)
-        except Exception as e:
-            logger.warning("SASAIEngine revenue summary error: %s", e)
-            return None
-
     # ---------------------------------------------------------------------
     # Formatting helpers
     # ---------------------------------------------------------------------
@@ -0,0 +1,213 @@
+"""
+Shared keyword matcher for the SAS AI chat engines.
+
+The engines classify questions by looking for keywords (``"how many"``,
+``"revenue"``, ``"this month"``...).  Rather than each engine testing every
+keyword with ``kw in text``, the keyword sets are registered here as named
+groups of labels and compiled into one Aho-Corasick automaton, so a single
+pass over the question finds every keyword of every group at once:
+
+    register("chat", {"inventory": ["stock", "low stock"], ...})
+    m = match("Which items are low on stock?")
+    m.best("chat")        # ("inventory", 2)
+    m.labels("chat")      # ["inventory"]
+
+Matching keeps the engines' substring semantics (``"event"`` matches
+``"events"``) and a label's score is the number of its keywords found, as
+before.  The cost of a match depends on the length of the question and the
+number of keywords found, not on how many intents are registered.
+
+The AI knowledge topics and feature names are registered as the
+``"topics"`` and ``"features"`` groups so any engine can pull them out of
+the same match.
+"""
+import threading
+from collections import deque
+from functools import lru_cache
+
+from sas_management.ai.feature_registry import AI_FEATURES
+from sas_management.ai.knowledge import SYSTEM_KNOWLEDGE
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton over a fixed set of lower-case keywords."""
+
+    def __init__(self, keywords):
+        self.keywords = sorted({kw for kw in keywords if kw})
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+
+        for index, keyword in enumerate(self.keywords):
+            state = 0
+            for ch in keyword:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                state = nxt
+            self._out[state] = (index,)
+
+        # Breadth-first failure links; each state also reports the keywords
+        # ending at its longest proper suffix state.
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find(self, text):
+        """``{keyword index: [end offsets]}`` for every keyword occurring in ``text``."""
+        goto, fail, out = self._goto, self._fail, self._out
+        found = {}
+        state = 0
+        for pos, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for index in out[state]:
+                found.setdefault(index, []).append(pos)
+        return found
+
+
+def _bounded(text, start, end):
+    """True when ``text[start:end + 1]`` is not part of a longer word."""
+    return (start == 0 or not text[start - 1].isalnum()) and (end + 1 == len(text) or not text[end + 1].isalnum())
+
+
+class IntentMatch:
+    """Keywords found in one question, scored per registered group."""
+
+    def __init__(self, compiled, text, found):
+        self._compiled = compiled
+        self.keywords = frozenset(compiled.automaton.keywords[i] for i in found)
+        self._hits = {}
+        for i, ends in found.items():
+            size = len(compiled.automaton.keywords[i])
+            word = None
+            for group, label, whole_words in compiled.tags[i]:
+                if whole_words:
+                    if word is None:
+                        word = any(_bounded(text, end - size + 1, end) for end in ends)
+                    if not word:
+                        continue
+                labels = self._hits.setdefault(group, {})
+                labels[label] = labels.get(label, 0) + 1
+
+    def scores(self, group):
+        """``{label: keywords found}`` for the labels of ``group`` that matched, in registration order."""
+        hits = self._hits.get(group, {})
+        order = self._compiled.order[group]
+        return {label: hits[label] for label in sorted(hits, key=order.__getitem__)}
+
+    def labels(self, group):
+        return list(self.scores(group))
+
+    def has(self, group, label=None):
+        hits = self._hits.get(group, {})
+        return bool(hits) if label is None else label in hits
+
+    def first(self, group):
+        """The earliest-registered label of ``group`` that matched, or None."""
+        labels = self.labels(group)
+        return labels[0] if labels else None
+
+    def best(self, group):
+        """``(label, score)`` with the highest score (earliest label on ties), or ``(None, 0)``."""
+        hits = self._hits.get(group)
+        if not hits:
+            return None, 0
+        order = self._compiled.order[group]
+        label = max(hits, key=lambda lbl: (hits[lbl], -order[lbl]))
+        return label, hits[label]
+
+    def entities(self):
+        """Knowledge topics and AI features mentioned in the question."""
+        return {"topics": self.labels("topics"), "features": self.labels("features")}
+
+
+class _Compiled:
+    def __init__(self, groups):
+        keywords = {kw for labels, _whole in groups.values() for kws in labels.values() for kw in kws}
+        self.automaton = KeywordAutomaton(keywords)
+        index = {kw: i for i, kw in enumerate(self.automaton.keywords)}
+        self.tags = [[] for _ in self.automaton.keywords]
+        self.order = {}
+        for group, (labels, whole_words) in groups.items():
+            self.order[group] = {label: n for n, label in enumerate(labels)}
+            for label, kws in labels.items():
+                for kw in kws:
+                    self.tags[index[kw]].append((group, label, whole_words))
+
+
+_groups = {}
+_compiled = None
+_lock = threading.Lock()
+
+
+def register(group, intents, whole_words=False):
+    """
+    Register (or replace) keyword group ``group``: ``{label: [keywords]}``.
+
+    Label order matters for ``first()`` and for breaking ties in ``best()``.
+    With ``whole_words`` a keyword only counts when it is not part of a
+    longer word (``"bi"`` does not match ``"mobile"``).
+    """
+    global _compiled
+    normalized = {label: tuple(kw.lower() for kw in keywords if kw) for label, keywords in intents.items()}
+    with _lock:
+        _groups[group] = (normalized, whole_words)
+        _compiled = None
+    _match_lower.cache_clear()
+
+
+def unregister(group):
+    """Remove keyword group ``group`` (no-op when it isn't registered)."""
+    global _compiled
+    with _lock:
+        if _groups.pop(group, None) is None:
+            return
+        _compiled = None
+    _match_lower.cache_clear()
+
+
+def register_terms(group, terms, whole_words=False):
+    """Register a group whose labels are the keywords themselves (entity lists)."""
+    register(group, {term: (term,) for term in terms}, whole_words)
+
+
+def _automaton():
+    global _compiled
+    compiled = _compiled
+    if compiled is None:
+        with _lock:
+            if _compiled is None:
+                _compiled = _Compiled(_groups)
+            compiled = _compiled
+    return compiled
+
+
+def match(text):
+    """Match ``text`` (case-insensitively) against every registered group."""
+    return _match_lower((text or "").lower())
+
+
+@lru_cache(maxsize=512)
+def _match_lower(text):
+    compiled = _automaton()
+    return IntentMatch(compiled, text, compiled.automaton.find(text))
+
+
+register("topics", {topic: (topic.replace("_", " "),) for topic in SYSTEM_KNOWLEDGE}, whole_words=True)
+register("features", {
+    code: (name.lower(), code.replace("_", " ")) for code, name in AI_FEATURES.items()
+}, whole_words=True)
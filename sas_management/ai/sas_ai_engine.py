@@ -13,13 +13,11 @@ from typing import Any, Dict, List, Optional, Tuple
 from flask import current_app
 
 from sas_management.models import (
-    db,
     User,
     UserRole,
     Employee,
     Event,
     Invoice,
-    InvoiceStatus,
     Task,
     TaskStatus,
     InventoryItem,
@@ -27,21 +25,42 @@ from sas_management.models import (
     Order as HireOrder,
     POSOrder,
 )
-
+from sas_management.ai import intent_matcher
+from sas_management.services.ai_metrics import ai_metrics
+
+
+# Keyword flags combined by SASAIEngine.detect_intent
+intent_matcher.register("sas_engine", {
+    "events_count": ("how many events", "events count"),
+    "event": ("event",),
+    "this_month": ("this month", "current month"),
+    "upcoming": ("upcoming", "next"),
+    "hires": ("hires", "hire orders", "hire order", "rentals", "rental"),
+    "staff": ("staff", "employees", "employee", "team"),
+    "revenue": ("revenue", "sales", "income"),
+    "inventory": ("inventory", "stock", "shortage", "low stock"),
+    "tasks": ("task", "todo", "to-do", "due today"),
+    "bakery_order": ("bakery order",),
+    "bakery": ("bakery",),
+    "order": ("order",),
+    "hire": ("hire",),
+    "equipment_hire": ("equipment hire",),
+    "pos": ("pos",),
+})
 
 _ENGINE_CACHE: Dict[str, Any] = {
     "initialized": False,
     "models": {},   # key models referenced by the engine
-    "metrics": {},  # lightweight cached counts / totals
     "schema": {},   # table / column / relationship map for learning phase
 }
 
 
 def _ensure_metadata_loaded():
     """
-    Scan key models and cache basic metrics for faster answers.
+    Scan key models and cache their schema map.
 
-    This runs once per process and is read-only.
+    This runs once per process and is read-only.  Counts and totals come
+    from the shared AI metrics provider, which keeps them current.
     """
     if _ENGINE_CACHE["initialized"]:
         return
@@ -61,61 +80,6 @@ def _ensure_metadata_loaded():
         }
         _ENGINE_CACHE["models"] = models
 
-        # ------------------------------------------------------------------
-        # Precompute lightweight metrics (learning phase)
-        # ------------------------------------------------------------------
-        metrics: Dict[str, Any] = {}
-        try:
-            metrics["user_count"] = User.query.count()
-        except Exception:
-            metrics["user_count"] = None
-        try:
-            metrics["employee_count"] = Employee.query.count()
-        except Exception:
-            metrics["employee_count"] = None
-        try:
-            metrics["event_count"] = Event.query.count()
-        except Exception:
-            metrics["event_count"] = None
-        try:
-            metrics["task_count"] = Task.query.count()
-        except Exception:
-            metrics["task_count"] = None
-        try:
-            metrics["inventory_item_count"] = InventoryItem.query.count()
-        except Exception:
-            metrics["inventory_item_count"] = None
-        try:
-            metrics["bakery_order_count"] = BakeryOrder.query.count()
-        except Exception:
-            metrics["bakery_order_count"] = None
-        try:
-            metrics["hire_order_count"] = HireOrder.query.count()
-        except Exception:
-            metrics["hire_order_count"] = None
-        try:
-            metrics["pos_order_count"] = POSOrder.query.count()
-        except Exception:
-            metrics["pos_order_count"] = None
-        try:
-            # Total invoiced amount in the system (all time)
-            total_amount = db.session.query(db.func.coalesce(db.func.sum(Invoice.total_amount_ugx), 0)).scalar()
-            metrics["invoice_total_amount"] = float(total_amount or 0)
-        except Exception:
-            metrics["invoice_total_amount"] = None
-        try:
-            # Total amount for paid invoices only (all time)
-            paid_amount = (
-                db.session.query(db.func.coalesce(db.func.sum(Invoice.total_amount_ugx), 0))
-                .filter(Invoice.status == InvoiceStatus.Paid)
-                .scalar()
-            )
-            metrics["invoice_paid_amount"] = float(paid_amount or 0)
-        except Exception:
-            metrics["invoice_paid_amount"] = None
-
-        _ENGINE_CACHE["metrics"] = metrics
-
         # ------------------------------------------------------------------
         # Lightweight schema map: table names, columns, relationships
         # ------------------------------------------------------------------
@@ -226,46 +190,49 @@ class SASAIEngine:
         """
         Map natural language question to a concrete intent code.
         """
-        q = (question or "").lower()
+        found = intent_matcher.match(question)
+
+        def has(*labels):
+            return all(found.has("sas_engine", label) for label in labels)
 
         # Events – explicit count
-        if "how many events" in q or "events count" in q:
+        if has("events_count"):
             return "events_total"
 
         # Events – time-bounded helpers (kept for richer questions)
-        if "event" in q or "events" in q:
-            if "this month" in q or "current month" in q:
+        if has("event"):
+            if has("this_month"):
                 return "events_this_month"
-            if "upcoming" in q or "next" in q:
+            if has("upcoming"):
                 return "events_upcoming"
 
         # Hire orders / rentals
-        if "hires" in q or "hire orders" in q or "hire order" in q or "rentals" in q or "rental" in q:
+        if has("hires"):
             return "hire_orders_total"
 
         # Staff / employees
-        if "staff" in q or "employees" in q or "employee" in q or "team" in q:
+        if has("staff"):
             return "staff_count"
 
         # Revenue / sales
-        if "revenue" in q or "sales" in q or "income" in q:
+        if has("revenue"):
             # Generic revenue question – use all-time total for paid invoices
             return "revenue_total"
 
         # Inventory / stock / shortages
-        if "inventory" in q or "stock" in q or "shortage" in q or "low stock" in q:
+        if has("inventory"):
             return "inventory_overview"
 
-        if "task" in q or "todo" in q or "to-do" in q or "due today" in q:
+        if has("tasks"):
             return "tasks_for_user_today"
 
-        if "bakery order" in q or ("bakery" in q and "order" in q):
+        if has("bakery_order") or has("bakery", "order"):
             return "bakery_orders_recent"
 
-        if ("hire" in q and "order" in q) or "equipment hire" in q:
+        if has("hire", "order") or has("equipment_hire"):
             return "hire_orders_recent"
 
-        if "pos" in q and "order" in q:
+        if has("pos", "order"):
             return "pos_orders_recent"
 
         return None
@@ -318,150 +285,62 @@ class SASAIEngine:
         return {}, False
 
     def _fetch_staff_count(self) -> Dict[str, Any]:
-        staff_total = None
-        employees_total = None
-        try:
-            staff_total = User.query.count()
-        except Exception:
-            pass
-        try:
-            employees_total = Employee.query.count()
-        except Exception:
-            pass
+        metrics = ai_metrics.many(["users.total", "employees.total"], self.user)
         return {
-            "staff_total": staff_total,
-            "employees_total": employees_total,
+            "staff_total": metrics.get("users.total"),
+            "employees_total": metrics.get("employees.total"),
         }
 
     def _fetch_events_total(self) -> Dict[str, Any]:
         """Count all events in the system."""
-        try:
-            total = Event.query.count()
-            return {"events_total": total}
-        except Exception as e:
-            current_app.logger.warning(f"SASAIEngine._fetch_events_total error: {e}")
-            return {}
+        total = ai_metrics.get("events.total", self.user)
+        return {} if total is None else {"events_total": total}
 
     def _fetch_events_this_month(self) -> Dict[str, Any]:
         today = date.today()
-        month_start = today.replace(day=1)
-        try:
-            q = Event.query
-            # Use event_date when available, otherwise date
-            if hasattr(Event, "event_date"):
-                q = q.filter(Event.event_date != None)  # noqa: E711
-                q = q.filter(Event.event_date >= month_start, Event.event_date <= today)
-            else:
-                q = q.filter(Event.date >= month_start, Event.date <= today)
-            count = q.count()
-            return {"month_start": month_start, "today": today, "events_count": count}
-        except Exception as e:
-            current_app.logger.warning(f"SASAIEngine._fetch_events_this_month error: {e}")
+        count = ai_metrics.get("events.this_month", self.user)
+        if count is None:
             return {}
+        return {"month_start": today.replace(day=1), "today": today, "events_count": count}
 
     def _fetch_events_upcoming(self) -> Dict[str, Any]:
         today = date.today()
-        horizon = today + timedelta(days=30)
-        try:
-            q = Event.query
-            if hasattr(Event, "event_date"):
-                q = q.filter(Event.event_date != None)  # noqa: E711
-                q = q.filter(Event.event_date > today, Event.event_date <= horizon)
-            else:
-                q = q.filter(Event.date > today, Event.date <= horizon)
-            events = q.order_by(Event.event_date.asc() if hasattr(Event, "event_date") else Event.date.asc()).limit(10).all()
-            items = []
-            for e in events:
-                items.append(
-                    {
-                        "id": e.id,
-                        "title": getattr(e, "title", getattr(e, "event_name", "Event")),
-                        "date": (e.event_date or e.date).isoformat() if (getattr(e, "event_date", None) or getattr(e, "date", None)) else None,
-                        "status": getattr(e, "status", None),
-                    }
-                )
-            return {"today": today, "horizon": horizon, "events": items}
-        except Exception as e:
-            current_app.logger.warning(f"SASAIEngine._fetch_events_upcoming error: {e}")
+        upcoming = ai_metrics.get("events.upcoming", self.user)
+        if upcoming is None:
             return {}
+        return {
+            "today": today,
+            "horizon": today + timedelta(days=30),
+            "events_count": upcoming["count"],
+            "events": upcoming["events"],
+        }
 
     def _fetch_revenue_overview_month(self) -> Dict[str, Any]:
-        today = datetime.utcnow().date()
-        month_start = today.replace(day=1)
-        try:
-            invoices = (
-                Invoice.query.filter(
-                    Invoice.status.in_([InvoiceStatus.Paid, InvoiceStatus.Issued, InvoiceStatus.Draft])
-                )
-                .filter(Invoice.issue_date >= month_start)
-                .all()
-            )
-            total = 0.0
-            paid = 0.0
-            for inv in invoices:
-                amount = float(inv.total_amount_ugx or 0)
-                total += amount
-                if inv.status == InvoiceStatus.Paid:
-                    paid += amount
-            return {
-                "period_start": month_start,
-                "period_end": today,
-                "total_amount": total,
-                "paid_amount": paid,
-                "invoices_count": len(invoices),
-            }
-        except Exception as e:
-            current_app.logger.warning(f"SASAIEngine._fetch_revenue_overview_month error: {e}")
-            return {}
+        overview = ai_metrics.get("revenue.month", self.user, can_view_sensitive=self.can_view_financials)
+        return dict(overview) if overview else {}
 
     def _fetch_hire_orders_total(self) -> Dict[str, Any]:
         """Count all hire orders in the system."""
-        try:
-            total = HireOrder.query.count()
-            return {"hire_orders_total": total}
-        except Exception as e:
-            current_app.logger.warning(f"SASAIEngine._fetch_hire_orders_total error: {e}")
-            return {}
+        total = ai_metrics.get("hire_orders.total", self.user)
+        return {} if total is None else {"hire_orders_total": total}
 
     def _fetch_revenue_total(self) -> Dict[str, Any]:
         """
         Sum revenue from invoices for all time (paid invoices only).
         """
-        try:
-            total_paid = (
-                db.session.query(db.func.coalesce(db.func.sum(Invoice.total_amount_ugx), 0))
-                .filter(Invoice.status == InvoiceStatus.Paid)
-                .scalar()
-            )
-            return {"total_revenue_paid": float(total_paid or 0.0)}
-        except Exception as e:
-            current_app.logger.warning(f"SASAIEngine._fetch_revenue_total error: {e}")
-            return {}
+        total_paid = ai_metrics.get("revenue.paid_total", self.user, can_view_sensitive=self.can_view_financials)
+        return {} if total_paid is None else {"total_revenue_paid": total_paid}
 
     def _fetch_inventory_overview(self) -> Dict[str, Any]:
-        try:
-            total_items = InventoryItem.query.count()
-            low_stock = []
-            all_items = InventoryItem.query.all()
-            for item in all_items:
-                qty = getattr(item, "stock_count", None)
-                if qty is None:
-                    continue
-                if qty <= 10:
-                    low_stock.append(
-                        {
-                            "id": item.id,
-                            "name": getattr(item, "name", "Item"),
-                            "stock_count": int(qty),
-                        }
-                    )
-            return {
-                "items_total": total_items,
-                "low_stock_items": low_stock,
-            }
-        except Exception as e:
-            current_app.logger.warning(f"SASAIEngine._fetch_inventory_low_stock error: {e}")
+        metrics = ai_metrics.many(["inventory.items", "inventory.low_stock"], self.user)
+        if metrics.get("inventory.items") is None:
             return {}
+        low_stock = metrics.get("inventory.low_stock") or {"count": 0, "items": []}
+        return {
+            "items_total": metrics["inventory.items"],
+            "low_stock_count": low_stock["count"],
+            "low_stock_items": low_stock["items"],
+        }
 
     def _fetch_tasks_for_user_today(self) -> Dict[str, Any]:
         today = datetime.utcnow().date()
@@ -491,32 +370,20 @@ class SASAIEngine:
             current_app.logger.warning(f"SASAIEngine._fetch_tasks_for_user_today error: {e}")
             return {}
 
-    def _fetch_bakery_orders_recent(self) -> Dict[str, Any]:
-        try:
-            since = datetime.utcnow() - timedelta(days=30)
-            orders = BakeryOrder.query.filter(BakeryOrder.created_at >= since).all()
-            return {"since": since, "count": len(orders)}
-        except Exception as e:
-            current_app.logger.warning(f"SASAIEngine._fetch_bakery_orders_recent error: {e}")
+    def _fetch_recent_orders(self, name: str) -> Dict[str, Any]:
+        count = ai_metrics.get(name, self.user)
+        if count is None:
             return {}
+        return {"since": datetime.utcnow() - timedelta(days=30), "count": count}
+
+    def _fetch_bakery_orders_recent(self) -> Dict[str, Any]:
+        return self._fetch_recent_orders("bakery_orders.recent")
 
     def _fetch_hire_orders_recent(self) -> Dict[str, Any]:
-        try:
-            since = datetime.utcnow() - timedelta(days=30)
-            orders = HireOrder.query.filter(HireOrder.created_at >= since).all()
-            return {"since": since, "count": len(orders)}
-        except Exception as e:
-            current_app.logger.warning(f"SASAIEngine._fetch_hire_orders_recent error: {e}")
-            return {}
+        return self._fetch_recent_orders("hire_orders.recent")
 
     def _fetch_pos_orders_recent(self) -> Dict[str, Any]:
-        try:
-            since = datetime.utcnow() - timedelta(days=30)
-            orders = POSOrder.query.filter(POSOrder.created_at >= since).all()
-            return {"since": since, "count": len(orders)}
-        except Exception as e:
-            current_app.logger.warning(f"SASAIEngine._fetch_pos_orders_recent error: {e}")
-            return {}
+        return self._fetch_recent_orders("pos_orders.recent")
 
     # ------------------------------------------------------------------
     # Reasoning & final answer
@@ -580,7 +447,7 @@ class SASAIEngine:
                 return reply, actions
             reply_lines = [
                 "📊 From SAS System:",
-                f"• Upcoming events in the next 30 days: {len(events)}",
+                f"• Upcoming events in the next 30 days: {data.get('events_count', len(events))}",
             ]
             for e in events[:5]:
                 reply_lines.append(
@@ -612,7 +479,7 @@ class SASAIEngine:
                 return "📊 From SAS System:\n• No data found for this query.", actions
             reply_lines = ["📊 From SAS System:"]
             reply_lines.append(f"• Inventory items in system: {items_total}")
-            reply_lines.append(f"• Low-stock items (≤ 10 units): {len(low_items)}")
+            reply_lines.append(f"• Low-stock items (≤ 10 units): {data.get('low_stock_count', len(low_items))}")
             if low_items:
                 for item in low_items[:5]:
                     reply_lines.append(
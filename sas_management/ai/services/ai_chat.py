@@ -6,10 +6,12 @@ Backed by SASAIAssistant for conversational memory and system-aware tools.
 NO external external APIs required.
 """
 from flask import current_app, session
+from sas_management.ai import intent_matcher
 from sas_management.ai.feature_model import is_ai_feature_enabled
 from sas_management.ai.core.assistant import SASAIAssistant
 from sas_management.models import User, db
-from datetime import datetime, timedelta, date
+from sas_management.services.ai_metrics import MetricRestricted, ai_metrics
+from datetime import datetime, timedelta
 from decimal import Decimal
 from typing import Dict, List, Optional
 
@@ -99,6 +101,22 @@ def process_chat_message(message: str, user_id: int, context: dict = None) -> di
         }
 
 
+intent_matcher.register("ai_chat", {
+    "writing": [
+        "write", "draft", "compose", "create", "generate", "help me write",
+        "make a", "prepare", "format", "template", "example"
+    ],
+    "system": [
+        "event", "events", "revenue", "profit", "staff", "employee",
+        "client", "customer", "inventory", "stock", "compliance", "safety",
+        "how many", "what is", "show me", "list", "count", "total",
+        "this month", "last quarter", "today", "upcoming", "pending",
+        "status", "performance", "analysis", "report"
+    ],
+    "follow_up": ["more", "details", "tell me", "explain"],
+})
+
+
 def _detect_intent(message: str, memory: List[Dict]) -> str:
     """
     Classify message intent into: system_query, general_knowledge, or writing_assistance.
@@ -110,29 +128,20 @@ def _detect_intent(message: str, memory: List[Dict]) -> str:
     Returns:
         Intent classification string
     """
+    found = intent_matcher.match(message)
+
     # Writing assistance keywords
-    writing_keywords = [
-        "write", "draft", "compose", "create", "generate", "help me write",
-        "make a", "prepare", "format", "template", "example"
-    ]
-    if any(keyword in message for keyword in writing_keywords):
+    if found.has("ai_chat", "writing"):
         return "writing_assistance"
     
     # System query keywords (data from database)
-    system_keywords = [
-        "event", "events", "revenue", "profit", "staff", "employee",
-        "client", "customer", "inventory", "stock", "compliance", "safety",
-        "how many", "what is", "show me", "list", "count", "total",
-        "this month", "last quarter", "today", "upcoming", "pending",
-        "status", "performance", "analysis", "report"
-    ]
-    if any(keyword in message for keyword in system_keywords):
+    if found.has("ai_chat", "system"):
         return "system_query"
     
     # Check memory for context
     if memory:
         last_intent = memory[-1].get("intent")
-        if last_intent == "system_query" and any(word in message for word in ["more", "details", "tell me", "explain"]):
+        if last_intent == "system_query" and found.has("ai_chat", "follow_up"):
             return "system_query"
     
     # Default to general knowledge
@@ -291,98 +300,59 @@ def _handle_writing_assistance(message: str, memory: List[Dict]) -> Dict:
 
 def _handle_events_query(message: str, detailed: bool = False) -> Dict:
     """Handle events-related queries."""
-    try:
-        from sas_management.service.models import ServiceEvent
-        
-        today = date.today()
-        month_start = today.replace(day=1)
-        
-        # Count events this month
-        events_this_month = ServiceEvent.query.filter(
-            ServiceEvent.event_date >= month_start,
-            ServiceEvent.event_date <= today
-        ).count()
-        
-        # Count upcoming events
-        upcoming = ServiceEvent.query.filter(
-            ServiceEvent.event_date > today
-        ).count()
-        
-        # Count by status
-        planned = ServiceEvent.query.filter_by(status="Planned").count()
-        confirmed = ServiceEvent.query.filter_by(status="Confirmed").count()
-        
-        reply = f"Here's your events overview:\n\n"
-        reply += f"• Events this month: {events_this_month}\n"
-        reply += f"• Upcoming events: {upcoming}\n"
-        reply += f"• Planned: {planned}\n"
-        reply += f"• Confirmed: {confirmed}\n\n"
-        reply += "Would you like details on a specific event?"
-        
-        return {
-            "reply": reply,
-            "source": "system_data",
-            "suggested_actions": ["Show upcoming events", "Event planning help", "View event details"],
-        }
-    except Exception as e:
-        current_app.logger.warning(f"Error handling events query: {e}")
+    overview = ai_metrics.get("service_events.overview")
+    if overview is None:
         return {
             "reply": "I can help with events, but I'm having trouble accessing the data right now. Please try again.",
             "source": "system_data",
             "suggested_actions": [],
         }
 
+    by_status = overview["by_status"]
+    reply = f"Here's your events overview:\n\n"
+    reply += f"• Events this month: {overview['this_month']}\n"
+    reply += f"• Upcoming events: {overview['upcoming']}\n"
+    reply += f"• Planned: {by_status.get('Planned', 0)}\n"
+    reply += f"• Confirmed: {by_status.get('Confirmed', 0)}\n\n"
+    reply += "Would you like details on a specific event?"
+
+    return {
+        "reply": reply,
+        "source": "system_data",
+        "suggested_actions": ["Show upcoming events", "Event planning help", "View event details"],
+    }
+
 
 def _handle_revenue_query(message: str) -> Dict:
-    """Handle revenue-related queries."""
+    """Handle revenue-related queries (invoices issued this month)."""
+    from flask_login import current_user
+
     try:
-        from sas_management.models import Quote, Invoice
-        
-        today = datetime.utcnow()
-        month_start = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        
-        quotes = Quote.query.filter(
-            Quote.status == "Accepted",
-            Quote.created_at >= month_start
-        ).all()
-        
-        total_revenue = Decimal("0")
-        for quote in quotes:
-            if quote.total_amount:
-                total_revenue += Decimal(str(quote.total_amount))
-        
-        invoices = Invoice.query.filter(
-            Invoice.status == "Paid",
-            Invoice.created_at >= month_start
-        ).all() if hasattr(Invoice, "status") else []
-        
-        invoice_revenue = Decimal("0")
-        for inv in invoices:
-            if hasattr(inv, "amount_paid") and inv.amount_paid:
-                invoice_revenue += Decimal(str(inv.amount_paid))
-        
-        total = total_revenue + invoice_revenue
-        
-        reply = f"Revenue Overview:\n\n"
-        reply += f"• This month's revenue: {float(total):,.0f} UGX\n"
-        reply += f"• From quotes: {float(total_revenue):,.0f} UGX\n"
-        if invoice_revenue > 0:
-            reply += f"• From invoices: {float(invoice_revenue):,.0f} UGX\n"
-        reply += f"\nBased on {len(quotes)} accepted quotes this month."
-        
+        revenue = ai_metrics.get("revenue.month", current_user)
+    except MetricRestricted:
         return {
-            "reply": reply,
+            "reply": "🔒 Revenue figures are restricted to administrators.",
             "source": "system_data",
-            "suggested_actions": ["Profit analysis", "Revenue forecast", "View quotes"],
+            "suggested_actions": [],
         }
-    except Exception as e:
-        current_app.logger.warning(f"Error handling revenue query: {e}")
+    if revenue is None:
         return {
             "reply": "I can help with revenue analysis, but I'm having trouble accessing the data right now.",
             "source": "system_data",
             "suggested_actions": [],
         }
 
+    reply = f"Revenue Overview:\n\n"
+    reply += f"• This month's invoiced revenue: {revenue['total_amount']:,.0f} UGX\n"
+    reply += f"• Paid so far: {revenue['paid_amount']:,.0f} UGX\n"
+    reply += f"\nBased on {revenue['invoices_count']} invoices issued this month."
+
+    return {
+        "reply": reply,
+        "source": "system_data",
+        "suggested_actions": ["Profit analysis", "Revenue forecast", "View invoices"],
+    }
+
 
 def _handle_profit_query(message: str) -> Dict:
     """Handle profit-related queries."""
@@ -445,31 +415,25 @@ def _handle_profit_query(message: str) -> Dict:
 
 def _handle_staff_query(message: str) -> Dict:
     """Handle staff-related queries."""
-    try:
-        from sas_management.models import User
-        from sas_management.service.models import ServiceStaffAssignment
-        
-        staff_count = User.query.filter(User.role != None).count()
-        assignments = ServiceStaffAssignment.query.count()
-        
-        reply = f"Staff Overview:\n\n"
-        reply += f"• Total staff members: {staff_count}\n"
-        reply += f"• Total service assignments: {assignments}\n\n"
-        reply += "I can help you analyze staff performance or plan staffing for events."
-        
-        return {
-            "reply": reply,
-            "source": "system_data",
-            "suggested_actions": ["Staff performance", "Staffing recommendations", "View assignments"],
-        }
-    except Exception as e:
-        current_app.logger.warning(f"Error handling staff query: {e}")
+    metrics = ai_metrics.many(["staff.total", "service_assignments.total"])
+    if None in metrics.values():
         return {
             "reply": "I can help with staff information, but I'm having trouble accessing the data right now.",
             "source": "system_data",
             "suggested_actions": [],
         }
 
+    reply = f"Staff Overview:\n\n"
+    reply += f"• Total staff members: {metrics['staff.total']}\n"
+    reply += f"• Total service assignments: {metrics['service_assignments.total']}\n\n"
+    reply += "I can help you analyze staff performance or plan staffing for events."
+
+    return {
+        "reply": reply,
+        "source": "system_data",
+        "suggested_actions": ["Staff performance", "Staffing recommendations", "View assignments"],
+    }
+
 
 def _handle_compliance_query(message: str) -> Dict:
     """Handle compliance-related queries."""
@@ -503,28 +467,24 @@ def _handle_inventory_query(message: str) -> Dict:
 
 def _handle_client_query(message: str) -> Dict:
     """Handle client-related queries."""
-    try:
-        from sas_management.models import Client
-        
-        client_count = Client.query.count()
-        
-        reply = f"Client Overview:\n\n"
-        reply += f"• Total clients: {client_count}\n\n"
-        reply += "Use the Client Analyzer feature to analyze client value and preferences."
-        
-        return {
-            "reply": reply,
-            "source": "system_data",
-            "suggested_actions": ["Client analysis", "Top clients", "Client reports"],
-        }
-    except Exception as e:
-        current_app.logger.warning(f"Error handling client query: {e}")
+    client_count = ai_metrics.get("clients.total")
+    if client_count is None:
         return {
             "reply": "I can help with client information, but I'm having trouble accessing the data right now.",
             "source": "system_data",
             "suggested_actions": [],
         }
 
+    reply = f"Client Overview:\n\n"
+    reply += f"• Total clients: {client_count}\n\n"
+    reply += "Use the Client Analyzer feature to analyze client value and preferences."
+
+    return {
+        "reply": reply,
+        "source": "system_data",
+        "suggested_actions": ["Client analysis", "Top clients", "Client reports"],
+    }
+
 
 def _get_session_memory() -> List[Dict]:
     """Get last 5 messages from session."""
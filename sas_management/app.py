@@ -134,6 +134,34 @@ def create_app():
     # Note: db.create_all() is kept for initial dev safety, but migrations are preferred
     migrate = Migrate(app, db)
     
+    # CLI: `flask search-index rebuild`
+    from sas_management.services.search_index import search_index_cli
+    app.cli.add_command(search_index_cli)
+    
+    # CLI: `flask pos-sales-cube rebuild`
+    from sas_management.services.pos_sales_cube import pos_sales_cube_cli
+    app.cli.add_command(pos_sales_cube_cli)
+    
+    # CLI: `flask hire-availability restore-stock`
+    from sas_management.services.hire_availability import hire_availability_cli
+    app.cli.add_command(hire_availability_cli)
+    
+    # CLI: `flask event-profitability refresh-all`
+    from sas_management.services.event_profitability_rollup import event_profitability_cli
+    app.cli.add_command(event_profitability_cli)
+    
+    # CLI: `flask ledger rebuild`
+    from sas_management.services.ledger_reports import ledger_cli
+    app.cli.add_command(ledger_cli)
+    
+    # CLI: `flask billing run --start 2026-01-01 --end 2026-01-31 [--send]`
+    from sas_management.services.billing_run import billing_cli
+    app.cli.add_command(billing_cli)
+    
+    # CLI: `flask documents prune`
+    from sas_management.services.document_renderer import documents_cli
+    app.cli.add_command(documents_cli)
+    
     # Global Safe-Mode Fix: Bypass RBAC for unassigned users
     @app.before_request
     def bypass_rbac_for_unassigned_users():
@@ -224,51 +252,121 @@ def create_app():
                 if app.config.get("DEBUG", False):
                     app.logger.debug(f"Expired roles check error (non-fatal): {e}")
     
-    # Activity logging middleware - safe error handling that doesn't break requests
+    # Activity logging middleware - rows are queued here and bulk-written by a
+    # background thread, so no request waits on an audit write
+    from sas_management.services.activity_log_writer import activity_log_writer
+    activity_log_writer.init_app(app)
+    
+    # Cached navigation menus and permission sets are keyed by this version;
+    # role/permission writes through the session bump it
+    from sas_management.utils import rbac_version
+    rbac_version.install(db.session)
+    from sas_management.utils.permission_resolver import permission_resolver
+    permission_resolver.configure(app)
+    
+    # Dashboard KPI snapshot - invalidated by writes to the models it aggregates
+    from sas_management.services.dashboard_metrics_service import dashboard_metrics
+    dashboard_metrics.init_app(app)
+    
+    # Counts and totals shared by the SAS AI engines - cached, coalesced and
+    # invalidated by writes to the models each metric reads
+    from sas_management.services.ai_metrics import ai_metrics
+    ai_metrics.init_app(app)
+    
+    # Chat / KDS server push - committed messages and order changes are
+    # published to the event bus and streamed over SSE
+    from sas_management.services.event_bus import event_bus
+    event_bus.init_app(app, db.session)
+    
+    # Running POS shift totals - kept in step with order/payment writes so
+    # X/Z reports never aggregate a whole shift
+    from sas_management.services import pos_shift_counters
+    pos_shift_counters.install(db.session)
+    
+    # POS product catalog - one cached, versioned snapshot for every till,
+    # invalidated by price and product writes
+    from sas_management.services.pos_catalog import pos_catalog
+    pos_catalog.init_app(app)
+    
+    # Hire equipment availability - per-item booking timelines, refreshed for
+    # just the items a committed hire order touches
+    from sas_management.services.hire_availability import hire_availability
+    hire_availability.init_app(app)
+    
+    # Dispatch route planner - solver budget and the road distance cache
+    from sas_management.services.route_planner import route_planner
+    route_planner.init_app(app)
+    
+    # Per-period payroll attendance totals - attendance writes drop the
+    # affected summaries so payroll runs only recompute changed employees
+    from sas_management.services import payroll_engine
+    payroll_engine.install(db.session)
+    
+    # Hourly POS sales cube - paid orders are folded into their hour/terminal
+    # bucket on flush, so BI heatmaps never scan pos_order
+    from sas_management.services import pos_sales_cube
+    pos_sales_cube.install(db.session)
+    
+    # Event profitability rollups - event/cost/revenue/staff writes mark the
+    # event dirty and a background refresher recomputes it in batches
+    from sas_management.services import event_profitability_rollup
+    event_profitability_rollup.install(db.session)
+    event_profitability_rollup.refresher.init_app(app)
+    
+    # Monthly ledger balances - journal writes re-fold the account/month
+    # pairs they touch, so financial reports never re-sum closed months
+    from sas_management.services import ledger_reports
+    ledger_reports.install(db.session)
+    
+    # Background CSV/XLSX exports
+    from sas_management.services.export_service import export_jobs
+    export_jobs.init_app(app)
+    
+    # PDF rendering pool and content-addressed document cache
+    from sas_management.services.document_renderer import renderer as document_renderer
+    document_renderer.init_app(app)
+    
+    # Month-end billing runs execute on a background thread
+    from sas_management.services.billing_run import runner as billing_runner
+    billing_runner.init_app(app)
+    
     @app.before_request
     def log_user_actions():
         from flask import request
         from flask_login import current_user
-        from sas_management.models import ActivityLog
         if current_user.is_authenticated:
             try:
-                entry = ActivityLog(
+                activity_log_writer.record(
                     user_id=current_user.id,
                     action=request.endpoint,
                     ip_address=request.remote_addr,
                     url=request.url
                 )
-                db.session.add(entry)
-                # Use flush instead of commit to avoid blocking on every request
-                # Actual commit happens at end of request via after_request
-                db.session.flush()
             except Exception as e:
-                # Don't break the app if logging fails - rollback and continue
-                db.session.rollback()
-                # Only log in development to avoid log noise in production
+                # Don't break the app if logging fails
                 if app.config.get("DEBUG", False):
                     app.logger.debug(f"Activity logging error (non-fatal): {e}")
     
-    # Commit activity logs at end of request (batched)
+    # Commit anything a view left pending at end of request. Activity logs no
+    # longer go through the session, but some views still rely on this commit.
     @app.after_request
-    def commit_activity_logs(response):
+    def commit_pending_changes(response):
         try:
-            # Only commit if there are pending changes (from activity logging)
             if db.session.dirty or db.session.new:
                 db.session.commit()
         except Exception as e:
             # Rollback on error but don't break the response
             db.session.rollback()
             if app.config.get("DEBUG", False):
-                app.logger.debug(f"Activity log commit error (non-fatal): {e}")
+                app.logger.debug(f"Pending change commit error (non-fatal): {e}")
         return response
     
     # Context processor to inject modules into all templates for authenticated users
     @app.context_processor
     def inject_modules():
         from flask_login import current_user
-        from flask import url_for
         from sas_management.utils.permissions import has_permission
+        from sas_management.navigation.registry import navigation_registry
         
         def has_any_permission(*permission_codes):
             """Check if user has any of the given permissions."""
@@ -292,147 +390,12 @@ def create_app():
             except:
                 return str(value)
         
-        modules = []
-        
-        # Only compute modules for authenticated users
-        if current_user.is_authenticated:
-            # Check if user is admin (has full access)
-            is_admin = False
-            if hasattr(current_user, 'role_obj') and current_user.role_obj:
-                if current_user.role_obj.name == 'ADMIN':
-                    is_admin = True
-            elif hasattr(current_user, 'role') and str(current_user.role) == 'UserRole.Admin':
-                is_admin = True
-            
-            # Admin gets ALL modules
-            if is_admin:
-                modules.extend([
-                    {"name": "Dashboard", "url": url_for("core.dashboard")},
-                    {"name": "Clients CRM", "url": url_for("core.clients_list")},
-                    {
-                        "name": "Events",
-                        "url": url_for("events.events_list"),
-                        "children": [
-                            {"name": "All Events", "url": url_for("events.events_list")},
-                            {"name": "Create Event", "url": url_for("events.event_create")},
-                            {"name": "Venues", "url": url_for("events.venues_list")},
-                            {"name": "Menu Packages", "url": url_for("events.menu_packages_list")},
-                            {"name": "Vendors", "url": url_for("events.vendors_manage")},
-                            {"name": "Floor Planner", "url": url_for("floorplanner.dashboard")},
-                            {"name": "Tasks", "url": url_for("tasks.task_list")},
-                        ]
-                    },
-                    {
-                        "name": "Hire Department",
-                        "url": url_for("hire.index"),
-                        "children": [
-                            {"name": "Hire Overview", "url": url_for("hire.index")},
-                            {"name": "Hire Inventory", "url": url_for("hire.inventory_list")},
-                            {"name": "Hire Orders", "url": url_for("hire.orders_list")},
-                            {"name": "Equipment Maintenance", "url": url_for("hire.maintenance_list")},
-                        ]
-                    },
-                    {
-                        "name": "Event Service",
-                        "url": url_for("service.dashboard"),
-                        "children": [
-                            {"name": "Services Overview", "url": url_for("service.dashboard")},
-                            {"name": "All Events", "url": url_for("service.events")},
-                            {"name": "Timeline", "url": url_for("event_service.timeline_index")},
-                            {"name": "Documents", "url": url_for("event_service.documents_index")},
-                            {"name": "Checklists", "url": url_for("event_service.service_checklists")},
-                            {"name": "Messages", "url": url_for("event_service.service_messages")},
-                            {"name": "Reports", "url": url_for("event_service.service_reports")},
-                            {"name": "Analytics", "url": url_for("event_service.service_analytics")},
-                        ]
-                    },
-                    {
-                        "name": "Production Department",
-                        "url": url_for("production.index"),
-                        "children": [
-                            {"name": "Production Overview", "url": url_for("production.index")},
-                            {"name": "Menu Builder", "url": url_for("menu_builder.dashboard")},
-                            {"name": "Catering Menu", "url": url_for("catering.menu_list")},
-                            {"name": "Ingredient Inventory", "url": url_for("inventory.ingredients_list")},
-                            {"name": "Kitchen Checklist", "url": url_for("production.kitchen_checklist_list")},
-                            {"name": "Delivery QC Checklist", "url": url_for("production.delivery_qc_list")},
-                            {"name": "Food Safety Logs", "url": url_for("production.food_safety_list")},
-                            {"name": "Hygiene Reports", "url": url_for("production.hygiene_reports_list")},
-                        ]
-                    },
-                    {
-                        "name": "Accounting Department",
-                        "url": url_for("accounting.dashboard"),
-                        "children": [
-                            {"name": "Accounting Overview", "url": url_for("accounting.dashboard")},
-                            {"name": "Receipting System", "url": url_for("accounting.receipts_list")},
-                            {"name": "Quotations", "url": url_for("quotes.list_quotes")},
-                            {"name": "Invoices", "url": url_for("invoices.invoice_list")},
-                            {"name": "Cashbook", "url": url_for("cashbook.index")},
-                            {"name": "Financial Reports", "url": url_for("reports.reports_index")},
-                            {"name": "Payroll Management", "url": url_for("payroll.payroll_list")},
-                        ]
-                    },
-                    {
-                        "name": "Bakery Department",
-                        "url": url_for("bakery.dashboard"),
-                        "children": [
-                            {"name": "Bakery Overview", "url": url_for("bakery.dashboard")},
-                            {"name": "Bakery Menu", "url": url_for("bakery.items_list")},
-                            {"name": "Bakery Orders", "url": url_for("bakery.orders_list")},
-                            {"name": "Production Sheet", "url": url_for("bakery.production_sheet")},
-                            {"name": "Reports", "url": url_for("bakery.reports")},
-                        ]
-                    },
-                    {"name": "POS System", "url": url_for("pos.index")},
-                    {
-                        "name": "HR Department",
-                        "url": url_for("hr.dashboard"),
-                        "children": [
-                            {"name": "HR Overview", "url": url_for("hr.dashboard")},
-                            {"name": "Employee Management", "url": url_for("hr.employee_list")},
-                            {"name": "Roster Builder", "url": url_for("hr.roster_builder")},
-                            {"name": "Leave Requests", "url": url_for("hr.leave_queue")},
-                            {"name": "Attendance Review", "url": url_for("hr.attendance_review")},
-                            {"name": "Payroll Export", "url": url_for("hr.payroll_export")},
-                        ]
-                    },
-                    {"name": "CRM Pipeline", "url": url_for("crm.pipeline")},
-                    {"name": "Dispatch", "url": url_for("dispatch.dashboard")},
-                    {"name": "Employee University", "url": url_for("university.dashboard")},
-                    {"name": "Admin Dashboard", "url": url_for("admin.dashboard")},
-                    {"name": "SAS AI", "url": url_for("ai.chat")},
-                ])
-            else:
-                # Non-admin users - check role and show appropriate modules
-                user_role_names = [r.name for r in current_user.roles.all()]
-                user_role_obj_name = current_user.role_obj.name if current_user.role_obj else None
-                all_user_roles = user_role_names + ([user_role_obj_name] if user_role_obj_name else [])
-                
-                # Check if user has specific role
-                def has_role(*role_names):
-                    return any(r in all_user_roles for r in role_names)
-                
-                # Show Accounting modules for ACCOUNTING role
-                if has_role('ACCOUNTING'):
-                    modules.append({
-                        "name": "Accounting Department",
-                        "url": url_for("accounting.dashboard"),
-                        "children": [
-                            {"name": "Accounting Overview", "url": url_for("accounting.dashboard")},
-                            {"name": "Receipting System", "url": url_for("accounting.receipts_list")},
-                            {"name": "Quotations", "url": url_for("quotes.list_quotes")},
-                            {"name": "Invoices", "url": url_for("invoices.invoice_list")},
-                            {"name": "Cashbook", "url": url_for("cashbook.index")},
-                            {"name": "Financial Reports", "url": url_for("reports.reports_index")},
-                            {"name": "Payroll Management", "url": url_for("payroll.payroll_list")},
-                        ]
-                    })
-                
-                # These modules are available to all authenticated users
-                modules.append({"name": "Employee University", "url": url_for("university.dashboard")})
-                modules.append({"name": "SAS AI", "url": url_for("ai.chat")})
-                modules.append({"name": "Announcements", "url": url_for("communication.announcements_list")})
+        # Pre-built per role-set; see sas_management/navigation/registry.py
+        try:
+            modules = navigation_registry.menu_for(current_user, "sidebar")
+        except Exception as e:
+            app.logger.warning(f"Navigation menu unavailable: {e}")
+            modules = []
         
         return dict(modules=modules, format_millions=format_millions, has_any_permission=has_any_permission)
     
@@ -575,7 +538,6 @@ def create_app():
             app.logger.error(error_msg)
             print(f"[ERROR] {error_msg}")
             if app.config.get("ENV") != "production":
-                import traceback
                 traceback.print_exc()
             # Create a failed validation result
             from scripts.db_autofix.auto_fix import SchemaValidationResult
@@ -645,6 +607,15 @@ def create_app():
         except Exception as e:
             app.logger.warning(f"Error ensuring default AI features: {e}")
         
+        # Global search index (FTS5 on SQLite, GIN tsvector on PostgreSQL)
+        try:
+            from sas_management.services import search_service  # registers searchable models
+            from sas_management.services.search_index import search_index
+            backend = search_index.ensure_schema()
+            app.logger.info(f"Search index ready ({backend})")
+        except Exception as e:
+            app.logger.warning(f"Search index setup failed (non-fatal): {e}")
+        
         # Seed initial data
         seed_initial_data(db)
         
@@ -431,6 +431,41 @@ def api_trial_balance():
     })
 
 
+@accounting_bp.route("/api/profit-and-loss")
+@login_required
+@role_required(UserRole.Admin, UserRole.SalesManager)
+def api_profit_and_loss():
+    """API: Get profit and loss, optionally with a comparative period (compare=previous|last_year)."""
+    date_from = request.args.get("date_from")
+    date_to = request.args.get("date_to")
+    
+    date_from_obj = datetime.strptime(date_from, "%Y-%m-%d").date() if date_from else None
+    date_to_obj = datetime.strptime(date_to, "%Y-%m-%d").date() if date_to else None
+    
+    report = compute_profit_and_loss(date_from_obj, date_to_obj, compare=request.args.get("compare"))
+    
+    return jsonify({
+        "status": "success",
+        "profit_and_loss": report,
+    })
+
+
+@accounting_bp.route("/api/balance-sheet")
+@login_required
+@role_required(UserRole.Admin, UserRole.SalesManager)
+def api_balance_sheet():
+    """API: Get balance sheet, optionally with a comparative date (compare=previous|last_year)."""
+    as_of = request.args.get("as_of")
+    as_of_obj = datetime.strptime(as_of, "%Y-%m-%d").date() if as_of else None
+    
+    report = compute_balance_sheet(as_of_obj, compare=request.args.get("compare"))
+    
+    return jsonify({
+        "status": "success",
+        "balance_sheet": report,
+    })
+
+
 # PDF receipt route is now defined in routes.py
 # The route will be automatically registered when routes.py is imported
 
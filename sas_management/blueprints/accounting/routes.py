@@ -6,6 +6,7 @@ import os
 
 from sas_management.models import AccountingReceipt, UserRole, db
 from sqlalchemy.orm import joinedload
+from sas_management.services.document_renderer import pending_response
 from sas_management.utils import role_required
 
 # Import the existing blueprint
@@ -50,12 +51,10 @@ def view_receipt(receipt_id):
     Opens PDF ready for download.
     If PDF doesn't exist, generates it on-the-fly.
     """
-    from sas_management.models import AccountingPayment, Invoice, Client, User, Event, db
-    
     # Import PDF generation function - handle gracefully if ReportLab not available
     try:
-        from services.accounting_service import _generate_pdf_receipt, REPORTLAB_AVAILABLE
-        _generate_pdf_fn = _generate_pdf_receipt
+        from services.accounting_service import prepare_receipt_pdf, REPORTLAB_AVAILABLE
+        _generate_pdf_fn = prepare_receipt_pdf
         reportlab_available = REPORTLAB_AVAILABLE
     except (ImportError, AttributeError) as e:
         reportlab_available = False
@@ -80,51 +79,14 @@ def view_receipt(receipt_id):
         if not reportlab_available or not _generate_pdf_fn:
             abort(500, description="PDF generation not available. ReportLab is not installed. Please install it using: pip install reportlab")
         
+        if not receipt.payment:
+            abort(404, description="Payment not found for this receipt")
+        
         try:
-            # Get related data for PDF generation
-            payment = None
-            if hasattr(receipt, 'payment') and receipt.payment:
-                payment = receipt.payment
-            elif receipt.payment_id:
-                payment = db.session.get(AccountingPayment, receipt.payment_id)
-            
-            if not payment:
-                abort(404, description="Payment not found for this receipt")
-            
-            invoice = None
-            if payment.invoice_id:
-                invoice = db.session.get(Invoice, payment.invoice_id)
-            
-            client = None
-            if receipt.issued_to:
-                client = db.session.get(Client, receipt.issued_to)
-            elif invoice and invoice.event_id:
-                event = db.session.get(Event, invoice.event_id)
-                if event and event.client_id:
-                    client = db.session.get(Client, event.client_id)
-            
-            issuer = None
-            if receipt.issued_by:
-                issuer = db.session.get(User, receipt.issued_by)
-            
-            # Ensure receipts folder exists
-            receipts_folder = os.path.join(current_app.instance_path, "receipts")
-            os.makedirs(receipts_folder, exist_ok=True)
-            
-            # Generate PDF
-            _generate_pdf_fn(
-                pdf_path=full_path,
-                receipt=receipt,
-                payment=payment,
-                invoice=invoice,
-                client=client,
-                issuer=issuer
-            )
-            
-            # Update receipt with PDF path
-            receipt.pdf_path = pdf_relative_path
-            db.session.commit()
-            
+            # Queued on the document pool; the page reloads until it is ready
+            full_path = _generate_pdf_fn(receipt.id)
+            if full_path is None:
+                return pending_response()
             current_app.logger.info(f"Generated PDF for receipt {receipt_id} at {full_path}")
         
         except Exception as e:
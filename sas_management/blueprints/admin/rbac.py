@@ -5,6 +5,7 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash,
 from flask_login import login_required, current_user
 from sas_management.models import Role, Permission, RolePermission, User, db
 from sas_management.utils.security import require_permission
+from sas_management.utils import rbac_version
 
 rbac_bp = Blueprint("rbac", __name__)
 
@@ -42,6 +43,7 @@ def edit_role_permissions(role_id):
             db.session.add(rp)
         
         db.session.commit()
+        rbac_version.bump_version()
         flash(f"Permissions updated for role '{role.name}'.", "success")
         return redirect(url_for("rbac.roles_list"))
     
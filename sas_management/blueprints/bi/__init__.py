@@ -7,7 +7,7 @@ from sqlalchemy.orm import joinedload
 
 from sas_management.models import (
     db, BIEventProfitability, BIIngredientPriceTrend, BISalesForecast,
-    BIStaffPerformance, BIBakeryDemand, BICustomerBehavior, BIPOSHeatmap,
+    BIStaffPerformance, BIBakeryDemand, BICustomerBehavior, POSDevice,
     Event, Ingredient, Employee, Client, BakeryItem, UserRole
 )
 from sas_management.utils import role_required
@@ -18,6 +18,7 @@ from sas_management.services.bi_service import (
     calculate_customer_behavior, generate_pos_heatmap,
     get_bi_dashboard_metrics
 )
+from sas_management.services import event_profitability_rollup, pos_sales_cube
 
 bi_bp = Blueprint("bi", __name__, url_prefix="/bi")
 
@@ -59,23 +60,29 @@ def dashboard():
 def event_profitability():
     """Event profitability analysis page."""
     try:
-        # Get all profitability records
+        # Rollups are maintained by services/event_profitability_rollup.py;
+        # this page only reads them
         profitability_records = BIEventProfitability.query.order_by(
             BIEventProfitability.generated_at.desc()
         ).all()
         
-        # Get events without profitability data
-        all_events = Event.query.filter_by(status="Completed").all()
-        event_ids_with_profit = {r.event_id for r in profitability_records if r.event_id}
-        events_needing_analysis = [e for e in all_events if e.id not in event_ids_with_profit]
+        # Completed events whose rollup has not been written yet
+        completed = Event.query.filter(Event.status.in_(event_profitability_rollup.ROLLUP_STATUSES))
+        needing_analysis = completed.outerjoin(
+            BIEventProfitability, BIEventProfitability.event_id == Event.id
+        ).filter(BIEventProfitability.id.is_(None))
+        events_needing_analysis = needing_analysis.order_by(Event.id).limit(50).all()
+        needing_analysis_count = needing_analysis.count()
         
         # Count completed events for seed button visibility
-        completed_events_count = len(all_events)
+        completed_events_count = completed.count()
         
         CURRENCY = current_app.config.get("CURRENCY_PREFIX", "UGX ")
         return render_template("bi/event_profitability.html",
             profitability_records=profitability_records,
             events_needing_analysis=events_needing_analysis,
+            needing_analysis_count=needing_analysis_count,
+            pending_refresh_count=event_profitability_rollup.pending_count(),
             completed_events_count=completed_events_count,
             CURRENCY=CURRENCY
         )
@@ -85,6 +92,8 @@ def event_profitability():
         return render_template("bi/event_profitability.html",
             profitability_records=[],
             events_needing_analysis=[],
+            needing_analysis_count=0,
+            pending_refresh_count=0,
             completed_events_count=0,
             CURRENCY=CURRENCY
         )
@@ -150,15 +159,23 @@ def sales_forecast():
             BISalesForecast.date < date.today()
         ).order_by(BISalesForecast.date.desc()).limit(100).all()
         
+        forecast_chart = [{
+            "source": f.source,
+            "date": f.date.isoformat(),
+            "predicted_sales": float(f.predicted_sales)
+        } for f in upcoming_forecasts]
+        
         return render_template("bi/sales_forecast.html",
             upcoming_forecasts=upcoming_forecasts,
-            historical_forecasts=historical_forecasts
+            historical_forecasts=historical_forecasts,
+            forecast_chart=forecast_chart
         )
     except Exception as e:
         current_app.logger.exception(f"Error loading sales forecast: {e}")
         return render_template("bi/sales_forecast.html",
             upcoming_forecasts=[],
-            historical_forecasts=[]
+            historical_forecasts=[],
+            forecast_chart=[]
         )
 
 @bi_bp.route("/staff-performance")
@@ -241,43 +258,42 @@ def customer_behavior():
             total_records=0
         )
 
+HEATMAP_PERIODS = (7, 30, 90)
+
+
+def _heatmap_period():
+    days = request.args.get('days', 7, type=int)
+    days = min(max(days, 1), 366)
+    end_date = date.today()
+    return days, end_date - timedelta(days=days - 1), end_date
+
+
 @bi_bp.route("/pos-heatmap")
 @login_required
 @role_required(UserRole.Admin, UserRole.SalesManager)
 def pos_heatmap():
     """POS sales heatmap page."""
+    days, start_date, end_date = _heatmap_period()
+    device_id = request.args.get('device_id', type=int)
     try:
-        # Get heatmap data
-        heatmap_data = BIPOSHeatmap.query.order_by(
-            BIPOSHeatmap.day, BIPOSHeatmap.hour
-        ).all()
-        
-        # Generate heatmap matrix
-        days = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
-        hours = list(range(24))
-        
-        heatmap_matrix = {}
-        for day in days:
-            heatmap_matrix[day] = {}
-            for hour in hours:
-                data = next((h for h in heatmap_data if h.day == day and h.hour == hour), None)
-                heatmap_matrix[day][hour] = {
-                    "sales": float(data.sales) if data else 0,
-                    "orders": int(data.transaction_count) if data else 0
-                }
-        
-        return render_template("bi/pos_heatmap.html",
-            heatmap_matrix=heatmap_matrix,
-            days=days,
-            hours=hours
-        )
+        heatmap_matrix = pos_sales_cube.heatmap(start_date, end_date, device_id=device_id)
+        terminals = pos_sales_cube.terminal_comparison(start_date, end_date)
+        categories = pos_sales_cube.category_breakdown(start_date, end_date, device_id=device_id)
     except Exception as e:
         current_app.logger.exception(f"Error loading POS heatmap: {e}")
-        return render_template("bi/pos_heatmap.html",
-            heatmap_matrix={},
-            days=["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"],
-            hours=list(range(24))
-        )
+        heatmap_matrix, terminals, categories = {}, [], []
+    
+    return render_template("bi/pos_heatmap.html",
+        heatmap_matrix=heatmap_matrix,
+        days=pos_sales_cube.DAY_NAMES,
+        hours=list(range(24)),
+        period_days=days,
+        periods=HEATMAP_PERIODS,
+        device_id=device_id,
+        devices=POSDevice.query.order_by(POSDevice.name).all(),
+        terminals=terminals,
+        categories=categories
+    )
 
 # ============================
 # API ENDPOINTS
@@ -308,8 +324,11 @@ def api_generate_event_profitability():
         if not request.is_json:
             return jsonify({"success": False, "error": "Request must be JSON"}), 400
         
-        data = request.get_json()
-        event_id = data.get('event_id', type=int)
+        data = request.get_json() or {}
+        try:
+            event_id = int(data.get('event_id') or 0)
+        except (TypeError, ValueError):
+            event_id = 0
         
         if not event_id:
             return jsonify({"success": False, "error": "event_id is required"}), 400
@@ -324,18 +343,39 @@ def api_generate_event_profitability():
         current_app.logger.exception(f"Error generating event profitability: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
 
+@bi_bp.route("/api/event-profitability/refresh-all", methods=["POST"])
+@login_required
+@role_required(UserRole.Admin, UserRole.SalesManager)
+def api_refresh_all_event_profitability():
+    """API: Queue every completed event for the background rollup refresher."""
+    try:
+        event_ids = db.session.execute(
+            db.select(Event.id).where(Event.status.in_(event_profitability_rollup.ROLLUP_STATUSES))
+        ).scalars().all()
+        event_profitability_rollup.mark_dirty(event_ids)
+        db.session.commit()
+        event_profitability_rollup.refresher.wake()
+        return jsonify({"success": True, "queued": len(event_ids)}), 202
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception(f"Error queueing event profitability refresh: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
 @bi_bp.route("/event-profitability/pdf")
 @login_required
 @role_required(UserRole.Admin, UserRole.SalesManager)
 def event_profitability_pdf():
     """Generate and download Event Profitability Analysis PDF report."""
     from flask import send_file, flash, redirect
-    from sas_management.services.bi_service import generate_profitability_pdf_report
+    from sas_management.services.bi_service import prepare_profitability_pdf_report
+    from sas_management.services.document_renderer import pending_response
     from datetime import datetime
     
     try:
-        # Generate PDF
-        pdf_path = generate_profitability_pdf_report()
+        # Queued on the document pool; the page reloads until it is ready
+        pdf_path = prepare_profitability_pdf_report()
+        if pdf_path is None:
+            return pending_response()
         
         if not pdf_path or not os.path.exists(pdf_path):
             flash("PDF file was not generated successfully.", "danger")
@@ -422,7 +462,7 @@ def api_run_sales_forecast():
         data = request.get_json()
         source = data.get('source', 'all')
         model = data.get('model', 'simple')
-        days = data.get('days', 14, type=int)
+        days = min(max(int(data.get('days') or 14), 1), 90)
         
         result = run_sales_forecasting(source=source, model=model, days=days)
         
@@ -503,17 +543,14 @@ def api_add_staff_performance():
 @login_required
 @role_required(UserRole.Admin, UserRole.SalesManager)
 def api_bakery_demand_forecast():
-    """API: Generate bakery demand forecast."""
+    """API: Generate bakery demand forecast (one item, or all items when item_id is omitted)."""
     try:
         if not request.is_json:
             return jsonify({"success": False, "error": "Request must be JSON"}), 400
         
         data = request.get_json()
-        item_id = data.get('item_id', type=int)
-        days = data.get('days', 14, type=int)
-        
-        if not item_id:
-            return jsonify({"success": False, "error": "item_id is required"}), 400
+        item_id = int(data['item_id']) if data.get('item_id') else None  # None = all active items
+        days = min(max(int(data.get('days') or 14), 1), 90)
         
         result = generate_bakery_demand_forecast(item_id, days)
         
@@ -554,46 +591,39 @@ def api_analyze_customer_behavior():
 @login_required
 def api_pos_heatmap():
     """API: Get POS heatmap data."""
+    days, _, _ = _heatmap_period()
+    result = generate_pos_heatmap(days=days, device_id=request.args.get('device_id', type=int))
+    if not result['success']:
+        return jsonify({"success": False, "error": result.get('error')}), 500
+    return jsonify(result), 200
+
+@bi_bp.route("/api/pos/hourly")
+@login_required
+def api_pos_hourly():
+    """API: Hourly POS sales trend."""
     try:
-        days = request.args.get('days', 7, type=int)
-        
-        # Generate heatmap if not exists
-        result = generate_pos_heatmap(days=days)
-        
-        if not result['success']:
-            return jsonify({"success": False, "error": result.get('error')}), 500
-        
-        # Get heatmap data from database
-        end_date = date.today()
-        start_date = end_date - timedelta(days=days - 1)
-        
-        heatmap_data = BIPOSHeatmap.query.filter(
-            BIPOSHeatmap.period_start >= start_date,
-            BIPOSHeatmap.period_end <= end_date
-        ).order_by(BIPOSHeatmap.day, BIPOSHeatmap.hour).all()
-        
-        # Format for frontend
-        days = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
-        heatmap_matrix = {}
-        
-        for day in days:
-            heatmap_matrix[day] = {}
-            for hour in range(24):
-                data = next((h for h in heatmap_data if h.day == day and h.hour == hour), None)
-                heatmap_matrix[day][hour] = {
-                    "sales": float(data.sales) if data else 0,
-                    "orders": int(data.transaction_count) if data else 0
-                }
-        
+        days, start_date, end_date = _heatmap_period()
         return jsonify({
             "success": True,
-            "heatmap": heatmap_matrix,
-            "period": {
-                "start": start_date.isoformat(),
-                "end": end_date.isoformat()
-            }
+            "trend": pos_sales_cube.hourly_trend(start_date, end_date, device_id=request.args.get('device_id', type=int)),
+            "period": {"start": start_date.isoformat(), "end": end_date.isoformat()}
         }), 200
     except Exception as e:
-        current_app.logger.exception(f"Error getting POS heatmap: {e}")
+        current_app.logger.exception(f"Error getting POS hourly trend: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
 
+@bi_bp.route("/api/pos/terminals")
+@login_required
+def api_pos_terminals():
+    """API: POS sales per terminal and per product category."""
+    try:
+        days, start_date, end_date = _heatmap_period()
+        return jsonify({
+            "success": True,
+            "terminals": pos_sales_cube.terminal_comparison(start_date, end_date),
+            "categories": pos_sales_cube.category_breakdown(start_date, end_date),
+            "period": {"start": start_date.isoformat(), "end": end_date.isoformat()}
+        }), 200
+    except Exception as e:
+        current_app.logger.exception(f"Error getting POS terminal comparison: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
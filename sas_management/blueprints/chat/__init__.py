@@ -1,9 +1,13 @@
+import hashlib
+import json
 from datetime import datetime
 
-from flask import Blueprint, flash, jsonify, redirect, render_template, request, url_for
+from flask import Blueprint, Response, current_app, flash, jsonify, redirect, render_template, request, url_for
 from flask_login import current_user, login_required
 
-from sas_management.models import Message, db
+from sas_management.models import Message, User, db
+from sas_management.services.event_bus import event_bus
+from sas_management.utils.keyset import clamp_limit, keyset_page, parse_cursor, scope_head
 
 chat_bp = Blueprint("chat", __name__, url_prefix="/chat")
 
@@ -17,6 +21,9 @@ AVAILABLE_CHANNELS = {
     "Support": "Technical support and help",
 }
 
+# Column order of ?format=compact rows
+COMPACT_FIELDS = ["id", "user_id", "user_email", "content", "timestamp"]
+
 
 @chat_bp.route("")
 @login_required
@@ -82,34 +89,89 @@ def send_message():
 @chat_bp.route("/api/messages/<channel_name>")
 @login_required
 def api_get_messages(channel_name):
-    """API endpoint to fetch messages for a specific channel as JSON."""
+    """
+    API endpoint to fetch messages for a specific channel as JSON.
+
+    Query parameters:
+        after_id   only messages newer than this id (polling)
+        before_id  the page of messages older than this id (scroll back)
+        limit      page size, default 100, max 500
+        format     ``compact`` for {"fields": [...], "rows": [[...]], cursors};
+                   otherwise a list of message objects, oldest first
+
+    Responses carry an ETag derived from the channel's newest message id, so
+    a poll with ``If-None-Match`` gets 304 when nothing was posted.
+    """
     if channel_name not in AVAILABLE_CHANNELS:
         return jsonify({"error": "Invalid channel"}), 400
 
-    # Query messages for the channel (last 100 messages)
-    messages = (
-        Message.query.filter_by(channel=channel_name)
-        .order_by(Message.timestamp.desc())
-        .limit(100)
-        .all()
+    after_id = parse_cursor(request.args.get("after_id"))
+    before_id = parse_cursor(request.args.get("before_id"))
+    limit = clamp_limit(request.args.get("limit"))
+    compact = request.args.get("format") == "compact"
+
+    scope = db.session.query(Message.id).filter(Message.channel == channel_name)
+    head = scope_head(scope, Message.id)
+    etag = hashlib.sha1(
+        f"{channel_name}:{head}:{after_id}:{before_id}:{limit}:{compact}:{current_user.id}".encode()
+    ).hexdigest()
+    if etag in request.if_none_match:
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    # Sender email comes from the same join - no per-message User load
+    query = (
+        db.session.query(Message.id, Message.user_id, Message.content, Message.timestamp, User.email)
+        .join(User, User.id == Message.user_id)
+        .filter(Message.channel == channel_name)
     )
-    messages.reverse()  # Show oldest first
-
-    # Serialize messages to JSON
-    messages_data = [
-        {
-            "id": msg.id,
-            "user_id": msg.user.id,
-            "user_email": msg.user.email,
-            "user_name": msg.user.email.split("@")[0] if msg.user.email else "User",
-            "content": msg.content,
-            "timestamp": msg.timestamp.isoformat(),
-            "formatted_time": msg.timestamp.strftime("%H:%M"),
-            "formatted_date": msg.timestamp.strftime("%b %d, %Y"),
-            "is_own_message": msg.user.id == current_user.id,
+    page = keyset_page(query, Message.id, after_id=after_id, before_id=before_id, limit=limit)
+
+    if compact:
+        payload = {
+            "fields": COMPACT_FIELDS,
+            "rows": [
+                [row.id, row.user_id, row.email, row.content,
+                 row.timestamp.isoformat() if row.timestamp else None]
+                for row in page.items
+            ],
+            **page.cursors(),
         }
-        for msg in messages
-    ]
+    else:
+        payload = [
+            {
+                "id": row.id,
+                "user_id": row.user_id,
+                "user_email": row.email,
+                "user_name": row.email.split("@")[0] if row.email else "User",
+                "content": row.content,
+                "timestamp": row.timestamp.isoformat() if row.timestamp else None,
+                "formatted_time": row.timestamp.strftime("%H:%M") if row.timestamp else "",
+                "formatted_date": row.timestamp.strftime("%b %d, %Y") if row.timestamp else "",
+                "is_own_message": row.user_id == current_user.id,
+            }
+            for row in page.items
+        ]
+
+    response = current_app.response_class(
+        json.dumps(payload, separators=(",", ":")), mimetype="application/json"
+    )
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    cursors = page.cursors()
+    if cursors["next_after_id"]:
+        response.headers["X-Next-After-Id"] = str(cursors["next_after_id"])
+    if cursors["prev_before_id"]:
+        response.headers["X-Prev-Before-Id"] = str(cursors["prev_before_id"])
+    return response
 
-    return jsonify(messages_data)
 
+@chat_bp.route("/stream/<channel_name>")
+@login_required
+def stream(channel_name):
+    """Server-Sent Events stream of new messages in a channel."""
+    if channel_name not in AVAILABLE_CHANNELS:
+        return jsonify({"error": "Invalid channel"}), 400
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    return event_bus.stream([f"chat:{channel_name}"], last_event_id)
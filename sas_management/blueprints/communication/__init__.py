@@ -168,11 +168,12 @@ def bulletin_post():
 def department_messages(department):
     """View department messages."""
     try:
-        result = get_department_messages(department)
+        result = get_department_messages(department, before_id=request.args.get('before_id', type=int))
         messages = result.get('messages', [])
         return render_template("communication/department_messages.html",
             department=department,
-            messages=messages
+            messages=messages,
+            older_before_id=result.get('prev_before_id')
         )
     except Exception as e:
         current_app.logger.exception(f"Error loading department messages: {e}")
@@ -228,13 +229,14 @@ def event_messages(event_id):
             return redirect(url_for("events.event_view", event_id=event_id))
         
         thread = result['thread']
-        messages_result = get_event_thread_messages(thread.id)
+        messages_result = get_event_thread_messages(thread.id, before_id=request.args.get('before_id', type=int))
         messages = messages_result.get('messages', [])
         
         return render_template("communication/event_messages.html",
             event=event,
             thread=thread,
-            messages=messages
+            messages=messages,
+            older_before_id=messages_result.get('prev_before_id')
         )
     except Exception as e:
         current_app.logger.exception(f"Error loading event messages: {e}")
@@ -31,7 +31,8 @@ def optimize():
         group_by_vehicle = data.get('group_by_vehicle', False)
         
         # Import optimization service
-        from services.dispatch_service import optimize_route, group_deliveries_by_vehicle
+        from sas_management.services.dispatch_service import optimize_route
+        from sas_management.services.route_planner import route_planner
         
         if not deliveries:
             return jsonify({
@@ -39,20 +40,33 @@ def optimize():
                 'error': 'No deliveries provided'
             }), 400
         
-        # If grouping by vehicle, assign deliveries first
+        # If grouping by vehicle, plan every vehicle's route together
         if group_by_vehicle and vehicles:
-            vehicle_assignments = group_deliveries_by_vehicle(deliveries, vehicles)
+            depot = (start_location['latitude'], start_location['longitude']) if start_location else None
+            located = [d for d in deliveries if d.get('latitude') is not None and d.get('longitude') is not None]
+            plan = route_planner.plan(
+                located,
+                vehicles,
+                depot=depot,
+                start_time=data.get('start_time'),
+                end_time=data.get('end_time'),
+            )
             
             optimized_routes = {}
-            for vehicle_id, vehicle_deliveries in vehicle_assignments.items():
-                if vehicle_deliveries:
-                    result = optimize_route(vehicle_deliveries, start_location)
-                    optimized_routes[vehicle_id] = result
+            for route in plan['routes']:
+                optimized_routes[route['vehicle_id']] = {
+                    'success': True,
+                    'route': route['stops'],
+                    **{key: value for key, value in route.items() if key not in ('vehicle_id', 'stops')},
+                }
             
             return jsonify({
                 'success': True,
                 'routes_by_vehicle': optimized_routes,
                 'total_vehicles': len(optimized_routes),
+                'total_distance': plan['total_distance'],
+                # Deliveries that fit no vehicle, plus any without coordinates
+                'unassigned': plan['unassigned'] + [d for d in deliveries if d.get('latitude') is None or d.get('longitude') is None],
                 'optimization_method': 'grouped_by_vehicle'
             })
         else:
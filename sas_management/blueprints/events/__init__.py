@@ -20,9 +20,10 @@ from sas_management.models import (
     Venue, MenuPackage, Vendor, EventVendorAssignment, FloorPlan,
     db
 )
+from sas_management.services.document_renderer import pending_response
 from sas_management.utils import paginate_query, get_decimal
 from sas_management.utils.helpers import parse_date, get_or_404
-from sas_management.utils.pdf_generator import generate_event_brief_pdf
+from sas_management.utils.pdf_generator import prepare_event_brief_pdf
 
 events_bp = Blueprint("events", __name__, url_prefix="/events")
 
@@ -732,7 +733,10 @@ def event_brief_pdf(event_id):
     event = get_or_404(Event, event_id)
     
     try:
-        pdf_path = generate_event_brief_pdf(event)
+        # Queued on the document pool; the page reloads until it is ready
+        pdf_path = prepare_event_brief_pdf(event)
+        if pdf_path is None:
+            return pending_response()
         return send_file(pdf_path, as_attachment=True, download_name=f"event_brief_{event.id}.pdf")
     except Exception as e:
         current_app.logger.exception(f"Error generating PDF: {e}")
@@ -6,6 +6,7 @@ from flask import Blueprint, jsonify, redirect, render_template, request, url_fo
 from flask_login import current_user, login_required
 
 from sas_management.models import FloorPlan, Event, db
+from sas_management.services.floorplanner_service import FloorPlanConflict, layout_text, save_layout
 
 floor_plans_bp = Blueprint("floor_plans_bp", __name__, url_prefix="/")
 
@@ -62,8 +63,7 @@ def new():
             default_data = '{"objects": [], "meta": {}}'
             floor_plan = FloorPlan(
                 name=name,
-                data=default_data,  # Primary field
-                layout_json=default_data,  # Keep for compatibility
+                data=default_data,
                 event_id=event_id,
                 created_by=current_user.id if hasattr(FloorPlan, 'created_by') else None
             )
@@ -113,8 +113,7 @@ def create():
         default_data = '{"objects": [], "meta": {}}'
         floor_plan = FloorPlan(
             name=name,
-            data=default_data,  # Primary field
-            layout_json=default_data,  # Keep for compatibility
+            data=default_data,
             event_id=event_id if event_id else None,
             created_by=current_user.id if hasattr(FloorPlan, 'created_by') else None
         )
@@ -147,8 +146,8 @@ def view_floor_plan(id):
         fp = FloorPlan.query.get_or_404(id)
         event = fp.event if fp else None
         
-        # Get floor plan JSON data - prefer data field, fallback to layout_json
-        floorplan_json = fp.data if fp.data else (fp.layout_json if fp.layout_json else "")
+        # Snapshot plus any changes saved since it was compacted
+        floorplan_json = layout_text(fp)
         
         # Get all events for assign modal
         events = Event.query.order_by(Event.date.desc()).limit(50).all()
@@ -175,7 +174,7 @@ def edit_floor_plan(id):
     return render_template(
         "floor_plans/edit.html",
         floorplan=fp,
-        floorplan_json=fp.data or ""
+        floorplan_json=layout_text(fp)
     )
 
 
@@ -197,19 +196,17 @@ def save():
         # Convert canvas_data to JSON string
         layout_json = json.dumps(canvas_data) if canvas_data else '{"objects": [], "meta": {}}'
         
-        # Update existing floor plan
+        # Update existing floor plan (the layout is stored as a delta)
         if plan_id:
             floor_plan = db.session.get(FloorPlan, plan_id)
             if floor_plan:
                 if name:
                     floor_plan.name = name
-                floor_plan.data = layout_json  # Primary field - save here first
-                floor_plan.layout_json = layout_json  # Keep for compatibility
-                floor_plan.updated_at = datetime.utcnow()
                 if event_id:
                     floor_plan.event_id = event_id
                 db.session.commit()
-                return jsonify({"success": True, "floor_plan_id": floor_plan.id})
+                revision = save_layout(floor_plan.id, layout_json, user_id=current_user.id)
+                return jsonify({"success": True, "floor_plan_id": floor_plan.id, "revision": revision})
         
         # Create new floor plan if no plan_id provided
         if not name:
@@ -222,8 +219,7 @@ def save():
         
         floor_plan = FloorPlan(
             name=name,
-            data=layout_json,  # Primary field - save here first
-            layout_json=layout_json,  # Keep for compatibility
+            data=layout_json,
             event_id=event_id if event_id else None,
             created_by=current_user.id if hasattr(FloorPlan, 'created_by') else None
         )
@@ -241,14 +237,16 @@ def save():
 @floor_plans_bp.route("/floor-plans/save/<int:id>", methods=["POST"])
 @login_required
 def save_floor_plan(id):
-    """Save floor plan JSON data by ID."""
-    fp = FloorPlan.query.get_or_404(id)
+    """Save floor plan JSON data by ID (stored as the delta from the current layout)."""
+    FloorPlan.query.get_or_404(id)
     req = request.get_json(silent=True)
     
     if req and "data" in req:
-        fp.data = req["data"]
-        db.session.commit()
-        return jsonify({"success": True})
+        try:
+            revision = save_layout(id, req["data"], req.get("base_revision"), current_user.id)
+        except FloorPlanConflict as e:
+            return jsonify({"success": False, "error": "conflict", "revision": e.revision}), 409
+        return jsonify({"success": True, "revision": revision})
     
     return jsonify({"success": False}), 400
 
@@ -1,7 +1,5 @@
 """Floor Planner Blueprint - Professional event floor plan designer."""
 from datetime import datetime
-import json
-import base64
 
 from flask import Blueprint, current_app, flash, jsonify, redirect, render_template, request, send_file, url_for
 from flask_login import current_user, login_required
@@ -10,10 +8,16 @@ import io
 
 from sas_management.models import FloorPlan, Event, User, UserRole, db
 from sas_management.services.floorplanner_service import (
+    FloorPlanConflict,
+    PatchError,
+    apply_changes,
     create_floorplan,
-    update_floorplan,
+    current_layout,
+    layout_text,
+    save_layout,
     save_thumbnail,
     get_floorplan,
+    get_thumbnail,
     list_floorplans,
     delete_floorplan,
     export_png,
@@ -40,18 +44,9 @@ def dashboard():
                 )
             )
         
+        # Thumbnails are deferred; the template links to them by URL
         floorplans = query.order_by(FloorPlan.updated_at.desc()).all()
         
-        # Prepare thumbnails as base64 strings
-        for floorplan in floorplans:
-            if floorplan.thumbnail:
-                try:
-                    floorplan.thumbnail_b64 = base64.b64encode(floorplan.thumbnail).decode('utf-8')
-                except Exception:
-                    floorplan.thumbnail_b64 = None
-            else:
-                floorplan.thumbnail_b64 = None
-        
         return render_template("floorplanner/dashboard.html", floorplans=floorplans, search_query=search_query)
     except Exception as e:
         current_app.logger.exception(f"Error loading floor planner dashboard: {e}")
@@ -110,18 +105,12 @@ def editor(id):
         
         event = Event.query.get_or_404(floorplan.event_id)
         
-        # Parse layout JSON - prefer data field, fallback to layout_json
-        try:
-            json_str = floorplan.data if floorplan.data else (floorplan.layout_json if floorplan.layout_json else None)
-            layout_data = json.loads(json_str) if json_str else {"objects": [], "meta": {}}
-        except json.JSONDecodeError:
-            layout_data = {"objects": [], "meta": {}}
-        
+        # Snapshot plus any changes saved since it was compacted
         return render_template(
             "floorplanner/editor.html",
             floorplan=floorplan,
             event=event,
-            layout_data=json.dumps(layout_data)
+            layout_data=layout_text(floorplan)
         )
     except Exception as e:
         current_app.logger.exception(f"Error loading floor plan editor: {e}")
@@ -137,15 +126,58 @@ def save(id):
         if not data or "layout" not in data:
             return jsonify({"success": False, "error": "No layout data provided"}), 400
         
-        layout_json = json.dumps(data["layout"])
-        update_floorplan(id, layout_json)
+        revision = save_layout(id, data["layout"], data.get("base_revision"), current_user.id)
         
-        return jsonify({"success": True, "message": "Floor plan saved successfully"})
+        return jsonify({"success": True, "revision": revision, "message": "Floor plan saved successfully"})
+    except FloorPlanConflict as e:
+        return jsonify({"success": False, "error": "conflict", "revision": e.revision}), 409
     except Exception as e:
         current_app.logger.exception(f"Error saving floor plan: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+@floorplanner_bp.route("/<int:id>/changes", methods=["POST"])
+@login_required
+def save_changes(id):
+    """Autosave: apply a JSON-Patch (or a whole layout) made against ``base_revision``."""
+    try:
+        data = request.get_json()
+        if not data or "base_revision" not in data or ("patch" not in data and "layout" not in data):
+            return jsonify({"success": False, "error": "base_revision and patch or layout are required"}), 400
+        
+        base_revision = int(data["base_revision"])
+        if "patch" in data:
+            revision = apply_changes(id, base_revision, data["patch"], current_user.id)
+        else:
+            revision = save_layout(id, data["layout"], base_revision, current_user.id)
+        
+        return jsonify({"success": True, "revision": revision})
+    except FloorPlanConflict as e:
+        return jsonify({"success": False, "error": "conflict", "revision": e.revision}), 409
+    except (PatchError, TypeError, ValueError) as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        current_app.logger.exception(f"Error saving floor plan changes: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@floorplanner_bp.route("/<int:id>/layout")
+@login_required
+def layout(id):
+    """Current layout and revision (editors reload it after a conflict)."""
+    return jsonify({"success": True, **current_layout(id)})
+
+
+@floorplanner_bp.route("/<int:id>/thumbnail")
+@login_required
+def thumbnail(id):
+    """Thumbnail PNG; URLs carry the thumbnail timestamp, so it can be cached."""
+    png_data = get_thumbnail(id)
+    if not png_data:
+        return "", 404
+    return send_file(io.BytesIO(png_data), mimetype="image/png", max_age=86400)
+
+
 @floorplanner_bp.route("/<int:id>/save-thumbnail", methods=["POST"])
 @login_required
 def save_thumbnail_route(id):
@@ -2,7 +2,7 @@
 import os
 from datetime import datetime
 from flask import Blueprint, flash, redirect, render_template, request, url_for, jsonify, send_file, send_from_directory, current_app
-from flask_login import login_required
+from flask_login import current_user, login_required
 
 from sas_management.models import (
     db, Department, Position, Employee, Attendance, Shift, ShiftAssignment,
@@ -697,7 +697,7 @@ def api_payroll_export():
         if not period_start or not period_end:
             return jsonify({"success": False, "error": "start and end date parameters are required (YYYY-MM-DD)"}), 400
         
-        result = generate_payroll_export(period_start, period_end, current_user.id)
+        result = generate_payroll_export(period_start, period_end, current_user.id, request.args.get('format', 'csv'))
         
         if result['success']:
             return jsonify({
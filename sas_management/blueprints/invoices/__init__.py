@@ -1,11 +1,12 @@
 from datetime import date, datetime, timedelta
 from decimal import Decimal
 
-from flask import Blueprint, current_app, flash, redirect, render_template, request, url_for
+from flask import Blueprint, current_app, flash, jsonify, redirect, render_template, request, url_for
 from flask_login import current_user, login_required
 from sqlalchemy.orm import joinedload
 
 from sas_management.models import (
+    BillingRun,
     Event,
     Invoice,
     InvoiceStatus,
@@ -15,28 +16,15 @@ from sas_management.models import (
     UserRole,
     db,
 )
+from sas_management.services import billing_run
+from sas_management.services.sequence_service import next_reference, seed_from_column
 from sas_management.utils import role_required, paginate_query
 
 invoices_bp = Blueprint("invoices", __name__, url_prefix="/invoices")
 
 def _generate_invoice_number():
-    """Generate a unique invoice number."""
-    today = date.today()
-    prefix = f"INV-{today.strftime('%Y%m%d')}"
-    last_invoice = (
-        Invoice.query.filter(Invoice.invoice_number.like(f"{prefix}%"))
-        .order_by(Invoice.invoice_number.desc())
-        .first()
-    )
-    if last_invoice:
-        try:
-            last_num = int(last_invoice.invoice_number.split("-")[-1])
-            new_num = last_num + 1
-        except (ValueError, IndexError):
-            new_num = 1
-    else:
-        new_num = 1
-    return f"{prefix}-{new_num:04d}"
+    """Generate a unique invoice number (shared sequence with month-end billing runs)."""
+    return next_reference("INV", seed=seed_from_column(Invoice.invoice_number, Invoice.id))
 
 def _generate_receipt_number():
     """Generate a unique receipt number."""
@@ -115,10 +103,10 @@ def invoice_new():
             db.session.add(invoice)
             db.session.flush()
             
-            # Generate PDF
+            # Queue the PDF so the first download finds it rendered
             try:
-                from sas_management.services.invoice_service import generate_invoice_pdf
-                generate_invoice_pdf(invoice.id)
+                from sas_management.services.invoice_service import prepare_invoice_pdf
+                prepare_invoice_pdf(invoice.id)
             except Exception as pdf_error:
                 current_app.logger.warning(f"Could not generate PDF for invoice {invoice.id}: {pdf_error}")
             
@@ -166,13 +154,16 @@ def invoice_view(invoice_id):
 def invoice_pdf(invoice_id):
     """Generate and download invoice PDF."""
     from flask import send_file
-    from sas_management.services.invoice_service import generate_invoice_pdf
+    from sas_management.services.document_renderer import pending_response
+    from sas_management.services.invoice_service import prepare_invoice_pdf
     
     invoice = Invoice.query.get_or_404(invoice_id)
     
     try:
-        # Generate PDF if it doesn't exist
-        pdf_path = generate_invoice_pdf(invoice_id)
+        # Queued on the document pool; the page reloads until it is ready
+        pdf_path = prepare_invoice_pdf(invoice_id)
+        if pdf_path is None:
+            return pending_response()
         
         # Send file
         return send_file(
@@ -254,3 +245,45 @@ def receipt_view(receipt_id):
     )
     return render_template("invoices/receipt_view.html", receipt=receipt)
 
+# ============================================================================
+# MONTH-END BILLING RUNS
+# ============================================================================
+
+@invoices_bp.route("/api/billing-runs", methods=["POST"])
+@login_required
+@role_required(UserRole.Admin, UserRole.SalesManager)
+def billing_run_start():
+    """Start a background billing run for a period (services/billing_run.py)."""
+    data = request.get_json(silent=True) or request.form
+    try:
+        period_start = datetime.strptime(data.get("period_start", ""), "%Y-%m-%d").date()
+        period_end = datetime.strptime(data.get("period_end", ""), "%Y-%m-%d").date()
+        due_days = int(data.get("due_days") or 30)
+    except ValueError:
+        return jsonify({"success": False, "error": "period_start and period_end must be YYYY-MM-DD"}), 400
+    send_emails = str(data.get("send_emails", "")).lower() in ("1", "true", "on", "yes")
+    try:
+        run = billing_run.create_run(period_start, period_end, send_emails=send_emails,
+                                     due_days=due_days, user_id=current_user.id)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    billing_run.runner.submit(run.id)
+    return jsonify({"success": True, "run": billing_run.progress(run)}), 202
+
+
+@invoices_bp.route("/api/billing-runs/<int:run_id>")
+@login_required
+@role_required(UserRole.Admin, UserRole.SalesManager)
+def billing_run_status(run_id):
+    run = BillingRun.query.get_or_404(run_id)
+    return jsonify({"success": True, "run": billing_run.progress(run)})
+
+
+@invoices_bp.route("/api/billing-runs/<int:run_id>/resume", methods=["POST"])
+@login_required
+@role_required(UserRole.Admin, UserRole.SalesManager)
+def billing_run_resume(run_id):
+    """Retry failed items and finish an interrupted run."""
+    run = BillingRun.query.get_or_404(run_id)
+    billing_run.runner.submit(run.id)
+    return jsonify({"success": True, "run": billing_run.progress(run)}), 202
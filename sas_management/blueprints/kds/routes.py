@@ -5,6 +5,7 @@ from datetime import datetime, timedelta
 from sqlalchemy import or_
 
 from sas_management.models import db, POSOrder, POSOrderLine
+from sas_management.services.event_bus import event_bus
 
 kds_bp = Blueprint("kds", __name__, url_prefix="/kds")
 
@@ -116,6 +117,14 @@ def api_orders():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@kds_bp.route("/stream")
+@login_required
+def stream():
+    """Server-Sent Events stream of order creations and status changes."""
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    return event_bus.stream(["kds"], last_event_id)
+
+
 @kds_bp.route("/orders/<int:order_id>/status", methods=["POST"])
 @login_required
 def update_order_status(order_id):
@@ -27,8 +27,11 @@ from sas_management.services.pos_service import (
     generate_z_report,
     release_inventory,
     reserve_inventory_for_order,
-    sync_orders_for_offline,
+    reserve_order_references,
 )
+from sas_management.services.pos_catalog import pos_catalog
+from sas_management.services.pos_shift_counters import reconcile_shift
+from sas_management.services.pos_sync import sync_terminal
 from sas_management.utils import role_required, permission_required, paginate_query
 
 pos_bp = Blueprint("pos", __name__, url_prefix="/pos")
@@ -458,6 +461,49 @@ def api_shift_close(shift_id):
         current_app.logger.exception("Error closing POS shift")
         return jsonify({"status": "error", "message": f"Failed to close shift: {str(e)}"}), 500
 
+@pos_bp.route("/api/shifts/<int:shift_id>/report")
+@login_required
+@role_required(UserRole.Admin, UserRole.SalesManager)
+def api_shift_report(shift_id):
+    """API: X-report (running totals) for a shift without closing it."""
+    shift = db.session.get(POSShift, shift_id)
+    if not shift:
+        return jsonify({"status": "error", "message": "Shift not found"}), 404
+    try:
+        report = generate_z_report(shift_id)
+        # Lazily seeded counters for shifts opened before they existed
+        db.session.commit()
+        return jsonify({"status": "success", "report": report})
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception("Error generating POS shift report")
+        return jsonify({"status": "error", "message": f"Failed to generate report: {str(e)}"}), 500
+
+@pos_bp.route("/api/shifts/<int:shift_id>/reconcile", methods=["POST"])
+@login_required
+@role_required(UserRole.Admin)
+def api_shift_reconcile(shift_id):
+    """API: Check a shift's running totals against a full recompute (?repair=1 to fix)."""
+    shift = db.session.get(POSShift, shift_id)
+    if not shift:
+        return jsonify({"status": "error", "message": "Shift not found"}), 404
+    try:
+        result = reconcile_shift(shift_id, repair=request.args.get("repair") == "1")
+        db.session.commit()
+        return jsonify({
+            "status": "success",
+            "shift_id": shift_id,
+            "ok": result["ok"],
+            "mismatches": {
+                key: {side: [count, float(amount)] for side, (count, amount) in values.items()}
+                for key, values in result["mismatches"].items()
+            },
+        })
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception("Error reconciling POS shift")
+        return jsonify({"status": "error", "message": f"Failed to reconcile shift: {str(e)}"}), 500
+
 @pos_bp.route("/api/orders")
 @login_required
 @role_required(UserRole.Admin, UserRole.SalesManager)
@@ -962,86 +1008,33 @@ def get_image_url(item, item_type):
 @login_required
 @role_required(UserRole.Admin, UserRole.SalesManager)
 def api_products():
-    """API: Get all products available for POS (Catering, Bakery, and custom POS products)."""
+    """
+    API: Get all products available for POS (Catering, Bakery, and custom POS products).
+
+    The response carries the catalog version as its ETag, so a till that
+    already has it gets a 304.  With ``?since_version=<version>`` only the
+    products changed or removed since that version are returned
+    (``"full": false``), unless the version is too old to diff against.
+    """
     try:
-        from sas_management.models import CateringItem, BakeryItem
-        from decimal import Decimal
-        
-        # Get catering items with current prices
-        catering_items = CateringItem.query.all()
-        catering_products = []
-        for item in catering_items:
-            try:
-                current_price = item.get_current_price()
-                # Ensure we have a valid price
-                if current_price is None:
-                    current_price = Decimal("0.00")
-                # Convert to float safely
-                price_float = float(current_price) if isinstance(current_price, Decimal) else float(str(current_price))
-                if price_float > 0:  # Only include items with prices
-                    catering_products.append({
-                        "id": item.id,
-                        "name": item.name,
-                        "type": "CATERING",
-                        "price": price_float,
-                        "category": "Catering",
-                        "image_url": item.image_url if hasattr(item, 'image_url') and item.image_url else url_for('static', filename='images/product-placeholder.svg'),
-                    })
-            except Exception as e:
-                current_app.logger.warning(f"Error getting price for catering item {item.id}: {e}")
-                continue
-        
-        # Get bakery items with current prices
-        bakery_items = BakeryItem.query.filter_by(status="Active").all()
-        bakery_products = []
-        for item in bakery_items:
-            try:
-                current_price = item.get_current_price()
-                # Ensure we have a valid price
-                if current_price is None:
-                    current_price = Decimal("0.00")
-                # Convert to float safely
-                price_float = float(current_price) if isinstance(current_price, Decimal) else float(str(current_price))
-                if price_float > 0:  # Only include items with prices
-                    bakery_products.append({
-                        "id": item.id,
-                        "name": item.name,
-                        "type": "BAKERY",
-                        "price": price_float,
-                        "category": item.category or "Bakery",
-                        "image_url": item.image_url if hasattr(item, 'image_url') and item.image_url else url_for('static', filename='images/product-placeholder.svg'),
-                    })
-            except Exception as e:
-                current_app.logger.warning(f"Error getting price for bakery item {item.id}: {e}")
-                continue
-        
-        # Get custom POS products
-        pos_products = POSProduct.query.filter_by(is_available=True).all()
-        custom_products = []
-        for item in pos_products:
-            try:
-                custom_products.append({
-                    "id": f"POS-{item.id}",  # Prefix to distinguish from Catering/Bakery items
-                    "name": item.name,
-                    "type": "POS_PRODUCT",
-                    "price": float(item.price),
-                    "category": item.category or "Custom",
-                    "image_url": item.image_url if item.image_url else url_for('static', filename='images/product-placeholder.png'),
-                    "description": item.description,
-                    "barcode": item.barcode,
-                    "sku": item.sku,
-                })
-            except Exception as e:
-                current_app.logger.warning(f"Error processing POS product {item.id}: {e}")
-                continue
-        
-        all_products = catering_products + bakery_products + custom_products
-        
-        return jsonify({
+        snapshot = pos_catalog.snapshot()
+
+        since_version = request.args.get("since_version")
+        if since_version:
+            delta = pos_catalog.delta(since_version, snapshot)
+            if delta is not None:
+                return jsonify({"status": "success", "full": False, **delta})
+
+        response = jsonify({
             "status": "success",
-            "products": all_products,
-            "count": len(all_products),
+            "full": True,
+            "version": snapshot["version"],
+            "products": snapshot["products"],
+            "count": len(snapshot["products"]),
         })
+        response.set_etag(snapshot["version"])
+        response.headers["Cache-Control"] = "private, no-cache"
+        return response.make_conditional(request)
     except Exception as e:
         current_app.logger.exception("Error fetching POS products")
         return jsonify({"status": "error", "message": str(e)}), 500
@@ -1242,7 +1235,14 @@ def api_product_manage(product_id):
 @login_required
 @role_required(UserRole.Admin, UserRole.SalesManager)
 def api_sync():
-    """API: Sync offline orders."""
+    """
+    API: Sync offline orders.
+
+    Body: {"device_code", "orders": [...], "catalog_version"}.  Every order
+    gets a result (created / duplicate / rejected), and a terminal that
+    sends its cached ``catalog_version`` also gets the catalog changes
+    since then under "catalog".
+    """
     if not request.is_json:
         return jsonify({"status": "error", "message": "Request must be JSON"}), 400
     
@@ -1251,15 +1251,36 @@ def api_sync():
     orders = data.get("orders", [])
     
     try:
-        result = sync_orders_for_offline(device_code, orders)
+        result = sync_terminal(device_code, orders, data.get("catalog_version"))
         return jsonify({
             "status": "success",
             "message": "Orders synced",
-            "synced_count": result.get("synced_count", 0),
-            "failed_count": result.get("failed_count", 0),
+            **result,
         })
-    except Exception as e:
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except Exception:
+        current_app.logger.exception(f"Error syncing POS orders for {device_code}")
+        return jsonify({"status": "error", "message": "Failed to sync orders"}), 500
+
+@pos_bp.route("/api/reference-block", methods=["POST"])
+@login_required
+@role_required(UserRole.Admin, UserRole.SalesManager)
+def api_reference_block():
+    """API: Reserve a block of order references for a terminal going offline."""
+    if not request.is_json:
+        return jsonify({"status": "error", "message": "Request must be JSON"}), 400
+    
+    data = request.get_json()
+    try:
+        size = int(data.get("size", 50))
+        block = reserve_order_references(data.get("device_code"), size)
+        return jsonify({"status": "success", **block})
+    except (ValueError, TypeError) as e:
         return jsonify({"status": "error", "message": str(e)}), 400
+    except Exception:
+        current_app.logger.exception("Error reserving POS reference block")
+        return jsonify({"status": "error", "message": "Failed to reserve references"}), 500
 
 # ============================
 # TERMINAL MANAGEMENT ROUTES
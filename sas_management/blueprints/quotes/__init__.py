@@ -20,6 +20,7 @@ from sas_management.models import (
     db,
 )
 # from modules.catering_menu import CATERING_MENU
+from sas_management.services.sequence_service import next_reference, seed_from_column
 from sas_management.utils import role_required, paginate_query
 from sas_management.utils.helpers import parse_date
 
@@ -32,24 +33,8 @@ def _parse_int(value):
         return None
 
 def _generate_invoice_number():
-    """Generate a unique invoice number."""
-    from sas_management.models import Invoice
-    today = date.today()
-    prefix = f"INV-{today.strftime('%Y%m%d')}"
-    last_invoice = (
-        Invoice.query.filter(Invoice.invoice_number.like(f"{prefix}%"))
-        .order_by(Invoice.invoice_number.desc())
-        .first()
-    )
-    if last_invoice:
-        try:
-            last_num = int(last_invoice.invoice_number.split("-")[-1])
-            new_num = last_num + 1
-        except (ValueError, IndexError):
-            new_num = 1
-    else:
-        new_num = 1
-    return f"{prefix}-{new_num:04d}"
+    """Generate a unique invoice number (shared sequence with month-end billing runs)."""
+    return next_reference("INV", seed=seed_from_column(Invoice.invoice_number, Invoice.id))
 
 def _collect_catering_lines():
     # lookup = {item["id"]: item for item in CATERING_MENU}
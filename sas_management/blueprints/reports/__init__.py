@@ -1,12 +1,16 @@
-import csv
+import os
 from datetime import date, datetime
 from decimal import Decimal
-from io import StringIO
 
-from flask import Blueprint, flash, make_response, redirect, render_template, request, url_for
-from flask_login import login_required
+from flask import (
+    Blueprint, abort, current_app, flash, jsonify, redirect, render_template, request, send_file, url_for
+)
+from flask_login import current_user, login_required
 
-from sas_management.models import Transaction, TransactionType, UserRole, db
+from sas_management.models import ExportJob, Transaction, TransactionType, UserRole, db
+from sas_management.services.export_service import (
+    MIMETYPES, export_jobs, normalize_format, register_export, stream_query, streaming_response
+)
 from sas_management.utils import paginate_query, role_required
 from sas_management.utils.helpers import parse_date
 
@@ -107,15 +111,11 @@ def reports_index():
     )
 
 
-@reports_bp.route("/export")
-@login_required
-@role_required(UserRole.Admin, UserRole.SalesManager)
-def export_csv():
-    """Export transactions to CSV with current filters."""
-    start_date_str = request.args.get("start_date", "")
-    end_date_str = request.args.get("end_date", "")
-    category = request.args.get("category", "")
-    tx_type_str = request.args.get("type", "")
+def _parse_filters(args):
+    """(start_date, end_date, category, tx_type) from request args or job params."""
+    start_date_str = args.get("start_date", "")
+    end_date_str = args.get("end_date", "")
+    tx_type_str = args.get("type", "")
 
     start_date = parse_date(start_date_str) if start_date_str else None
     end_date = parse_date(end_date_str) if end_date_str else None
@@ -125,32 +125,98 @@ def export_csv():
             tx_type = TransactionType(tx_type_str)
         except ValueError:
             pass
+    return start_date, end_date, args.get("category", ""), tx_type
 
-    # Get filtered transactions (no pagination for export)
-    filtered_query = _get_filtered_query(start_date, end_date, category, tx_type)
-    transactions = filtered_query.all()
-
-    # Create CSV
-    output = StringIO()
-    writer = csv.writer(output)
-    writer.writerow(["Date", "Type", "Category", "Description", "Amount (UGX)", "Event ID"])
-
-    for tx in transactions:
-        writer.writerow(
-            [
-                tx.date.isoformat(),
-                tx.type.value,
-                tx.category,
-                tx.description,
-                str(tx.amount),
-                tx.related_event_id or "",
-            ]
-        )
-
-    output.seek(0)
-    response = make_response(output.getvalue())
-    response.headers["Content-Type"] = "text/csv"
-    response.headers["Content-Disposition"] = 'attachment; filename="transactions_export.csv"'
-
-    return response
 
+TRANSACTION_EXPORT_HEADERS = ["Date", "Type", "Category", "Description", "Amount (UGX)", "Event ID"]
+
+
+def _transaction_rows(filtered_query):
+    """Export rows streamed through a server-side cursor (columns only, no ORM objects)."""
+    columns = filtered_query.with_entities(
+        Transaction.date,
+        Transaction.type,
+        Transaction.category,
+        Transaction.description,
+        Transaction.amount,
+        Transaction.related_event_id,
+    )
+    for tx_date, tx_type, category, description, amount, event_id in stream_query(columns):
+        yield [tx_date.isoformat(), tx_type.value, category, description, str(amount), event_id or ""]
+
+
+@register_export("transactions")
+def transactions_export(params):
+    """Background export source: transactions matching the report filters."""
+    return TRANSACTION_EXPORT_HEADERS, _transaction_rows(_get_filtered_query(*_parse_filters(params)))
+
+
+@reports_bp.route("/export")
+@login_required
+@role_required(UserRole.Admin, UserRole.SalesManager)
+def export_csv():
+    """
+    Export transactions with current filters (``format=csv|xlsx``).
+
+    Streams the file directly; ranges larger than ``EXPORT_SYNC_MAX_ROWS``
+    (or ``background=1``) are handed to a background export job instead.
+    """
+    fmt = normalize_format(request.args.get("format"))
+    params = {key: request.args.get(key, "") for key in ("start_date", "end_date", "category", "type")}
+    filtered_query = _get_filtered_query(*_parse_filters(params))
+
+    background = request.args.get("background") == "1"
+    if not background:
+        max_rows = current_app.config.get("EXPORT_SYNC_MAX_ROWS", 200000)
+        background = filtered_query.order_by(None).count() > max_rows
+    if background:
+        job = export_jobs.submit("transactions", fmt, params, current_user.id)
+        flash("This export is large and is being prepared in the background.", "info")
+        return redirect(url_for("reports.export_job", token=job.token))
+
+    return streaming_response(
+        TRANSACTION_EXPORT_HEADERS,
+        _transaction_rows(filtered_query),
+        "transactions_export",
+        fmt,
+        title="Transactions",
+    )
+
+
+def _load_job(token):
+    job = ExportJob.query.filter_by(token=token).first_or_404()
+    if job.created_by != current_user.id and not current_user.is_admin:
+        abort(404)
+    return job
+
+
+@reports_bp.route("/exports/<token>")
+@login_required
+@role_required(UserRole.Admin, UserRole.SalesManager)
+def export_job(token):
+    """Status page of a background export (refreshes until the file is ready)."""
+    job = _load_job(token)
+    if request.args.get("format") == "json":
+        return jsonify({
+            "status": job.status,
+            "row_count": job.row_count,
+            "error": job.error,
+            "download_url": url_for("reports.export_download", token=job.token) if job.status == "completed" else None,
+        })
+    return render_template("reports/export_job.html", job=job)
+
+
+@reports_bp.route("/exports/<token>/download")
+@login_required
+@role_required(UserRole.Admin, UserRole.SalesManager)
+def export_download(token):
+    job = _load_job(token)
+    if job.status != "completed" or not job.file_path or not os.path.exists(job.file_path):
+        flash("That export is not ready.", "warning")
+        return redirect(url_for("reports.export_job", token=token))
+    return send_file(
+        job.file_path,
+        mimetype=MIMETYPES[job.fmt],
+        as_attachment=True,
+        download_name=f"{job.kind}_export.{job.fmt}",
+    )
@@ -2,7 +2,7 @@
 from flask import Blueprint, current_app, jsonify, render_template, request
 from flask_login import current_user, login_required
 
-from services.search_service import global_search, quick_search
+from sas_management.services.search_service import global_search, quick_search
 
 search_bp = Blueprint("search", __name__, url_prefix="/search")
 
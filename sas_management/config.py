@@ -38,6 +38,78 @@ class BaseConfig:
     UNIVERSITY_UPLOAD_FOLDER = "sas_management/static/uploads/university"
     UNIVERSITY_MAX_CONTENT_LENGTH = 1024 * 1024 * 1024  # 1GB max file size for videos
     
+    # Activity log pipeline - rows are queued per request and bulk-written by a background thread
+    ACTIVITY_LOG_QUEUE_SIZE = int(os.environ.get("ACTIVITY_LOG_QUEUE_SIZE", "10000"))
+    ACTIVITY_LOG_BATCH_SIZE = int(os.environ.get("ACTIVITY_LOG_BATCH_SIZE", "200"))
+    ACTIVITY_LOG_FLUSH_INTERVAL_MS = int(os.environ.get("ACTIVITY_LOG_FLUSH_INTERVAL_MS", "500"))
+    # Static files and polling APIs would flood the log without adding information
+    ACTIVITY_LOG_EXCLUDE_ENDPOINTS = {
+        "static", "chat.api_get_messages", "chat.stream", "kds.api_orders", "kds.stream", "search.api_quick_search",
+    }
+    # Fraction of requests logged per endpoint (unlisted endpoints are always logged)
+    ACTIVITY_LOG_SAMPLE_RATES = {"kds.screen": 0.1}
+    
+    # Seconds a built navigation menu / cached user role-set lives. Changes made
+    # in this process invalidate immediately; this bounds staleness across workers.
+    NAVIGATION_CACHE_TTL = int(os.environ.get("NAVIGATION_CACHE_TTL", "300"))
+    
+    # Compiled per-user permission sets (utils/permission_resolver.py)
+    PERMISSION_CACHE_SIZE = int(os.environ.get("PERMISSION_CACHE_SIZE", "2048"))
+    PERMISSION_CACHE_TTL = int(os.environ.get("PERMISSION_CACHE_TTL", "300"))
+    
+    # CSV/XLSX exports stream from the database; larger ranges run as background jobs
+    EXPORT_SYNC_MAX_ROWS = int(os.environ.get("EXPORT_SYNC_MAX_ROWS", "200000"))
+    EXPORT_JOB_WORKERS = int(os.environ.get("EXPORT_JOB_WORKERS", "2"))
+    EXPORT_FOLDER = os.environ.get("EXPORT_FOLDER")  # Defaults to <instance>/exports
+    
+    # PDF documents render in a process pool (0 = in the calling thread) and are
+    # cached by a hash of their source data (services/document_renderer.py)
+    DOCUMENT_RENDER_WORKERS = int(os.environ.get("DOCUMENT_RENDER_WORKERS", "2"))
+    DOCUMENT_RENDER_TIMEOUT = int(os.environ.get("DOCUMENT_RENDER_TIMEOUT", "120"))
+    DOCUMENT_CACHE_FOLDER = os.environ.get("DOCUMENT_CACHE_FOLDER")  # Defaults to <instance>/documents
+    DOCUMENT_CACHE_MAX_AGE_DAYS = int(os.environ.get("DOCUMENT_CACHE_MAX_AGE_DAYS", "90"))
+    
+    # Month-end billing runs: items per commit and concurrent SendGrid calls
+    BILLING_RUN_CHUNK_SIZE = int(os.environ.get("BILLING_RUN_CHUNK_SIZE", "200"))
+    BILLING_SEND_CONCURRENCY = int(os.environ.get("BILLING_SEND_CONCURRENCY", "8"))
+    
+    # Dashboard KPI snapshot lifetime in seconds (writes invalidate it sooner)
+    DASHBOARD_METRICS_TTL = int(os.environ.get("DASHBOARD_METRICS_TTL", "30"))
+    DASHBOARD_ANNOUNCEMENTS_LIMIT = 5
+    
+    # Shared SAS AI metrics lifetime in seconds (writes invalidate them sooner)
+    AI_METRICS_TTL = int(os.environ.get("AI_METRICS_TTL", "60"))
+    
+    # POS catalog snapshot lifetime in seconds (price/product writes invalidate it sooner)
+    POS_CATALOG_TTL = int(os.environ.get("POS_CATALOG_TTL", "60"))
+    
+    # Hire availability index lifetime in seconds (booking writes refresh the
+    # affected items sooner) and how many past days it keeps
+    HIRE_AVAILABILITY_TTL = int(os.environ.get("HIRE_AVAILABILITY_TTL", "300"))
+    HIRE_AVAILABILITY_HISTORY_DAYS = int(os.environ.get("HIRE_AVAILABILITY_HISTORY_DAYS", "90"))
+    
+    # Dispatch route planning (services/route_planner.py): solver time budget in
+    # seconds, fallback road speed, and the on-disk cache of Google road distances
+    DISPATCH_SOLVER_TIME_LIMIT = float(os.environ.get("DISPATCH_SOLVER_TIME_LIMIT", "3"))
+    DISPATCH_AVERAGE_SPEED_KMH = float(os.environ.get("DISPATCH_AVERAGE_SPEED_KMH", "40"))
+    ROUTE_MATRIX_CACHE_FILE = os.environ.get("ROUTE_MATRIX_CACHE_FILE")  # Defaults to <instance>/route_matrix.sqlite3
+    ROUTE_MATRIX_MAX_AGE_DAYS = int(os.environ.get("ROUTE_MATRIX_MAX_AGE_DAYS", "30"))
+    
+    # Floor plan autosaves are stored as JSON-Patch revisions and folded into
+    # the layout snapshot every N revisions (services/floorplanner_service.py)
+    FLOORPLAN_COMPACT_EVERY = int(os.environ.get("FLOORPLAN_COMPACT_EVERY", "50"))
+    
+    # Event profitability rollups - dirty events are recomputed after commits
+    # and at least every interval seconds (services/event_profitability_rollup.py)
+    EVENT_PROFITABILITY_REFRESHER = os.environ.get("EVENT_PROFITABILITY_REFRESHER", "true").lower() == "true"
+    EVENT_PROFITABILITY_REFRESH_INTERVAL = int(os.environ.get("EVENT_PROFITABILITY_REFRESH_INTERVAL", "30"))
+    EVENT_PROFITABILITY_BATCH_SIZE = int(os.environ.get("EVENT_PROFITABILITY_BATCH_SIZE", "200"))
+    
+    # Server-Sent Events bus for chat and KDS ("memory" or "postgres" LISTEN/NOTIFY)
+    EVENT_BUS_BROKER = os.environ.get("EVENT_BUS_BROKER", "memory")
+    EVENT_BUS_HISTORY_SIZE = int(os.environ.get("EVENT_BUS_HISTORY_SIZE", "1000"))
+    EVENT_BUS_HEARTBEAT_SECONDS = 15
+    
     # Enterprise Module Flags
     ENABLE_BRANCHES = os.environ.get("ENABLE_BRANCHES", "false").lower() == "true"
     ENABLE_SCHEDULER = os.environ.get("ENABLE_SCHEDULER", "true").lower() == "true"
@@ -1,6 +1,7 @@
-from flask import render_template, request, redirect, url_for, flash, current_app
+from flask import render_template, request, redirect, url_for, flash, current_app, jsonify
 from . import hire
 from sas_management.models import InventoryItem, Order, OrderItem, db, Client, Event
+from sas_management.services.hire_availability import InsufficientAvailability, hire_availability, rental_days
 from .services import paginate_query, serialize_item
 from sqlalchemy import func
 from sqlalchemy.orm import joinedload
@@ -331,62 +332,21 @@ def new_order():
             # Generate reference number with actual order ID
             order.reference = f"HO-{datetime.now().strftime('%Y%m%d')}-{order.id:04d}"
 
-            total_cost = Decimal('0.00')
-            insufficient_stock_items = []
-            
+            lines = []
             for it in items:
-                item_id = int(it.get("id"))
                 qty = int(it.get("qty", 0))
-                price = Decimal(str(it.get("price", 0)))
-                
-                if qty <= 0:
-                    continue
-                
-                # Verify availability and check stock
-                inv = db.session.get(InventoryItem, item_id)
-                if not inv:
-                    flash(f"Item ID {item_id} not found.", "warning")
-                    continue
-                
-                # Check if sufficient stock is available
-                if inv.stock_count < qty:
-                    insufficient_stock_items.append(f"{inv.name} (Available: {inv.stock_count}, Requested: {qty})")
-                    continue
-                
-                # Calculate subtotal (considering rental period if applicable)
-                days = 1
-                if start_date and end_date:
-                    days = max(1, (end_date - start_date).days + 1)
-                
-                subtotal = qty * price * days
-                
-                # Create OrderItem
-                order_item = OrderItem(
-                    order_id=order.id,
-                    item_id=inv.id,
-                    qty=qty,
-                    price=price,
-                    subtotal=subtotal
-                )
-                db.session.add(order_item)
-                total_cost += subtotal
-
-                # Deduct stock from inventory
-                inv.stock_count = max(0, inv.stock_count - qty)
-                
-                # Update item status if stock is depleted
-                if inv.stock_count == 0:
-                    inv.status = "Rented"
-                elif inv.status == "Available" and inv.stock_count < qty:
-                    inv.status = "Low Stock"
-                
-                db.session.add(inv)
+                if qty > 0:
+                    lines.append((int(it.get("id")), qty, Decimal(str(it.get("price", 0)))))
             
-            # Check for insufficient stock
-            if insufficient_stock_items:
+            # Checks the items are free for the order's dates and books them;
+            # stock_count is the owned quantity and is no longer decremented
+            try:
+                order_items = hire_availability.reserve(order, lines)
+            except InsufficientAvailability as e:
                 db.session.rollback()
-                flash(f"Insufficient stock for: {', '.join(insufficient_stock_items)}", "danger")
+                flash(f"Insufficient stock for: {e}", "danger")
                 return redirect(url_for("hire.new_order"))
+            total_cost = sum((oi.subtotal for oi in order_items), Decimal('0.00'))
 
             # Save total cost and calculate balance
             order.total_cost = total_cost
@@ -404,6 +364,8 @@ def new_order():
             return redirect(url_for("hire.new_order"))
 
     # ---- GET: render form ----
+    # Quantities shown are owned stock until dates are picked; the form then
+    # asks hire.availability for what is free over those dates
     # Query available inventory items with stock > 0
     items = InventoryItem.query.filter(
         InventoryItem.stock_count > 0
@@ -421,6 +383,25 @@ def new_order():
                          events=events)
 
 
+@hire.route("/availability")
+def availability():
+    """JSON: free quantity of every item (or ?item_id=...) between ?start= and ?end=, optionally vs ?qty=."""
+    try:
+        start = datetime.strptime(request.args.get("start", ""), "%Y-%m-%d").date()
+        end = datetime.strptime(request.args.get("end") or request.args.get("start", ""), "%Y-%m-%d").date()
+        qty = request.args.get("qty", type=int)
+        item_ids = request.args.getlist("item_id", type=int) or None
+        rows = hire_availability.availability(start, end, quantity=qty, item_ids=item_ids)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e) or "Invalid dates"}), 400
+    return jsonify({
+        "status": "success",
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "items": rows,
+    })
+
+
 @hire.route("/orders/<int:order_id>")
 def order_details(order_id):
     """View hire order details."""
@@ -430,16 +411,11 @@ def order_details(order_id):
         joinedload(Order.event)
     ).get_or_404(order_id)
     
-    # Calculate days if dates are available
-    rental_days = 1
-    if order.start_date and order.end_date:
-        rental_days = max(1, (order.end_date - order.start_date).days + 1)
-    
     return render_template(
         "hire/order_details.html",
         order_id=order_id,
         order=order,
-        rental_days=rental_days
+        rental_days=rental_days(order)
     )
 
 
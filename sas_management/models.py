@@ -277,22 +277,17 @@ class User(UserMixin, db.Model):
             if not hasattr(self, 'id') or not self.id:
                 return False
             
-            # Check legacy role enum field first
-            if self.role == UserRole.Admin:
-                return True
-            # Check role_obj name
-            if self.role_obj and hasattr(self.role_obj, 'name'):
-                if self.role_obj.name == 'Admin':
-                    return True
-            # Check roles relationship
-            if hasattr(self, 'roles') and self.roles:
-                for role in self.roles:
-                    if role.name == 'Admin':
-                        return True
-            return False
+            # Legacy role enum, role_obj and extra roles are all resolved into
+            # one cached permission set (see utils/permission_resolver.py)
+            return self.effective_permissions().is_admin
         except Exception:
             return False
     
+    def effective_permissions(self):
+        """Compiled permission set for this user, cached per request and per RBAC version."""
+        from sas_management.utils.permission_resolver import resolve_permissions
+        return resolve_permissions(self)
+    
     # Add this helper safely:
     def is_super_admin(self):
         """Check if user is SuperAdmin - bypasses all permission checks."""
@@ -342,31 +337,11 @@ class User(UserMixin, db.Model):
         if not hasattr(self, 'id') or not self.id:
             return False
         
-        # Admin bypass: If user is Admin, grant all permissions
-        if self.is_admin:
-            return True
-        
-        # Check if user has a role with this permission
+        # Admin bypass and wildcard grants are handled by the compiled set
         try:
-            # Check primary role (role_id)
-            if self.role_id:
-                role = db.session.get(Role, self.role_id)
-                if role:
-                    # Force load permissions
-                    perms = list(role.permissions)
-                    for perm in perms:
-                        if perm.code == code:
-                            return True
-            
-            # Check additional roles
-            for role in self.roles:
-                for perm in role.permissions:
-                    if perm.code == code:
-                        return True
+            return self.effective_permissions().allows(code)
         except Exception:
-            pass
-        
-        return False
+            return False
     
     def get_role_name(self):
         """Get the role name for display purposes."""
@@ -532,6 +507,12 @@ class MenuPackage(db.Model):
 class Event(db.Model):
     """Industry-grade Event management."""
     __tablename__ = "event"
+    __table_args__ = (
+        db.Index("ix_event_event_date", "event_date"),
+        db.Index("ix_event_date", "date"),
+        db.Index("ix_event_status_event_date", "status", "event_date"),
+        db.Index("ix_event_client_id", "client_id"),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
@@ -992,6 +973,10 @@ class AIConversation(db.Model):
 class Invoice(db.Model):
     """Invoice management."""
     __tablename__ = "invoice"
+    __table_args__ = (
+        db.Index("ix_invoice_status_due_date", "status", "due_date"),
+        db.Index("ix_invoice_event_id", "event_id"),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     event_id = db.Column(db.Integer, db.ForeignKey("event.id"), nullable=False)
@@ -1063,6 +1048,11 @@ class Account(db.Model):
     
     parent = db.relationship("Account", remote_side=[id])
     
+    # Names used by the accounting service, seeds and tests
+    code = db.synonym("account_code")
+    name = db.synonym("account_name")
+    type = db.synonym("account_type")
+    
     def __repr__(self):
         return f'<Account {self.account_code} - {self.account_name}>'
 
@@ -1153,6 +1143,9 @@ class Journal(db.Model):
 class JournalEntry(db.Model):
     """Journal entries."""
     __tablename__ = "journal_entry"
+    __table_args__ = (
+        db.Index("ix_journal_entry_entry_date", "entry_date"),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     journal_id = db.Column(db.Integer, db.ForeignKey("journal.id"), nullable=False)
@@ -1170,6 +1163,10 @@ class JournalEntry(db.Model):
 class JournalEntryLine(db.Model):
     """Journal entry lines."""
     __tablename__ = "journal_entry_line"
+    __table_args__ = (
+        db.Index("ix_journal_entry_line_entry_id", "entry_id"),
+        db.Index("ix_journal_entry_line_account_id", "account_id"),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     entry_id = db.Column(db.Integer, db.ForeignKey("journal_entry.id"), nullable=False)
@@ -1185,6 +1182,28 @@ class JournalEntryLine(db.Model):
         return f'<JournalEntryLine {self.id}>'
 
 
+class LedgerMonthlyBalance(db.Model):
+    """Debit/credit totals per account per calendar month (services/ledger_reports.py).
+
+    Kept in step with journal writes on flush, so reports add up whole
+    months from here and only read journal lines for partial months.
+    """
+    __tablename__ = "ledger_monthly_balance"
+    __table_args__ = (
+        db.Index("ix_ledger_monthly_balance_month", "month"),
+    )
+    
+    account_id = db.Column(db.Integer, db.ForeignKey("account.id"), primary_key=True)
+    month = db.Column(db.Date, primary_key=True)  # First day of the month
+    debit = db.Column(db.Numeric(16, 2), nullable=False, default=0.00)
+    credit = db.Column(db.Numeric(16, 2), nullable=False, default=0.00)
+    line_count = db.Column(db.Integer, nullable=False, default=0)
+    computed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<LedgerMonthlyBalance {self.account_id} {self.month}>'
+
+
 # ============================================================================
 # QUOTATION MODELS
 # ============================================================================
@@ -1588,6 +1607,10 @@ class Order(db.Model):
 class OrderItem(db.Model):
     """Hire order line items."""
     __tablename__ = "hire_order_item"
+    __table_args__ = (
+        db.Index("ix_hire_order_item_item_id", "item_id"),
+        db.Index("ix_hire_order_item_order_id", "order_id"),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     order_id = db.Column(db.Integer, db.ForeignKey("hire_order.id"), nullable=False)
@@ -1611,6 +1634,9 @@ class OrderItem(db.Model):
 class IncomingLead(db.Model):
     """CRM incoming leads."""
     __tablename__ = "incoming_lead"
+    __table_args__ = (
+        db.Index("ix_incoming_lead_pipeline_stage_timestamp", "pipeline_stage", "timestamp"),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     client_name = db.Column(db.String(255), nullable=False)
@@ -1658,8 +1684,15 @@ class Task(db.Model):
 # ============================================================================
 
 class BIEventProfitability(db.Model):
-    """Event profitability analysis aggregated data."""
+    """Event profitability analysis aggregated data.
+
+    One row per completed event, kept current by
+    services/event_profitability_rollup.py.
+    """
     __tablename__ = "bi_event_profitability"
+    __table_args__ = (
+        db.Index("ux_bi_event_profitability_event_id", "event_id", unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     event_id = db.Column(db.Integer, db.ForeignKey("event.id"), nullable=True)
@@ -1677,6 +1710,25 @@ class BIEventProfitability(db.Model):
         return f'<BIEventProfitability Event {self.event_id} Margin {self.margin_percent}%>'
 
 
+class BIEventProfitabilityDirty(db.Model):
+    """Events whose profitability rollup must be recomputed.
+
+    Marked on flush by writes to an event or its cost, revenue and staff
+    rows; cleared by the rollup refresher.  No foreign key, so deleted
+    events can be queued for removal of their rollup.
+    """
+    __tablename__ = "bi_event_profitability_dirty"
+    __table_args__ = (
+        db.Index("ix_bi_event_profitability_dirty_marked_at", "marked_at"),
+    )
+    
+    event_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    marked_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<BIEventProfitabilityDirty Event {self.event_id}>'
+
+
 class BIIngredientPriceTrend(db.Model):
     """Ingredient price trend data."""
     __tablename__ = "bi_ingredient_price_trend"
@@ -1696,13 +1748,22 @@ class BIIngredientPriceTrend(db.Model):
 class BISalesForecast(db.Model):
     """Sales forecast data."""
     __tablename__ = "bi_sales_forecast"
+    __table_args__ = (
+        db.Index("ux_bi_sales_forecast_source_forecast_date", "source", "forecast_date", unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
+    source = db.Column(db.String(50), nullable=True)  # POS, Catering, Bakery
     forecast_date = db.Column(db.Date, nullable=False)
     predicted_revenue = db.Column(db.Numeric(14, 2), nullable=False)
+    model_name = db.Column(db.String(50), nullable=True)
     confidence = db.Column(db.Float, nullable=True)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     
+    # Names used by the BI service, views and seed data
+    date = db.synonym("forecast_date")
+    predicted_sales = db.synonym("predicted_revenue")
+    
     def __repr__(self):
         return f'<BISalesForecast {self.forecast_date}>'
 
@@ -1726,13 +1787,27 @@ class BIStaffPerformance(db.Model):
 class BIBakeryDemand(db.Model):
     """Bakery demand forecast."""
     __tablename__ = "bi_bakery_demand"
+    __table_args__ = (
+        db.Index("ux_bi_bakery_demand_item_id_forecast_date", "item_id", "forecast_date", unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     item_id = db.Column(db.Integer, nullable=True)
     forecast_date = db.Column(db.Date, nullable=False)
     predicted_demand = db.Column(db.Integer, nullable=False)
+    model_name = db.Column(db.String(50), nullable=True)
+    confidence = db.Column(db.Float, nullable=True)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     
+    bakery_item = db.relationship(
+        "BakeryItem", primaryjoin="foreign(BIBakeryDemand.item_id) == BakeryItem.id", viewonly=True
+    )
+    
+    # Names used by the BI service, views and seed data
+    bakery_item_id = db.synonym("item_id")
+    date = db.synonym("forecast_date")
+    predicted_qty = db.synonym("predicted_demand")
+    
     def __repr__(self):
         return f'<BIBakeryDemand {self.forecast_date}>'
 
@@ -1781,7 +1856,13 @@ class FloorPlan(db.Model):
     name = db.Column(db.String(255), nullable=False)
     data = db.Column(db.Text, nullable=True)  # Primary JSON storage field - MUST EXIST
     layout_json = db.Column(db.Text, nullable=True)  # Optional legacy field
-    thumbnail = db.Column(db.LargeBinary, nullable=True)
+    # Layout revision (bumped by every saved change) and the revision ``data``
+    # holds; later revisions are FloorPlanChange patches on top of it
+    revision = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    snapshot_revision = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    # Loaded only when accessed so listings never read the PNG
+    thumbnail = db.deferred(db.Column(db.LargeBinary, nullable=True))
+    thumbnail_updated_at = db.Column(db.DateTime, nullable=True)
     created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -1794,6 +1875,24 @@ class FloorPlan(db.Model):
         return f'<FloorPlan {self.name}>'
 
 
+class FloorPlanChange(db.Model):
+    """JSON-Patch delta that turns floor plan revision ``revision - 1`` into ``revision``."""
+    __tablename__ = "floor_plan_change"
+    __table_args__ = (
+        db.UniqueConstraint("floor_plan_id", "revision", name="uq_floor_plan_change_revision"),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    floor_plan_id = db.Column(db.Integer, db.ForeignKey('floor_plan.id', ondelete="CASCADE"), nullable=False)
+    revision = db.Column(db.Integer, nullable=False)
+    patch = db.Column(db.Text, nullable=False)  # RFC 6902 operations as JSON
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<FloorPlanChange {self.floor_plan_id}@{self.revision}>'
+
+
 class SeatingAssignment(db.Model):
     """Seating assignments for floor plans."""
     __tablename__ = "seating_assignment"
@@ -1950,6 +2049,10 @@ class Employee(db.Model):
 class Attendance(db.Model):
     """Employee attendance records."""
     __tablename__ = "attendance"
+    __table_args__ = (
+        db.Index("ix_attendance_employee_id_clock_in", "employee_id", "clock_in"),
+        db.Index("ix_attendance_clock_in", "clock_in"),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     employee_id = db.Column(db.Integer, db.ForeignKey("employee.id"), nullable=False)
@@ -1989,6 +2092,9 @@ class Shift(db.Model):
 class ShiftAssignment(db.Model):
     """Shift assignments to employees."""
     __tablename__ = "shift_assignment"
+    __table_args__ = (
+        db.Index("ix_shift_assignment_assignment_date", "assignment_date", "employee_id"),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     shift_id = db.Column(db.Integer, db.ForeignKey("shift.id"), nullable=False)
@@ -2047,6 +2153,28 @@ class PayrollExport(db.Model):
         return f'<PayrollExport {self.export_date}>'
 
 
+class PayrollAttendanceSummary(db.Model):
+    """Days/hours worked per employee for a payroll period (services/payroll_engine.py).
+
+    Rows are deleted whenever an attendance row inside the period changes, so
+    a missing row means "recompute this employee".
+    """
+    __tablename__ = "payroll_attendance_summary"
+    __table_args__ = (
+        db.Index("ix_payroll_attendance_summary_employee_id", "employee_id", "period_start", "period_end"),
+    )
+    
+    period_start = db.Column(db.Date, primary_key=True)
+    period_end = db.Column(db.Date, primary_key=True)
+    employee_id = db.Column(db.Integer, db.ForeignKey("employee.id"), primary_key=True)
+    days_worked = db.Column(db.Integer, nullable=False, default=0)
+    hours_worked = db.Column(db.Numeric(10, 2), nullable=False, default=0.00)
+    computed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<PayrollAttendanceSummary {self.employee_id} {self.period_start}..{self.period_end}>'
+
+
 # ============================================================================
 # PRODUCTION MODELS
 # ============================================================================
@@ -2643,6 +2771,10 @@ class Announcement(db.Model):
 class Message(db.Model):
     """Chat messages (channel-based). Supports text and attachments."""
     __tablename__ = "message"
+    __table_args__ = (
+        db.Index("ix_message_channel_timestamp", "channel", "timestamp"),
+        db.Index("ix_message_channel_id", "channel", "id"),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
@@ -2680,6 +2812,9 @@ class DirectMessageThread(db.Model):
 class DirectMessage(db.Model):
     """Direct messages (1:1). Supports text, documents, voice notes, images."""
     __tablename__ = "direct_message"
+    __table_args__ = (
+        db.Index("ix_direct_message_thread_id_id", "thread_id", "id"),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     thread_id = db.Column(db.Integer, db.ForeignKey("direct_message_thread.id"), nullable=False)
@@ -2717,6 +2852,9 @@ class EventMessageThread(db.Model):
 class EventMessage(db.Model):
     """Event messages."""
     __tablename__ = "event_message"
+    __table_args__ = (
+        db.Index("ix_event_message_thread_id_id", "thread_id", "id"),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     thread_id = db.Column(db.Integer, db.ForeignKey("event_message_thread.id"), nullable=False)
@@ -2735,6 +2873,9 @@ class EventMessage(db.Model):
 class DepartmentMessage(db.Model):
     """Department-wide messages."""
     __tablename__ = "department_message"
+    __table_args__ = (
+        db.Index("ix_department_message_department_id", "department", "id"),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     department = db.Column(db.String(100), nullable=False)
@@ -2861,9 +3002,17 @@ class POSShift(db.Model):
 class POSOrder(db.Model):
     """POS orders."""
     __tablename__ = "pos_order"
+    __table_args__ = (
+        db.Index("ix_pos_order_shift_id_status", "shift_id", "status"),
+        db.Index("ix_pos_order_status_created_at", "status", "created_at"),
+        db.Index("ix_pos_order_status_order_time", "status", "order_time"),
+        db.Index("ux_pos_order_client_uuid", "client_uuid", unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     reference = db.Column(db.String(120), unique=True, nullable=False)
+    # Generated by the terminal; makes offline sync retries idempotent
+    client_uuid = db.Column(db.String(36), nullable=True)
     shift_id = db.Column(db.Integer, db.ForeignKey("pos_shift.id"), nullable=True)
     device_id = db.Column(db.Integer, db.ForeignKey("pos_device.id"), nullable=True)
     client_id = db.Column(db.Integer, db.ForeignKey("client.id"), nullable=True)
@@ -2895,6 +3044,9 @@ class POSOrder(db.Model):
 class POSOrderLine(db.Model):
     """POS order line items."""
     __tablename__ = "pos_order_line"
+    __table_args__ = (
+        db.Index("ix_pos_order_line_order_id", "order_id"),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     order_id = db.Column(db.Integer, db.ForeignKey("pos_order.id"), nullable=False)
@@ -2915,6 +3067,9 @@ class POSOrderLine(db.Model):
 class POSPayment(db.Model):
     """POS payments."""
     __tablename__ = "pos_payment"
+    __table_args__ = (
+        db.Index("ix_pos_payment_order_id", "order_id"),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     order_id = db.Column(db.Integer, db.ForeignKey("pos_order.id"), nullable=False)
@@ -2930,6 +3085,68 @@ class POSPayment(db.Model):
         return f'<POSPayment {self.method} - {self.amount}>'
 
 
+class POSShiftCounter(db.Model):
+    """Running per-shift totals (orders, paid sales, tax, discount, payments by method).
+
+    Maintained on every flush by ``services.pos_shift_counters`` so X/Z reports
+    read a handful of rows instead of aggregating the shift's orders.
+    """
+    __tablename__ = "pos_shift_counter"
+    
+    shift_id = db.Column(db.Integer, db.ForeignKey("pos_shift.id"), primary_key=True)
+    key = db.Column(db.String(80), primary_key=True)  # 'orders' | 'paid' | 'tax' | 'discount' | 'payment:<method>'
+    count = db.Column(db.Integer, nullable=False, default=0)
+    amount = db.Column(db.Numeric(16, 2), nullable=False, default=0.00)
+    
+    def __repr__(self):
+        return f'<POSShiftCounter {self.shift_id} {self.key}>'
+
+
+class POSReferenceBlock(db.Model):
+    """Order references handed to a terminal for numbering sales while offline.
+
+    Written by ``services.pos_service.reserve_order_references``; offline sync
+    only keeps a client-supplied reference that falls inside one of the
+    device's blocks.
+    """
+    __tablename__ = "pos_reference_block"
+    __table_args__ = (db.Index("ix_pos_reference_block_device_period", "device_id", "period"),)
+    
+    id = db.Column(db.Integer, primary_key=True)
+    device_id = db.Column(db.Integer, db.ForeignKey("pos_device.id", ondelete="CASCADE"), nullable=False)
+    prefix = db.Column(db.String(40), nullable=False)
+    period = db.Column(db.String(20), nullable=False)
+    first = db.Column(db.Integer, nullable=False)
+    last = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<POSReferenceBlock {self.prefix}-{self.period} {self.first}-{self.last}>'
+
+
+class POSSalesCube(db.Model):
+    """Hourly POS sales rollup per (date, hour, terminal, product category).
+
+    Maintained by ``services.pos_sales_cube`` as orders are paid, so heatmaps
+    and trends never scan ``pos_order``.  ``category`` '*' holds whole-order
+    totals (order count, revenue, payments); the other categories hold line
+    quantities and line totals.  ``device_id`` 0 means "no terminal".
+    """
+    __tablename__ = "pos_sales_cube"
+    
+    bucket_date = db.Column(db.Date, primary_key=True)
+    hour = db.Column(db.SmallInteger, primary_key=True)
+    device_id = db.Column(db.Integer, primary_key=True, default=0)
+    category = db.Column(db.String(100), primary_key=True, default="*")
+    orders = db.Column(db.Integer, nullable=False, default=0)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Numeric(16, 2), nullable=False, default=0.00)
+    paid_amount = db.Column(db.Numeric(16, 2), nullable=False, default=0.00)
+    
+    def __repr__(self):
+        return f'<POSSalesCube {self.bucket_date} {self.hour} {self.device_id} {self.category}>'
+
+
 class POSProduct(db.Model):
     """POS products."""
     __tablename__ = "pos_product"
@@ -3821,6 +4038,10 @@ def setup_audit_logging():
 class ActivityLog(db.Model):
     """Activity logging for user actions."""
     __tablename__ = "activity_logs"
+    __table_args__ = (
+        db.Index("ix_activity_logs_timestamp", "timestamp"),
+        db.Index("ix_activity_logs_user_id_timestamp", "user_id", "timestamp"),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=True)
@@ -3834,3 +4055,113 @@ class ActivityLog(db.Model):
     
     def __repr__(self):
         return f'<ActivityLog user_id={self.user_id} action={self.action}>'
+
+
+class SearchDocument(db.Model):
+    """Flattened, tokenizable text of one searchable record (global search index)."""
+    __tablename__ = "search_documents"
+    __table_args__ = (
+        db.UniqueConstraint("entity", "entity_id", name="uq_search_documents_entity"),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(50), nullable=False)  # Search result key, e.g. 'clients'
+    entity_id = db.Column(db.Integer, nullable=False)
+    body = db.Column(db.Text, nullable=False, default="")
+    visible = db.Column(db.Boolean, nullable=False, default=True, server_default=db.true())  # Matches its type's visibility filter
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<SearchDocument {self.entity}:{self.entity_id}>'
+
+
+class ReferenceSequence(db.Model):
+    """Per-prefix, per-period counter behind human-readable references (POS-20260101-0001)."""
+    __tablename__ = "sequences"
+    
+    prefix = db.Column(db.String(40), primary_key=True)
+    period = db.Column(db.String(20), primary_key=True)  # e.g. '20260101'; '' for never-resetting sequences
+    value = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<ReferenceSequence {self.prefix}-{self.period}={self.value}>'
+
+
+class ExportJob(db.Model):
+    """Background CSV/XLSX export (services/export_service.py)."""
+    __tablename__ = "export_jobs"
+    
+    id = db.Column(db.Integer, primary_key=True)
+    token = db.Column(db.String(64), unique=True, nullable=False)  # Opaque id used in download links
+    kind = db.Column(db.String(50), nullable=False)  # Registered export name, e.g. 'transactions'
+    fmt = db.Column(db.String(10), nullable=False, default="csv")  # 'csv' | 'xlsx'
+    params = db.Column(db.JSON, nullable=True)
+    status = db.Column(db.String(20), nullable=False, default="pending")  # pending | running | completed | failed
+    row_count = db.Column(db.Integer, nullable=False, default=0)
+    file_path = db.Column(db.String(500), nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    created_by = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    
+    creator = db.relationship("User")
+    
+    def __repr__(self):
+        return f'<ExportJob {self.kind} {self.status}>'
+
+
+class BillingRun(db.Model):
+    """Month-end bulk invoicing run (services/billing_run.py)."""
+    __tablename__ = "billing_run"
+    
+    id = db.Column(db.Integer, primary_key=True)
+    period_start = db.Column(db.Date, nullable=False)
+    period_end = db.Column(db.Date, nullable=False)
+    issue_date = db.Column(db.Date, nullable=False, default=date.today)
+    due_date = db.Column(db.Date, nullable=False)
+    send_emails = db.Column(db.Boolean, nullable=False, default=False)
+    # pending | running | completed | completed_with_errors | failed
+    status = db.Column(db.String(30), nullable=False, default="pending")
+    total = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text, nullable=True)
+    created_by = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    planned_at = db.Column(db.DateTime, nullable=True)  # Items selected
+    started_at = db.Column(db.DateTime, nullable=True)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)  # Last progress; stale runs can be resumed elsewhere
+    finished_at = db.Column(db.DateTime, nullable=True)
+    
+    creator = db.relationship("User")
+    items = db.relationship("BillingRunItem", back_populates="run", cascade="all, delete-orphan", lazy="dynamic")
+    
+    def __repr__(self):
+        return f'<BillingRun {self.period_start}..{self.period_end} {self.status}>'
+
+
+class BillingRunItem(db.Model):
+    """One event billed by a BillingRun; ``status`` is the last stage it completed."""
+    __tablename__ = "billing_run_item"
+    __table_args__ = (
+        db.UniqueConstraint("run_id", "event_id", name="uq_billing_run_item_run_event"),
+        db.Index("ix_billing_run_item_run_status", "run_id", "status"),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    run_id = db.Column(db.Integer, db.ForeignKey("billing_run.id"), nullable=False)
+    event_id = db.Column(db.Integer, db.ForeignKey("event.id"), nullable=False)
+    amount = db.Column(db.Numeric(12, 2), nullable=False, default=0.00)
+    invoice_id = db.Column(db.Integer, db.ForeignKey("invoice.id"), nullable=True)
+    # pending | invoiced | rendered | sent | skipped
+    status = db.Column(db.String(20), nullable=False, default="pending")
+    pdf_path = db.Column(db.String(500), nullable=True)
+    message_id = db.Column(db.String(255), nullable=True)
+    error = db.Column(db.Text, nullable=True)  # Why the next stage failed; cleared on resume
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    run = db.relationship("BillingRun", back_populates="items")
+    event = db.relationship("Event")
+    invoice = db.relationship("Invoice")
+    
+    def __repr__(self):
+        return f'<BillingRunItem {self.run_id}/{self.event_id} {self.status}>'
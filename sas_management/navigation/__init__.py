@@ -1,5 +1,5 @@
 # Navigation module
 from .modules import get_modules
+from .registry import navigation_registry
 
-__all__ = ['get_modules']
-
+__all__ = ['get_modules', 'navigation_registry']
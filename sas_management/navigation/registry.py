@@ -0,0 +1,334 @@
+"""
+Navigation registry - per-role menus built once and reused.
+
+Menus are declared as data (``NavEntry``) and resolved with ``url_for`` only
+when a role-set is seen for the first time.  Built menus are cached in process
+keyed by (menu, admin flag, role names, RBAC version); a user's role names are
+cached the same way so a warm page render costs no queries and no ``url_for``
+calls.  Role and permission changes bump the RBAC version
+(``sas_management.utils.rbac_version``), which drops every cached entry.
+
+The returned lists are shared between requests and must not be mutated.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, request, url_for
+
+from sas_management.utils import rbac_version
+from sas_management.utils.permission_resolver import EffectivePermissions
+
+
+class NavEntry:
+    """
+    One top-level menu entry.
+
+    ``admin`` - shown to admin users.
+    ``permissions`` - shown to non-admins holding any of these permission codes.
+    ``roles`` - shown to non-admins holding any of these role names.
+    ``members`` - shown to every non-admin user.
+    ``everyone`` - shown to every authenticated user.
+    ``config_flags`` - hidden unless at least one of these config flags is on.
+    """
+
+    def __init__(self, name, endpoint, children=None, admin=True, permissions=(), roles=(),
+                 members=False, everyone=False, config_flags=()):
+        self.name = name
+        self.endpoint = endpoint
+        self.children = children
+        self.admin = admin
+        self.permissions = tuple(permissions)
+        self.roles = tuple(roles)
+        self.members = members
+        self.everyone = everyone
+        self.config_flags = tuple(config_flags)
+
+    def enabled(self, config):
+        return not self.config_flags or any(config.get(flag, True) for flag in self.config_flags)
+
+    def visible_to(self, profile):
+        if self.everyone:
+            return True
+        if profile.is_admin:
+            return self.admin
+        if self.members:
+            return True
+        if self.roles and not profile.role_names.isdisjoint(self.roles):
+            return True
+        return bool(self.permissions) and profile.permissions.allows_any(*self.permissions)
+
+
+EVENTS_CHILDREN = (
+    ("All Events", "events.events_list"),
+    ("Create Event", "events.event_create"),
+    ("Venues", "events.venues_list"),
+    ("Menu Packages", "events.menu_packages_list"),
+    ("Vendors", "events.vendors_manage"),
+    ("Floor Planner", "floorplanner.dashboard"),
+    ("Tasks", "tasks.task_list"),
+)
+
+HIRE_CHILDREN = (
+    ("Hire Overview", "hire.index"),
+    ("Hire Inventory", "hire.inventory_list"),
+    ("Hire Orders", "hire.orders_list"),
+    ("Equipment Maintenance", "hire.maintenance_list"),
+)
+
+EVENT_SERVICE_CHILDREN = (
+    ("Services Overview", "service.dashboard"),
+    ("All Events", "service.events"),
+    ("Timeline", "event_service.timeline_index"),
+    ("Documents", "event_service.documents_index"),
+    ("Checklists", "event_service.service_checklists"),
+    ("Messages", "event_service.service_messages"),
+    ("Reports", "event_service.service_reports"),
+    ("Analytics", "event_service.service_analytics"),
+)
+
+PRODUCTION_CHILDREN = (
+    ("Production Overview", "production.index"),
+    ("Menu Builder", "menu_builder.dashboard"),
+    ("Catering Menu", "catering.menu_list"),
+    ("Ingredient Inventory", "inventory.ingredients_list"),
+    ("Kitchen Checklist", "production.kitchen_checklist_list"),
+    ("Delivery QC Checklist", "production.delivery_qc_list"),
+    ("Food Safety Logs", "production.food_safety_list"),
+    ("Hygiene Reports", "production.hygiene_reports_list"),
+)
+
+ACCOUNTING_CHILDREN = (
+    ("Accounting Overview", "accounting.dashboard"),
+    ("Receipting System", "accounting.receipts_list"),
+    ("Quotations", "quotes.list_quotes"),
+    ("Invoices", "invoices.invoice_list"),
+    ("Cashbook", "cashbook.index"),
+    ("Financial Reports", "reports.reports_index"),
+    ("Payroll Management", "payroll.payroll_list"),
+)
+
+BAKERY_CHILDREN = (
+    ("Bakery Overview", "bakery.dashboard"),
+    ("Bakery Menu", "bakery.items_list"),
+    ("Bakery Orders", "bakery.orders_list"),
+    ("Production Sheet", "bakery.production_sheet"),
+    ("Reports", "bakery.reports"),
+)
+
+HR_CHILDREN = (
+    ("HR Overview", "hr.dashboard"),
+    ("Employee Management", "hr.employee_list"),
+    ("Roster Builder", "hr.roster_builder"),
+    ("Leave Requests", "hr.leave_queue"),
+    ("Attendance Review", "hr.attendance_review"),
+    ("Payroll Export", "hr.payroll_export"),
+)
+
+ADMIN_CHILDREN = (
+    ("Admin Dashboard", "admin.dashboard"),
+    ("Roles & Permissions", "admin.roles_list"),
+    ("🤖 AI Permissions", "admin.ai_permissions"),
+)
+
+SAS_AI_CHILDREN = (
+    ("AI Dashboard", "ai.dashboard"),
+    ("AI Chat", "ai.chat"),
+    ("All Features", "ai.chat"),
+)
+
+# Sidebar (base.html): admins see every department, other users see the
+# department their role maps to plus the modules everyone has.
+SIDEBAR_MENU = (
+    NavEntry("Dashboard", "core.dashboard"),
+    NavEntry("Clients CRM", "core.clients_list"),
+    NavEntry("Events", "events.events_list", EVENTS_CHILDREN),
+    NavEntry("Hire Department", "hire.index", HIRE_CHILDREN),
+    NavEntry("Event Service", "service.dashboard", EVENT_SERVICE_CHILDREN),
+    NavEntry("Production Department", "production.index", PRODUCTION_CHILDREN),
+    NavEntry("Accounting Department", "accounting.dashboard", ACCOUNTING_CHILDREN, roles=("ACCOUNTING",)),
+    NavEntry("Bakery Department", "bakery.dashboard", BAKERY_CHILDREN),
+    NavEntry("POS System", "pos.index"),
+    NavEntry("HR Department", "hr.dashboard", HR_CHILDREN),
+    NavEntry("CRM Pipeline", "crm.pipeline"),
+    NavEntry("Dispatch", "dispatch.dashboard"),
+    NavEntry("Employee University", "university.dashboard", everyone=True),
+    NavEntry("Admin Dashboard", "admin.dashboard"),
+    NavEntry("SAS AI", "ai.chat", everyone=True),
+    NavEntry("Announcements", "communication.announcements_list", admin=False, members=True),
+)
+
+# Dashboard module tiles: permission based for non-admins.
+DASHBOARD_MENU = (
+    NavEntry("Dashboard", "core.dashboard", everyone=True),
+    NavEntry("Clients CRM", "core.clients_list",
+             permissions=("view_clients", "manage_clients", "view_all")),
+    NavEntry("Events", "events.events_list", EVENTS_CHILDREN,
+             permissions=("view_events", "manage_events", "event_service.view_events", "view_all")),
+    NavEntry("Hire Department", "hire.index", HIRE_CHILDREN,
+             permissions=("view_hire", "manage_hire", "view_all")),
+    NavEntry("🧾 Event Service", "service.dashboard", EVENT_SERVICE_CHILDREN,
+             permissions=("event_service.view_events", "event_service.create_events",
+                          "event_service.manage_events", "view_all")),
+    NavEntry("Production Department", "production.index", PRODUCTION_CHILDREN),
+    NavEntry("Production Department", "production.index",
+             PRODUCTION_CHILDREN + (("Production Sheet", "bakery.production_sheet"), ("Reports", "bakery.reports")),
+             admin=False, permissions=("view_production", "manage_production", "view_all")),
+    NavEntry("Accounting Department", "accounting.dashboard", ACCOUNTING_CHILDREN),
+    NavEntry("Bakery Department", "bakery.dashboard", BAKERY_CHILDREN),
+    NavEntry("POS System", "pos.index",
+             permissions=("view_pos", "manage_pos", "view_all")),
+    NavEntry("HR Department", "hr.dashboard", HR_CHILDREN,
+             permissions=("view_hr", "manage_hr", "view_all")),
+    NavEntry("Accounting Department", "accounting.dashboard", ACCOUNTING_CHILDREN, admin=False,
+             permissions=("accounting.view_accounting", "accounting.create_invoice",
+                          "accounting.approve_payments", "view_all")),
+    NavEntry("CRM Pipeline", "crm.pipeline"),
+    NavEntry("Dispatch", "dispatch.dashboard"),
+    NavEntry("🎓 Employee University", "university.dashboard"),
+    NavEntry("Admin", "admin.roles_list", ADMIN_CHILDREN,
+             permissions=("view_admin", "manage_users", "assign_roles", "view_all")),
+    NavEntry("🤖 SAS AI", "ai.chat", SAS_AI_CHILDREN, everyone=True,
+             config_flags=("AI_MODULE_ENABLED", "SAS_AI_ENABLED")),
+)
+
+MENUS = {"sidebar": SIDEBAR_MENU, "dashboard": DASHBOARD_MENU}
+
+
+class UserProfile:
+    """What the menus need to know about a user, resolved once per RBAC version."""
+
+    __slots__ = ("is_admin", "role_names", "permissions")
+
+    def __init__(self, is_admin, role_names=frozenset(), permissions=None):
+        self.is_admin = is_admin
+        self.role_names = frozenset(role_names)
+        self.permissions = permissions if permissions is not None else EffectivePermissions(None)
+
+    def key(self):
+        return (self.is_admin, self.role_names)
+
+
+def _sidebar_admin(user):
+    # Matches the historic sidebar check: role_obj wins over the legacy enum
+    role_obj = getattr(user, "role_obj", None)
+    if role_obj is not None:
+        return role_obj.name == "ADMIN"
+    return str(getattr(user, "role", None)) == "UserRole.Admin"
+
+
+def _dashboard_admin(user):
+    try:
+        return bool(user.is_admin or user.is_super_admin())
+    except Exception:
+        return False
+
+
+def load_user_profiles(user):
+    """Menu profiles for ``user``, built on its compiled permission set."""
+    effective = user.effective_permissions()
+    # The admin shortcut is decided per menu, so permissions are checked without it
+    permissions = EffectivePermissions(effective.user_id, False, effective.role_names, effective.codes)
+    return {
+        "sidebar": UserProfile(_sidebar_admin(user), effective.role_names, permissions),
+        "dashboard": UserProfile(_dashboard_admin(user), effective.role_names, permissions),
+    }
+
+
+def _resolve(name, endpoint, children, logger=None):
+    node = {"name": name, "url": url_for(endpoint)}
+    if children is not None:
+        node["children"] = []
+        for child_name, child_endpoint in children:
+            try:
+                node["children"].append({"name": child_name, "url": url_for(child_endpoint)})
+            except Exception as e:
+                if logger is not None:
+                    logger.warning(f"Navigation entry '{name} / {child_name}' skipped: {e}")
+    return node
+
+
+def build_menu(entries, profile, config, logger=None):
+    """Resolve the entries visible to ``profile`` into template-ready dicts."""
+    modules = []
+    for entry in entries:
+        if not (entry.visible_to(profile) and entry.enabled(config)):
+            continue
+        try:
+            modules.append(_resolve(entry.name, entry.endpoint, entry.children, logger))
+        except Exception as e:
+            # A blueprint that failed to register must not break navigation
+            if logger is not None:
+                logger.warning(f"Navigation entry '{entry.name}' skipped: {e}")
+    return modules
+
+
+class NavigationRegistry:
+    """Process-local cache of built menus and per-user profiles."""
+
+    def __init__(self, ttl=300, max_users=4096):
+        self.ttl = ttl
+        self.max_users = max_users
+        self._menus = {}
+        self._users = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        with self._lock:
+            self._menus.clear()
+            self._users.clear()
+
+    def _sync_version(self):
+        version = rbac_version.current_version()
+        if version != self._version:
+            self.clear()
+            self._version = version
+        return version
+
+    def _profiles(self, user, now):
+        user_id = user.get_id()
+        with self._lock:
+            cached = self._users.get(user_id)
+            if cached is not None and cached[0] > now:
+                self._users.move_to_end(user_id)
+                return cached[1]
+        profiles = load_user_profiles(user)
+        with self._lock:
+            self._users[user_id] = (now + self.ttl, profiles)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        return profiles
+
+    def menu_for(self, user, menu="sidebar"):
+        """The pre-built menu ``menu`` for ``user`` (empty for anonymous users)."""
+        if not getattr(user, "is_authenticated", False):
+            return []
+        self.ttl = current_app.config.get("NAVIGATION_CACHE_TTL", self.ttl)
+        version = self._sync_version()
+        now = time.monotonic()
+        profile = self._profiles(user, now)[menu]
+        key = (menu, profile.key(), version, request.script_root)
+        cached = self._menus.get(key)
+        if cached is not None and cached[0] > now:
+            self.hits += 1
+            return cached[1]
+        self.misses += 1
+        modules = build_menu(MENUS[menu], profile, current_app.config, current_app.logger)
+        with self._lock:
+            self._menus[key] = (now + self.ttl, modules)
+        return modules
+
+    def stats(self):
+        return {
+            "menus": len(self._menus),
+            "users": len(self._users),
+            "hits": self.hits,
+            "misses": self.misses,
+            "version": self._version,
+        }
+
+
+navigation_registry = NavigationRegistry()
@@ -23,8 +23,6 @@ from sas_management.models import (
     IncomingLead,
     Ingredient,
     InventoryItem,
-    Invoice,
-    InvoiceStatus,
     Quotation,
     QuotationLine,
     QuotationSource,
@@ -258,171 +256,51 @@ def dashboard():
         except:
             pass
     
-    # If super admin → return dashboard immediately (check if authenticated first)
-    if current_user.is_authenticated and hasattr(current_user, 'is_super_admin') and current_user.is_super_admin():
-        # We'll still render the full dashboard, but skip permission checks
-        pass
-    elif not is_admin_user:
-        # Non-admin users: redirect to a simplified dashboard or show limited data
-        # Get user's role to determine what to show
-        user_role_name = ""
-        if current_user.is_authenticated and hasattr(current_user, 'role_obj') and current_user.role_obj:
-            user_role_name = current_user.role_obj.name.lower()
-        
-        # Check what modules user has access to
-        user_permissions = []
-        if current_user.is_authenticated:
-            try:
-                for perm in current_user.role_obj.permissions:
-                    user_permissions.append(perm.code)
-            except:
-                pass
-        
-        # Build a simplified dashboard for non-admins
-        # Only show data relevant to their role
-        # We'll still render the full dashboard, but skip permission checks
-        pass
-    
     # Show full dashboard for admins
     show_full_dashboard = is_admin_user
+    show_employee_university = is_admin_user
+    
+    # Permission checks below are set lookups against the user's compiled
+    # permission set (resolved once per request, see utils/permission_resolver.py)
+    effective = current_user.effective_permissions()
     
     # Helper function to check if user has permission for a module
     def can_view_module(*permission_codes):
         if is_admin_user:
             return True
         # Check if user has ADMIN role
-        try:
-            if current_user.role_obj and current_user.role_obj.name == 'ADMIN':
-                return True
-        except:
-            pass
-        for code in permission_codes:
-            if current_user.has_permission(code):
-                return True
-        return False
+        if effective.has_role('ADMIN'):
+            return True
+        return effective.allows_any(*permission_codes)
     
     try:
 
         # Initialize all variables with safe defaults
-        clients = []
-        events = []
-        total_confirmed_quote = Decimal('0.00')
-        active_clients = 0
-        draft_events = 0
-        pipeline_stats = {}
-        pipeline_value = Decimal('0.00')
-        paid_invoices = 0
-        pending_invoices = 0
-        overdue_invoices = 0
-        pending_invoice_amount = Decimal('0.00')
-        available_staff = 0
-        low_stock_alerts = 0
-        upcoming_events_count = 0
+        metrics = {}
         upcoming_events = []
-        tasks_today = 0
         recent_tasks = []
-        top_clients = []
         announcements = []
 
-        # Load data based on permissions
-        # Only load data for modules user has access to
-        try:
-            if can_view_module('view_clients', 'manage_clients', 'view_all'):
-                clients = Client.query.filter(Client.is_archived == False).order_by(Client.name.asc()).all()
-                active_clients = len(clients)
-        except Exception as e:
-            current_app.logger.error(f"Error loading clients: {e}")
-
+        # KPIs come from the shared snapshot (a handful of grouped aggregates,
+        # cached briefly and invalidated on writes)
         try:
-            if can_view_module('view_events', 'manage_events', 'event_service.view_events', 'view_all'):
-                events = Event.query.order_by(Event.event_date.asc()).all()
+            from sas_management.services.dashboard_metrics_service import dashboard_metrics
+            metrics = dashboard_metrics.snapshot()
         except Exception as e:
-            current_app.logger.error(f"Error loading events: {e}")
-            flash("Error loading event data. Some metrics may be incomplete.", "warning")
+            current_app.logger.error(f"Error loading dashboard metrics: {e}")
+            flash("Error loading dashboard metrics. Some figures may be incomplete.", "warning")
 
-        try:
-            total_confirmed_quote = (
-                db.session.query(db.func.coalesce(db.func.sum(Event.quoted_value), 0))
-                .filter(Event.status == "Confirmed")
-                .scalar() or Decimal('0.00')
-            )
-        except Exception as e:
-            current_app.logger.error(f"Error calculating confirmed quotes: {e}")
-
-        try:
-            draft_events = (
-                db.session.query(db.func.count(Event.id))
-                .filter(Event.status == "Draft")
-                .scalar() or 0
-            )
-        except Exception as e:
-            current_app.logger.error(f"Error counting draft events: {e}")
-        
-        # Pipeline metrics with error handling
-        try:
-            from sas_management.models import IncomingLead
-            from datetime import datetime, timedelta
-            stages = ["New Lead", "Qualified", "Proposal Sent", "Negotiation", "Awaiting Payment", "Confirmed", "Completed", "Lost"]
-            for stage in stages:
-                try:
-                    pipeline_stats[stage] = IncomingLead.query.filter_by(pipeline_stage=stage).count()
-                except Exception as e:
-                    current_app.logger.error(f"Error counting leads for stage {stage}: {e}")
-                    pipeline_stats[stage] = 0
-        except Exception as e:
-            current_app.logger.error(f"Error loading pipeline stats: {e}")
-            flash("Error loading pipeline statistics.", "warning")
-        
-        # Calculate pipeline value with error handling
-        try:
-            pipeline_value = (
-                db.session.query(db.func.coalesce(db.func.sum(Event.quoted_value), 0))
-                .join(IncomingLead, IncomingLead.converted_event_id == Event.id)
-                .filter(IncomingLead.pipeline_stage.in_(["Qualified", "Proposal Sent", "Negotiation", "Awaiting Payment"]))
-                .scalar() or Decimal('0.00')
-            )
-        except Exception as e:
-            current_app.logger.error(f"Error calculating pipeline value: {e}")
-        
-        # Invoice metrics with error handling
-        try:
-            from sas_management.models import Invoice, InvoiceStatus, InventoryItem, Task, TaskStatus
-            paid_invoices = Invoice.query.filter_by(status=InvoiceStatus.Paid).count()
-            pending_invoices = Invoice.query.filter(Invoice.status.in_([InvoiceStatus.Issued, InvoiceStatus.Draft])).count()
-            overdue_invoices = Invoice.query.filter_by(status=InvoiceStatus.Overdue).count()
-            
-            pending_invoice_amount = (
-                db.session.query(db.func.coalesce(db.func.sum(Invoice.total_amount_ugx), 0))
-                .filter(Invoice.status.in_([InvoiceStatus.Issued, InvoiceStatus.Draft]))
-                .scalar() or Decimal('0.00')
-            )
-        except Exception as e:
-            current_app.logger.error(f"Error loading invoice metrics: {e}")
-            flash("Error loading invoice data.", "warning")
-        
-        try:
-            available_staff = User.query.count()
-        except Exception as e:
-            current_app.logger.error(f"Error counting staff: {e}")
-        
-        try:
-            low_stock_alerts = InventoryItem.query.filter(InventoryItem.stock_count <= 10).count()
-        except Exception as e:
-            current_app.logger.error(f"Error checking low stock: {e}")
-            flash("Error loading inventory alerts.", "warning")
+        # Only show figures for modules the user has access to
+        show_clients = can_view_module('view_clients', 'manage_clients', 'view_all')
+        show_events = can_view_module('view_events', 'manage_events', 'event_service.view_events', 'view_all')
         
         # Upcoming events with error handling
         try:
-            from datetime import datetime, timedelta
+            from datetime import timedelta
+            from sqlalchemy.orm import joinedload
             today = datetime.utcnow().date()
-            next_30_days = today + timedelta(days=30)
             next_7_days = today + timedelta(days=7)
-            upcoming_events_count = Event.query.filter(
-                Event.event_date >= today,
-                Event.event_date <= next_30_days
-            ).count()
-            
-            upcoming_events = Event.query.filter(
+            upcoming_events = Event.query.options(joinedload(Event.client)).filter(
                 Event.event_date >= today,
                 Event.event_date <= next_7_days
             ).order_by(Event.event_date.asc()).limit(5).all()
@@ -431,13 +309,7 @@ def dashboard():
         
         # Tasks with error handling
         try:
-            from datetime import date
-            today = date.today()
-            tasks_today = Task.query.filter(
-                Task.due_date <= today,
-                Task.status != TaskStatus.Complete
-            ).count()
-            
+            from sas_management.models import Task, TaskStatus
             recent_tasks = Task.query.filter(
                 Task.assigned_user_id == current_user.id,
                 Task.status != TaskStatus.Complete
@@ -445,308 +317,27 @@ def dashboard():
         except Exception as e:
             current_app.logger.error(f"Error loading tasks: {e}")
         
-        # Top clients with error handling
-        try:
-            from sqlalchemy import func
-            top_clients_query = (
-                db.session.query(Client, func.count(Event.id).label('event_count'))
-                .join(Event, Client.id == Event.client_id)
-                .filter(Client.is_archived == False)
-                .group_by(Client.id)
-                .order_by(func.count(Event.id).desc())
-                .limit(5)
-                .all()
-            )
-            top_clients = [{"client": client, "event_count": count} for client, count in top_clients_query]
-        except Exception as e:
-            current_app.logger.error(f"Error loading top clients: {e}")
-        
-        # Announcements with error handling
+        # Announcements with error handling (latest few; "View All" links to the full list)
         try:
             from sas_management.models import Announcement
             from sqlalchemy.orm import joinedload
-            announcements = Announcement.query.options(joinedload(Announcement.creator)).order_by(Announcement.created_at.desc()).all()
+            announcements = (
+                Announcement.query.options(joinedload(Announcement.creator))
+                .order_by(Announcement.created_at.desc())
+                .limit(current_app.config.get("DASHBOARD_ANNOUNCEMENTS_LIMIT", 5))
+                .all()
+            )
         except Exception as e:
             current_app.logger.error(f"Error loading announcements: {e}")
             announcements = []
         
-        # Build modules list (filtered by permissions)
-        modules = []
-        
-        # Helper function to check if user has any of the given permissions
-        def has_any_permission(*permission_codes):
-            # Check if user is authenticated first
-            if not current_user.is_authenticated:
-                return False
-            # Admin users see everything - no need to check specific permissions
-            if is_admin_user:
-                return True
-            for code in permission_codes:
-                if current_user.has_permission(code):
-                    return True
-            return False
-        
-        # DEBUG: Log user info
-        import sys
-        print(f"DEBUG: user={current_user.email}, is_admin={is_admin_user}, role_id={current_user.role_id}", file=sys.stderr)
-        print(f"DEBUG: has_permission('accounting.view_accounting')={current_user.has_permission('accounting.view_accounting')}", file=sys.stderr)
-        
-        # Dashboard - always available
-        modules.append({"name": "Dashboard", "url": url_for("core.dashboard")})
-        
-        # ALL MODULES - Show everything for admin users
-        if is_admin_user:
-            # Clients CRM
-            modules.append({"name": "Clients CRM", "url": url_for("core.clients_list")})
-            
-            # Events
-            events_children = [
-                {"name": "All Events", "url": url_for("events.events_list")},
-                {"name": "Create Event", "url": url_for("events.event_create")},
-                {"name": "Venues", "url": url_for("events.venues_list")},
-                {"name": "Menu Packages", "url": url_for("events.menu_packages_list")},
-                {"name": "Vendors", "url": url_for("events.vendors_manage")},
-                {"name": "Floor Planner", "url": url_for("floorplanner.dashboard")},
-                {"name": "Tasks", "url": url_for("tasks.task_list")},
-            ]
-            modules.append({"name": "Events", "url": url_for("events.events_list"), "children": events_children})
-            
-            # Hire Department
-            hire_children = [
-                {"name": "Hire Overview", "url": url_for("hire.index")},
-                {"name": "Hire Inventory", "url": url_for("hire.inventory_list")},
-                {"name": "Hire Orders", "url": url_for("hire.orders_list")},
-                {"name": "Equipment Maintenance", "url": url_for("hire.maintenance_list")},
-            ]
-            modules.append({"name": "Hire Department", "url": url_for("hire.index"), "children": hire_children})
-            
-            # Event Service Department
-            event_service_children = [
-                {"name": "Services Overview", "url": url_for("service.dashboard")},
-                {"name": "All Events", "url": url_for("service.events")},
-                {"name": "Timeline", "url": url_for("event_service.timeline_index")},
-                {"name": "Documents", "url": url_for("event_service.documents_index")},
-                {"name": "Checklists", "url": url_for("event_service.service_checklists")},
-                {"name": "Messages", "url": url_for("event_service.service_messages")},
-                {"name": "Reports", "url": url_for("event_service.service_reports")},
-                {"name": "Analytics", "url": url_for("event_service.service_analytics")},
-            ]
-            modules.append({"name": "🧾 Event Service", "url": url_for("service.dashboard"), "children": event_service_children})
-            
-            # Production Department
-            production_children = [
-                {"name": "Production Overview", "url": url_for("production.index")},
-                {"name": "Menu Builder", "url": url_for("menu_builder.dashboard")},
-                {"name": "Catering Menu", "url": url_for("catering.menu_list")},
-                {"name": "Ingredient Inventory", "url": url_for("inventory.ingredients_list")},
-                {"name": "Kitchen Checklist", "url": url_for("production.kitchen_checklist_list")},
-                {"name": "Delivery QC Checklist", "url": url_for("production.delivery_qc_list")},
-                {"name": "Food Safety Logs", "url": url_for("production.food_safety_list")},
-                {"name": "Hygiene Reports", "url": url_for("production.hygiene_reports_list")},
-            ]
-            modules.append({"name": "Production Department", "url": url_for("production.index"), "children": production_children})
-            
-            # Accounting Department
-            accounting_children = [
-                {"name": "Accounting Overview", "url": url_for("accounting.dashboard")},
-                {"name": "Receipting System", "url": url_for("accounting.receipts_list")},
-                {"name": "Quotations", "url": url_for("quotes.list_quotes")},
-                {"name": "Invoices", "url": url_for("invoices.invoice_list")},
-                {"name": "Cashbook", "url": url_for("cashbook.index")},
-                {"name": "Financial Reports", "url": url_for("reports.reports_index")},
-                {"name": "Payroll Management", "url": url_for("payroll.payroll_list")},
-            ]
-            modules.append({"name": "Accounting Department", "url": url_for("accounting.dashboard"), "children": accounting_children})
-            
-            # Bakery Department
-            bakery_children = [
-                {"name": "Bakery Overview", "url": url_for("bakery.dashboard")},
-                {"name": "Bakery Menu", "url": url_for("bakery.items_list")},
-                {"name": "Bakery Orders", "url": url_for("bakery.orders_list")},
-                {"name": "Production Sheet", "url": url_for("bakery.production_sheet")},
-                {"name": "Reports", "url": url_for("bakery.reports")},
-            ]
-            modules.append({"name": "Bakery Department", "url": url_for("bakery.dashboard"), "children": bakery_children})
-            
-            # POS System
-            modules.append({"name": "POS System", "url": url_for("pos.index")})
-            
-            # HR Department
-            hr_children = [
-                {"name": "HR Overview", "url": url_for("hr.dashboard")},
-                {"name": "Employee Management", "url": url_for("hr.employee_list")},
-                {"name": "Roster Builder", "url": url_for("hr.roster_builder")},
-                {"name": "Leave Requests", "url": url_for("hr.leave_queue")},
-                {"name": "Attendance Review", "url": url_for("hr.attendance_review")},
-                {"name": "Payroll Export", "url": url_for("hr.payroll_export")},
-            ]
-            modules.append({"name": "HR Department", "url": url_for("hr.dashboard"), "children": hr_children})
-            
-            # CRM/Pipeline
-            modules.append({"name": "CRM Pipeline", "url": url_for("crm.pipeline")})
-            
-            # Dispatch
-            modules.append({"name": "Dispatch", "url": url_for("dispatch.dashboard")})
-            
-        else:
-            # Non-admin users - use permission-based filtering
-            # Clients CRM - check permission
-            if has_any_permission('view_clients', 'manage_clients', 'view_all'):
-                modules.append({"name": "Clients CRM", "url": url_for("core.clients_list")})
-            
-            # Events - check permission
-            if has_any_permission('view_events', 'manage_events', 'event_service.view_events', 'view_all'):
-                events_children = [
-                    {"name": "All Events", "url": url_for("events.events_list")},
-                    {"name": "Create Event", "url": url_for("events.event_create")},
-                    {"name": "Venues", "url": url_for("events.venues_list")},
-                    {"name": "Menu Packages", "url": url_for("events.menu_packages_list")},
-                    {"name": "Vendors", "url": url_for("events.vendors_manage")},
-                    {"name": "Floor Planner", "url": url_for("floorplanner.dashboard")},
-                    {"name": "Tasks", "url": url_for("tasks.task_list")},
-                ]
-                modules.append({"name": "Events", "url": url_for("events.events_list"), "children": events_children})
-            
-            # Hire Department - check permission
-            if has_any_permission('view_hire', 'manage_hire', 'view_all'):
-                hire_children = [
-                    {"name": "Hire Overview", "url": url_for("hire.index")},
-                    {"name": "Hire Inventory", "url": url_for("hire.inventory_list")},
-                    {"name": "Hire Orders", "url": url_for("hire.orders_list")},
-                    {"name": "Equipment Maintenance", "url": url_for("hire.maintenance_list")},
-                ]
-                modules.append({"name": "Hire Department", "url": url_for("hire.index"), "children": hire_children})
-            
-            # Event Service Department - check permission
-            if has_any_permission('event_service.view_events', 'event_service.create_events', 'event_service.manage_events', 'view_all'):
-                event_service_children = [
-                    {"name": "Services Overview", "url": url_for("service.dashboard")},
-                    {"name": "All Events", "url": url_for("service.events")},
-                    {"name": "Timeline", "url": url_for("event_service.timeline_index")},
-                    {"name": "Documents", "url": url_for("event_service.documents_index")},
-                    {"name": "Checklists", "url": url_for("event_service.service_checklists")},
-                    {"name": "Messages", "url": url_for("event_service.service_messages")},
-                    {"name": "Reports", "url": url_for("event_service.service_reports")},
-                    {"name": "Analytics", "url": url_for("event_service.service_analytics")},
-                ]
-                modules.append({"name": "🧾 Event Service", "url": url_for("service.dashboard"), "children": event_service_children})
-            
-            # Production Department - check permission
-            if has_any_permission('view_production', 'manage_production', 'view_all'):
-                modules.append({
-                    "name": "Production Department",
-                    "url": url_for("production.index"),
-                    "children": [
-                        {"name": "Production Overview", "url": url_for("production.index")},
-                        {"name": "Menu Builder", "url": url_for("menu_builder.dashboard")},
-                        {"name": "Catering Menu", "url": url_for("catering.menu_list")},
-                        {"name": "Ingredient Inventory", "url": url_for("inventory.ingredients_list")},
-                        {"name": "Kitchen Checklist", "url": url_for("production.kitchen_checklist_list")},
-                        {"name": "Delivery QC Checklist", "url": url_for("production.delivery_qc_list")},
-                        {"name": "Food Safety Logs", "url": url_for("production.food_safety_list")},
-                        {"name": "Hygiene Reports", "url": url_for("production.hygiene_reports_list")},
-                        {"name": "Production Sheet", "url": url_for("bakery.production_sheet")},
-                        {"name": "Reports", "url": url_for("bakery.reports")},
-                    ]
-                })
-            
-            # POS System - check permission
-            if has_any_permission('view_pos', 'manage_pos', 'view_all'):
-                modules.append({"name": "POS System", "url": url_for("pos.index")})
-            
-            # HR Department - check permission
-            if has_any_permission('view_hr', 'manage_hr', 'view_all'):
-                modules.append({
-                    "name": "HR Department",
-                    "url": url_for("hr.dashboard"),
-                    "children": [
-                        {"name": "HR Overview", "url": url_for("hr.dashboard")},
-                        {"name": "Employee Management", "url": url_for("hr.employee_list")},
-                        {"name": "Roster Builder", "url": url_for("hr.roster_builder")},
-                        {"name": "Leave Requests", "url": url_for("hr.leave_queue")},
-                        {"name": "Attendance Review", "url": url_for("hr.attendance_review")},
-                        {"name": "Payroll Export", "url": url_for("hr.payroll_export")},
-                    ]
-                })
-            
-            # Accounting Department - check permission
-            if has_any_permission('accounting.view_accounting', 'accounting.create_invoice', 'accounting.approve_payments', 'view_all'):
-                accounting_children = [
-                    {"name": "Accounting Overview", "url": url_for("accounting.dashboard")},
-                    {"name": "Receipting System", "url": url_for("accounting.receipts_list")},
-                    {"name": "Quotations", "url": url_for("quotes.list_quotes")},
-                    {"name": "Invoices", "url": url_for("invoices.invoice_list")},
-                    {"name": "Cashbook", "url": url_for("cashbook.index")},
-                    {"name": "Financial Reports", "url": url_for("reports.reports_index")},
-                    {"name": "Payroll Management", "url": url_for("payroll.payroll_list")},
-                ]
-                modules.append({"name": "Accounting Department", "url": url_for("accounting.dashboard"), "children": accounting_children})
-        
-        # Employee University - show only for admins
-        show_employee_university = is_admin_user
-        if show_employee_university:
-            modules.append({
-                "name": "🎓 Employee University",
-                "url": url_for("university.dashboard"),
-            })
-        
-        # Add admin-only modules - check permission
-        if has_any_permission('view_admin', 'manage_users', 'assign_roles', 'view_all') or (current_user.is_authenticated and current_user.is_admin):
-            admin_module = {
-            "name": "Admin",
-            "url": url_for("admin.roles_list"),
-            "children": [
-            {"name": "Admin Dashboard", "url": url_for("admin.dashboard")},
-            {"name": "Roles & Permissions", "url": url_for("admin.roles_list")},
-            {"name": "🤖 AI Permissions", "url": url_for("admin.ai_permissions")},
-            ]
-            }
-            modules.append(admin_module)
-        
-        # Add SAS AI Module (always visible if enabled, defaults to True)
-        # Check both AI_MODULE_ENABLED and SAS_AI_ENABLED config flags
-        ai_module_enabled = current_app.config.get("AI_MODULE_ENABLED", True)
-        sas_ai_enabled = current_app.config.get("SAS_AI_ENABLED", True)
-        
-        if ai_module_enabled or sas_ai_enabled:
-            try:
-                from sas_management.ai.state import is_enabled
-                
-                sas_ai_children = [
-                {"name": "AI Dashboard", "url": url_for("ai.dashboard")},
-                ]
-                
-                # Always add AI Chat - it's the main entry point
-                sas_ai_children.append({"name": "AI Chat", "url": url_for("ai.chat")})
-                
-                # Note: feature_list route may not exist, using chat as fallback
-                try:
-                    sas_ai_children.append({"name": "All Features", "url": url_for("ai.chat")})
-                except:
-                    pass
-                
-                sas_ai_module = {
-                "name": "🤖 SAS AI",
-                "url": url_for("ai.chat"),  # Main entry point is chat
-                "children": sas_ai_children,
-                }
-                modules.append(sas_ai_module)
-            except Exception as e:
-                # Log error but don't break navigation
-                current_app.logger.warning(f"SAS AI module not available: {e}")
-                # Still add a basic SAS AI link if blueprint exists
-                try:
-                    modules.append({
-                    "name": "🤖 SAS AI",
-                    "url": url_for("ai.chat"),
-                    })
-                except Exception:
-                    pass
-        
-        # Add Payroll to Accounting Department children if not already there
-        accounting_dept = next((m for m in modules if m.get("name") == "Accounting Department"), None)
-        if accounting_dept and "children" in accounting_dept:
-            accounting_dept["children"].append({"name": "Payroll Management", "url": url_for("payroll.payroll_list")})
+        # Module tiles come pre-built per role-set from the navigation registry
+        try:
+            from sas_management.navigation.registry import navigation_registry
+            modules = navigation_registry.menu_for(current_user, "dashboard")
+        except Exception as e:
+            current_app.logger.error(f"Error building modules: {e}")
+            modules = []
         
         # Get today's date for template
         from datetime import date
@@ -754,28 +345,26 @@ def dashboard():
         
         return render_template(
             "dashboard.html",
-            clients=clients,
-            events=events,
             modules=modules,
             today=today,
             show_full_dashboard=show_full_dashboard,
             summary={
-                "total_confirmed_quote": total_confirmed_quote,
-                "active_clients": active_clients,
-                "draft_events": draft_events,
-                "total_events": len(events),
-                "paid_invoices": paid_invoices,
-                "pending_invoices": pending_invoices,
-                "overdue_invoices": overdue_invoices,
-                "pipeline_value": pipeline_value,
-                "pending_invoice_amount": pending_invoice_amount,
-                "available_staff": available_staff,
-                "low_stock_alerts": low_stock_alerts,
-                "upcoming_events_count": upcoming_events_count,
-                "tasks_today": tasks_today,
+                "total_confirmed_quote": metrics.get("total_confirmed_quote", 0),
+                "active_clients": metrics.get("active_clients", 0) if show_clients else 0,
+                "draft_events": metrics.get("draft_events", 0),
+                "total_events": metrics.get("total_events", 0) if show_events else 0,
+                "paid_invoices": metrics.get("paid_invoices", 0),
+                "pending_invoices": metrics.get("pending_invoices", 0),
+                "overdue_invoices": metrics.get("overdue_invoices", 0),
+                "pipeline_value": metrics.get("pipeline_value", 0),
+                "pending_invoice_amount": metrics.get("pending_invoice_amount", 0),
+                "available_staff": metrics.get("available_staff", 0),
+                "low_stock_alerts": metrics.get("low_stock_alerts", 0),
+                "upcoming_events_count": metrics.get("upcoming_events_count", 0),
+                "tasks_today": metrics.get("tasks_today", 0),
             },
-            pipeline_stats=pipeline_stats,
-            top_clients=top_clients,
+            pipeline_stats=metrics.get("pipeline_stats", {}),
+            top_clients=metrics.get("top_clients", []),
             upcoming_events=upcoming_events,
             recent_tasks=recent_tasks,
             announcements=announcements,
@@ -787,8 +376,6 @@ def dashboard():
         # Return a minimal dashboard with error message
         return render_template(
             "dashboard.html",
-            clients=[],
-            events=[],
             modules=[],
             today=date.today() if 'date' in dir() else None,
             show_full_dashboard=show_full_dashboard,
@@ -826,7 +413,8 @@ def api_dashboard_upcoming_events():
     today = datetime.utcnow().date()
     next_30_days = today + timedelta(days=30)
     
-    events = Event.query.filter(
+    from sqlalchemy.orm import joinedload
+    events = Event.query.options(joinedload(Event.client)).filter(
         Event.event_date >= today,
         Event.event_date <= next_30_days
     ).order_by(Event.event_date.asc()).all()
@@ -852,28 +440,13 @@ def api_dashboard_upcoming_events():
 @login_required
 def api_dashboard_pipeline():
     """API endpoint for pipeline statistics."""
-    allowed_roles = {UserRole.Admin, UserRole.SalesManager}
-    stages = ["New Lead", "Qualified", "Proposal Sent", "Negotiation", "Awaiting Payment", "Confirmed", "Completed", "Lost"]
-    pipeline_stats = {}
-    pipeline_values = {}
-    
-    for stage in stages:
-        count = IncomingLead.query.filter_by(pipeline_stage=stage).count()
-        pipeline_stats[stage] = count
-        
-        # Calculate total value for leads in this stage
-        value = (
-            db.session.query(db.func.coalesce(db.func.sum(Event.quoted_value), 0))
-            .join(IncomingLead, IncomingLead.converted_event_id == Event.id)
-            .filter(IncomingLead.pipeline_stage == stage)
-            .scalar()
-        )
-        pipeline_values[stage] = float(value)
+    from sas_management.services.dashboard_metrics_service import PIPELINE_STAGES, dashboard_metrics
+    metrics = dashboard_metrics.snapshot()
     
     return jsonify({
-        "stages": stages,
-        "counts": pipeline_stats,
-        "values": pipeline_values
+        "stages": PIPELINE_STAGES,
+        "counts": metrics["pipeline_stats"],
+        "values": metrics["pipeline_values"]
     })
 
 
@@ -881,15 +454,14 @@ def api_dashboard_pipeline():
 @login_required
 def api_dashboard_pending_invoices():
     """API endpoint for pending invoices data."""
-    allowed_roles = {UserRole.Admin, UserRole.SalesManager}
-    pending = Invoice.query.filter(Invoice.status.in_([InvoiceStatus.Issued, InvoiceStatus.Draft])).all()
-    overdue = Invoice.query.filter_by(status=InvoiceStatus.Overdue).all()
+    from sas_management.services.dashboard_metrics_service import dashboard_metrics
+    metrics = dashboard_metrics.snapshot()
     
     return jsonify({
-        "pending_count": len(pending),
-        "pending_amount": float(sum(float(i.total_amount_ugx or 0) for i in pending)),
-        "overdue_count": len(overdue),
-        "overdue_amount": float(sum(float(i.total_amount_ugx or 0) for i in overdue))
+        "pending_count": metrics["pending_invoices"],
+        "pending_amount": metrics["pending_invoice_amount"],
+        "overdue_count": metrics["overdue_invoices"],
+        "overdue_amount": metrics["overdue_invoice_amount"]
     })
 
 
@@ -897,22 +469,13 @@ def api_dashboard_pending_invoices():
 @login_required
 def api_dashboard_staff_availability():
     """API endpoint for staff availability data."""
-    allowed_roles = {UserRole.Admin, UserRole.SalesManager}
     # All access allowed - no restrictions
-    
-    # Count users by role
-    from sqlalchemy import func
-    role_counts = (
-        db.session.query(User.role, func.count(User.id).label('count'))
-        .group_by(User.role)
-        .all()
-    )
-    
-    total_staff = User.query.count()
+    from sas_management.services.dashboard_metrics_service import dashboard_metrics
+    metrics = dashboard_metrics.snapshot()
     
     return jsonify({
-        "total_staff": total_staff,
-        "by_role": {role.value: count for role, count in role_counts}
+        "total_staff": metrics["available_staff"],
+        "by_role": metrics["staff_by_role"]
     })
 
 
@@ -943,62 +506,14 @@ def api_dashboard_low_stock():
 @login_required
 def api_dashboard_revenue_stats():
     """API endpoint for revenue statistics (last 6 months)."""
-    allowed_roles = {UserRole.Admin, UserRole.SalesManager}
-    from datetime import timedelta
-    from calendar import month_abbr
-    today = datetime.utcnow().date()
-    
-    # Get revenue data for last 6 months
-    monthly_revenue = []
-    monthly_expenses = []
-    monthly_labels = []
-    
-    for i in range(5, -1, -1):
-        month_start = (today - timedelta(days=i*30)).replace(day=1)
-        month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
-        
-        month_label = f"{month_abbr[month_start.month]} {month_start.year}"
-        monthly_labels.append(month_label)
-        
-        # Calculate income for this month
-        income = (
-            db.session.query(db.func.coalesce(db.func.sum(Transaction.amount), 0))
-            .filter(Transaction.type == TransactionType.Income)
-            .filter(Transaction.date >= month_start)
-            .filter(Transaction.date <= month_end)
-            .scalar()
-        )
-        
-        # Calculate expenses for this month
-        expenses = (
-            db.session.query(db.func.coalesce(db.func.sum(Transaction.amount), 0))
-            .filter(Transaction.type == TransactionType.Expense)
-            .filter(Transaction.date >= month_start)
-            .filter(Transaction.date <= month_end)
-            .scalar()
-        )
-        
-        monthly_revenue.append(float(income))
-        monthly_expenses.append(float(expenses))
-    
-    # Bookings over time (events by month)
-    monthly_bookings = []
-    for i in range(5, -1, -1):
-        month_start = (today - timedelta(days=i*30)).replace(day=1)
-        month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
-        
-        bookings = Event.query.filter(
-            Event.event_date >= month_start,
-            Event.event_date <= month_end
-        ).count()
-        
-        monthly_bookings.append(bookings)
+    from sas_management.services.dashboard_metrics_service import dashboard_metrics
+    monthly = dashboard_metrics.snapshot()["monthly"]
     
     return jsonify({
-        "labels": monthly_labels,
-        "revenue": monthly_revenue,
-        "expenses": monthly_expenses,
-        "bookings": monthly_bookings
+        "labels": monthly["labels"],
+        "revenue": monthly["revenue"],
+        "expenses": monthly["expenses"],
+        "bookings": monthly["bookings"]
     })
 
 
@@ -1537,6 +1052,14 @@ def pos_product_manage_proxy(product_id):
     from blueprints.pos import api_product_manage
     return api_product_manage(product_id)
 
+@core_bp.route("/api/pos/sync", methods=["POST"])
+@login_required
+@pos_role_required(UserRole.Admin, UserRole.SalesManager)
+def pos_sync_proxy():
+    """Proxy route for /api/pos/sync -> forwards to POS blueprint"""
+    from blueprints.pos import api_sync
+    return api_sync()
+
 @core_bp.route("/api/pos/devices", methods=["GET", "POST"])
 @login_required
 def pos_devices_proxy():
@@ -1,6 +1,7 @@
 """SAS AI Engine - Main orchestrator for AI responses."""
 from typing import Dict, List, Optional
 from flask import current_app
+from sas_management.services.ai_metrics import MetricRestricted, ai_metrics
 from .context import get_system_prompt
 from .reasoning import classify_question, determine_response_strategy, extract_entities
 from .retriever import retrieve_answer, search_system_context
@@ -223,79 +224,48 @@ def _handle_system_query(message: str, entities: Dict, conversation_history: Lis
 
 def _query_events(time_periods: List[str]) -> str:
     """Query events data."""
-    try:
-        from sas_management.service.models import ServiceEvent
-        from datetime import date
-        
-        today = date.today()
-        month_start = today.replace(day=1)
-        
-        events_this_month = ServiceEvent.query.filter(
-            ServiceEvent.event_date >= month_start,
-            ServiceEvent.event_date <= today
-        ).count()
-        
-        upcoming = ServiceEvent.query.filter(ServiceEvent.event_date > today).count()
-        total = ServiceEvent.query.count()
-        
-        return f"""**Events Overview:**
-• Total events: {total}
-• Events this month: {events_this_month}
-• Upcoming events: {upcoming}
+    overview = ai_metrics.get("service_events.overview")
+    if overview is None:
+        return "I can help you query events data. Try asking: 'How many events this month?' or 'Show upcoming events'"
+
+    return f"""**Events Overview:**
+• Total events: {overview['total']}
+• Events this month: {overview['this_month']}
+• Upcoming events: {overview['upcoming']}
 
 Would you like details on a specific event or help planning a new one?"""
-    except Exception:
-        return "I can help you query events data. Try asking: 'How many events this month?' or 'Show upcoming events'"
 
 
 def _query_revenue(time_periods: List[str]) -> str:
-    """Query revenue data."""
-    try:
-        # Safe import - use Quotation instead of Quote
-        try:
-            from sas_management.models import Quotation
-            Quote = Quotation  # Alias for backward compatibility
-        except ImportError:
-            Quote = None
-        
-        if Quote is None:
-            return "I can help you query revenue data. The revenue module may not be available right now."
-        
-        from datetime import datetime
-        
-        today = datetime.utcnow()
-        month_start = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        
-        quotes = Quote.query.filter(
-            Quote.status == "Accepted",
-            Quote.created_at >= month_start
-        ).all()
-        
-        if not quotes:
-            return "No accepted quotes found for this month. Would you like to check a different time period?"
-        
-        total = sum(float(quote.total_amount or 0) for quote in quotes)
-        
-        return f"""**Revenue Overview (This Month):**
-• Total revenue: {total:,.0f} UGX
-• From {len(quotes)} accepted quotes
+    """Query revenue data (invoices issued this month)."""
+    from flask_login import current_user
 
-Would you like profit analysis or details on specific quotes?"""
-    except Exception:
+    try:
+        revenue = ai_metrics.get("revenue.month", current_user)
+    except MetricRestricted:
+        return "Revenue figures are restricted to administrators."
+    if revenue is None:
         return "I can help you analyze revenue. Try asking about monthly revenue or profit margins."
+    if not revenue["invoices_count"]:
+        return "No invoices found for this month. Would you like to check a different time period?"
+
+    return f"""**Revenue Overview (This Month):**
+• Total invoiced: {revenue['total_amount']:,.0f} UGX
+• Paid: {revenue['paid_amount']:,.0f} UGX
+• From {revenue['invoices_count']} invoices
+
+Would you like profit analysis or details on specific invoices?"""
 
 
 def _query_staff() -> str:
     """Query staff data."""
-    try:
-        from sas_management.models import User
-        staff_count = User.query.filter(User.role != None).count()
-        return f"""**Staff Overview:**
+    staff_count = ai_metrics.get("staff.total")
+    if staff_count is None:
+        return "I can help you with staff information. Try asking about staff count or scheduling."
+    return f"""**Staff Overview:**
 • Total staff members: {staff_count}
 
 I can help you with staff scheduling, assignments, or planning for events."""
-    except Exception:
-        return "I can help you with staff information. Try asking about staff count or scheduling."
 
 
 def _query_inventory() -> str:
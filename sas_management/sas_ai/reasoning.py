@@ -1,6 +1,8 @@
 """SAS AI Reasoning - Analyze user intent and decide response strategy."""
 from typing import Dict, List, Tuple
 
+from sas_management.ai import intent_matcher
+
 
 QUESTION_TYPES = {
     "system": "system",
@@ -12,6 +14,42 @@ QUESTION_TYPES = {
 }
 
 
+intent_matcher.register("reasoning", {
+    "greeting": ["hello", "hi", "hey", "greetings", "good morning", "good afternoon"],
+    "help": ["help", "what can you", "how do", "what is", "explain", "tell me about"],
+    "help_system": ["sas", "system", "event", "revenue", "staff", "inventory"],
+    "error": ["error", "bug", "issue", "problem", "broken", "not working", "fail", "crash"],
+    "system": [
+        "event", "events", "how many", "count", "list", "show me", "display",
+        "revenue", "profit", "sales", "income", "money earned", "financial",
+        "staff", "employee", "workers", "team", "personnel",
+        "inventory", "stock", "supplies", "items",
+        "client", "customer", "customers",
+        "this month", "last month", "quarter", "today", "week", "year",
+        "report", "data", "statistics", "metrics"
+    ],
+    "web": [
+        "what is the", "who is", "when did", "where is",
+        "latest", "news", "today's", "current", "recent",
+        "definition", "meaning of", "explain what", "what does"
+    ],
+    "own_system": ["sas", "our", "my", "this system"],
+    "question_word": ["what", "how", "why", "when", "where", "who"],
+})
+intent_matcher.register_terms("entities.time_periods", [
+    "today", "yesterday", "this week", "last week", "this month",
+    "last month", "this quarter", "last quarter", "this year", "last year"
+])
+intent_matcher.register_terms("entities.topics", [
+    "event", "events", "revenue", "profit", "staff", "inventory",
+    "client", "customers", "compliance", "safety"
+])
+intent_matcher.register_terms("entities.actions", [
+    "count", "list", "show", "display", "calculate", "analyze",
+    "explain", "help", "find"
+])
+
+
 def classify_question(message: str, conversation_history: List[Dict] = None) -> Tuple[str, float]:
     """
     Classify user question to determine response strategy.
@@ -28,52 +66,37 @@ def classify_question(message: str, conversation_history: List[Dict] = None) ->
     if not message_lower:
         return "greeting", 0.5
     
+    found = intent_matcher.match(message_lower)
+    
     # Greetings
-    if any(keyword in message_lower for keyword in ["hello", "hi", "hey", "greetings", "good morning", "good afternoon"]):
+    if found.has("reasoning", "greeting"):
         return "greeting", 0.95
     
     # Help requests
-    if any(keyword in message_lower for keyword in ["help", "what can you", "how do", "what is", "explain", "tell me about"]):
-        if any(keyword in message_lower for keyword in ["sas", "system", "event", "revenue", "staff", "inventory"]):
+    if found.has("reasoning", "help"):
+        if found.has("reasoning", "help_system"):
             return "system", 0.8
         return "help", 0.9
     
     # Error-related queries
-    error_keywords = ["error", "bug", "issue", "problem", "broken", "not working", "fail", "crash"]
-    if any(keyword in message_lower for keyword in error_keywords):
+    if found.has("reasoning", "error"):
         return "error", 0.85
     
     # System queries - high confidence indicators
-    system_keywords = [
-        "event", "events", "how many", "count", "list", "show me", "display",
-        "revenue", "profit", "sales", "income", "money earned", "financial",
-        "staff", "employee", "workers", "team", "personnel",
-        "inventory", "stock", "supplies", "items",
-        "client", "customer", "customers",
-        "this month", "last month", "quarter", "today", "week", "year",
-        "report", "data", "statistics", "metrics"
-    ]
-    
-    system_score = sum(1 for keyword in system_keywords if keyword in message_lower)
+    system_score = found.scores("reasoning").get("system", 0)
     if system_score >= 2:
         return "system", 0.9
     elif system_score >= 1:
         return "system", 0.7
     
     # Web-required queries (current events, specific facts, news)
-    web_keywords = [
-        "what is the", "who is", "when did", "where is",
-        "latest", "news", "today's", "current", "recent",
-        "definition", "meaning of", "explain what", "what does"
-    ]
-    
-    if any(keyword in message_lower for keyword in web_keywords):
+    if found.has("reasoning", "web"):
         # But not if it's about SAS system
-        if not any(keyword in message_lower for keyword in ["sas", "our", "my", "this system"]):
+        if not found.has("reasoning", "own_system"):
             return "web_required", 0.8
     
     # General questions (default)
-    if "?" in message or any(keyword in message_lower for keyword in ["what", "how", "why", "when", "where", "who"]):
+    if "?" in message or found.has("reasoning", "question_word"):
         return "general", 0.6
     
     # Default to general
@@ -132,35 +155,13 @@ def extract_entities(message: str) -> Dict[str, List[str]]:
         message: User's message
         
     Returns:
-        Dict with entity types and values
+        Dict with entity types and values (AI features mentioned are
+        listed under ``features``)
     """
-    message_lower = message.lower()
-    entities = {
-        "time_periods": [],
-        "topics": [],
-        "actions": []
+    found = intent_matcher.match(message)
+    return {
+        "time_periods": found.labels("entities.time_periods"),
+        "topics": found.labels("entities.topics"),
+        "actions": found.labels("entities.actions"),
+        "features": found.labels("features"),
     }
-    
-    # Time periods
-    time_periods = ["today", "yesterday", "this week", "last week", "this month", 
-                   "last month", "this quarter", "last quarter", "this year", "last year"]
-    for period in time_periods:
-        if period in message_lower:
-            entities["time_periods"].append(period)
-    
-    # Topics
-    topics = ["event", "events", "revenue", "profit", "staff", "inventory", 
-             "client", "customers", "compliance", "safety"]
-    for topic in topics:
-        if topic in message_lower:
-            entities["topics"].append(topic)
-    
-    # Actions
-    actions = ["count", "list", "show", "display", "calculate", "analyze", 
-              "explain", "help", "find"]
-    for action in actions:
-        if action in message_lower:
-            entities["actions"].append(action)
-    
-    return entities
-
@@ -1,7 +1,8 @@
 """Accounting service layer for business logic."""
 import json
+import logging
 import os
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
 from decimal import Decimal
 from flask import current_app, render_template, url_for
 from io import BytesIO
@@ -13,7 +14,7 @@ try:
     from reportlab.lib.units import inch
     from reportlab.lib import colors
     from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image, HRFlowable
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, HRFlowable
     from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_LEFT
     REPORTLAB_AVAILABLE = True
 except ImportError:
@@ -24,7 +25,6 @@ except ImportError:
 from sqlalchemy.exc import SQLAlchemyError
 
 from sas_management.models import (
-    Account,
     AccountingPayment,
     AccountingReceipt,
     BankStatement,
@@ -37,28 +37,32 @@ from sas_management.models import (
     User,
     db,
 )
+from sas_management.services import ledger_reports
+from sas_management.services.document_renderer import (
+    as_namespace,
+    copy_to,
+    load_assets,
+    logo_flowable,
+    register_document,
+    renderer as document_renderer,
+)
+
 from sqlalchemy import func
 
+logger = logging.getLogger(__name__)
+
 
 # ============================
-# TRIAL BALANCE FUNCTION
+# LEDGER REPORTS
 # ============================
 def compute_trial_balance(start_date=None, end_date=None):
     """
-    Computes a simplified trial balance.
-    Returns a list of dicts with account name, debit, credit.
+    Trial balance from the journal (services/ledger_reports.py).
+    Returns a list of dicts with account code, name, type, movements and
+    the net debit or credit balance; cumulative to end_date when no
+    start_date is given.
     """
-    accounts = Account.query.all()
-    result = []
-    for acc in accounts:
-        # Simplified: just return account structure
-        result.append({
-            "code": acc.code,
-            "name": acc.name,
-            "debit": 0.0,
-            "credit": 0.0,
-        })
-    return result
+    return ledger_reports.trial_balance(start_date, end_date or date.today())
 
 
 # ============================
@@ -247,10 +251,10 @@ def generate_receipt(payment_id=None, issued_by=None, amount=None, client_id=Non
         db.session.add(receipt)
         db.session.flush()
         
-        # Generate PDF if ReportLab is available
+        # Queue the PDF if ReportLab is available (pdf_path is set once it is rendered)
         if REPORTLAB_AVAILABLE:
             try:
-                _generate_pdf_receipt_for_payment(receipt.id)
+                prepare_receipt_pdf(receipt.id)
             except Exception as e:
                 try:
                     current_app.logger.warning(f"Could not generate PDF for receipt {receipt.id}: {e}")
@@ -275,61 +279,104 @@ def generate_receipt(payment_id=None, issued_by=None, amount=None, client_id=Non
         raise
 
 
-def _generate_pdf_receipt_for_payment(receipt_id):
-    """Generate PDF for a receipt (internal helper)."""
-    receipt = db.session.get(AccountingReceipt, receipt_id)
-    if not receipt:
-        raise ValueError(f"Receipt {receipt_id} not found")
-    
+def receipt_document(receipt):
+    """Plain render data for ``receipt`` (the document cache key is derived from it)."""
     payment = receipt.payment
-    invoice = payment.invoice if payment.invoice_id else None
+    invoice = payment.invoice if payment and payment.invoice_id else None
     
     client = None
     if receipt.issued_to:
         client = db.session.get(Client, receipt.issued_to)
-    elif invoice and invoice.event_id:
-        from sas_management.models import Event
-        event = db.session.get(Event, invoice.event_id)
-        if event and event.client_id:
-            client = db.session.get(Client, event.client_id)
+    elif invoice and invoice.event and invoice.event.client_id:
+        client = invoice.event.client
     
-    issuer = None
-    if receipt.issued_by:
-        issuer = db.session.get(User, receipt.issued_by)
-    
-    # Generate PDF path
-    receipts_folder = os.path.join(current_app.instance_path, "receipts")
-    os.makedirs(receipts_folder, exist_ok=True)
+    issuer = db.session.get(User, receipt.issued_by) if receipt.issued_by else None
     
+    return {
+        "receipt": {
+            "reference": receipt.reference,
+            "date": receipt.date,
+            "amount": Decimal(str(receipt.amount or 0)),
+            "notes": receipt.notes,
+        },
+        "payment": {
+            "method": payment.method,
+            "reference": payment.reference,
+        } if payment else None,
+        "invoice": {
+            "id": invoice.id,
+            "invoice_number": invoice.invoice_number,
+            "total_amount_ugx": Decimal(str(invoice.total_amount_ugx or 0)),
+        } if invoice else None,
+        "client": {
+            "name": client.name,
+            "contact_person": client.contact_person,
+            "company": client.company,
+            "email": client.email,
+            "phone": client.phone,
+            "address": client.address,
+        } if client else None,
+        "issuer": {
+            "email": issuer.email,
+            "name": getattr(issuer, "name", None),
+        } if issuer else None,
+    }
+
+
+def _load_receipt(receipt_id):
+    receipt = db.session.get(AccountingReceipt, receipt_id)
+    if not receipt:
+        raise ValueError(f"Receipt {receipt_id} not found")
     pdf_relative_path = f"receipts/receipt_{receipt.reference}.pdf"
-    full_path = os.path.join(current_app.instance_path, pdf_relative_path)
-    full_path = os.path.abspath(full_path)
-    
-    _generate_pdf_receipt(
-        pdf_path=full_path,
-        receipt=receipt,
-        payment=payment,
-        invoice=invoice,
-        client=client,
-        issuer=issuer
-    )
+    return receipt, pdf_relative_path, os.path.abspath(os.path.join(current_app.instance_path, pdf_relative_path))
+
+
+def _generate_pdf_receipt_for_payment(receipt_id):
+    """Generate PDF for a receipt (internal helper); waits for the render and returns the file's full path."""
+    receipt, pdf_relative_path, full_path = _load_receipt(receipt_id)
+    document_renderer.publish("receipt", receipt_document(receipt), full_path)
     
     # Update receipt with PDF path
     receipt.pdf_path = pdf_relative_path
     db.session.commit()
+    return full_path
 
 
-def _generate_pdf_receipt(pdf_path, receipt, payment=None, invoice=None, client=None, issuer=None):
+def prepare_receipt_pdf(receipt_id):
+    """
+    Non-blocking ``_generate_pdf_receipt_for_payment`` for request handlers.
+    
+    Returns the full path once the PDF is ready, or None while the document
+    pool is still rendering it (ask again shortly).
+    """
+    receipt, pdf_relative_path, full_path = _load_receipt(receipt_id)
+    path = document_renderer.prepare("receipt", receipt_document(receipt))
+    if path is None:
+        return None
+    copy_to(path, full_path)
+    receipt.pdf_path = pdf_relative_path
+    db.session.commit()
+    return full_path
+
+
+@register_document("receipt", version=1)
+def _render_receipt(pdf_path, data, assets):
+    doc = as_namespace(data)
+    _generate_pdf_receipt(pdf_path, doc.receipt, doc.payment, doc.invoice, doc.client, doc.issuer, assets=assets)
+
+
+def _generate_pdf_receipt(pdf_path, receipt, payment=None, invoice=None, client=None, issuer=None, assets=None):
     """
     Generate professional single-page PDF receipt with SAS Best Foods branding.
     
     Args:
         pdf_path: Full path where PDF should be saved
-        receipt: AccountingReceipt object
+        receipt: AccountingReceipt object (or render data namespace)
         payment: AccountingPayment object (optional)
         invoice: Invoice object (optional)
         client: Client object (optional)
         issuer: User object (optional)
+        assets: Preloaded document assets (logo); loaded on demand if omitted
     """
     if not REPORTLAB_AVAILABLE:
         raise ImportError("ReportLab is not installed. Install it with: pip install reportlab")
@@ -349,49 +396,10 @@ def _generate_pdf_receipt(pdf_path, receipt, payment=None, invoice=None, client=
         story = []
         styles = getSampleStyleSheet()
         
-        # Try to load logo - make it optional so receipt can still generate
-        logo_img = None
-        try:
-            logo_path = os.path.join(current_app.static_folder, 'images', 'sas_logo.png')
-            if os.path.exists(logo_path):
-                try:
-                    # Use PIL to properly load and validate the image first
-                    try:
-                        from PIL import Image as PILImage
-                        # Open and verify the image
-                        pil_img = PILImage.open(logo_path)
-                        # Convert to RGB if necessary (for PNG with transparency)
-                        if pil_img.mode in ('RGBA', 'LA', 'P'):
-                            # Create a white background
-                            rgb_img = PILImage.new('RGB', pil_img.size, (255, 255, 255))
-                            if pil_img.mode == 'P':
-                                pil_img = pil_img.convert('RGBA')
-                            rgb_img.paste(pil_img, mask=pil_img.split()[-1] if pil_img.mode == 'RGBA' else None)
-                            pil_img = rgb_img
-                        # Save to a temporary BytesIO for ReportLab
-                        from io import BytesIO
-                        img_buffer = BytesIO()
-                        pil_img.save(img_buffer, format='PNG')
-                        img_buffer.seek(0)
-                        # Now create ReportLab Image from the buffer
-                        logo_img = Image(img_buffer, width=1.2*inch, height=1.2*inch)
-                    except ImportError:
-                        # PIL not available, try direct loading
-                        logo_img = Image(logo_path, width=1.2*inch, height=1.2*inch)
-                except Exception as img_error:
-                    # If image loading fails, just continue without logo
-                    try:
-                        current_app.logger.warning(f"Could not load logo image: {img_error}")
-                    except:
-                        pass
-                    logo_img = None
-        except Exception as e:
-            # If any error occurs, just continue without logo
-            try:
-                current_app.logger.warning(f"Error checking for logo: {e}")
-            except:
-                pass
-            logo_img = None
+        # Logo is optional so the receipt can still generate without it
+        if assets is None:
+            assets = load_assets(current_app.static_folder)
+        logo_img = logo_flowable(assets, 1.2*inch, 1.2*inch)
         
         # ========== HEADER SECTION ==========
         # Create header table with logo and company info
@@ -657,10 +665,7 @@ def _generate_pdf_receipt(pdf_path, receipt, payment=None, invoice=None, client=
         doc.build(story)
         
     except Exception as e:
-        try:
-            current_app.logger.exception(f"Error generating PDF receipt: {e}")
-        except:
-            pass
+        logger.exception(f"Error generating PDF receipt: {e}")
         raise
 
 
@@ -674,11 +679,35 @@ def reconcile_bank_statement(*args, **kwargs):
     raise NotImplementedError("reconcile_bank_statement() not implemented yet.")
 
 
-def compute_profit_and_loss(*args, **kwargs):
-    """Compute profit and loss statement - placeholder implementation."""
-    return {"income": 0, "expenses": 0, "profit": 0}
+def compute_profit_and_loss(start_date=None, end_date=None, compare=None):
+    """
+    Profit and loss for a period (year to date by default).
 
+    ``compare`` adds a "comparative" statement for "previous", "last_year"
+    or an explicit (start, end) period.
+    """
+    end_date = end_date or date.today()
+    start_date = start_date or date(end_date.year, 1, 1)
+    report = ledger_reports.profit_and_loss(start_date, end_date)
+    period = ledger_reports.comparative_period(start_date, end_date, compare)
+    if period:
+        report["comparative"] = ledger_reports.profit_and_loss(*period)
+    return report
 
-def compute_balance_sheet(*args, **kwargs):
-    """Compute balance sheet - placeholder implementation."""
-    return {"assets": 0, "liabilities": 0, "equity": 0}
+
+def compute_balance_sheet(as_of=None, compare=None):
+    """
+    Balance sheet at ``as_of`` (today by default).
+
+    ``compare`` adds a "comparative" balance sheet at the end of the
+    "previous" month, the same day "last_year", or an explicit date.
+    """
+    as_of = as_of or date.today()
+    report = ledger_reports.balance_sheet(as_of)
+    if compare == "previous":
+        report["comparative"] = ledger_reports.balance_sheet(ledger_reports.month_start(as_of) - timedelta(days=1))
+    elif compare == "last_year":
+        report["comparative"] = ledger_reports.balance_sheet(ledger_reports.same_period_last_year(as_of, as_of)[0])
+    elif compare:
+        report["comparative"] = ledger_reports.balance_sheet(compare)
+    return report
@@ -0,0 +1,170 @@
+"""Asynchronous, batched ActivityLog writer.
+
+Requests only enqueue an activity record; a background thread drains the
+bounded queue and bulk-inserts rows with a single ``executemany`` every
+``ACTIVITY_LOG_FLUSH_INTERVAL_MS`` or ``ACTIVITY_LOG_BATCH_SIZE`` rows,
+whichever comes first.  When the queue is full new records are dropped and
+counted rather than slowing the request down.  Remaining rows are flushed on
+interpreter shutdown.
+"""
+import atexit
+import os
+import queue
+import random
+import threading
+import time
+from datetime import datetime
+
+from sas_management.models import ActivityLog, db
+
+
+class ActivityLogWriter:
+    """Bounded queue + writer thread for ActivityLog rows."""
+
+    def __init__(self, max_queue_size=10000, batch_size=200, flush_interval_ms=500,
+                 exclude_endpoints=(), sample_rates=None):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.exclude_endpoints = set(exclude_endpoints)
+        self.sample_rates = dict(sample_rates or {})
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._engine = None
+        self._logger = None
+        self._thread = None
+        self._pid = None
+        self._stop = threading.Event()
+        self._start_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self.counters = {
+            "enqueued": 0,
+            "written": 0,
+            "dropped": 0,
+            "excluded": 0,
+            "sampled_out": 0,
+            "failed": 0,
+        }
+
+    def init_app(self, app):
+        """Bind to the app's engine and read tuning from config."""
+        cfg = app.config
+        self.batch_size = cfg.get("ACTIVITY_LOG_BATCH_SIZE", self.batch_size)
+        self.flush_interval = cfg.get("ACTIVITY_LOG_FLUSH_INTERVAL_MS", self.flush_interval * 1000) / 1000.0
+        self.exclude_endpoints = set(cfg.get("ACTIVITY_LOG_EXCLUDE_ENDPOINTS", self.exclude_endpoints))
+        self.sample_rates = dict(cfg.get("ACTIVITY_LOG_SAMPLE_RATES", self.sample_rates))
+        max_queue_size = cfg.get("ACTIVITY_LOG_QUEUE_SIZE", self._queue.maxsize)
+        if max_queue_size != self._queue.maxsize:
+            self._queue = queue.Queue(maxsize=max_queue_size)
+        with app.app_context():
+            self._engine = db.engine
+        self._logger = app.logger
+        atexit.register(self.stop)
+
+    # ------------------------------------------------------------------
+    # Producer side (request thread)
+    # ------------------------------------------------------------------
+    def should_log(self, endpoint):
+        """Apply exclusion and sampling rules to an endpoint."""
+        if endpoint is None or endpoint in self.exclude_endpoints or endpoint.endswith(".static"):
+            self.counters["excluded"] += 1
+            return False
+        rate = self.sample_rates.get(endpoint)
+        if rate is not None and random.random() >= rate:
+            self.counters["sampled_out"] += 1
+            return False
+        return True
+
+    def record(self, user_id, action, ip_address=None, url=None):
+        """Queue one activity row. Never blocks and never touches the database."""
+        if not self.should_log(action):
+            return False
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait({
+                "user_id": user_id,
+                "action": action,
+                "ip_address": ip_address,
+                "url": (url or "")[:255],
+                "timestamp": datetime.utcnow(),
+            })
+        except queue.Full:
+            self.counters["dropped"] += 1
+            return False
+        self.counters["enqueued"] += 1
+        return True
+
+    # ------------------------------------------------------------------
+    # Consumer side (writer thread)
+    # ------------------------------------------------------------------
+    def _ensure_thread(self):
+        # Started lazily and re-started after a fork (gunicorn pre-fork workers)
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="activity-log-writer", daemon=True)
+            self._thread.start()
+
+    def _drain(self, limit):
+        rows = []
+        while len(rows) < limit:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return rows
+
+    def _run(self):
+        while not self._stop.is_set():
+            deadline = time.monotonic() + self.flush_interval
+            rows = []
+            while len(rows) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    rows.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+                if self._stop.is_set():
+                    break
+            rows.extend(self._drain(self.batch_size - len(rows)))
+            if rows:
+                self._write(rows)
+
+    def _write(self, rows):
+        if self._engine is None:
+            self.counters["failed"] += len(rows)
+            return
+        with self._write_lock:
+            try:
+                with self._engine.begin() as conn:
+                    conn.execute(ActivityLog.__table__.insert(), rows)
+                self.counters["written"] += len(rows)
+            except Exception as e:
+                self.counters["failed"] += len(rows)
+                if self._logger is not None:
+                    self._logger.warning(f"Activity log batch write failed ({len(rows)} rows): {e}")
+
+    def flush(self):
+        """Synchronously write everything currently queued."""
+        while True:
+            rows = self._drain(self.batch_size)
+            if not rows:
+                break
+            self._write(rows)
+
+    def stop(self, timeout=5.0):
+        """Stop the writer thread and flush what is left."""
+        self._stop.set()
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            self._thread.join(timeout)
+        self.flush()
+
+    def stats(self):
+        return dict(self.counters, queued=self._queue.qsize(), capacity=self._queue.maxsize)
+
+
+activity_log_writer = ActivityLogWriter()
@@ -0,0 +1,442 @@
+"""
+Shared metrics provider for the SAS AI engines.
+
+Every chat engine (``ai.engine``, ``ai.sas_ai_engine``, ``ai.chat_engine``,
+``sas_ai.ai_engine``, ``ai.services.ai_chat``) answers the same questions -
+how many events, how much revenue this month - so the numbers live here as
+named metrics instead of ad-hoc COUNT/SUM queries in each engine:
+
+* ``@metric(name, *models)`` registers ``fn() -> plain data`` (numbers,
+  dicts, lists; never ORM instances) and the models it reads.
+* Values are cached for ``AI_METRICS_TTL`` seconds.  A flush that writes
+  any of a metric's models invalidates it immediately, and values computed
+  on a previous day are never served.
+* Concurrent requests for the same stale metric are coalesced: one caller
+  runs the query while the others wait for its result.
+* Metrics marked ``sensitive`` (revenue, payments) are only returned to
+  users allowed to see sensitive AI data (or the engine's own financial
+  role check); ``get`` raises ``MetricRestricted`` otherwise and ``many``
+  leaves them out.
+
+A metric whose query fails returns None (and is not cached), matching the
+engines' "no data available" fallbacks.  Each metric runs inside a
+SAVEPOINT, so a failed query is rolled back on its own and the caller's
+session (pending changes included) is left as it was.
+"""
+import logging
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import case, event, func
+
+from sas_management.models import (
+    AccountingPayment,
+    BakeryOrder,
+    Client,
+    Employee,
+    Event,
+    InventoryItem,
+    Invoice,
+    InvoiceStatus,
+    Order as HireOrder,
+    POSOrder,
+    ProductionOrder,
+    Task,
+    TaskStatus,
+    User,
+    Venue,
+    db,
+)
+from sas_management.service.models import ServiceEvent, ServiceStaffAssignment
+from sas_management.utils.permissions import can_access_sensitive_ai_data
+
+logger = logging.getLogger(__name__)
+
+LOW_STOCK_THRESHOLD = 10
+UPCOMING_DAYS = 30
+RECENT_DAYS = 30
+
+
+class MetricRestricted(PermissionError):
+    """The user's role may not see this metric."""
+
+
+class _Metric:
+    __slots__ = ("name", "fn", "models", "sensitive", "ttl")
+
+    def __init__(self, name, fn, models, sensitive, ttl):
+        self.name = name
+        self.fn = fn
+        self.models = models
+        self.sensitive = sensitive
+        self.ttl = ttl
+
+
+class _Flight:
+    """One in-progress computation that other callers can wait on."""
+    __slots__ = ("done", "value")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+
+
+_registry = {}
+
+
+def metric(name, *models, sensitive=False, ttl=None):
+    """Register ``fn()`` as metric ``name``, invalidated by writes to ``models``."""
+    def decorator(fn):
+        _registry[name] = _Metric(name, fn, tuple(models), sensitive, ttl)
+        return fn
+    return decorator
+
+
+class AIMetricsProvider:
+    """TTL + write-invalidated cache of named metrics with request coalescing."""
+
+    def __init__(self, ttl=60, wait_timeout=10.0):
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        self._lock = threading.Lock()
+        self._values = {}  # name -> (value, expires, day)
+        self._generations = {}
+        self._inflight = {}
+        self._installed = False
+        self.computes = 0
+        self.coalesced = 0
+
+    def init_app(self, app):
+        self.ttl = app.config.get("AI_METRICS_TTL", self.ttl)
+        if not self._installed:
+            event.listen(db.session, "after_flush", self._after_flush)
+            self._installed = True
+
+    def uninstall(self):
+        """Detach the invalidation listener added by ``init_app``."""
+        if self._installed:
+            event.remove(db.session, "after_flush", self._after_flush)
+            self._installed = False
+
+    def _after_flush(self, session, flush_context):
+        touched = {type(obj) for obj in session.new | session.dirty | session.deleted}
+        if not touched:
+            return
+        stale = [
+            m.name for m in _registry.values()
+            if any(issubclass(cls, m.models) for cls in touched)
+        ]
+        if stale:
+            self.invalidate(*stale)
+
+    def invalidate(self, *names):
+        """Drop cached values (all of them when no names are given)."""
+        with self._lock:
+            for name in names or list(_registry):
+                self._generations[name] = self._generations.get(name, 0) + 1
+                self._values.pop(name, None)
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    @staticmethod
+    def allowed(name, user, can_view_sensitive=None):
+        if not _registry[name].sensitive:
+            return True
+        if can_view_sensitive is None:
+            can_view_sensitive = can_access_sensitive_ai_data(user)
+        return bool(can_view_sensitive)
+
+    def get(self, name, user=None, can_view_sensitive=None):
+        """
+        Value of metric ``name`` for ``user``.
+
+        ``can_view_sensitive`` lets an engine with its own financial role
+        rules decide for sensitive metrics; by default only users allowed
+        sensitive AI data see them.  Raises KeyError for unknown metrics and
+        MetricRestricted when the user may not see the metric.
+        """
+        if name not in _registry:
+            raise KeyError(f"Unknown AI metric '{name}'")
+        if not self.allowed(name, user, can_view_sensitive):
+            raise MetricRestricted(name)
+        return self._load(name)
+
+    def many(self, names, user=None, can_view_sensitive=None):
+        """``{name: value}`` for the metrics ``user`` may see."""
+        return {
+            name: self._load(name)
+            for name in names
+            if name in _registry and self.allowed(name, user, can_view_sensitive)
+        }
+
+    def _load(self, name):
+        now = time.monotonic()
+        today = date.today()
+        with self._lock:
+            cached = self._values.get(name)
+            if cached is not None and cached[1] > now and cached[2] == today:
+                return cached[0]
+            flight = self._inflight.get(name)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[name] = _Flight()
+                generation = self._generations.get(name, 0)
+
+        if not leader:
+            if flight.done.wait(self.wait_timeout):
+                with self._lock:
+                    self.coalesced += 1
+                return flight.value
+            # The leader is stuck; don't make this request wait any longer
+            return self._compute(name)
+
+        try:
+            value = self._compute(name)
+            flight.value = value
+            with self._lock:
+                # A write during the query makes this value stale already
+                if value is not None and generation == self._generations.get(name, 0):
+                    ttl = _registry[name].ttl or self.ttl
+                    self._values[name] = (value, now + ttl, today)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(name, None)
+            flight.done.set()
+
+    def _compute(self, name):
+        with self._lock:
+            self.computes += 1
+        try:
+            with db.session.begin_nested():
+                return _registry[name].fn()
+        except Exception as e:
+            logger.warning("AI metric %s failed: %s", name, e)
+            return None
+
+
+ai_metrics = AIMetricsProvider()
+
+
+# ----------------------------------------------------------------------
+# Metrics
+# ----------------------------------------------------------------------
+def _count(model, *criteria):
+    query = db.session.query(func.count(model.id))
+    if criteria:
+        query = query.filter(*criteria)
+    return int(query.scalar() or 0)
+
+
+def _month_start(today=None):
+    return (today or date.today()).replace(day=1)
+
+
+@metric("events.total", Event)
+def _events_total():
+    return _count(Event)
+
+
+@metric("events.this_month", Event)
+def _events_this_month():
+    today = date.today()
+    return _count(Event, Event.event_date >= _month_start(today), Event.event_date <= today)
+
+
+@metric("events.upcoming", Event)
+def _events_upcoming():
+    """Events in the next UPCOMING_DAYS days: the count and the first ten."""
+    today = date.today()
+    window = (Event.event_date > today, Event.event_date <= today + timedelta(days=UPCOMING_DAYS))
+    rows = (
+        db.session.query(Event.id, Event.title, Event.event_date, Event.status)
+        .filter(*window)
+        .order_by(Event.event_date.asc(), Event.id.asc())
+        .limit(10)
+        .all()
+    )
+    return {
+        "count": _count(Event, *window),
+        "events": [
+            {"id": r.id, "title": r.title, "date": r.event_date.isoformat(), "status": r.status}
+            for r in rows
+        ],
+    }
+
+
+@metric("clients.total", Client)
+def _clients_total():
+    return _count(Client)
+
+
+@metric("users.total", User)
+def _users_total():
+    return _count(User)
+
+
+@metric("staff.total", User)
+def _staff_total():
+    """Users with a role (the engines' notion of staff members)."""
+    return _count(User, User.role != None)  # noqa: E711
+
+
+@metric("employees.total", Employee)
+def _employees_total():
+    return _count(Employee)
+
+
+@metric("venues.total", Venue)
+def _venues_total():
+    return _count(Venue)
+
+
+@metric("inventory.items", InventoryItem)
+def _inventory_items():
+    return _count(InventoryItem)
+
+
+@metric("inventory.low_stock", InventoryItem)
+def _inventory_low_stock():
+    """Items at or below LOW_STOCK_THRESHOLD: the count and the five lowest."""
+    low = InventoryItem.stock_count <= LOW_STOCK_THRESHOLD
+    rows = (
+        db.session.query(InventoryItem.id, InventoryItem.name, InventoryItem.stock_count)
+        .filter(low)
+        .order_by(InventoryItem.stock_count.asc(), InventoryItem.id.asc())
+        .limit(5)
+        .all()
+    )
+    return {
+        "count": _count(InventoryItem, low),
+        "items": [{"id": r.id, "name": r.name, "stock_count": int(r.stock_count)} for r in rows],
+    }
+
+
+@metric("tasks.total", Task)
+def _tasks_total():
+    return _count(Task)
+
+
+@metric("tasks.pending", Task)
+def _tasks_pending():
+    return _count(Task, Task.status == TaskStatus.Pending)
+
+
+@metric("production.active_orders", ProductionOrder)
+def _production_active_orders():
+    return _count(ProductionOrder, ProductionOrder.status != "Completed")
+
+
+@metric("hire_orders.total", HireOrder)
+def _hire_orders_total():
+    return _count(HireOrder)
+
+
+@metric("hire_orders.recent", HireOrder)
+def _hire_orders_recent():
+    return _count(HireOrder, HireOrder.created_at >= datetime.utcnow() - timedelta(days=RECENT_DAYS))
+
+
+@metric("bakery_orders.total", BakeryOrder)
+def _bakery_orders_total():
+    return _count(BakeryOrder)
+
+
+@metric("bakery_orders.recent", BakeryOrder)
+def _bakery_orders_recent():
+    return _count(BakeryOrder, BakeryOrder.created_at >= datetime.utcnow() - timedelta(days=RECENT_DAYS))
+
+
+@metric("pos_orders.total", POSOrder)
+def _pos_orders_total():
+    return _count(POSOrder)
+
+
+@metric("pos_orders.recent", POSOrder)
+def _pos_orders_recent():
+    return _count(POSOrder, POSOrder.created_at >= datetime.utcnow() - timedelta(days=RECENT_DAYS))
+
+
+@metric("service_events.overview", ServiceEvent)
+def _service_events_overview():
+    """Totals, this month, upcoming and per-status counts in one grouped query."""
+    today = date.today()
+    month_start = _month_start(today)
+    rows = db.session.query(
+        ServiceEvent.status,
+        func.count(ServiceEvent.id),
+        func.sum(case(((ServiceEvent.event_date >= month_start) & (ServiceEvent.event_date <= today), 1), else_=0)),
+        func.sum(case((ServiceEvent.event_date > today, 1), else_=0)),
+    ).group_by(ServiceEvent.status).all()
+    return {
+        "total": sum(int(r[1] or 0) for r in rows),
+        "this_month": sum(int(r[2] or 0) for r in rows),
+        "upcoming": sum(int(r[3] or 0) for r in rows),
+        "by_status": {status: int(count or 0) for status, count, _m, _u in rows},
+    }
+
+
+@metric("service_assignments.total", ServiceStaffAssignment)
+def _service_assignments_total():
+    return _count(ServiceStaffAssignment)
+
+
+@metric("invoices.overview", Invoice, sensitive=True)
+def _invoices_overview():
+    """Count, invoiced amount, paid amount and outstanding amount (all time)."""
+    row = db.session.query(
+        func.count(Invoice.id),
+        func.coalesce(func.sum(Invoice.total_amount_ugx), 0),
+        func.coalesce(func.sum(case((Invoice.status == InvoiceStatus.Paid, Invoice.total_amount_ugx), else_=0)), 0),
+        func.coalesce(func.sum(case(
+            (Invoice.status.in_([InvoiceStatus.Paid, InvoiceStatus.Cancelled]), 0), else_=Invoice.total_amount_ugx
+        )), 0),
+    ).one()
+    return {
+        "count": int(row[0] or 0),
+        "total_amount": float(row[1] or 0),
+        "paid_amount": float(row[2] or 0),
+        "outstanding_amount": float(row[3] or 0),
+    }
+
+
+@metric("revenue.paid_total", Invoice, sensitive=True)
+def _revenue_paid_total():
+    """Paid invoices, all time."""
+    total = db.session.query(func.coalesce(func.sum(Invoice.total_amount_ugx), 0)).filter(
+        Invoice.status == InvoiceStatus.Paid
+    ).scalar()
+    return float(total or 0)
+
+
+@metric("revenue.month", Invoice, sensitive=True)
+def _revenue_month():
+    """Invoices issued since the first of this month (draft, issued and paid)."""
+    today = date.today()
+    month_start = _month_start(today)
+    row = db.session.query(
+        func.count(Invoice.id),
+        func.coalesce(func.sum(Invoice.total_amount_ugx), 0),
+        func.coalesce(func.sum(case((Invoice.status == InvoiceStatus.Paid, Invoice.total_amount_ugx), else_=0)), 0),
+    ).filter(
+        Invoice.status.in_([InvoiceStatus.Paid, InvoiceStatus.Issued, InvoiceStatus.Draft]),
+        Invoice.issue_date >= month_start,
+    ).one()
+    return {
+        "period_start": month_start.isoformat(),
+        "period_end": today.isoformat(),
+        "invoices_count": int(row[0] or 0),
+        "total_amount": float(row[1] or 0),
+        "paid_amount": float(row[2] or 0),
+    }
+
+
+@metric("payments.overview", AccountingPayment, sensitive=True)
+def _payments_overview():
+    row = db.session.query(
+        func.count(AccountingPayment.id),
+        func.coalesce(func.sum(AccountingPayment.amount), 0),
+    ).one()
+    return {"count": int(row[0] or 0), "total_amount": float(row[1] or 0)}
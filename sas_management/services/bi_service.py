@@ -1,4 +1,7 @@
 """Business Intelligence Service - Analytics, predictions, and data warehouse operations."""
+import importlib.util
+import logging
+import os
 from datetime import datetime, date, timedelta
 from decimal import Decimal
 from flask import current_app
@@ -8,77 +11,44 @@ from collections import defaultdict
 
 from sas_management.models import (
     db, BIEventProfitability, BIIngredientPriceTrend, BISalesForecast,
-    BIStaffPerformance, BIBakeryDemand, BICustomerBehavior, BIPOSHeatmap,
-    Event, EventMenuSelection, EventStaffAssignment, Ingredient, Employee,
-    Client, BakeryItem, Transaction, TransactionType
+    BIStaffPerformance, BICustomerBehavior,
+    Event, EventMenuSelection, Ingredient, Employee,
+    Client, BakeryItem
 )
+from sas_management.services import event_profitability_rollup, forecasting_engine, pos_sales_cube
+from sas_management.services.document_renderer import (
+    as_namespace,
+    copy_to,
+    load_assets,
+    logo_flowable,
+    register_document,
+    renderer as document_renderer,
+)
+
+logger = logging.getLogger(__name__)
 
 
 def calculate_event_profitability(event_id):
-    """Calculate and store event profitability metrics."""
+    """Recompute one event's profitability rollup now (the refresher does this for dirty events)."""
     try:
-        db.session.begin()
-        
         event = db.session.get(Event, event_id)
         if not event:
             raise ValueError("Event not found")
+        if event.status not in event_profitability_rollup.ROLLUP_STATUSES:
+            raise ValueError("Profitability is only analysed for completed events")
         
-        # Calculate revenue (quoted value or actual)
-        revenue = float(event.quoted_value or 0)
-        # If event completed, use actual revenue if available
-        # For now, use quoted value
-        
-        # Calculate COGS
-        cost_of_goods = float(event.actual_cogs_ugx or 0)
-        
-        # Estimate labor cost (simplified - based on staff assignments)
-        labor_cost = 0.0
-        staff_assignments = EventStaffAssignment.query.filter_by(event_id=event_id).all()
-        # Simple estimation: 50k UGX per staff hour (adjustable)
-        labor_cost = len(staff_assignments) * 50000 * 8  # 8 hour estimate
-        
-        # Overhead cost (10% of revenue as estimate)
-        overhead_cost = revenue * 0.10
-        
-        # Calculate profit
-        profit = revenue - cost_of_goods - labor_cost - overhead_cost
-        
-        # Calculate margin
-        margin_percent = (profit / revenue * 100) if revenue > 0 else 0
-        
-        # Store or update profitability record
-        existing = BIEventProfitability.query.filter_by(event_id=event_id).first()
-        if existing:
-            existing.revenue = revenue
-            existing.cost_of_goods = cost_of_goods
-            existing.labor_cost = labor_cost
-            existing.overhead_cost = overhead_cost
-            existing.profit = profit
-            existing.margin_percent = margin_percent
-            existing.generated_at = datetime.utcnow()
-        else:
-            profitability = BIEventProfitability(
-                event_id=event_id,
-                revenue=revenue,
-                cost_of_goods=cost_of_goods,
-                labor_cost=labor_cost,
-                overhead_cost=overhead_cost,
-                profit=profit,
-                margin_percent=margin_percent
-            )
-            db.session.add(profitability)
-        
+        row = event_profitability_rollup.refresh_events([event_id])[event_id]
         db.session.commit()
         
         return {
             "success": True,
             "event_id": event_id,
-            "revenue": revenue,
-            "cost_of_goods": cost_of_goods,
-            "labor_cost": labor_cost,
-            "overhead_cost": overhead_cost,
-            "profit": profit,
-            "margin_percent": round(margin_percent, 2)
+            "revenue": float(row["revenue"]),
+            "cost_of_goods": float(row["cost_of_goods"]),
+            "labor_cost": float(row["labor_cost"]),
+            "overhead_cost": float(row["overhead_cost"]),
+            "profit": float(row["profit"]),
+            "margin_percent": row["margin_percent"]
         }
     except Exception as e:
         db.session.rollback()
@@ -90,22 +60,45 @@ def generate_profitability_pdf_report():
     """
     Generate a comprehensive PDF report for all Event Profitability Analysis records.
     
+    Waits for the document pool; request handlers use
+    ``prepare_profitability_pdf_report`` instead.
+    
     Returns:
         Full path to the generated PDF file
     """
-    # Try to import ReportLab
+    data, full_path = _profitability_report_job()
     try:
-        from reportlab.lib.pagesizes import A4
-        from reportlab.lib.units import inch
-        from reportlab.lib import colors
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image, HRFlowable, PageBreak
-        from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_LEFT
-        REPORTLAB_AVAILABLE = True
-    except ImportError:
-        raise ImportError("ReportLab is not installed. Install it with: pip install reportlab")
+        # Rendered by the document pool; unchanged rollups reuse the cached file
+        document_renderer.publish("event_profitability_report", data, full_path)
+        
+        # Verify file was created
+        if not os.path.exists(full_path):
+            raise IOError(f"PDF file was not created at {full_path}")
+        
+        return full_path
+    except Exception as e:
+        current_app.logger.exception(f"Error in generate_profitability_pdf_report: {e}")
+        raise
+
+
+def prepare_profitability_pdf_report():
+    """
+    Non-blocking ``generate_profitability_pdf_report`` for request handlers.
     
-    import os
+    Returns the full path once the PDF is ready, or None while the document
+    pool is still rendering it (ask again shortly).
+    """
+    data, full_path = _profitability_report_job()
+    path = document_renderer.prepare("event_profitability_report", data)
+    if path is None:
+        return None
+    return copy_to(path, full_path)
+
+
+def _profitability_report_job():
+    """Render data for the profitability report and where its copy goes under ``instance/reports``."""
+    if importlib.util.find_spec("reportlab") is None:
+        raise ImportError("ReportLab is not installed. Install it with: pip install reportlab")
     
     # Get all profitability records with event data
     from sqlalchemy.orm import joinedload
@@ -116,51 +109,62 @@ def generate_profitability_pdf_report():
     if not profitability_records:
         raise ValueError("No profitability records found. Generate analysis for events first.")
     
-    # Generate PDF path
-    try:
-        reports_folder = os.path.join(current_app.instance_path, "reports")
-        os.makedirs(reports_folder, exist_ok=True)
-        
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        pdf_relative_path = f"reports/event_profitability_report_{timestamp}.pdf"
-        full_path = os.path.join(current_app.instance_path, pdf_relative_path)
-        full_path = os.path.abspath(full_path)
-        
-        # Generate PDF
-        _generate_pdf_profitability_report(
-            pdf_path=full_path,
-            profitability_records=profitability_records
-        )
-        
-        # Verify file was created
-        if not os.path.exists(full_path):
-            raise IOError(f"PDF file was not created at {full_path}")
-        
-        return full_path
-    except Exception as e:
-        current_app.logger.exception(f"Error in generate_profitability_pdf_report: {e}")
-        raise
+    data = profitability_report_document(profitability_records)
+    # Named after the figures' timestamp, so retries while it renders agree on the file
+    timestamp = (data["generated_at"] or datetime.now()).strftime("%Y%m%d_%H%M%S")
+    pdf_relative_path = f"reports/event_profitability_report_{timestamp}.pdf"
+    return data, os.path.abspath(os.path.join(current_app.instance_path, pdf_relative_path))
 
 
-def _generate_pdf_profitability_report(pdf_path, profitability_records):
+def profitability_report_document(profitability_records):
+    """Plain render data for the profitability report (the document cache key is derived from it)."""
+    return {
+        "generated_at": max(record.generated_at for record in profitability_records),
+        "records": [
+            {
+                "event_id": record.event_id,
+                "event": {
+                    "event_name": record.event.event_name,
+                    "client": {"name": record.event.client.name} if record.event.client else None,
+                } if record.event else None,
+                "revenue": Decimal(str(record.revenue or 0)),
+                "cost_of_goods": Decimal(str(record.cost_of_goods or 0)),
+                "labor_cost": Decimal(str(record.labor_cost or 0)),
+                "overhead_cost": Decimal(str(record.overhead_cost or 0)),
+                "profit": Decimal(str(record.profit or 0)),
+                "margin_percent": record.margin_percent or 0.0,
+            }
+            for record in profitability_records
+        ],
+    }
+
+
+@register_document("event_profitability_report", version=1)
+def _render_profitability_report(pdf_path, data, assets):
+    doc = as_namespace(data)
+    _generate_pdf_profitability_report(pdf_path, doc.records, assets=assets, generated_at=doc.generated_at)
+
+
+def _generate_pdf_profitability_report(pdf_path, profitability_records, assets=None, generated_at=None):
     """
     Generate professional PDF report for Event Profitability Analysis.
     
     Args:
         pdf_path: Full path where PDF should be saved
-        profitability_records: List of BIEventProfitability records
+        profitability_records: List of BIEventProfitability records (or render data namespaces)
+        assets: Preloaded document assets (logo); loaded on demand if omitted
+        generated_at: When the figures were computed (defaults to now)
     """
     try:
         from reportlab.lib.pagesizes import A4
         from reportlab.lib.units import inch
         from reportlab.lib import colors
         from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image, HRFlowable, PageBreak
+        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, HRFlowable, PageBreak
         from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_LEFT
     except ImportError:
         raise ImportError("ReportLab is not installed. Install it with: pip install reportlab")
     
-    import os
     from flask import current_app
     
     # SAS Brand Colors
@@ -177,31 +181,9 @@ def _generate_pdf_profitability_report(pdf_path, profitability_records):
     story = []
     styles = getSampleStyleSheet()
     
-    # Try to load logo
-    logo_img = None
-    try:
-        logo_path = os.path.join(current_app.static_folder, 'images', 'sas_logo.png')
-        if os.path.exists(logo_path):
-            try:
-                from PIL import Image as PILImage
-                from io import BytesIO
-                pil_img = PILImage.open(logo_path)
-                if pil_img.mode in ('RGBA', 'LA', 'P'):
-                    rgb_img = PILImage.new('RGB', pil_img.size, (255, 255, 255))
-                    if pil_img.mode == 'P':
-                        pil_img = pil_img.convert('RGBA')
-                    rgb_img.paste(pil_img, mask=pil_img.split()[-1] if pil_img.mode == 'RGBA' else None)
-                    pil_img = rgb_img
-                img_buffer = BytesIO()
-                pil_img.save(img_buffer, format='PNG')
-                img_buffer.seek(0)
-                logo_img = Image(img_buffer, width=1.2*inch, height=1.2*inch)
-            except ImportError:
-                logo_img = Image(logo_path, width=1.2*inch, height=1.2*inch)
-            except Exception:
-                logo_img = None
-    except Exception:
-        logo_img = None
+    if assets is None:
+        assets = load_assets(current_app.static_folder)
+    logo_img = logo_flowable(assets, 1.2*inch, 1.2*inch)
     
     # ========== HEADER SECTION ==========
     header_data = []
@@ -296,7 +278,7 @@ def _generate_pdf_profitability_report(pdf_path, profitability_records):
         alignment=TA_CENTER,
         spaceAfter=0.15*inch
     )
-    report_date = datetime.now().strftime('%B %d, %Y at %I:%M %p')
+    report_date = (generated_at or datetime.now()).strftime('%B %d, %Y at %I:%M %p')
     story.append(Paragraph(f"Generated on {report_date}", meta_style))
     story.append(Paragraph(f"Total Events Analyzed: {len(profitability_records)}", meta_style))
     story.append(Spacer(1, 0.2*inch))
@@ -448,7 +430,7 @@ def _generate_pdf_profitability_report(pdf_path, profitability_records):
     try:
         doc.build(story)
     except Exception as e:
-        current_app.logger.exception(f"Error building PDF document: {e}")
+        logger.exception(f"Error building PDF document: {e}")
         raise
 
 
@@ -540,94 +522,15 @@ def generate_price_trend_history(inventory_item_id, days=30):
 def run_sales_forecasting(source="all", model="simple", days=14):
     """Generate sales forecasts for POS, Catering, or Bakery."""
     try:
-        db.session.begin()
-        
-        forecast_date = date.today() + timedelta(days=1)
-        end_date = forecast_date + timedelta(days=days - 1)
-        
         sources = ["POS", "Catering", "Bakery"] if source == "all" else [source]
-        forecasts = []
-        
-        for src in sources:
-            # Get historical sales data (last 30 days)
-            historical_start = date.today() - timedelta(days=30)
-            
-            # Simple linear regression based on historical averages
-            # In production, use ML models (scikit-learn, etc.)
-            if src == "POS":
-                # Get POS transactions
-                historical_txns = Transaction.query.filter(
-                    and_(
-                        Transaction.type == TransactionType.Revenue,
-                        Transaction.date >= historical_start,
-                        Transaction.category.ilike("%POS%")
-                    )
-                ).all()
-                
-                daily_avg = statistics.mean([float(t.amount) for t in historical_txns]) / 30 if historical_txns else 50000
-                
-            elif src == "Catering":
-                # Get catering revenue (from events)
-                historical_events = Event.query.filter(
-                    Event.event_date >= historical_start
-                ).all()
-                
-                event_revenue = [float(e.quoted_value or 0) for e in historical_events]
-                daily_avg = statistics.mean(event_revenue) / 30 if event_revenue else 100000
-                
-            elif src == "Bakery":
-                # Get bakery transactions
-                historical_txns = Transaction.query.filter(
-                    and_(
-                        Transaction.type == TransactionType.Revenue,
-                        Transaction.date >= historical_start,
-                        Transaction.category.ilike("%Bakery%")
-                    )
-                ).all()
-                
-                daily_avg = statistics.mean([float(t.amount) for t in historical_txns]) / 30 if historical_txns else 30000
-            
-            # Generate forecasts
-            current_date = forecast_date
-            while current_date <= end_date:
-                # Simple model: daily average with day-of-week adjustment
-                day_of_week = current_date.weekday()
-                # Weekend boost (Saturday=5, Sunday=6)
-                multiplier = 1.5 if day_of_week >= 5 else 1.0
-                
-                predicted = daily_avg * multiplier
-                
-                # Check if forecast already exists
-                existing = BISalesForecast.query.filter_by(
-                    source=src,
-                    date=current_date
-                ).first()
-                
-                if existing:
-                    existing.predicted_sales = predicted
-                    existing.model_name = model
-                else:
-                    forecast = BISalesForecast(
-                        source=src,
-                        date=current_date,
-                        predicted_sales=predicted,
-                        model_name=model,
-                        confidence=0.7  # Simple model confidence
-                    )
-                    db.session.add(forecast)
-                    forecasts.append({
-                        "source": src,
-                        "date": current_date.isoformat(),
-                        "predicted_sales": round(predicted, 2)
-                    })
-                
-                current_date += timedelta(days=1)
-        
+        forecasts = forecasting_engine.forecast_sales(sources, horizon=days)
         db.session.commit()
         
+        forecast_date = date.today() + timedelta(days=1)
+        end_date = forecast_date + timedelta(days=days - 1)
         return {
             "success": True,
-            "model": model,
+            "model": forecasting_engine.MODEL_NAME,
             "forecasts": forecasts,
             "forecast_period": {
                 "start": forecast_date.isoformat(),
@@ -671,61 +574,24 @@ def generate_staff_performance(employee_id, metric, value, period="daily", perio
         return {"success": False, "error": str(e)}
 
 
-def generate_bakery_demand_forecast(item_id, days=14):
-    """Generate bakery item demand forecast."""
+def generate_bakery_demand_forecast(item_id=None, days=14):
+    """Generate demand forecasts for one bakery item, or all active items when ``item_id`` is None."""
     try:
-        db.session.begin()
-        
-        # Get historical sales data (from POS or bakery orders)
-        historical_start = date.today() - timedelta(days=30)
-        
-        # Simple average-based forecast
-        # In production, use time series models (ARIMA, Prophet, etc.)
-        avg_daily_qty = 5  # Default average
-        
-        forecast_date = date.today() + timedelta(days=1)
-        end_date = forecast_date + timedelta(days=days - 1)
-        
-        forecasts = []
-        current_date = forecast_date
-        
-        while current_date <= end_date:
-            # Day-of-week adjustment
-            day_of_week = current_date.weekday()
-            multiplier = 1.8 if day_of_week >= 5 else 1.0  # Weekend boost
-            
-            predicted_qty = int(avg_daily_qty * multiplier)
-            
-            existing = BIBakeryDemand.query.filter_by(
-                bakery_item_id=item_id,
-                date=current_date
-            ).first()
-            
-            if existing:
-                existing.predicted_qty = predicted_qty
-                existing.model_name = "simple"
-            else:
-                demand = BIBakeryDemand(
-                    bakery_item_id=item_id,
-                    date=current_date,
-                    predicted_qty=predicted_qty,
-                    model_name="simple",
-                    confidence=0.65
-                )
-                db.session.add(demand)
-                forecasts.append({
-                    "date": current_date.isoformat(),
-                    "predicted_qty": predicted_qty
-                })
-            
-            current_date += timedelta(days=1)
-        
+        by_item = forecasting_engine.forecast_bakery_demand(
+            None if item_id is None else [item_id], horizon=days
+        )
         db.session.commit()
         
+        if item_id is not None:
+            return {
+                "success": True,
+                "item_id": item_id,
+                "forecasts": by_item.get(item_id, [])
+            }
         return {
             "success": True,
-            "item_id": item_id,
-            "forecasts": forecasts
+            "items_count": len(by_item),
+            "forecasts": [dict(f, item_id=i) for i, rows in by_item.items() for f in rows]
         }
     except Exception as e:
         db.session.rollback()
@@ -802,78 +668,21 @@ def calculate_customer_behavior(customer_id):
         return {"success": False, "error": str(e)}
 
 
-def generate_pos_heatmap(days=7):
-    """Generate POS sales heatmap data (hour × day matrix)."""
+def generate_pos_heatmap(days=7, device_id=None):
+    """POS sales heatmap (day of week × hour) for the last ``days`` days, read from the sales cube."""
     try:
-        db.session.begin()
-        
         end_date = date.today()
         start_date = end_date - timedelta(days=days - 1)
         
-        # Get POS transactions (simulated for now - in production, query actual POS orders)
-        # Group by hour and day of week
-        days_of_week = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
-        
-        # Initialize heatmap data
-        heatmap_data = defaultdict(lambda: {"sales": 0.0, "count": 0})
-        
-        # Simulate data (in production, query actual POSOrder table)
-        # For now, generate sample distribution
-        for day_idx, day_name in enumerate(days_of_week):
-            for hour in range(24):
-                # Peak hours: 8-10, 12-14, 17-19
-                if hour in [8, 9, 12, 13, 17, 18]:
-                    sales = 15000.0
-                    count = 3
-                elif hour in [10, 11, 14, 15, 19, 20]:
-                    sales = 10000.0
-                    count = 2
-                else:
-                    sales = 3000.0
-                    count = 1
-                
-                # Weekend boost
-                if day_idx >= 5:
-                    sales *= 1.5
-                    count = int(count * 1.5)
-                
-                heatmap_data[(day_name, hour)]["sales"] += sales
-                heatmap_data[(day_name, hour)]["count"] += count
-        
-        # Store heatmap data
-        for (day_name, hour), data in heatmap_data.items():
-            # Find existing record (may not have date field, check day and hour)
-            existing = BIPOSHeatmap.query.filter_by(
-                day=day_name,
-                hour=hour
-            ).first()
-            
-            if existing:
-                existing.sales = data["sales"]
-                existing.transaction_count = data["count"]
-            else:
-                heatmap = BIPOSHeatmap(
-                    day=day_name,
-                    hour=hour,
-                    sales=data["sales"],
-                    transaction_count=data["count"],
-                    period_start=start_date,
-                    period_end=end_date
-                )
-                db.session.add(heatmap)
-        
-        db.session.commit()
-        
         return {
             "success": True,
             "period": {
                 "start": start_date.isoformat(),
                 "end": end_date.isoformat()
             },
-            "heatmap": dict(heatmap_data)
+            "heatmap": pos_sales_cube.heatmap(start_date, end_date, device_id=device_id)
         }
     except Exception as e:
-        db.session.rollback()
         current_app.logger.exception(f"Error generating POS heatmap: {e}")
         return {"success": False, "error": str(e)}
 
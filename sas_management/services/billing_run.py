@@ -0,0 +1,479 @@
+"""
+Month-end billing runs.
+
+A ``BillingRun`` invoices every billable event in a period in stages, each
+processed in chunks of ``BILLING_RUN_CHUNK_SIZE`` items with one commit per
+chunk:
+
+plan      One query selects the events held in the period (``BILLABLE_STATUSES``,
+          no live invoice yet) and one grouped query totals their revenue
+          items; the run's ``BillingRunItem`` rows go in with a single bulk
+          insert.  Amount is the revenue-item total, else the quoted value
+          (the same rule as the profitability rollups).
+invoice   A block of ``INV-YYYYMMDD-NNNN`` numbers is reserved with one
+          sequence increment and the chunk's ``Invoice`` rows are bulk
+          inserted (and indexed for global search in the same transaction).
+render    PDFs render in parallel through the document pool
+          (``invoice_service.generate_invoice_pdfs``).
+send      Optional: each PDF is emailed to the client through SendGrid on a
+          small thread pool.
+
+``BillingRunItem.status`` is the last stage an item completed, and a failure
+is recorded on the item (``error``) without stopping the run.  Re-running
+(``execute`` / ``flask billing resume``) clears those errors and carries
+every item on from where it stopped, so a crash or a SendGrid outage never
+issues an invoice twice.  A run is claimed by one worker at a time; a
+claim whose heartbeat is older than ``STALE_AFTER`` is considered abandoned.
+"""
+import base64
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import func, or_, select, update
+
+from sas_management.models import (
+    BillingRun,
+    BillingRunItem,
+    Event,
+    EventRevenueItem,
+    Invoice,
+    InvoiceStatus,
+    db,
+)
+from sas_management.services import sequence_service
+from sas_management.services.search_index import search_index
+
+logger = logging.getLogger(__name__)
+
+BILLABLE_STATUSES = ("Confirmed", "In Progress", "Completed")
+STAGES = ("pending", "invoiced", "rendered", "sent")
+DEFAULT_CHUNK_SIZE = 200
+DEFAULT_SEND_CONCURRENCY = 8
+STALE_AFTER = timedelta(minutes=10)
+
+_ZERO = Decimal("0")
+_CENT = Decimal("0.01")
+
+
+def _dec(value):
+    return Decimal(str(value)) if value is not None else _ZERO
+
+
+def _config(key, default):
+    from flask import current_app
+    return current_app.config.get(key, default)
+
+
+# ----------------------------------------------------------------------
+# Creating runs
+# ----------------------------------------------------------------------
+def create_run(period_start, period_end, send_emails=False, due_days=30, issue_date=None, user_id=None):
+    """Create (and commit) a pending run for ``period_start``..``period_end``."""
+    if period_end < period_start:
+        raise ValueError("Period end is before period start")
+    issue_date = issue_date or date.today()
+    run = BillingRun(
+        period_start=period_start,
+        period_end=period_end,
+        issue_date=issue_date,
+        due_date=issue_date + timedelta(days=due_days),
+        send_emails=send_emails,
+        status="pending",
+        created_by=user_id,
+    )
+    db.session.add(run)
+    db.session.commit()
+    return run
+
+
+def billable_events(period_start, period_end):
+    """``[(event_id, amount)]`` for events in the period that still need an invoice."""
+    live_invoices = select(Invoice.event_id).where(Invoice.status != InvoiceStatus.Cancelled)
+    events = db.session.execute(
+        select(Event.id, Event.quoted_value)
+        .where(
+            Event.date.between(period_start, period_end),
+            Event.status.in_(BILLABLE_STATUSES),
+            Event.id.not_in(live_invoices),
+        )
+        .order_by(Event.date, Event.id)
+    ).all()
+    if not events:
+        return []
+    event_ids = [row.id for row in events]
+    revenue = dict(db.session.execute(
+        select(EventRevenueItem.event_id, func.sum(EventRevenueItem.amount))
+        .where(EventRevenueItem.event_id.in_(event_ids))
+        .group_by(EventRevenueItem.event_id)
+    ).all())
+    billable = []
+    for row in events:
+        amount = _dec(revenue[row.id]) if row.id in revenue else _dec(row.quoted_value)
+        if amount > 0:
+            billable.append((row.id, amount.quantize(_CENT)))
+    return billable
+
+
+def plan(run):
+    """Bulk-insert one item per billable event; returns the item count."""
+    rows = [
+        {"run_id": run.id, "event_id": event_id, "amount": amount, "status": "pending",
+         "attempts": 0, "updated_at": datetime.utcnow()}
+        for event_id, amount in billable_events(run.period_start, run.period_end)
+    ]
+    if rows:
+        db.session.execute(BillingRunItem.__table__.insert(), rows)
+    run.total = len(rows)
+    run.planned_at = datetime.utcnow()
+    db.session.commit()
+    return len(rows)
+
+
+# ----------------------------------------------------------------------
+# Stages
+# ----------------------------------------------------------------------
+def _next_chunk(run, status, size):
+    return (
+        BillingRunItem.query
+        .filter_by(run_id=run.id, status=status)
+        .filter(BillingRunItem.error.is_(None))
+        .order_by(BillingRunItem.id)
+        .limit(size)
+        .all()
+    )
+
+
+def _fail(item, error):
+    item.error = str(error) or error.__class__.__name__
+    item.attempts += 1
+
+
+def _issue_invoices(run, items):
+    """Bulk insert invoices for a chunk of pending items."""
+    # An invoice may have been raised by hand since the run was planned
+    already = set(db.session.execute(
+        select(Invoice.event_id).where(
+            Invoice.event_id.in_([item.event_id for item in items]),
+            Invoice.status != InvoiceStatus.Cancelled,
+        )
+    ).scalars())
+    to_invoice = []
+    for item in items:
+        if item.event_id in already:
+            item.status = "skipped"
+            item.error = None
+        else:
+            to_invoice.append(item)
+
+    if to_invoice:
+        block = sequence_service.reserve_block(
+            "INV", len(to_invoice),
+            seed=sequence_service.seed_from_column(Invoice.invoice_number, Invoice.id),
+            when=datetime.combine(run.issue_date, datetime.min.time()),
+        )
+        numbers = dict(zip((item.event_id for item in to_invoice), block["references"]))
+        db.session.execute(Invoice.__table__.insert(), [
+            {
+                "event_id": item.event_id,
+                "invoice_number": numbers[item.event_id],
+                "issue_date": run.issue_date,
+                "due_date": run.due_date,
+                "total_amount_ugx": item.amount,
+                "status": InvoiceStatus.Issued,
+            }
+            for item in to_invoice
+        ])
+        invoice_ids = dict(db.session.execute(
+            select(Invoice.invoice_number, Invoice.id).where(Invoice.invoice_number.in_(list(numbers.values())))
+        ).all())
+        # The Core insert skips the mapper hooks that index ORM inserts
+        search_index.index_ids("invoices", invoice_ids.values())
+        for item in to_invoice:
+            item.invoice_id = invoice_ids[numbers[item.event_id]]
+            item.status = "invoiced"
+    db.session.commit()
+
+
+def _render_invoices(run, items):
+    from sas_management.services.invoice_service import generate_invoice_pdfs
+
+    results = generate_invoice_pdfs([item.invoice_id for item in items])
+    for item in items:
+        path, error = results.get(item.invoice_id, (None, ValueError("Invoice was not rendered")))
+        if error is not None:
+            _fail(item, error)
+        else:
+            item.pdf_path = path
+            item.status = "rendered"
+    db.session.commit()
+
+
+def _recipient(event):
+    if event.client and event.client.email:
+        return event.client.email
+    return event.client_email
+
+
+def _send_invoices(run, items, adapter=None, concurrency=DEFAULT_SEND_CONCURRENCY):
+    """Email a chunk of rendered invoices; SendGrid calls run on a thread pool."""
+    if adapter is None:
+        from integrations.comms.sendgrid_adapter import SendGridAdapter
+        adapter = SendGridAdapter()
+
+    invoices = {
+        invoice.id: invoice
+        for invoice in Invoice.query.options(db.joinedload(Invoice.event).joinedload(Event.client))
+        .filter(Invoice.id.in_([item.invoice_id for item in items]))
+    }
+    jobs = []
+    for item in items:
+        invoice = invoices[item.invoice_id]
+        to_email = _recipient(invoice.event) if invoice.event else None
+        if not to_email:
+            _fail(item, "Client has no email address")
+            continue
+        jobs.append((item, to_email, invoice.invoice_number, invoice.event.event_name, invoice.total_amount_ugx))
+
+    def send(job):
+        item, to_email, number, event_name, amount = job
+        try:
+            with open(item.pdf_path, "rb") as handle:
+                content = base64.b64encode(handle.read()).decode("ascii")
+            return adapter.send_email(
+                to_email=to_email,
+                subject=f"Invoice {number} from SAS Best Foods",
+                html_content=(
+                    f"<p>Please find attached invoice <strong>{number}</strong> for {event_name}, "
+                    f"amounting to UGX {_dec(amount):,.2f}, due on {run.due_date.strftime('%B %d, %Y')}.</p>"
+                    "<p>Thank you for your business.</p><p>SAS Best Foods</p>"
+                ),
+                attachments=[{"content": content, "filename": f"invoice_{number}.pdf", "type": "application/pdf"}],
+            )
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="billing-send") as pool:
+        for (item, *_rest), result in zip(jobs, pool.map(send, jobs)):
+            if result.get("success"):
+                item.message_id = result.get("message_id")
+                item.status = "sent"
+            else:
+                _fail(item, result.get("error") or "Email was not accepted")
+    db.session.commit()
+
+
+# ----------------------------------------------------------------------
+# Running
+# ----------------------------------------------------------------------
+def _claim(run_id):
+    """Mark the run as ours; False when another live worker holds it."""
+    now = datetime.utcnow()
+    claimed = db.session.execute(
+        update(BillingRun)
+        .where(
+            BillingRun.id == run_id,
+            or_(BillingRun.status != "running", BillingRun.heartbeat_at.is_(None),
+                BillingRun.heartbeat_at < now - STALE_AFTER),
+        )
+        .values(status="running", heartbeat_at=now, error=None, finished_at=None)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    return bool(claimed)
+
+
+def _heartbeat(run):
+    run.heartbeat_at = datetime.utcnow()
+    db.session.commit()
+
+
+def execute(run_id, chunk_size=None, adapter=None, on_progress=None):
+    """
+    Run (or resume) a billing run to completion in the calling thread.
+
+    Returns the run's ``progress`` dict, or None if another worker holds it.
+    """
+    chunk_size = chunk_size or _config("BILLING_RUN_CHUNK_SIZE", DEFAULT_CHUNK_SIZE)
+    concurrency = _config("BILLING_SEND_CONCURRENCY", DEFAULT_SEND_CONCURRENCY)
+    if not _claim(run_id):
+        return None
+    run = db.session.get(BillingRun, run_id)
+    db.session.refresh(run)
+    try:
+        run.started_at = run.started_at or datetime.utcnow()
+        if run.planned_at is None:
+            plan(run)
+        # Resuming retries everything that failed last time
+        db.session.execute(
+            update(BillingRunItem)
+            .where(BillingRunItem.run_id == run.id, BillingRunItem.error.isnot(None))
+            .values(error=None)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+
+        stages = [("pending", _issue_invoices), ("invoiced", _render_invoices)]
+        if run.send_emails:
+            stages.append(("rendered", lambda r, items: _send_invoices(r, items, adapter, concurrency)))
+        for status, handler in stages:
+            while True:
+                items = _next_chunk(run, status, chunk_size)
+                if not items:
+                    break
+                try:
+                    handler(run, items)
+                except Exception as e:
+                    # Chunk-level failure (e.g. the database): record it on each item and move on
+                    db.session.rollback()
+                    logger.exception(f"Billing run {run.id}: {status} chunk failed: {e}")
+                    for item in _reload(items):
+                        _fail(item, e)
+                    db.session.commit()
+                _heartbeat(run)
+                if on_progress:
+                    on_progress(progress(run))
+
+        summary = progress(run)
+        run.status = "completed_with_errors" if summary["failed"] else "completed"
+    except Exception as e:
+        db.session.rollback()
+        logger.exception(f"Billing run {run_id} failed: {e}")
+        run = db.session.get(BillingRun, run_id)
+        run.status = "failed"
+        run.error = str(e)
+    run.finished_at = datetime.utcnow()
+    db.session.commit()
+    return progress(run)
+
+
+def _reload(items):
+    ids = [item.id for item in items]
+    return BillingRunItem.query.filter(BillingRunItem.id.in_(ids)).all()
+
+
+def progress(run):
+    """Counts per stage plus the failed items (one grouped query)."""
+    counts = dict(db.session.execute(
+        select(BillingRunItem.status, func.count())
+        .where(BillingRunItem.run_id == run.id)
+        .group_by(BillingRunItem.status)
+    ).all())
+    failed = (
+        BillingRunItem.query.filter_by(run_id=run.id)
+        .filter(BillingRunItem.error.isnot(None))
+        .order_by(BillingRunItem.id)
+        .all()
+    )
+    final = "sent" if run.send_emails else "rendered"
+    done = counts.get(final, 0) + counts.get("skipped", 0)
+    return {
+        "id": run.id,
+        "status": run.status,
+        "period_start": run.period_start.isoformat(),
+        "period_end": run.period_end.isoformat(),
+        "send_emails": run.send_emails,
+        "total": run.total,
+        "done": done,
+        "stages": {stage: counts.get(stage, 0) for stage in STAGES + ("skipped",)},
+        "failed": len(failed),
+        "errors": [
+            {"event_id": item.event_id, "invoice_id": item.invoice_id, "stage": item.status, "error": item.error}
+            for item in failed
+        ],
+        "percent": round(done * 100 / run.total, 1) if run.total else 100.0,
+        "error": run.error,
+    }
+
+
+class BillingRunner:
+    """Runs billing runs on a background thread (one run at a time per process)."""
+
+    def __init__(self):
+        self._app = None
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self._app = app
+
+    def _pool(self):
+        # Re-created after a fork (gunicorn pre-fork workers)
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="billing-run")
+                self._pid = os.getpid()
+            return self._executor
+
+    def submit(self, run_id):
+        return self._pool().submit(self._run, run_id)
+
+    def _run(self, run_id):
+        with self._app.app_context():
+            try:
+                execute(run_id)
+            except Exception as e:
+                logger.exception(f"Billing run {run_id} crashed: {e}")
+            finally:
+                db.session.remove()
+
+
+runner = BillingRunner()
+
+
+# ----------------------------------------------------------------------
+# CLI
+# ----------------------------------------------------------------------
+@click.group("billing")
+def billing_cli():
+    """Month-end billing runs."""
+
+
+def _echo_progress(summary):
+    click.echo(f"  {summary['done']}/{summary['total']} done, {summary['failed']} failed")
+
+
+def _echo_summary(summary):
+    if summary is None:
+        click.echo("Run is being processed by another worker.")
+        return
+    click.echo(f"Run {summary['id']}: {summary['status']} - {summary['done']}/{summary['total']} done")
+    for error in summary["errors"]:
+        click.echo(f"  event {error['event_id']} ({error['stage']}): {error['error']}")
+
+
+@billing_cli.command("run")
+@click.option("--start", "period_start", type=click.DateTime(["%Y-%m-%d"]), required=True)
+@click.option("--end", "period_end", type=click.DateTime(["%Y-%m-%d"]), required=True)
+@click.option("--send/--no-send", default=False, show_default=True, help="Email invoices to clients.")
+@click.option("--due-days", default=30, show_default=True)
+@with_appcontext
+def run_command(period_start, period_end, send, due_days):
+    run = create_run(period_start.date(), period_end.date(), send_emails=send, due_days=due_days)
+    click.echo(f"Billing run {run.id} created.")
+    _echo_summary(execute(run.id, on_progress=_echo_progress))
+
+
+@billing_cli.command("resume")
+@click.argument("run_id", type=int)
+@with_appcontext
+def resume_command(run_id):
+    if db.session.get(BillingRun, run_id) is None:
+        raise click.ClickException(f"Billing run {run_id} not found")
+    _echo_summary(execute(run_id, on_progress=_echo_progress))
+
+
+@billing_cli.command("status")
+@click.argument("run_id", type=int)
+@with_appcontext
+def status_command(run_id):
+    run = db.session.get(BillingRun, run_id)
+    if run is None:
+        raise click.ClickException(f"Billing run {run_id} not found")
+    _echo_summary(progress(run))
@@ -2,12 +2,14 @@
 import os
 from datetime import datetime, date
 from flask import current_app
+from sqlalchemy.orm import joinedload
 from werkzeug.utils import secure_filename
 from sas_management.models import (
     db, Announcement, BulletinPost, DirectMessageThread, DirectMessage,
     DepartmentMessage, EventMessageThread, EventMessage, StaffTask,
     User, Event
 )
+from sas_management.utils.keyset import keyset_page
 
 
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'pdf', 'doc', 'docx', 'txt'}
@@ -171,11 +173,17 @@ def send_direct_message(thread_id, sender_id, text, attachment_file=None):
         return {"success": False, "error": str(e)}
 
 
-def get_thread_messages(thread_id):
-    """Get all messages in a thread."""
+def _message_page(query, id_column, after_id, before_id, limit):
+    """Keyset page of ``query`` as the service result dict (oldest first)."""
+    page = keyset_page(query, id_column, after_id=after_id, before_id=before_id, limit=limit)
+    return {"success": True, "messages": page.items, **page.cursors()}
+
+
+def get_thread_messages(thread_id, after_id=None, before_id=None, limit=200):
+    """Get a page of messages in a thread (the newest ``limit`` by default)."""
     try:
-        messages = DirectMessage.query.filter_by(thread_id=thread_id).order_by(DirectMessage.timestamp.asc()).all()
-        return {"success": True, "messages": messages}
+        query = DirectMessage.query.options(joinedload(DirectMessage.sender)).filter_by(thread_id=thread_id)
+        return _message_page(query, DirectMessage.id, after_id, before_id, limit)
     except Exception as e:
         current_app.logger.exception(f"Error getting thread messages: {e}")
         return {"success": False, "error": str(e), "messages": []}
@@ -224,13 +232,15 @@ def post_department_message(department, message, sender_id, attachment_file=None
         return {"success": False, "error": str(e)}
 
 
-def get_department_messages(department, limit=100):
-    """Get messages for a department."""
+def get_department_messages(department, limit=100, after_id=None, before_id=None):
+    """Get a page of messages for a department, newest first."""
     try:
-        messages = DepartmentMessage.query.filter_by(
+        query = DepartmentMessage.query.options(joinedload(DepartmentMessage.sender)).filter_by(
             department=department
-        ).order_by(DepartmentMessage.created_at.desc()).limit(limit).all()
-        return {"success": True, "messages": messages}
+        )
+        result = _message_page(query, DepartmentMessage.id, after_id, before_id, limit)
+        result["messages"].reverse()
+        return result
     except Exception as e:
         current_app.logger.exception(f"Error getting department messages: {e}")
         return {"success": False, "error": str(e), "messages": []}
@@ -285,11 +295,11 @@ def post_event_message(thread_id, sender_id, text, attachment_file=None):
         return {"success": False, "error": str(e)}
 
 
-def get_event_thread_messages(thread_id):
-    """Get all messages in an event thread."""
+def get_event_thread_messages(thread_id, after_id=None, before_id=None, limit=200):
+    """Get a page of messages in an event thread (the newest ``limit`` by default)."""
     try:
-        messages = EventMessage.query.filter_by(thread_id=thread_id).order_by(EventMessage.timestamp.asc()).all()
-        return {"success": True, "messages": messages}
+        query = EventMessage.query.options(joinedload(EventMessage.sender)).filter_by(thread_id=thread_id)
+        return _message_page(query, EventMessage.id, after_id, before_id, limit)
     except Exception as e:
         current_app.logger.exception(f"Error getting event thread messages: {e}")
         return {"success": False, "error": str(e), "messages": []}
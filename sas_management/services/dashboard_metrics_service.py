@@ -0,0 +1,257 @@
+"""
+Dashboard metrics snapshot service.
+
+All dashboard KPIs are computed with a handful of grouped aggregate queries
+(one pass over events, one GROUP BY pipeline stage, one GROUP BY invoice
+status, one row of scalar counts, ...) and kept as a plain-data snapshot for
+``DASHBOARD_METRICS_TTL`` seconds.  Any flush that writes one of the source
+models invalidates the snapshot immediately, so users see their own changes
+on the next page load.
+
+The snapshot only holds numbers, strings and dates - never ORM instances -
+so it is safe to share between requests and threads.
+"""
+import threading
+import time
+from calendar import month_abbr
+from datetime import date, timedelta
+
+from sqlalchemy import case, event, func
+
+from sas_management.models import (
+    Client,
+    Event,
+    IncomingLead,
+    InventoryItem,
+    Invoice,
+    InvoiceStatus,
+    Task,
+    TaskStatus,
+    Transaction,
+    TransactionType,
+    User,
+    db,
+)
+
+PIPELINE_STAGES = [
+    "New Lead", "Qualified", "Proposal Sent", "Negotiation",
+    "Awaiting Payment", "Confirmed", "Completed", "Lost",
+]
+# Stages whose converted-event value counts as open pipeline
+OPEN_PIPELINE_STAGES = ["Qualified", "Proposal Sent", "Negotiation", "Awaiting Payment"]
+PENDING_INVOICE_STATUSES = (InvoiceStatus.Issued, InvoiceStatus.Draft)
+LOW_STOCK_THRESHOLD = 10
+
+# Writes to these models change at least one KPI
+WATCHED_MODELS = (Client, Event, IncomingLead, InventoryItem, Invoice, Task, Transaction, User)
+
+
+def _num(value):
+    return float(value or 0)
+
+
+def _month_windows(today, months=6):
+    """The last ``months`` calendar months as (label, start, end), oldest first."""
+    windows = []
+    for i in range(months - 1, -1, -1):
+        month_start = (today - timedelta(days=i * 30)).replace(day=1)
+        month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        windows.append((f"{month_abbr[month_start.month]} {month_start.year}", month_start, month_end))
+    return windows
+
+
+def _bucket(rows, windows):
+    """Sum (day, value) rows into the month windows."""
+    totals = [0.0] * len(windows)
+    for day, value in rows:
+        if day is None:
+            continue
+        for i, (_, start, end) in enumerate(windows):
+            if start <= day <= end:
+                totals[i] += _num(value)
+                break
+    return totals
+
+
+class DashboardMetricsService:
+    """Builds and caches the dashboard KPI snapshot."""
+
+    def __init__(self, ttl=30):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._expires = 0.0
+        self._generation = 0
+        self._installed = False
+        self.builds = 0
+
+    def init_app(self, app):
+        self.ttl = app.config.get("DASHBOARD_METRICS_TTL", self.ttl)
+        if not self._installed:
+            event.listen(db.session, "after_flush", self._after_flush)
+            self._installed = True
+
+    def _after_flush(self, session, flush_context):
+        for obj in session.new | session.dirty | session.deleted:
+            if isinstance(obj, WATCHED_MODELS):
+                self.invalidate()
+                return
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._snapshot = None
+
+    def snapshot(self, today=None):
+        """Current KPI snapshot, rebuilt when stale, invalidated or on a new day."""
+        today = today or date.today()
+        now = time.monotonic()
+        with self._lock:
+            cached = self._snapshot
+            generation = self._generation
+            if cached is not None and self._expires > now and cached["today"] == today:
+                return cached
+        snapshot = self._build(today)
+        with self._lock:
+            # A write during the build makes this snapshot stale already
+            if generation == self._generation:
+                self._snapshot = snapshot
+                self._expires = now + self.ttl
+        return snapshot
+
+    # ------------------------------------------------------------------
+    # Aggregates
+    # ------------------------------------------------------------------
+    def _build(self, today):
+        self.builds += 1
+        snapshot = {"today": today}
+        snapshot.update(self._event_totals(today))
+        snapshot.update(self._pipeline(today))
+        snapshot.update(self._invoices())
+        snapshot.update(self._counts(today))
+        snapshot["staff_by_role"] = self._staff_by_role()
+        snapshot["top_clients"] = self._top_clients()
+        snapshot.update(self._monthly(today))
+        return snapshot
+
+    def _event_totals(self, today):
+        next_30_days = today + timedelta(days=30)
+        row = db.session.query(
+            func.count(Event.id),
+            func.coalesce(func.sum(case((Event.status == "Draft", 1), else_=0)), 0),
+            func.coalesce(func.sum(case((Event.status == "Confirmed", Event.quoted_value), else_=0)), 0),
+            func.coalesce(func.sum(case(
+                ((Event.event_date >= today) & (Event.event_date <= next_30_days), 1), else_=0
+            )), 0),
+        ).one()
+        return {
+            "total_events": int(row[0] or 0),
+            "draft_events": int(row[1] or 0),
+            "total_confirmed_quote": _num(row[2]),
+            "upcoming_events_count": int(row[3] or 0),
+        }
+
+    def _pipeline(self, today):
+        rows = (
+            db.session.query(
+                IncomingLead.pipeline_stage,
+                func.count(IncomingLead.id),
+                func.coalesce(func.sum(Event.quoted_value), 0),
+            )
+            .outerjoin(Event, IncomingLead.converted_event_id == Event.id)
+            .group_by(IncomingLead.pipeline_stage)
+            .all()
+        )
+        counts = {stage: 0 for stage in PIPELINE_STAGES}
+        values = {stage: 0.0 for stage in PIPELINE_STAGES}
+        for stage, count, value in rows:
+            if stage in counts:
+                counts[stage] = int(count)
+                values[stage] = _num(value)
+        return {
+            "pipeline_stats": counts,
+            "pipeline_values": values,
+            "pipeline_value": sum(values[stage] for stage in OPEN_PIPELINE_STAGES),
+        }
+
+    def _invoices(self):
+        rows = (
+            db.session.query(Invoice.status, func.count(Invoice.id), func.coalesce(func.sum(Invoice.total_amount_ugx), 0))
+            .group_by(Invoice.status)
+            .all()
+        )
+        by_status = {status: (int(count), _num(amount)) for status, count, amount in rows}
+        pending = [by_status.get(s, (0, 0.0)) for s in PENDING_INVOICE_STATUSES]
+        return {
+            "paid_invoices": by_status.get(InvoiceStatus.Paid, (0, 0.0))[0],
+            "pending_invoices": sum(c for c, _ in pending),
+            "pending_invoice_amount": sum(a for _, a in pending),
+            "overdue_invoices": by_status.get(InvoiceStatus.Overdue, (0, 0.0))[0],
+            "overdue_invoice_amount": by_status.get(InvoiceStatus.Overdue, (0, 0.0))[1],
+        }
+
+    def _counts(self, today):
+        active_clients = (
+            db.session.query(func.count(Client.id)).filter(Client.is_archived == False).scalar_subquery()
+        )
+        staff = db.session.query(func.count(User.id)).scalar_subquery()
+        low_stock = (
+            db.session.query(func.count(InventoryItem.id))
+            .filter(InventoryItem.stock_count <= LOW_STOCK_THRESHOLD)
+            .scalar_subquery()
+        )
+        tasks_today = (
+            db.session.query(func.count(Task.id))
+            .filter(Task.due_date <= today, Task.status != TaskStatus.Complete)
+            .scalar_subquery()
+        )
+        row = db.session.query(active_clients, staff, low_stock, tasks_today).one()
+        return {
+            "active_clients": int(row[0] or 0),
+            "available_staff": int(row[1] or 0),
+            "low_stock_alerts": int(row[2] or 0),
+            "tasks_today": int(row[3] or 0),
+        }
+
+    def _staff_by_role(self):
+        rows = db.session.query(User.role, func.count(User.id)).group_by(User.role).all()
+        return {(role.value if role is not None else "Unassigned"): int(count) for role, count in rows}
+
+    def _top_clients(self, limit=5):
+        rows = (
+            db.session.query(Client.id, Client.name, func.count(Event.id).label("event_count"))
+            .join(Event, Client.id == Event.client_id)
+            .filter(Client.is_archived == False)
+            .group_by(Client.id, Client.name)
+            .order_by(func.count(Event.id).desc())
+            .limit(limit)
+            .all()
+        )
+        return [{"client": {"id": cid, "name": name}, "event_count": int(count)} for cid, name, count in rows]
+
+    def _monthly(self, today):
+        windows = _month_windows(today)
+        start, end = windows[0][1], windows[-1][2]
+        transactions = (
+            db.session.query(Transaction.type, Transaction.date, func.sum(Transaction.amount))
+            .filter(Transaction.date >= start, Transaction.date <= end)
+            .group_by(Transaction.type, Transaction.date)
+            .all()
+        )
+        bookings = (
+            db.session.query(Event.event_date, func.count(Event.id))
+            .filter(Event.event_date >= start, Event.event_date <= end)
+            .group_by(Event.event_date)
+            .all()
+        )
+        return {
+            "monthly": {
+                "labels": [label for label, _, _ in windows],
+                "revenue": _bucket([(d, a) for t, d, a in transactions if t == TransactionType.Income], windows),
+                "expenses": _bucket([(d, a) for t, d, a in transactions if t == TransactionType.Expense], windows),
+                "bookings": [int(n) for n in _bucket(bookings, windows)],
+            }
+        }
+
+
+dashboard_metrics = DashboardMetricsService()
@@ -3,6 +3,8 @@ from datetime import datetime, timedelta
 from typing import List, Dict, Any
 import math
 
+from sas_management.services.route_planner import route_planner
+
 
 def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """
@@ -31,7 +33,12 @@ def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
 
 def optimize_route(deliveries: List[Dict[str, Any]], start_location: Dict[str, float] = None) -> Dict[str, Any]:
     """
-    Optimize delivery route using nearest neighbor algorithm with priority consideration.
+    Order deliveries into one round trip from the start location.
+
+    Uses the route planner (services/route_planner.py) with a single
+    unlimited vehicle, so ``window_start``/``window_end`` on a delivery are
+    honoured and the order is improved by local search rather than taken
+    greedily.
     
     Args:
         deliveries: List of delivery dictionaries with:
@@ -78,91 +85,37 @@ def optimize_route(deliveries: List[Dict[str, Any]], start_location: Dict[str, f
             'message': 'No coordinates provided, sorted by priority only'
         }
     
-    # Nearest Neighbor Algorithm with Priority Weighting
-    optimized_route = []
-    remaining_deliveries = valid_deliveries.copy()
-    current_location = start_location
-    total_distance = 0.0
-    total_time = 0
+    plan = route_planner.plan(
+        valid_deliveries,
+        [{'id': None, 'capacity': None}],
+        depot=(start_location['latitude'], start_location['longitude']),
+    )
+    route = plan['routes'][0] if plan['routes'] else {'stops': [], 'total_distance': 0, 'total_time': 0, 'return_distance': 0}
     
-    while remaining_deliveries:
-        best_delivery = None
-        best_score = float('inf')
-        
-        for delivery in remaining_deliveries:
-            # Calculate distance
-            distance = calculate_distance(
-                current_location['latitude'],
-                current_location['longitude'],
-                delivery['latitude'],
-                delivery['longitude']
-            )
-            
-            # Calculate priority-adjusted score
-            # Lower score = better (closer + higher priority)
-            priority = delivery.get('priority', 0)
-            priority_multiplier = max(0.1, 1.0 - (priority / 10.0))  # Higher priority = lower multiplier
-            
-            # Score combines distance and priority
-            score = distance * priority_multiplier
-            
-            if score < best_score:
-                best_score = score
-                best_delivery = delivery
-        
-        if best_delivery:
-            # Add to route
-            distance = calculate_distance(
-                current_location['latitude'],
-                current_location['longitude'],
-                best_delivery['latitude'],
-                best_delivery['longitude']
-            )
-            
-            optimized_route.append({
-                **best_delivery,
-                'distance_from_previous': round(distance, 2),
-                'cumulative_distance': round(total_distance + distance, 2)
-            })
-            
-            total_distance += distance
-            total_time += best_delivery.get('estimated_time', 15)  # Default 15 minutes per stop
-            
-            # Update current location
-            current_location = {
-                'latitude': best_delivery['latitude'],
-                'longitude': best_delivery['longitude']
-            }
-            
-            # Remove from remaining
-            remaining_deliveries.remove(best_delivery)
-    
-    # Calculate return distance to start
-    if optimized_route:
-        last_delivery = optimized_route[-1]
-        return_distance = calculate_distance(
-            last_delivery['latitude'],
-            last_delivery['longitude'],
-            start_location['latitude'],
-            start_location['longitude']
-        )
-        total_distance += return_distance
-    
-    return {
+    result = {
         'success': True,
-        'route': optimized_route,
-        'total_distance': round(total_distance, 2),
-        'total_time': total_time,
-        'total_stops': len(optimized_route),
-        'return_distance': round(return_distance, 2) if optimized_route else 0,
-        'optimization_method': 'nearest_neighbor_with_priority',
+        'route': route['stops'],
+        'total_distance': route['total_distance'],
+        'total_time': route['total_time'],
+        'total_stops': len(route['stops']),
+        'return_distance': route['return_distance'],
+        'optimization_method': plan['optimization_method'],
         'start_location': start_location
     }
+    if plan['unassigned']:
+        # Only possible when a time window cannot be met at all
+        result['unassigned'] = plan['unassigned']
+    return result
 
 
 def group_deliveries_by_vehicle(deliveries: List[Dict[str, Any]], vehicles: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
     """
-    Group deliveries by vehicle based on capacity and location.
+    Group deliveries by vehicle based on capacity, location and time windows.
+    
+    Deliveries with coordinates are planned together by the route planner,
+    so each vehicle's list comes back in visiting order; deliveries without
+    coordinates then fill the remaining capacity, least loaded vehicle first.
+    Deliveries that fit no vehicle are left out.
     
     Args:
         deliveries: List of delivery dictionaries
@@ -174,13 +127,21 @@ def group_deliveries_by_vehicle(deliveries: List[Dict[str, Any]], vehicles: List
     vehicle_assignments = {v['id']: [] for v in vehicles}
     vehicle_capacity_used = {v['id']: 0 for v in vehicles}
     
-    # Sort deliveries by priority (highest first)
-    sorted_deliveries = sorted(deliveries, key=lambda x: x.get('priority', 0), reverse=True)
+    located = [d for d in deliveries if d.get('latitude') is not None and d.get('longitude') is not None]
+    if located and vehicles:
+        plan = route_planner.plan(located, vehicles)
+        for route in plan['routes']:
+            vehicle_assignments[route['vehicle_id']] = route['stops']
+            vehicle_capacity_used[route['vehicle_id']] = route['load']
+    
+    # Sort the rest by priority (highest first)
+    unlocated = [d for d in deliveries if d.get('latitude') is None or d.get('longitude') is None]
+    sorted_deliveries = sorted(unlocated, key=lambda x: x.get('priority', 0), reverse=True)
     
     for delivery in sorted_deliveries:
         delivery_weight = delivery.get('weight', 0)
         
-        # Find best vehicle (has capacity and is closest)
+        # Find best vehicle (has capacity and is least loaded)
         best_vehicle_id = None
         best_score = float('inf')
         
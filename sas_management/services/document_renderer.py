@@ -0,0 +1,420 @@
+"""
+Document rendering subsystem.
+
+PDF builders (invoices, receipts, event briefs, timelines, BI reports) run in
+a small process pool instead of inside the request, and their output is
+content-addressed:
+
+* Each document kind registers ``fn(path, data, assets)`` with
+  ``@register_document(kind, version)``.  ``data`` is plain, picklable data
+  (dicts, lists, numbers, strings, dates) built from the source rows by the
+  calling service.  The builder never touches the database or the Flask app.
+* The cache key is ``sha256(kind, template version, canonical JSON of data)``.
+  Rendering the same rows twice returns the file already on disk under
+  ``DOCUMENT_CACHE_FOLDER/<kind>/<key[:2]>/<key>.pdf``.  Bump ``version``
+  whenever a template changes so stale files stop matching.
+* Pool workers load shared assets once (logo bytes, TTF fonts from
+  ``static/fonts``, ReportLab's sample stylesheet) in their initializer, so
+  individual renders don't hit the disk for them.
+* ``render_many`` submits a whole batch (e.g. month-end invoices) at once and
+  yields results as they finish.  Identical documents in flight are rendered
+  only once.
+
+* Request handlers call ``prepare``, which never waits on the pool: it
+  returns the cached path, or queues the render and returns None so the
+  view can answer with ``pending_response`` (202 + Retry-After) and the
+  browser asks again.  ``render`` / ``publish`` block until the file exists
+  and are meant for background jobs and the CLI.
+* Workers are started with the ``spawn`` method (``DOCUMENT_RENDER_START_METHOD``),
+  never forked from a web worker that holds threads, locks and pooled
+  database connections.
+
+With ``DOCUMENT_RENDER_WORKERS = 0`` (or where process pools are unavailable)
+documents render in the calling thread, still through the cache.
+"""
+import atexit
+import hashlib
+import importlib
+import json
+import logging
+import math
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from types import SimpleNamespace
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+logger = logging.getLogger(__name__)
+
+LOGO_CANDIDATES = ("sas_logo.png", "ssas_logo.png")
+
+_registry = {}
+
+# Assets loaded once per process by the pool initializer (or lazily in-process)
+_assets = None
+
+
+def register_document(kind, version=1):
+    """Register ``fn(path, data, assets)`` as the builder for ``kind``."""
+    def decorator(fn):
+        _registry[kind] = (fn, version, fn.__module__)
+        return fn
+    return decorator
+
+
+def _json_default(value):
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return str(value)
+
+
+def content_key(kind, data):
+    """Cache key for ``data`` rendered with the current template for ``kind``."""
+    if kind not in _registry:
+        raise ValueError(f"Unknown document kind '{kind}'")
+    version = _registry[kind][1]
+    payload = json.dumps(data, sort_keys=True, default=_json_default, separators=(",", ":"))
+    return hashlib.sha256(f"{kind}:{version}:{payload}".encode("utf-8")).hexdigest()
+
+
+def as_namespace(value):
+    """Recursively turn dicts into attribute-access objects for template code."""
+    if isinstance(value, dict):
+        return SimpleNamespace(**{k: as_namespace(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return [as_namespace(v) for v in value]
+    return value
+
+
+# ----------------------------------------------------------------------
+# Shared assets
+# ----------------------------------------------------------------------
+def load_assets(static_folder=None):
+    """Read logo bytes, register bundled fonts and warm ReportLab's stylesheet."""
+    assets = {"logo": None, "fonts": []}
+    if static_folder:
+        for name in LOGO_CANDIDATES:
+            path = os.path.join(static_folder, "images", name)
+            if os.path.exists(path):
+                try:
+                    assets["logo"] = _flatten_png(path)
+                except OSError:
+                    continue
+                break
+        fonts_dir = os.path.join(static_folder, "fonts")
+        if os.path.isdir(fonts_dir):
+            assets["fonts"] = _register_fonts(fonts_dir)
+    try:
+        from reportlab.lib.styles import getSampleStyleSheet
+        getSampleStyleSheet()
+    except ImportError:
+        pass
+    return assets
+
+
+def _flatten_png(path):
+    """Logo bytes with any transparency flattened onto white (ReportLab renders alpha as black)."""
+    try:
+        from io import BytesIO
+        from PIL import Image as PILImage
+    except ImportError:
+        with open(path, "rb") as handle:
+            return handle.read()
+    image = PILImage.open(path)
+    if image.mode in ("RGBA", "LA", "P"):
+        if image.mode == "P":
+            image = image.convert("RGBA")
+        background = PILImage.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.split()[-1] if image.mode in ("RGBA", "LA") else None)
+        image = background
+    buffer = BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _register_fonts(fonts_dir):
+    try:
+        from reportlab.pdfbase import pdfmetrics
+        from reportlab.pdfbase.ttfonts import TTFont
+    except ImportError:
+        return []
+    registered = []
+    for filename in sorted(os.listdir(fonts_dir)):
+        if filename.lower().endswith(".ttf"):
+            name = os.path.splitext(filename)[0]
+            try:
+                pdfmetrics.registerFont(TTFont(name, os.path.join(fonts_dir, filename)))
+                registered.append(name)
+            except Exception as e:
+                logger.warning(f"Could not register font {filename}: {e}")
+    return registered
+
+
+def logo_flowable(assets, width, height):
+    """ReportLab Image for the preloaded logo, or None."""
+    if not assets or not assets.get("logo"):
+        return None
+    from io import BytesIO
+    from reportlab.platypus import Image
+    return Image(BytesIO(assets["logo"]), width=width, height=height)
+
+
+def _init_worker(static_folder):
+    global _assets
+    _assets = load_assets(static_folder)
+
+
+def _build(kind, module, data, path, static_folder=None):
+    """Render ``data`` to ``path`` atomically; runs in a pool worker or in-process."""
+    global _assets
+    if kind not in _registry:
+        importlib.import_module(module)
+    if _assets is None:
+        _assets = load_assets(static_folder)
+    fn = _registry[kind][0]
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        fn(tmp_path, data, _assets)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+    return path
+
+
+# ----------------------------------------------------------------------
+# Renderer
+# ----------------------------------------------------------------------
+class DocumentRenderer:
+    """Renders registered documents on a process pool through a content-addressed disk cache."""
+
+    def __init__(self, max_workers=2, timeout=120, start_method="spawn"):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.start_method = start_method
+        self.folder = None
+        self.static_folder = None
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._prepared = {}
+        self._atexit = False
+
+    def init_app(self, app):
+        self.max_workers = app.config.get("DOCUMENT_RENDER_WORKERS", self.max_workers)
+        self.timeout = app.config.get("DOCUMENT_RENDER_TIMEOUT", self.timeout)
+        self.start_method = app.config.get("DOCUMENT_RENDER_START_METHOD", self.start_method)
+        self.folder = app.config.get("DOCUMENT_CACHE_FOLDER") or os.path.join(app.instance_path, "documents")
+        self.static_folder = app.static_folder
+        if not self._atexit:
+            atexit.register(self.stop)
+            self._atexit = True
+
+    def _pool(self):
+        # Re-created after a fork (gunicorn pre-fork workers)
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context(self.start_method),
+                    initializer=_init_worker,
+                    initargs=(self.static_folder,),
+                )
+                self._pid = os.getpid()
+                self._inflight = {}
+                self._prepared = {}
+            return self._executor
+
+    def stop(self):
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def path_for(self, kind, key):
+        folder = self.folder or os.path.join(os.getcwd(), "instance", "documents")
+        return os.path.join(folder, kind, key[:2], f"{key}.pdf")
+
+    def cached(self, kind, data):
+        """Path of the cached rendering of ``data``, or None."""
+        path = self.path_for(kind, content_key(kind, data))
+        return path if os.path.exists(path) else None
+
+    def submit(self, kind, data):
+        """Queue a render; returns a Future resolving to the cached file's path."""
+        key = content_key(kind, data)
+        path = self.path_for(kind, key)
+        if os.path.exists(path):
+            future = Future()
+            future.set_result(path)
+            return future
+        module = _registry[kind][2]
+        if self.max_workers <= 0:
+            return self._render_inline(kind, module, data, path)
+        with self._lock:
+            pending = self._inflight.get(key)
+            if pending is not None and self._pid == os.getpid():
+                return pending
+        try:
+            future = self._pool().submit(_build, kind, module, data, path, self.static_folder)
+        except (OSError, NotImplementedError, RuntimeError) as e:
+            # No working process pool here (sandboxed hosts, shutdown in progress)
+            logger.warning(f"Document pool unavailable, rendering {kind} in-process: {e}")
+            return self._render_inline(kind, module, data, path)
+        with self._lock:
+            self._inflight[key] = future
+        future.add_done_callback(lambda _f, key=key: self._inflight.pop(key, None))
+        return future
+
+    def _render_inline(self, kind, module, data, path):
+        future = Future()
+        try:
+            future.set_result(_build(kind, module, data, path, self.static_folder))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def render(self, kind, data, timeout=None):
+        """Render (or fetch from cache) one document and return its path, waiting for the pool."""
+        return self.submit(kind, data).result(timeout=timeout or self.timeout)
+
+    def prepare(self, kind, data):
+        """
+        Non-blocking ``render`` for request handlers.
+
+        Returns the cached file's path when it is ready.  Otherwise the render
+        is queued (once, however often this is called) and None is returned;
+        a render that failed raises its error on the next call.
+        """
+        key = content_key(kind, data)
+        path = self.path_for(kind, key)
+        with self._lock:
+            future = self._prepared.pop(key, None) if self._pid == os.getpid() else None
+        if os.path.exists(path):
+            return path
+        if future is None:
+            future = self.submit(kind, data)
+        if not future.done():
+            with self._lock:
+                self._prepared[key] = future
+            return None
+        return future.result()
+
+    def render_many(self, kind, items, timeout=None):
+        """
+        Render a batch in parallel.
+
+        ``items`` is an iterable of ``(tag, data)``; yields ``(tag, path, error)``
+        in completion order, with ``error`` set (and ``path`` None) for
+        documents that failed so one bad row doesn't abort the batch.
+
+        The whole batch gets ``timeout`` seconds (default: the per-document
+        timeout for each round of ``max_workers`` renders).  Documents still
+        unfinished then are cancelled and yielded with a ``TimeoutError``.
+        """
+        futures = {}
+        for tag, data in items:
+            try:
+                futures[self.submit(kind, data)] = tag
+            except Exception as e:
+                yield tag, None, e
+        if timeout is None:
+            timeout = self.timeout * max(1, math.ceil(len(futures) / max(self.max_workers, 1)))
+        pending = dict(futures)
+        try:
+            for future in as_completed(futures, timeout=timeout):
+                tag = pending.pop(future)
+                try:
+                    yield tag, future.result(), None
+                except Exception as e:
+                    yield tag, None, e
+        except TimeoutError:
+            for future, tag in pending.items():
+                future.cancel()
+                yield tag, None, TimeoutError(f"{kind} not rendered within {timeout}s")
+
+    def publish(self, kind, data, dest, timeout=None):
+        """Render through the cache and place a copy at ``dest`` (for stable download paths)."""
+        path = self.render(kind, data, timeout=timeout)
+        copy_to(path, dest)
+        return dest
+
+    def prune(self, max_age_days):
+        """Delete cached documents not accessed for ``max_age_days``; returns the count."""
+        if not self.folder or not os.path.isdir(self.folder):
+            return 0
+        cutoff = time.time() - max_age_days * 86400
+        removed = 0
+        for root, _dirs, files in os.walk(self.folder):
+            for filename in files:
+                path = os.path.join(root, filename)
+                try:
+                    stat = os.stat(path)
+                    if max(stat.st_atime, stat.st_mtime) < cutoff:
+                        os.unlink(path)
+                        removed += 1
+                except OSError:
+                    continue
+        return removed
+
+
+def pending_response(retry_after=2):
+    """202 for a document still being rendered; the browser reloads the same URL."""
+    from flask import make_response
+    body = (
+        f'<!doctype html><meta http-equiv="refresh" content="{retry_after}">'
+        "<p>Preparing your document&hellip;</p>"
+    )
+    response = make_response(body, 202)
+    response.headers["Retry-After"] = str(retry_after)
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
+def copy_to(path, dest):
+    """Atomically place ``path`` at ``dest``, hard-linking when on the same filesystem."""
+    if os.path.abspath(path) == os.path.abspath(dest):
+        return dest
+    os.makedirs(os.path.dirname(os.path.abspath(dest)), exist_ok=True)
+    tmp_dest = f"{dest}.{os.getpid()}.tmp"
+    try:
+        os.link(path, tmp_dest)
+    except OSError:
+        shutil.copyfile(path, tmp_dest)
+    os.replace(tmp_dest, dest)
+    return dest
+
+
+renderer = DocumentRenderer()
+
+
+# ----------------------------------------------------------------------
+# CLI
+# ----------------------------------------------------------------------
+
+@click.group("documents")
+def documents_cli():
+    """Rendered document cache."""
+
+
+@documents_cli.command("prune")
+@click.option("--days", type=int, default=None, help="Remove files unused for this many days.")
+@with_appcontext
+def prune_command(days):
+    days = days if days is not None else current_app.config.get("DOCUMENT_CACHE_MAX_AGE_DAYS", 90)
+    click.echo(f"Removed {renderer.prune(days)} cached documents.")
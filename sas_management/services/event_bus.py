@@ -0,0 +1,354 @@
+"""
+Event bus and Server-Sent Events (SSE) streaming.
+
+Committed writes to ``Message`` and ``POSOrder`` (new orders and status
+changes) are published to topics:
+
+    chat:<channel>         new channel message
+    kds                    POS order created / status changed
+
+Changes are captured at flush and published after the outermost commit.
+Those flushed inside a savepoint that is rolled back are dropped with it.
+
+Browsers subscribe with ``EventSource``; on reconnect the browser sends
+``Last-Event-ID`` and only the events after that id are replayed from a
+bounded history, so a screen never re-downloads data it already has.
+
+Brokers (``EVENT_BUS_BROKER``):
+
+``memory``   (default) in-process pub/sub.  Correct for a single process
+             (the built-in server, or gunicorn with one worker and threads).
+``postgres`` LISTEN/NOTIFY fan-out so every worker process sees every event.
+
+Each open stream holds one server thread, so run gunicorn with threaded
+(``gthread``) or async workers when streams are enabled.  A stream does not
+hold a database connection: the request's session is released before the
+response starts, and the generator runs outside the request context.
+"""
+import json
+import logging
+import queue
+import select
+import threading
+import time
+from collections import deque
+
+from flask import Response
+from sqlalchemy import event, inspect as sa_inspect, select as sa_select
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = "sas_event_bus"
+# PostgreSQL rejects NOTIFY payloads of 8000 bytes or more
+MAX_NOTIFY_BYTES = 7900
+
+
+class BusEvent:
+    """One published event."""
+
+    __slots__ = ("id", "topic", "type", "data")
+
+    def __init__(self, id, topic, type, data):
+        self.id = id
+        self.topic = topic
+        self.type = type
+        self.data = data
+
+    def to_sse(self):
+        return f"id: {self.id}\nevent: {self.type}\ndata: {json.dumps(self.data, separators=(',', ':'), default=str)}\n\n"
+
+
+class InProcessBroker:
+    """Bounded event history plus a condition variable to wake subscribers."""
+
+    def __init__(self, history_size=1000):
+        self._history = deque(maxlen=history_size)
+        self._cond = threading.Condition()
+        self._last_id = 0
+
+    @property
+    def last_id(self):
+        return self._last_id
+
+    def next_id(self):
+        # Millisecond clock * 1000 keeps ids increasing across restarts and
+        # comparable between processes sharing a broker
+        with self._cond:
+            candidate = int(time.time() * 1000) * 1000
+            return max(candidate, self._last_id + 1)
+
+    def publish(self, topic, event_type, data):
+        self._append(BusEvent(self.next_id(), topic, event_type, data))
+
+    def _append(self, bus_event):
+        with self._cond:
+            if bus_event.id <= self._last_id:
+                bus_event.id = self._last_id + 1
+            self._last_id = bus_event.id
+            self._history.append(bus_event)
+            self._cond.notify_all()
+
+    def since(self, topics, last_id):
+        """Events on ``topics`` newer than ``last_id``, oldest first."""
+        with self._cond:
+            return [e for e in self._history if e.id > last_id and e.topic in topics]
+
+    def wait(self, last_id, timeout):
+        """Block until an event newer than ``last_id`` exists (or timeout)."""
+        with self._cond:
+            if self._last_id <= last_id:
+                self._cond.wait(timeout)
+            return self._last_id
+
+    def start(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class PostgresNotifyBroker(InProcessBroker):
+    """Fan events out to every process through PostgreSQL LISTEN/NOTIFY."""
+
+    def __init__(self, engine, history_size=1000):
+        super().__init__(history_size)
+        self._engine = engine
+        self._outbox = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="event-bus-listener", daemon=True)
+                self._thread.start()
+
+    def publish(self, topic, event_type, data):
+        # Delivered locally when our own NOTIFY comes back through LISTEN
+        self.start()
+        message = {"id": self.next_id(), "topic": topic, "type": event_type, "data": data}
+        payload = json.dumps(message, separators=(",", ":"), default=str)
+        if len(payload.encode("utf-8")) > MAX_NOTIFY_BYTES:
+            # Too big for NOTIFY: send the id only, subscribers fetch the row
+            message["data"] = {"id": data.get("id"), "truncated": True}
+            payload = json.dumps(message, separators=(",", ":"), default=str)
+        self._outbox.put(payload)
+
+    def _run(self):
+        while not self._stop.is_set():
+            raw = None
+            try:
+                raw = self._engine.raw_connection()
+                conn = raw.driver_connection
+                conn.autocommit = True
+                cursor = conn.cursor()
+                cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+                while not self._stop.is_set():
+                    while True:
+                        try:
+                            payload = self._outbox.get_nowait()
+                        except queue.Empty:
+                            break
+                        cursor.execute("SELECT pg_notify(%s, %s)", (NOTIFY_CHANNEL, payload))
+                    if select.select([conn], [], [], 0.05) != ([], [], []):
+                        conn.poll()
+                        while conn.notifies:
+                            self._receive(conn.notifies.pop(0).payload)
+            except Exception as e:
+                logger.warning(f"Event bus listener error, reconnecting: {e}")
+                time.sleep(1)
+            finally:
+                if raw is not None:
+                    try:
+                        raw.close()
+                    except Exception:
+                        pass
+
+    def _receive(self, payload):
+        try:
+            message = json.loads(payload)
+            self._append(BusEvent(int(message["id"]), message["topic"], message["type"], message["data"]))
+        except Exception as e:
+            logger.warning(f"Event bus dropped malformed notification: {e}")
+
+    def close(self):
+        self._stop.set()
+
+
+class EventBus:
+    """Publish model changes after commit and stream them to subscribers."""
+
+    def __init__(self, broker=None, heartbeat=15):
+        self.broker = broker or InProcessBroker()
+        self.heartbeat = heartbeat
+        self._session = None
+        self._installed = False
+
+    def init_app(self, app, session):
+        from sas_management.models import db
+        cfg = app.config
+        self.heartbeat = cfg.get("EVENT_BUS_HEARTBEAT_SECONDS", self.heartbeat)
+        history = cfg.get("EVENT_BUS_HISTORY_SIZE", 1000)
+        kind = cfg.get("EVENT_BUS_BROKER", "memory")
+        if kind == "postgres":
+            with app.app_context():
+                engine = db.engine
+            if engine.dialect.name == "postgresql":
+                self.broker = PostgresNotifyBroker(engine, history)
+            else:
+                app.logger.warning("EVENT_BUS_BROKER=postgres needs a PostgreSQL database; using in-process broker")
+                self.broker = InProcessBroker(history)
+        else:
+            self.broker = InProcessBroker(history)
+        if not self._installed:
+            event.listen(session, "after_flush", _collect_changes)
+            event.listen(session, "after_commit", self._after_commit)
+            event.listen(session, "after_soft_rollback", _discard_changes)
+            self._session = session
+            self._installed = True
+
+    def uninstall(self):
+        """Detach the change-capture listeners added by ``init_app``."""
+        if self._installed:
+            event.remove(self._session, "after_flush", _collect_changes)
+            event.remove(self._session, "after_commit", self._after_commit)
+            event.remove(self._session, "after_soft_rollback", _discard_changes)
+            self._installed = False
+
+    def publish(self, topic, event_type, data):
+        try:
+            self.broker.publish(topic, event_type, data)
+        except Exception as e:
+            logger.warning(f"Event bus publish failed for {topic}: {e}")
+
+    def _after_commit(self, session):
+        for _transaction, topic, event_type, data in session.info.pop("event_bus_pending", ()):
+            self.publish(topic, event_type, data)
+
+    # ------------------------------------------------------------------
+    # Subscribers
+    # ------------------------------------------------------------------
+    def subscribe(self, topics, last_event_id=None, max_seconds=None):
+        """
+        Generator of SSE frames for ``topics``.
+
+        Without ``last_event_id`` the stream starts at the current head, so
+        only events published after subscribing are sent.
+        """
+        topics = frozenset(topics)
+        self.broker.start()
+        cursor = self.broker.last_id if last_event_id is None else last_event_id
+        started = time.monotonic()
+        yield f"retry: 3000\nid: {cursor}\n\n" if last_event_id is None else "retry: 3000\n\n"
+        while max_seconds is None or time.monotonic() - started < max_seconds:
+            events = self.broker.since(topics, cursor)
+            if events:
+                for bus_event in events:
+                    yield bus_event.to_sse()
+                cursor = events[-1].id
+                continue
+            head = self.broker.wait(cursor, self.heartbeat)
+            if head <= cursor:
+                yield ": keep-alive\n\n"
+            else:
+                # Newer events exist on other topics only; skip past them
+                if not self.broker.since(topics, cursor):
+                    cursor = head
+
+    def stream(self, topics, last_event_id=None):
+        """
+        Flask response streaming ``topics`` as text/event-stream.
+
+        The scoped session (and the pooled connection that ``login_required``
+        checked out loading the user) is returned before streaming, so an
+        idle subscriber never pins a connection.  The generator only reads
+        the broker; anything it ever needs from the database must open its
+        own short-lived ``Session(db.engine)`` and close it per query.
+        """
+        from sas_management.models import db
+        generator = self.subscribe(topics, _parse_event_id(last_event_id))
+        db.session.remove()
+        response = Response(generator, mimetype="text/event-stream")
+        response.headers["Cache-Control"] = "no-cache"
+        response.headers["X-Accel-Buffering"] = "no"
+        return response
+
+
+def _parse_event_id(value):
+    try:
+        return int(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+# ----------------------------------------------------------------------
+# Change capture
+# ----------------------------------------------------------------------
+def _user_display(session, user_id):
+    """(email, short name) for a sender without triggering a lazy load."""
+    from sas_management.models import User
+    from sqlalchemy.orm.util import identity_key
+    user = session.identity_map.get(identity_key(User, user_id))
+    if user is not None:
+        email = user.email
+    else:
+        email = session.connection().execute(sa_select(User.email).where(User.id == user_id)).scalar()
+    name = email.split("@")[0] if email else "User"
+    return email, name
+
+
+def message_payload(session, msg):
+    email, name = _user_display(session, msg.user_id)
+    return {
+        "id": msg.id,
+        "channel": msg.channel,
+        "user_id": msg.user_id,
+        "user_email": email,
+        "user_name": name,
+        "content": msg.content,
+        "timestamp": msg.timestamp.isoformat() if msg.timestamp else None,
+        "formatted_time": msg.timestamp.strftime("%H:%M") if msg.timestamp else "",
+        "formatted_date": msg.timestamp.strftime("%b %d, %Y") if msg.timestamp else "",
+    }
+
+
+def _collect_changes(session, flush_context):
+    from sas_management.models import Message, POSOrder
+    # Tagged with the innermost transaction so a savepoint rollback can drop them
+    transaction = session.get_nested_transaction() or session.get_transaction()
+    pending = session.info.setdefault("event_bus_pending", [])
+    for obj in session.new:
+        if isinstance(obj, Message):
+            pending.append((transaction, f"chat:{obj.channel}", "message", message_payload(session, obj)))
+        elif isinstance(obj, POSOrder):
+            pending.append((transaction, "kds", "order",
+                            {"id": obj.id, "reference": obj.reference, "status": obj.status, "old_status": None}))
+    for obj in session.dirty:
+        if isinstance(obj, POSOrder):
+            history = sa_inspect(obj).attrs.status.history
+            if history.has_changes():
+                old = history.deleted[0] if history.deleted else None
+                pending.append((transaction, "kds", "order",
+                                {"id": obj.id, "reference": obj.reference, "status": obj.status, "old_status": old}))
+
+
+def _discard_changes(session, previous_transaction):
+    """Drop changes flushed inside ``previous_transaction`` (the whole session or a savepoint)."""
+    pending = session.info.get("event_bus_pending")
+    if pending:
+        pending[:] = [item for item in pending if not _inside(item[0], previous_transaction)]
+
+
+def _inside(transaction, outer):
+    while transaction is not None:
+        if transaction is outer:
+            return True
+        transaction = transaction.parent
+    return False
+
+
+event_bus = EventBus()
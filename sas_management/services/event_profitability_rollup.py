@@ -0,0 +1,449 @@
+"""
+Materialized event profitability rollups.
+
+``bi_event_profitability`` holds one row per completed event and is kept
+current without any page ever recomputing it:
+
+* every flush that writes an ``Event`` (a costing field or its status), an
+  ``EventCostItem``, ``EventRevenueItem`` or ``EventStaffAssignment`` marks
+  the affected events in ``bi_event_profitability_dirty``, in the same
+  transaction as the change;
+* a background refresher drains the dirty queue in batches, computing each
+  batch with four grouped queries (events, revenue items, cost items, staff
+  hours) and one bulk upsert, and drops rollups of events that were deleted
+  or are no longer completed;
+* ``refresh_all`` (``flask event-profitability refresh-all``) walks every
+  event by id for backfills.
+
+Figures per event:
+
+    revenue        sum of revenue items, else the quoted value
+    cost_of_goods  non-labour cost items, else the cost sheet
+                   (ingredients + transport + equipment)
+    labor_cost     labour cost items, else the cost sheet labour cost, else
+                   assigned staff hours (8 when unset) x LABOR_HOURLY_RATE
+    overhead_cost  OVERHEAD_RATE x revenue
+"""
+import atexit
+import logging
+import os
+import threading
+from datetime import datetime
+from decimal import Decimal
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import bindparam, case, delete, event, func, inspect as sa_inspect, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from sas_management.models import (
+    BIEventProfitability,
+    BIEventProfitabilityDirty,
+    Event,
+    EventCostItem,
+    EventRevenueItem,
+    EventStaffAssignment,
+    db,
+)
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_STATUSES = ("Completed",)
+LABOR_CATEGORIES = ("labor", "labour", "staff", "wages")
+LABOR_HOURLY_RATE = Decimal("50000")
+DEFAULT_SHIFT_HOURS = 8
+OVERHEAD_RATE = Decimal("0.10")
+
+# Attributes whose change alters a rollup
+_EVENT_ATTRS = ("status", "quoted_value", "labor_cost", "transport_cost", "equipment_cost", "ingredients_cost")
+_CHILD_ATTRS = {
+    EventCostItem: ("event_id", "amount", "category"),
+    EventRevenueItem: ("event_id", "amount"),
+    EventStaffAssignment: ("event_id", "assigned_hours"),
+}
+
+_rollup = BIEventProfitability.__table__
+_dirty = BIEventProfitabilityDirty.__table__
+_UPSERT_INSERTS = {"postgresql": pg_insert, "sqlite": sqlite_insert}
+_ROLLUP_COLUMNS = ("revenue", "cost_of_goods", "labor_cost", "overhead_cost", "profit", "margin_percent", "generated_at")
+_CHUNK = 500
+_PENDING_KEY = "event_profitability_dirty"
+_installed = False
+
+_ZERO = Decimal("0.00")
+_CENT = Decimal("0.01")
+
+
+def _dec(value):
+    return Decimal(str(value or 0))
+
+
+def _chunks(ids, size=_CHUNK):
+    ids = list(ids)
+    for i in range(0, len(ids), size):
+        yield ids[i:i + size]
+
+
+# ----------------------------------------------------------------------
+# Computing rollups
+# ----------------------------------------------------------------------
+def compute(event_ids, connection=None):
+    """
+    {event_id: rollup row} for the completed events among ``event_ids``,
+    from one grouped query per source table.
+    """
+    conn = connection if connection is not None else db.session.connection()
+    event_ids = list(event_ids)
+    if not event_ids:
+        return {}
+
+    events = {
+        row.id: row
+        for row in conn.execute(
+            select(
+                Event.id, Event.quoted_value, Event.labor_cost, Event.transport_cost,
+                Event.equipment_cost, Event.ingredients_cost,
+            ).where(Event.id.in_(event_ids), Event.status.in_(ROLLUP_STATUSES))
+        )
+    }
+    if not events:
+        return {}
+    ids = list(events)
+
+    revenue_items = {
+        event_id: (_dec(total), count)
+        for event_id, total, count in conn.execute(
+            select(EventRevenueItem.event_id, func.sum(EventRevenueItem.amount), func.count(EventRevenueItem.id))
+            .where(EventRevenueItem.event_id.in_(ids))
+            .group_by(EventRevenueItem.event_id)
+        )
+    }
+
+    is_labor = case(
+        (func.lower(func.coalesce(EventCostItem.category, "")).in_(LABOR_CATEGORIES), 1), else_=0
+    )
+    cost_items = {}
+    for event_id, labor, total in conn.execute(
+        select(EventCostItem.event_id, is_labor, func.sum(EventCostItem.amount))
+        .where(EventCostItem.event_id.in_(ids))
+        .group_by(EventCostItem.event_id, is_labor)
+    ):
+        cost_items.setdefault(event_id, {})[bool(labor)] = _dec(total)
+
+    staff_hours = dict(
+        conn.execute(
+            select(
+                EventStaffAssignment.event_id,
+                func.sum(func.coalesce(EventStaffAssignment.assigned_hours, DEFAULT_SHIFT_HOURS)),
+            )
+            .where(EventStaffAssignment.event_id.in_(ids))
+            .group_by(EventStaffAssignment.event_id)
+        ).all()
+    )
+
+    now = datetime.utcnow()
+    rows = {}
+    for event_id, ev in events.items():
+        revenue, revenue_count = revenue_items.get(event_id, (_ZERO, 0))
+        if not revenue_count:
+            revenue = _dec(ev.quoted_value)
+        costs = cost_items.get(event_id)
+        if costs is None:
+            cogs = _dec(ev.ingredients_cost) + _dec(ev.transport_cost) + _dec(ev.equipment_cost)
+        else:
+            cogs = costs.get(False, _ZERO)
+        if costs is not None and True in costs:
+            labor = costs[True]
+        elif ev.labor_cost:
+            labor = _dec(ev.labor_cost)
+        else:
+            labor = _dec(staff_hours.get(event_id)) * LABOR_HOURLY_RATE
+        overhead = revenue * OVERHEAD_RATE
+        profit = revenue - cogs - labor - overhead
+        rows[event_id] = {
+            "event_id": event_id,
+            "revenue": revenue.quantize(_CENT),
+            "cost_of_goods": cogs.quantize(_CENT),
+            "labor_cost": labor.quantize(_CENT),
+            "overhead_cost": overhead.quantize(_CENT),
+            "profit": profit.quantize(_CENT),
+            "margin_percent": round(float(profit / revenue * 100), 2) if revenue > 0 else 0.0,
+            "generated_at": now,
+        }
+    return rows
+
+
+def _upsert(conn, rows):
+    if not rows:
+        return
+    dialect_insert = _UPSERT_INSERTS.get(conn.dialect.name)
+    if dialect_insert is None:
+        conn.execute(delete(_rollup).where(_rollup.c.event_id.in_([row["event_id"] for row in rows])))
+        conn.execute(_rollup.insert(), rows)
+        return
+    stmt = dialect_insert(_rollup)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[_rollup.c.event_id],
+        set_={col: stmt.excluded[col] for col in _ROLLUP_COLUMNS},
+    )
+    conn.execute(stmt, rows)
+
+
+def refresh_events(event_ids, connection=None):
+    """Recompute the rollups of ``event_ids``; returns {event_id: row} for those still rolled up."""
+    conn = connection if connection is not None else db.session.connection()
+    rows = {}
+    for chunk in _chunks(set(event_ids)):
+        fresh = compute(chunk, conn)
+        _upsert(conn, list(fresh.values()))
+        gone = [event_id for event_id in chunk if event_id not in fresh]
+        if gone:
+            conn.execute(delete(_rollup).where(_rollup.c.event_id.in_(gone)))
+        rows.update(fresh)
+    return rows
+
+
+def refresh_dirty(batch_size=200, connection=None):
+    """
+    Recompute one batch of dirty events, oldest mark first, and clear their
+    marks.  A mark re-set while the batch was computed survives.  Returns
+    the number of events refreshed.
+    """
+    conn = connection if connection is not None else db.session.connection()
+    marks = conn.execute(
+        select(_dirty.c.event_id, _dirty.c.marked_at).order_by(_dirty.c.marked_at).limit(batch_size)
+    ).all()
+    if not marks:
+        return 0
+    refresh_events([event_id for event_id, _ in marks], conn)
+    conn.execute(
+        delete(_dirty).where(_dirty.c.event_id == bindparam("b_event_id"), _dirty.c.marked_at <= bindparam("b_marked_at")),
+        [{"b_event_id": event_id, "b_marked_at": marked_at} for event_id, marked_at in marks],
+    )
+    return len(marks)
+
+
+def refresh_all(batch_size=_CHUNK, connection=None):
+    """Rebuild every rollup (backfills); returns the number of rollups written."""
+    conn = connection if connection is not None else db.session.connection()
+    started = datetime.utcnow()
+    written = 0
+    last_id = 0
+    while True:
+        ids = conn.execute(
+            select(Event.id).where(Event.id > last_id).order_by(Event.id).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            break
+        written += len(refresh_events(ids, conn))
+        last_id = ids[-1]
+    # Rollups of events that no longer exist
+    conn.execute(delete(_rollup).where(_rollup.c.event_id.not_in(select(Event.id))))
+    conn.execute(delete(_dirty).where(_dirty.c.marked_at <= started))
+    return written
+
+
+def mark_dirty(event_ids, connection=None):
+    """Queue events for the refresher."""
+    conn = connection if connection is not None else db.session.connection()
+    event_ids = sorted(set(event_ids))
+    if not event_ids:
+        return
+    now = datetime.utcnow()
+    rows = [{"event_id": event_id, "marked_at": now} for event_id in event_ids]
+    dialect_insert = _UPSERT_INSERTS.get(conn.dialect.name)
+    if dialect_insert is None:
+        conn.execute(delete(_dirty).where(_dirty.c.event_id.in_(event_ids)))
+        conn.execute(_dirty.insert(), rows)
+        return
+    stmt = dialect_insert(_dirty)
+    stmt = stmt.on_conflict_do_update(index_elements=[_dirty.c.event_id], set_={"marked_at": stmt.excluded.marked_at})
+    conn.execute(stmt, rows)
+
+
+def pending_count():
+    """Number of events waiting for the refresher."""
+    return db.session.execute(select(func.count()).select_from(_dirty)).scalar() or 0
+
+
+# ----------------------------------------------------------------------
+# Background refresher
+# ----------------------------------------------------------------------
+class RollupRefresher:
+    """Thread that drains the dirty queue after commits and every ``interval`` seconds."""
+
+    def __init__(self, interval=30, batch_size=200):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.enabled = True
+        self._engine = None
+        self._logger = logger
+        self._thread = None
+        self._pid = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._start_lock = threading.Lock()
+        self.counters = {"refreshed": 0, "batches": 0, "failed": 0}
+
+    def init_app(self, app):
+        cfg = app.config
+        self.interval = cfg.get("EVENT_PROFITABILITY_REFRESH_INTERVAL", self.interval)
+        self.batch_size = cfg.get("EVENT_PROFITABILITY_BATCH_SIZE", self.batch_size)
+        self.enabled = cfg.get("EVENT_PROFITABILITY_REFRESHER", self.enabled)
+        with app.app_context():
+            self._engine = db.engine
+        self._logger = app.logger
+        atexit.register(self.stop)
+
+    def wake(self):
+        """Ask for a refresh pass soon; starts the thread if needed."""
+        if not self.enabled or self._engine is None:
+            return
+        self._ensure_thread()
+        self._wake.set()
+
+    def _ensure_thread(self):
+        # Started lazily and re-started after a fork (gunicorn pre-fork workers)
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="event-profitability-refresher", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            self.drain()
+
+    def drain(self):
+        """Refresh batches until the queue is empty; returns the events refreshed."""
+        total = 0
+        while True:
+            try:
+                with self._engine.begin() as conn:
+                    refreshed = refresh_dirty(self.batch_size, conn)
+            except Exception as e:
+                self.counters["failed"] += 1
+                self._logger.warning(f"Event profitability refresh failed: {e}")
+                return total
+            if not refreshed:
+                return total
+            total += refreshed
+            self.counters["refreshed"] += refreshed
+            self.counters["batches"] += 1
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout)
+
+
+refresher = RollupRefresher()
+
+
+# ----------------------------------------------------------------------
+# Dirty marking
+# ----------------------------------------------------------------------
+def _changed(obj, attrs):
+    state = sa_inspect(obj)
+    return any(state.attrs[attr].history.has_changes() for attr in attrs)
+
+
+def _before_flush(session, flush_context, instances):
+    # Rollups reference their event, so they go before the event row does
+    deleted = [obj.id for obj in session.deleted if isinstance(obj, Event) and obj.id is not None]
+    if deleted:
+        session.connection().execute(delete(_rollup).where(_rollup.c.event_id.in_(deleted)))
+
+
+def _after_flush(session, flush_context):
+    event_ids = set()
+    for obj in session.new | session.dirty | session.deleted:
+        if isinstance(obj, Event):
+            if obj in session.new or obj in session.deleted or _changed(obj, _EVENT_ATTRS):
+                event_ids.add(obj.id)
+            continue
+        attrs = _CHILD_ATTRS.get(type(obj))
+        if attrs is None:
+            continue
+        if obj in session.new or obj in session.deleted or _changed(obj, attrs):
+            event_ids.add(obj.event_id)
+            event_ids.update(sa_inspect(obj).attrs.event_id.history.deleted)
+    event_ids.discard(None)
+    if event_ids:
+        mark_dirty(event_ids, session.connection())
+        session.info[_PENDING_KEY] = True
+
+
+def _after_commit(session):
+    if session.info.pop(_PENDING_KEY, False):
+        refresher.wake()
+
+
+def _after_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def install(session):
+    """Attach the dirty-marking listeners to a session (or session class)."""
+    global _installed
+    if _installed:
+        return
+    event.listen(session, "before_flush", _before_flush)
+    event.listen(session, "after_flush", _after_flush)
+    event.listen(session, "after_commit", _after_commit)
+    event.listen(session, "after_rollback", _after_rollback)
+    _installed = True
+
+
+def uninstall(session):
+    """Remove the dirty-marking listeners added by ``install``."""
+    global _installed
+    if not _installed:
+        return
+    event.remove(session, "before_flush", _before_flush)
+    event.remove(session, "after_flush", _after_flush)
+    event.remove(session, "after_commit", _after_commit)
+    event.remove(session, "after_rollback", _after_rollback)
+    _installed = False
+
+
+# ----------------------------------------------------------------------
+# CLI
+# ----------------------------------------------------------------------
+@click.group("event-profitability")
+def event_profitability_cli():
+    """Manage event profitability rollups."""
+
+
+@event_profitability_cli.command("refresh-all")
+@with_appcontext
+def refresh_all_command():
+    """Recompute every event profitability rollup."""
+    written = refresh_all()
+    db.session.commit()
+    click.echo(f"Wrote {written} event profitability rollups.")
+
+
+@event_profitability_cli.command("refresh-dirty")
+@click.option("--batch-size", default=200, show_default=True)
+@with_appcontext
+def refresh_dirty_command(batch_size):
+    """Drain the dirty queue now."""
+    total = 0
+    while True:
+        refreshed = refresh_dirty(batch_size)
+        db.session.commit()
+        if not refreshed:
+            break
+        total += refreshed
+    click.echo(f"Refreshed {total} events.")
@@ -0,0 +1,281 @@
+"""
+Streaming CSV / XLSX export engine.
+
+Exports never materialise their result set:
+
+* ``stream_query`` iterates a query through a server-side cursor
+  (``yield_per``), holding one batch of rows at a time.
+* ``csv_chunks`` turns rows into CSV text a few hundred rows at a time, so a
+  ``streaming_response`` starts sending immediately and memory stays flat.
+* ``write_xlsx`` uses openpyxl's write-only workbook, which spools rows to
+  disk instead of building the sheet in memory.
+
+Ranges too large to finish inside a request run as background ``ExportJob``s
+(``export_jobs.submit``): a worker thread writes the file under
+``EXPORT_FOLDER`` and the job row records status, row count and the file for
+the download link.  Background exports are looked up by name, so each
+export source registers a ``fn(params) -> (headers, rows)`` with
+``@register_export(name)``.
+"""
+import csv
+import io
+import logging
+import os
+import secrets
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from enum import Enum
+
+from flask import Response, stream_with_context
+from sqlalchemy import Select
+
+from sas_management.models import ExportJob, db
+
+logger = logging.getLogger(__name__)
+
+MIMETYPES = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+CSV_CHUNK_ROWS = 500
+FILE_CHUNK_BYTES = 64 * 1024
+
+_registry = {}
+
+
+def register_export(name):
+    """Register ``fn(params) -> (headers, rows)`` as a background-capable export."""
+    def decorator(fn):
+        _registry[name] = fn
+        return fn
+    return decorator
+
+
+def get_export(name):
+    return _registry.get(name)
+
+
+def normalize_format(fmt):
+    fmt = (fmt or "csv").lower()
+    return fmt if fmt in MIMETYPES else "csv"
+
+
+# ----------------------------------------------------------------------
+# Row sources
+# ----------------------------------------------------------------------
+def stream_query(query, batch_size=1000):
+    """Iterate a legacy ``Query`` or a ``select()`` with a server-side cursor."""
+    if isinstance(query, Select):
+        return db.session.execute(query.execution_options(yield_per=batch_size))
+    return query.yield_per(batch_size)
+
+
+def _cell(value):
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+# ----------------------------------------------------------------------
+# Writers
+# ----------------------------------------------------------------------
+def csv_chunks(headers, rows, chunk_rows=CSV_CHUNK_ROWS):
+    """Yield CSV text for ``headers`` + ``rows``, ``chunk_rows`` rows per chunk."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(headers)
+    pending = 0
+    for row in rows:
+        writer.writerow([_cell(v) for v in row])
+        pending += 1
+        if pending >= chunk_rows:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+            pending = 0
+    tail = buffer.getvalue()
+    if tail:
+        yield tail
+
+
+def write_csv(headers, rows, path):
+    """Write a CSV file; returns the number of data rows."""
+    counter = _Counter(rows)
+    with open(path, "w", newline="", encoding="utf-8") as handle:
+        for chunk in csv_chunks(headers, counter):
+            handle.write(chunk)
+    return counter.count
+
+
+def write_xlsx(headers, rows, path, title="Export"):
+    """Write an XLSX file with a write-only (streaming) workbook; returns the row count."""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=title[:31])
+    sheet.append(list(headers))
+    count = 0
+    for row in rows:
+        sheet.append([_xlsx_cell(v) for v in row])
+        count += 1
+    workbook.save(path)
+    return count
+
+
+def _xlsx_cell(value):
+    value = _cell(value)
+    if isinstance(value, (str, int, float, date, datetime)) or value is None:
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def write_export(fmt, headers, rows, path, title="Export"):
+    if normalize_format(fmt) == "xlsx":
+        return write_xlsx(headers, rows, path, title)
+    return write_csv(headers, rows, path)
+
+
+class _Counter:
+    """Pass-through iterator that counts the rows it yields."""
+
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self.count = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        row = next(self._rows)
+        self.count += 1
+        return row
+
+
+# ----------------------------------------------------------------------
+# HTTP responses
+# ----------------------------------------------------------------------
+def _attachment(response, filename):
+    response.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+def file_chunks(path, delete=False):
+    try:
+        with open(path, "rb") as handle:
+            while True:
+                chunk = handle.read(FILE_CHUNK_BYTES)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        if delete:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+
+def streaming_response(headers, rows, filename, fmt="csv", title="Export"):
+    """
+    Chunked download of ``rows``.
+
+    CSV is generated while it is sent.  XLSX is a zip archive and can only be
+    sent once complete, so it is spooled to a temporary file first (still
+    without holding the rows in memory) and streamed from there.
+    """
+    fmt = normalize_format(fmt)
+    if fmt == "csv":
+        response = Response(stream_with_context(csv_chunks(headers, rows)), mimetype=MIMETYPES["csv"])
+        return _attachment(response, f"{filename}.csv")
+    handle = tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False)
+    handle.close()
+    try:
+        write_xlsx(headers, rows, handle.name, title)
+    except Exception:
+        os.unlink(handle.name)
+        raise
+    response = Response(file_chunks(handle.name, delete=True), mimetype=MIMETYPES["xlsx"])
+    response.headers["Content-Length"] = str(os.path.getsize(handle.name))
+    return _attachment(response, f"{filename}.xlsx")
+
+
+# ----------------------------------------------------------------------
+# Background jobs
+# ----------------------------------------------------------------------
+class ExportJobRunner:
+    """Runs registered exports on a small thread pool and records them as ExportJob rows."""
+
+    def __init__(self, max_workers=2):
+        self.max_workers = max_workers
+        self.folder = None
+        self._app = None
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self._app = app
+        self.max_workers = app.config.get("EXPORT_JOB_WORKERS", self.max_workers)
+        self.folder = app.config.get("EXPORT_FOLDER") or os.path.join(app.instance_path, "exports")
+
+    def _pool(self):
+        # Re-created after a fork (gunicorn pre-fork workers)
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="export-job")
+                self._pid = os.getpid()
+            return self._executor
+
+    def submit(self, kind, fmt="csv", params=None, user_id=None):
+        """Queue export ``kind`` and return its (committed) ExportJob."""
+        if kind not in _registry:
+            raise ValueError(f"Unknown export '{kind}'")
+        job = ExportJob(
+            token=secrets.token_urlsafe(24),
+            kind=kind,
+            fmt=normalize_format(fmt),
+            params=params or {},
+            status="pending",
+            created_by=user_id,
+        )
+        db.session.add(job)
+        db.session.commit()
+        self._pool().submit(self._run, job.id)
+        return job
+
+    def path_for(self, job):
+        return os.path.join(self.folder, f"{job.kind}_{job.token}.{job.fmt}")
+
+    def _run(self, job_id):
+        with self._app.app_context():
+            job = db.session.get(ExportJob, job_id)
+            if job is None:
+                return
+            try:
+                job.status = "running"
+                db.session.commit()
+                headers, rows = _registry[job.kind](job.params or {})
+                os.makedirs(self.folder, exist_ok=True)
+                path = self.path_for(job)
+                job.row_count = write_export(job.fmt, headers, rows, path, title=job.kind.title())
+                job.file_path = path
+                job.status = "completed"
+            except Exception as e:
+                db.session.rollback()
+                logger.exception(f"Export job {job_id} ({job.kind}) failed: {e}")
+                job = db.session.get(ExportJob, job_id)
+                job.status = "failed"
+                job.error = str(e)
+            finally:
+                job.finished_at = datetime.utcnow()
+                db.session.commit()
+                db.session.remove()
+
+
+export_jobs = ExportJobRunner()
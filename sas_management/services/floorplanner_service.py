@@ -1,14 +1,378 @@
-"""Floor Planner Service Layer - Business logic for floor plan management."""
+"""
+Floor Planner Service Layer - Business logic for floor plan management.
+
+Layouts are saved as deltas.  ``floor_plan.data`` holds the layout at
+``snapshot_revision``; every later save is one ``FloorPlanChange`` row with
+the RFC 6902 JSON-Patch that produced the next revision:
+
+* Editors send ``(base_revision, patch)``.  A base that is not the current
+  revision raises ``FloorPlanConflict`` (optimistic concurrency), so an
+  editor never patches a layout it has not seen.  Empty patches write
+  nothing.
+* Every ``FLOORPLAN_COMPACT_EVERY`` revisions the patches are folded into a
+  new ``data`` snapshot and deleted.
+* The materialized layout of recently edited plans is kept in process by
+  revision, so applying a patch does not re-read or re-parse the layout.
+* Full-layout saves (older clients, new plans) are diffed against the
+  current layout and stored the same way.
+
+Thumbnails are a deferred column, so listings never load them.
+"""
 import json
 import base64
 import io
+import threading
+from collections import OrderedDict
 from datetime import datetime
 from typing import Optional, Dict, List
 
-from sqlalchemy.exc import SQLAlchemyError
+from flask import current_app
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from PIL import Image
 
-from sas_management.models import FloorPlan, SeatingAssignment, Event, User, db
+from sas_management.models import FloorPlan, FloorPlanChange, SeatingAssignment, Event, User, db
+
+DEFAULT_LAYOUT = '{"objects": [], "meta": {"zoom": 1, "pan": {"x": 0, "y": 0}, "grid": true}}'
+COMPACT_EVERY = 50
+# Materialized layouts kept in process, most recently saved first out last
+LAYOUT_CACHE_SIZE = 32
+
+_layouts = OrderedDict()
+_layouts_lock = threading.Lock()
+
+
+class PatchError(ValueError):
+    """A JSON-Patch operation that does not apply to the layout."""
+
+
+class FloorPlanConflict(Exception):
+    """The layout was saved elsewhere since ``base_revision``."""
+
+    def __init__(self, revision):
+        super().__init__(f"Floor plan changed elsewhere (now at revision {revision})")
+        self.revision = revision
+
+
+# ----------------------------------------------------------------------
+# JSON Patch (RFC 6902)
+# ----------------------------------------------------------------------
+def _escape(token) -> str:
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+
+def _tokens(pointer: str) -> List[str]:
+    if not isinstance(pointer, str) or (pointer and not pointer.startswith("/")):
+        raise PatchError(f"Invalid path: {pointer!r}")
+    return [token.replace("~1", "/").replace("~0", "~") for token in pointer.split("/")[1:]]
+
+
+def _index(container: list, token: str, inserting: bool = False) -> int:
+    if inserting and token == "-":
+        return len(container)
+    if not token.isdigit() or (len(token) > 1 and token.startswith("0")):
+        raise PatchError(f"Invalid array index: {token!r}")
+    index = int(token)
+    if index > len(container) or (index == len(container) and not inserting):
+        raise PatchError(f"Array index out of range: {index}")
+    return index
+
+
+def _child(container, token: str):
+    if isinstance(container, list):
+        return container[_index(container, token)]
+    if isinstance(container, dict) and token in container:
+        return container[token]
+    raise PatchError(f"Path not found: {token!r}")
+
+
+def _parent(doc, tokens: List[str]):
+    for token in tokens[:-1]:
+        doc = _child(doc, token)
+    if not isinstance(doc, (dict, list)):
+        raise PatchError("Path does not lead into an object or array")
+    return doc
+
+
+def _get(doc, pointer: str):
+    for token in _tokens(pointer):
+        doc = _child(doc, token)
+    return doc
+
+
+def _clone(value):
+    """Detached copy of a JSON value, so the layout never shares objects with a patch."""
+    return json.loads(json.dumps(value))
+
+
+def _add(doc, tokens, value):
+    if not tokens:
+        return value
+    parent, token = _parent(doc, tokens), tokens[-1]
+    if isinstance(parent, list):
+        parent.insert(_index(parent, token, inserting=True), value)
+    else:
+        parent[token] = value
+    return doc
+
+
+def _replace(doc, tokens, value):
+    if not tokens:
+        return value
+    parent, token = _parent(doc, tokens), tokens[-1]
+    if isinstance(parent, list):
+        parent[_index(parent, token)] = value
+    elif token in parent:
+        parent[token] = value
+    else:
+        raise PatchError(f"Path not found: {token!r}")
+    return doc
+
+
+def _remove(doc, tokens):
+    if not tokens:
+        raise PatchError("Cannot remove the whole layout")
+    parent, token = _parent(doc, tokens), tokens[-1]
+    if isinstance(parent, list):
+        return parent.pop(_index(parent, token))
+    if token not in parent:
+        raise PatchError(f"Path not found: {token!r}")
+    return parent.pop(token)
+
+
+def apply_patch(doc, patch: List[Dict]):
+    """
+    Apply JSON-Patch ``patch`` to ``doc`` in place and return the result (the root may be replaced).
+
+    ``add`` / ``replace`` / ``copy`` insert copies of their values: a later
+    operation editing the inserted object must not rewrite the patch
+    itself, which is stored and replayed after this call.
+    """
+    if not isinstance(patch, list):
+        raise PatchError("Patch must be a list of operations")
+    for operation in patch:
+        if not isinstance(operation, dict):
+            raise PatchError("Patch operations must be objects")
+        op, path = operation.get("op"), operation.get("path")
+        tokens = _tokens(path)
+        if op in ("add", "replace", "test") and "value" not in operation:
+            raise PatchError(f"'{op}' needs a value")
+        if op == "add":
+            doc = _add(doc, tokens, _clone(operation["value"]))
+        elif op == "remove":
+            _remove(doc, tokens)
+        elif op == "replace":
+            doc = _replace(doc, tokens, _clone(operation["value"]))
+        elif op in ("move", "copy"):
+            source = operation.get("from")
+            if op == "move" and (path == source or path.startswith(f"{source}/")):
+                if path == source:
+                    continue
+                raise PatchError("Cannot move a value into itself")
+            value = _remove(doc, _tokens(source)) if op == "move" else _clone(_get(doc, source))
+            doc = _add(doc, tokens, value)
+        elif op == "test":
+            if _get(doc, path) != operation["value"]:
+                raise PatchError(f"Test failed at {path!r}")
+        else:
+            raise PatchError(f"Unknown operation: {op!r}")
+    return doc
+
+
+def _diff(before, after, path: str, ops: List[Dict]):
+    if isinstance(before, dict) and isinstance(after, dict):
+        for key in before:
+            if key not in after:
+                ops.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        for key, value in after.items():
+            if key not in before:
+                ops.append({"op": "add", "path": f"{path}/{_escape(key)}", "value": value})
+            else:
+                _diff(before[key], value, f"{path}/{_escape(key)}", ops)
+    elif isinstance(before, list) and isinstance(after, list):
+        # Skip the unchanged head and tail so one insert or delete in a long
+        # object list is one operation rather than a rewrite of every later index
+        common = min(len(before), len(after))
+        head = 0
+        while head < common and before[head] == after[head]:
+            head += 1
+        tail = 0
+        while tail < common - head and before[-1 - tail] == after[-1 - tail]:
+            tail += 1
+        old, new = before[head:len(before) - tail], after[head:len(after) - tail]
+        shared = min(len(old), len(new))
+        for i in range(shared):
+            _diff(old[i], new[i], f"{path}/{head + i}", ops)
+        for i in range(len(old) - 1, shared - 1, -1):
+            ops.append({"op": "remove", "path": f"{path}/{head + i}"})
+        for i in range(shared, len(new)):
+            ops.append({"op": "add", "path": f"{path}/{head + i}", "value": new[i]})
+    elif before != after or type(before) is not type(after):
+        ops.append({"op": "replace", "path": path, "value": after})
+
+
+def make_patch(before, after) -> List[Dict]:
+    """JSON-Patch turning ``before`` into ``after`` (empty when they are equal)."""
+    ops = []
+    _diff(before, after, "", ops)
+    return ops
+
+
+# ----------------------------------------------------------------------
+# Layout storage
+# ----------------------------------------------------------------------
+def _parse_layout(text):
+    try:
+        layout = json.loads(text) if text else None
+        # Some clients stored a JSON string of the layout
+        if isinstance(layout, str):
+            layout = json.loads(layout)
+    except (TypeError, json.JSONDecodeError):
+        layout = None
+    return layout if isinstance(layout, (dict, list)) else json.loads(DEFAULT_LAYOUT)
+
+
+def _dumps(layout) -> str:
+    return json.dumps(layout, separators=(",", ":"))
+
+
+def _materialize(floorplan: FloorPlan):
+    layout = _parse_layout(floorplan.data or floorplan.layout_json)
+    changes = (
+        db.session.query(FloorPlanChange.patch)
+        .filter(FloorPlanChange.floor_plan_id == floorplan.id, FloorPlanChange.revision > floorplan.snapshot_revision)
+        .order_by(FloorPlanChange.revision)
+    )
+    for (patch,) in changes:
+        layout = apply_patch(layout, json.loads(patch))
+    return layout
+
+
+def _take_layout(floorplan: FloorPlan):
+    """The current layout, owned by the caller (removed from the cache until it is put back)."""
+    with _layouts_lock:
+        cached = _layouts.pop(floorplan.id, None)
+    if cached is not None and cached[0] == floorplan.revision:
+        return cached[1]
+    return _materialize(floorplan)
+
+
+def _keep_layout(floorplan_id: int, revision: int, layout):
+    with _layouts_lock:
+        _layouts[floorplan_id] = (revision, layout)
+        _layouts.move_to_end(floorplan_id)
+        while len(_layouts) > LAYOUT_CACHE_SIZE:
+            _layouts.popitem(last=False)
+
+
+def layout_text(floorplan: FloorPlan) -> str:
+    """Current layout JSON of ``floorplan`` (snapshot plus any pending changes)."""
+    if floorplan.revision == floorplan.snapshot_revision and floorplan.data:
+        return floorplan.data
+    with _layouts_lock:
+        cached = _layouts.get(floorplan.id)
+        # Serialized under the lock: a save takes the layout out before changing it
+        if cached is not None and cached[0] == floorplan.revision:
+            return _dumps(cached[1])
+    layout = _materialize(floorplan)
+    _keep_layout(floorplan.id, floorplan.revision, layout)
+    return _dumps(layout)
+
+
+def current_layout(id: int) -> Dict:
+    """``{"revision", "layout"}`` for a floor plan."""
+    floorplan = FloorPlan.query.get_or_404(id)
+    return {"revision": floorplan.revision, "layout": json.loads(layout_text(floorplan))}
+
+
+def _store(floorplan: FloorPlan, base_revision: int, patch: List[Dict], layout, user_id: int = None) -> int:
+    """Record ``patch`` (already applied to ``layout``) as the revision after ``base_revision``."""
+    revision = base_revision + 1
+    now = datetime.utcnow()
+    claimed = db.session.execute(
+        update(FloorPlan)
+        .where(FloorPlan.id == floorplan.id, FloorPlan.revision == base_revision)
+        .values(revision=revision, updated_at=now)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not claimed:
+        db.session.rollback()
+        raise FloorPlanConflict(db.session.query(FloorPlan.revision).filter_by(id=floorplan.id).scalar())
+
+    compact_every = current_app.config.get("FLOORPLAN_COMPACT_EVERY", COMPACT_EVERY)
+    whole = any(operation.get("path") == "" for operation in patch)
+    if whole or revision - floorplan.snapshot_revision >= compact_every:
+        db.session.execute(
+            update(FloorPlan)
+            .where(FloorPlan.id == floorplan.id)
+            .values(data=_dumps(layout), layout_json=None, snapshot_revision=revision)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.execute(delete(FloorPlanChange).where(FloorPlanChange.floor_plan_id == floorplan.id))
+    else:
+        db.session.add(FloorPlanChange(
+            floor_plan_id=floorplan.id, revision=revision, patch=_dumps(patch), created_by=user_id, created_at=now
+        ))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another worker stored this revision first
+        db.session.rollback()
+        raise FloorPlanConflict(db.session.query(FloorPlan.revision).filter_by(id=floorplan.id).scalar())
+    return revision
+
+
+def apply_changes(id: int, base_revision: int, patch: List[Dict], user_id: int = None) -> int:
+    """
+    Apply a JSON-Patch made against ``base_revision`` and return the new revision.
+
+    Raises ``FloorPlanConflict`` when the plan is no longer at
+    ``base_revision`` and ``PatchError`` when the patch does not apply.
+    """
+    floorplan = FloorPlan.query.get_or_404(id)
+    if floorplan.revision != base_revision:
+        raise FloorPlanConflict(floorplan.revision)
+    if not patch:
+        return floorplan.revision
+    layout = _take_layout(floorplan)
+    try:
+        layout = apply_patch(layout, patch)
+        revision = _store(floorplan, base_revision, patch, layout, user_id)
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        raise Exception(f"Database error updating floor plan: {str(e)}")
+    # On any failure the layout (possibly half patched) is simply not put back
+    _keep_layout(id, revision, layout)
+    return revision
+
+
+def save_layout(id: int, layout, base_revision: int = None, user_id: int = None) -> int:
+    """
+    Save a whole layout; it is stored as the delta from the current one.
+
+    Without ``base_revision`` the save applies to whatever is current (the
+    old last-writer-wins behaviour).  Returns the new revision, or the
+    current one when nothing changed.
+    """
+    floorplan = FloorPlan.query.get_or_404(id)
+    if base_revision is None:
+        base_revision = floorplan.revision
+    elif floorplan.revision != base_revision:
+        raise FloorPlanConflict(floorplan.revision)
+    if isinstance(layout, str):
+        layout = _parse_layout(layout)
+    current = _take_layout(floorplan)
+    patch = make_patch(current, layout)
+    if not patch:
+        _keep_layout(id, floorplan.revision, current)
+        return floorplan.revision
+    try:
+        revision = _store(floorplan, base_revision, patch, layout, user_id)
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        raise Exception(f"Database error updating floor plan: {str(e)}")
+    _keep_layout(id, revision, layout)
+    return revision
 
 
 def create_floorplan(event_id: int, user_id: int, name: str = None) -> FloorPlan:
@@ -19,12 +383,10 @@ def create_floorplan(event_id: int, user_id: int, name: str = None) -> FloorPlan
         if not name:
             name = f"Floor Plan - {event.title}"
         
-        default_data = '{"objects": [], "meta": {"zoom": 1, "pan": {"x": 0, "y": 0}, "grid": true}}'
         floorplan = FloorPlan(
             event_id=event_id,
             name=name,
-            data=default_data,  # Primary field
-            layout_json=default_data,  # Keep for compatibility
+            data=DEFAULT_LAYOUT,
             created_by=user_id,
             created_at=datetime.utcnow(),
             updated_at=datetime.utcnow()
@@ -39,25 +401,15 @@ def create_floorplan(event_id: int, user_id: int, name: str = None) -> FloorPlan
 
 
 def update_floorplan(id: int, json_data: str) -> FloorPlan:
-    """Update floor plan layout JSON."""
+    """Update floor plan layout JSON (stored as the delta from the current layout)."""
+    # Validate JSON
     try:
-        floorplan = FloorPlan.query.get_or_404(id)
-        
-        # Validate JSON
-        try:
-            json.loads(json_data)
-        except json.JSONDecodeError:
-            raise ValueError("Invalid JSON data")
-        
-        floorplan.data = json_data  # Primary field - save here first
-        floorplan.layout_json = json_data  # Keep for compatibility
-        floorplan.updated_at = datetime.utcnow()
-        
-        db.session.commit()
-        return floorplan
-    except SQLAlchemyError as e:
-        db.session.rollback()
-        raise Exception(f"Database error updating floor plan: {str(e)}")
+        layout = json.loads(json_data)
+    except json.JSONDecodeError:
+        raise ValueError("Invalid JSON data")
+    
+    save_layout(id, layout)
+    return db.session.get(FloorPlan, id)
 
 
 def save_thumbnail(id: int, png_data: str) -> FloorPlan:
@@ -82,7 +434,7 @@ def save_thumbnail(id: int, png_data: str) -> FloorPlan:
             pass  # Use original if resize fails
         
         floorplan.thumbnail = thumbnail_bytes
-        floorplan.updated_at = datetime.utcnow()
+        floorplan.thumbnail_updated_at = datetime.utcnow()
         
         db.session.commit()
         return floorplan
@@ -91,6 +443,14 @@ def save_thumbnail(id: int, png_data: str) -> FloorPlan:
         raise Exception(f"Database error saving thumbnail: {str(e)}")
 
 
+def get_thumbnail(id: int) -> Optional[bytes]:
+    """Thumbnail PNG of a floor plan, or None."""
+    try:
+        return db.session.query(FloorPlan.thumbnail).filter_by(id=id).scalar()
+    except SQLAlchemyError as e:
+        raise Exception(f"Database error getting thumbnail: {str(e)}")
+
+
 def get_floorplan(id: int) -> Optional[FloorPlan]:
     """Get floor plan by ID."""
     try:
@@ -100,7 +460,7 @@ def get_floorplan(id: int) -> Optional[FloorPlan]:
 
 
 def list_floorplans(event_id: int = None) -> List[FloorPlan]:
-    """List all floor plans, optionally filtered by event."""
+    """List all floor plans, optionally filtered by event (thumbnails stay unloaded)."""
     try:
         query = FloorPlan.query
         if event_id:
@@ -117,9 +477,12 @@ def delete_floorplan(id: int) -> bool:
         
         # Delete seating assignments (cascade should handle this, but explicit is safer)
         SeatingAssignment.query.filter_by(floorplan_id=id).delete()
+        FloorPlanChange.query.filter_by(floor_plan_id=id).delete()
         
         db.session.delete(floorplan)
         db.session.commit()
+        with _layouts_lock:
+            _layouts.pop(id, None)
         return True
     except SQLAlchemyError as e:
         db.session.rollback()
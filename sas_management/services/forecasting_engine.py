@@ -0,0 +1,299 @@
+"""
+Batch forecasting engine for BI sales and bakery demand forecasts.
+
+Each source is read as a daily series with a single ``GROUP BY date`` query
+(``GROUP BY item, date`` for bakery demand), laid out as a
+series x days matrix, and forecast for every series at once with a
+day-of-week seasonal model:
+
+    level        mean of the last LEVEL_DAYS days
+    factor[w]    weekday mean / overall mean, shrunk towards 1 by SHRINKAGE
+                 weeks of pseudo-observations so sparse series stay flat
+    forecast     level * factor[weekday]
+    confidence   1 / (1 + coefficient of variation of the fit residuals),
+                 clipped to [MIN_CONFIDENCE, MAX_CONFIDENCE]
+
+Series with no history fall back to a default level with a weekend
+multiplier (the previous placeholder model).  Results are written with one
+bulk upsert per run, keyed on (source, date) / (item, date).
+
+The model is vectorized with NumPy when it is installed and falls back to
+an equivalent pure-Python loop otherwise.
+"""
+import logging
+from datetime import date, timedelta
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from sas_management.models import (
+    BakeryItem, BakeryOrder, BakeryOrderItem, BIBakeryDemand, BISalesForecast, Event, POSSalesCube, db
+)
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = "seasonal_dow"
+HISTORY_DAYS = 56  # eight of each weekday
+LEVEL_DAYS = 28
+SHRINKAGE = 2.0
+MIN_CONFIDENCE = 0.3
+MAX_CONFIDENCE = 0.95
+CANCELLED_STATUS = "Cancelled"
+
+# Fallbacks for series without history: (daily level, weekend multiplier, confidence)
+SALES_DEFAULTS = {"POS": (50000.0, 1.5, 0.7), "Catering": (100000.0, 1.5, 0.7), "Bakery": (30000.0, 1.5, 0.7)}
+BAKERY_DEMAND_DEFAULT = (5.0, 1.8, 0.65)
+
+_UPSERT_INSERTS = {"postgresql": pg_insert, "sqlite": sqlite_insert}
+
+
+# ----------------------------------------------------------------------
+# Daily series
+# ----------------------------------------------------------------------
+def _sales_statement(source, start, end):
+    """SELECT day, total for one sales source between two dates (inclusive)."""
+    if source == "POS":
+        cube = POSSalesCube.__table__
+        return (
+            select(cube.c.bucket_date, func.sum(cube.c.revenue))
+            .where(cube.c.category == "*", cube.c.bucket_date >= start, cube.c.bucket_date <= end)
+            .group_by(cube.c.bucket_date)
+        )
+    if source == "Catering":
+        return (
+            select(Event.event_date, func.sum(Event.quoted_value))
+            .where(Event.event_date >= start, Event.event_date <= end)
+            .group_by(Event.event_date)
+        )
+    if source == "Bakery":
+        return (
+            select(BakeryOrder.order_date, func.sum(BakeryOrder.total_amount))
+            .where(BakeryOrder.order_date >= start, BakeryOrder.order_date <= end,
+                   BakeryOrder.status != CANCELLED_STATUS)
+            .group_by(BakeryOrder.order_date)
+        )
+    raise ValueError(f"Unknown forecast source '{source}'")
+
+
+def _as_date(value):
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def daily_matrix(rows, keys, start, days):
+    """Lay (key, day, value) rows out as a len(keys) x days matrix (list of lists or ndarray)."""
+    index = {key: i for i, key in enumerate(keys)}
+    cells = []
+    for key, day, value in rows:
+        offset = (_as_date(day) - start).days
+        if key in index and 0 <= offset < days:
+            cells.append((index[key], offset, float(value or 0)))
+    if NUMPY_AVAILABLE:
+        matrix = np.zeros((len(keys), days))
+        if cells:
+            r, c, v = zip(*cells)
+            np.add.at(matrix, (np.array(r), np.array(c)), np.array(v))
+        return matrix
+    matrix = [[0.0] * days for _ in keys]
+    for r, c, v in cells:
+        matrix[r][c] += v
+    return matrix
+
+
+# ----------------------------------------------------------------------
+# Model
+# ----------------------------------------------------------------------
+def seasonal_forecast(history, history_start, forecast_start, horizon):
+    """
+    Day-of-week forecast for every row of ``history`` (series x days).
+
+    Returns (predictions, confidence): a series x horizon matrix and one
+    confidence per series, as NumPy arrays when available, else lists.
+    """
+    if NUMPY_AVAILABLE:
+        return _seasonal_numpy(np.asarray(history, dtype=float), history_start, forecast_start, horizon)
+    return _seasonal_python(history, history_start, forecast_start, horizon)
+
+
+def _seasonal_numpy(history, history_start, forecast_start, horizon):
+    n, days = history.shape
+    if n == 0 or days == 0:
+        return np.zeros((n, horizon)), np.full(n, MIN_CONFIDENCE)
+    hist_dow = (history_start.weekday() + np.arange(days)) % 7
+    future_dow = (forecast_start.weekday() + np.arange(horizon)) % 7
+    onehot = np.eye(7)[hist_dow]                      # days x 7
+    counts = onehot.sum(axis=0)                        # 7
+    weekday_mean = (history @ onehot) / np.maximum(counts, 1)
+    mean = history.mean(axis=1)
+    safe_mean = np.where(mean > 0, mean, 1.0)[:, None]
+    factor = (counts * weekday_mean / safe_mean + SHRINKAGE) / (counts + SHRINKAGE)
+    factor[mean <= 0] = 1.0
+    level = history[:, -LEVEL_DAYS:].mean(axis=1)
+    predictions = level[:, None] * factor[:, future_dow]
+    residuals = history - mean[:, None] * factor[:, hist_dow]
+    cv = residuals.std(axis=1) / safe_mean[:, 0]
+    confidence = np.clip(1.0 / (1.0 + cv), MIN_CONFIDENCE, MAX_CONFIDENCE)
+    return predictions, confidence
+
+
+def _seasonal_python(history, history_start, forecast_start, horizon):
+    predictions, confidence = [], []
+    for series in history:
+        days = len(series)
+        if days == 0:
+            predictions.append([0.0] * horizon)
+            confidence.append(MIN_CONFIDENCE)
+            continue
+        dow = [(history_start.weekday() + t) % 7 for t in range(days)]
+        counts = [dow.count(w) for w in range(7)]
+        sums = [0.0] * 7
+        for t, value in enumerate(series):
+            sums[dow[t]] += value
+        mean = sum(series) / days
+        if mean > 0:
+            factor = [(sums[w] / mean + SHRINKAGE) / (counts[w] + SHRINKAGE) for w in range(7)]
+        else:
+            factor = [1.0] * 7
+        tail = series[-LEVEL_DAYS:]
+        level = sum(tail) / len(tail)
+        predictions.append([level * factor[(forecast_start.weekday() + h) % 7] for h in range(horizon)])
+        residuals = [series[t] - mean * factor[dow[t]] for t in range(days)]
+        r_mean = sum(residuals) / days
+        std = (sum((r - r_mean) ** 2 for r in residuals) / days) ** 0.5
+        cv = std / (mean if mean > 0 else 1.0)
+        confidence.append(min(max(1.0 / (1.0 + cv), MIN_CONFIDENCE), MAX_CONFIDENCE))
+    return predictions, confidence
+
+
+def _forecast_rows(history, has_history, defaults, history_start, forecast_start, horizon):
+    """Per-series [(day, value)] lists and confidences, with defaults for empty series."""
+    predictions, confidence = seasonal_forecast(history, history_start, forecast_start, horizon)
+    days = [forecast_start + timedelta(days=h) for h in range(horizon)]
+    result = []
+    for i, (level, weekend, default_conf) in enumerate(defaults):
+        if has_history[i]:
+            values = [float(v) for v in predictions[i]]
+            conf = float(confidence[i])
+        else:
+            values = [level * (weekend if d.weekday() >= 5 else 1.0) for d in days]
+            conf = default_conf
+        result.append((list(zip(days, values)), round(conf, 3)))
+    return result
+
+
+def _has_history(matrix):
+    if NUMPY_AVAILABLE:
+        return (np.asarray(matrix) != 0).any(axis=1).tolist()
+    return [any(series) for series in matrix]
+
+
+def _window(history_days, today):
+    """(first history day, last history day, first forecast day); history ends yesterday."""
+    today = today or date.today()
+    return today - timedelta(days=history_days), today - timedelta(days=1), today + timedelta(days=1)
+
+
+# ----------------------------------------------------------------------
+# Storage
+# ----------------------------------------------------------------------
+def _bulk_upsert(model, rows, keys, values):
+    if not rows:
+        return
+    table = model.__table__
+    conn = db.session.connection()
+    dialect_insert = _UPSERT_INSERTS.get(conn.dialect.name)
+    if dialect_insert is not None:
+        stmt = dialect_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c[k] for k in keys],
+            set_={v: stmt.excluded[v] for v in values},
+        )
+        conn.execute(stmt, rows)
+        return
+    for row in rows:
+        conn.execute(table.delete().where(*[table.c[k] == row[k] for k in keys]))
+    conn.execute(table.insert(), rows)
+
+
+# ----------------------------------------------------------------------
+# Forecasts
+# ----------------------------------------------------------------------
+def forecast_sales(sources, horizon=14, history_days=HISTORY_DAYS, today=None):
+    """
+    Forecast daily sales for ``sources`` and upsert them into bi_sales_forecast.
+
+    One aggregate query per source.  Returns [{"source", "date",
+    "predicted_sales", "confidence"}]; the caller commits.
+    """
+    history_start, history_end, forecast_start = _window(history_days, today)
+    rows = []
+    for source in sources:
+        rows += [(source, day, total) for day, total in db.session.execute(
+            _sales_statement(source, history_start, history_end))]
+    matrix = daily_matrix(rows, sources, history_start, history_days)
+    forecasts = _forecast_rows(matrix, _has_history(matrix), [SALES_DEFAULTS[s] for s in sources],
+                               history_start, forecast_start, horizon)
+
+    records = []
+    for source, (values, conf) in zip(sources, forecasts):
+        records += [
+            {"source": source, "forecast_date": day, "predicted_revenue": round(value, 2),
+             "model_name": MODEL_NAME, "confidence": conf}
+            for day, value in values
+        ]
+    _bulk_upsert(BISalesForecast, records, ("source", "forecast_date"),
+                 ("predicted_revenue", "model_name", "confidence"))
+    return [
+        {"source": r["source"], "date": r["forecast_date"].isoformat(),
+         "predicted_sales": r["predicted_revenue"], "confidence": r["confidence"]}
+        for r in records
+    ]
+
+
+def forecast_bakery_demand(item_ids=None, horizon=14, history_days=HISTORY_DAYS, today=None):
+    """
+    Forecast daily demand for bakery items (all active items by default) in
+    one batch and upsert it into bi_bakery_demand.
+
+    Returns {item_id: [{"date", "predicted_qty"}]}; the caller commits.
+    """
+    if item_ids is None:
+        item_ids = db.session.execute(
+            select(BakeryItem.id).where(BakeryItem.status == "Active").order_by(BakeryItem.id)
+        ).scalars().all()
+    item_ids = list(item_ids)
+    if not item_ids:
+        return {}
+    history_start, history_end, forecast_start = _window(history_days, today)
+    stmt = (
+        select(BakeryOrderItem.bakery_item_id, BakeryOrder.order_date, func.sum(BakeryOrderItem.quantity))
+        .join(BakeryOrder, BakeryOrder.id == BakeryOrderItem.order_id)
+        .where(BakeryOrder.order_date >= history_start, BakeryOrder.order_date <= history_end,
+               BakeryOrder.status != CANCELLED_STATUS)
+        .group_by(BakeryOrderItem.bakery_item_id, BakeryOrder.order_date)
+    )
+    if len(item_ids) <= 500:
+        stmt = stmt.where(BakeryOrderItem.bakery_item_id.in_(item_ids))
+    matrix = daily_matrix(db.session.execute(stmt), item_ids, history_start, history_days)
+    forecasts = _forecast_rows(matrix, _has_history(matrix), [BAKERY_DEMAND_DEFAULT] * len(item_ids),
+                               history_start, forecast_start, horizon)
+
+    records, result = [], {}
+    for item_id, (values, conf) in zip(item_ids, forecasts):
+        result[item_id] = []
+        for day, value in values:
+            qty = max(int(round(value)), 0)
+            records.append({"item_id": item_id, "forecast_date": day, "predicted_demand": qty,
+                            "model_name": MODEL_NAME, "confidence": conf})
+            result[item_id].append({"date": day.isoformat(), "predicted_qty": qty})
+    _bulk_upsert(BIBakeryDemand, records, ("item_id", "forecast_date"),
+                 ("predicted_demand", "model_name", "confidence"))
+    logger.info(f"Bakery demand forecast: {len(item_ids)} items x {horizon} days")
+    return result
@@ -0,0 +1,449 @@
+"""
+Date-range availability of hire equipment.
+
+``InventoryItem.stock_count`` is the number of units the business owns.
+A hire order holds its items from the first to the last of its delivery,
+start, end and pickup dates (inclusive), unless it is cancelled or still a
+draft.  How many units of an item are free over a date range is the stock
+minus the *peak* number booked on any day of the range.
+
+Each item's bookings are kept as a step function (``ItemTimeline``): the
+sorted days on which the booked quantity changes and the level from each
+such day on, built with one sweep over the item's reservations.  Asking
+for a range is a bisect plus a scan of the changes inside it, so "what is
+free 12-14 Dec" for 10k items is one pass over the cached timelines.
+
+* The index holds reservations that end on or after ``build day -
+  HIRE_AVAILABILITY_HISTORY_DAYS``; older ranges are answered from the
+  database directly.
+* Writes to hire orders, their items or inventory items mark just the
+  affected items stale after commit; they are rebuilt on the next read.
+  ``HIRE_AVAILABILITY_TTL`` bounds how long a worker that did not see a
+  write keeps serving its copy.
+* ``reserve`` never trusts the cache: it locks the requested items' rows,
+  re-reads their overlapping reservations and only then adds the order
+  lines, so two bookings of the last units cannot both succeed.
+"""
+import threading
+import time
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import date, timedelta
+from itertools import accumulate
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import event, or_, select, update
+from sqlalchemy import inspect as sa_inspect
+
+from sas_management.models import InventoryItem, Order, OrderItem, db
+
+# Orders in these states do not hold equipment
+RELEASED_STATUSES = ("Cancelled", "Draft")
+# The dates that bound an order's hold on its items
+WINDOW_COLUMNS = (Order.delivery_date, Order.start_date, Order.end_date, Order.pickup_date)
+_ORDER_ATTRS = ("status", "delivery_date", "start_date", "end_date", "pickup_date", "event_date")
+_PENDING_KEY = "hire_availability_pending"
+# Keeps IN (...) lists under SQLite's bound-parameter limit
+_IN_CHUNK = 500
+
+
+class InsufficientAvailability(ValueError):
+    """Some items are not free in the requested quantity; ``shortages`` lists them."""
+
+    def __init__(self, shortages):
+        self.shortages = shortages
+        super().__init__(", ".join(
+            f"{s['name']} (Available: {s['available']}, Requested: {s['requested']})" for s in shortages
+        ))
+
+
+def hold_window(*dates):
+    """(first, last) day an order holds its items, from its non-empty dates, or None."""
+    dates = [d for d in dates if d]
+    if not dates:
+        return None
+    return min(dates), max(dates)
+
+
+def order_window(order):
+    window = hold_window(order.delivery_date, order.start_date, order.end_date, order.pickup_date)
+    # Orders entered with only an event date hold their items for that day
+    return window or hold_window(order.event_date)
+
+
+def rental_days(order):
+    """Days charged for a hire order (start to end inclusive, at least one)."""
+    if order.start_date and order.end_date:
+        return max(1, (order.end_date - order.start_date).days + 1)
+    return 1
+
+
+class ItemTimeline:
+    """Booked quantity of one item as a step function of the day."""
+
+    __slots__ = ("days", "levels")
+
+    def __init__(self, reservations=()):
+        changes = defaultdict(int)
+        for first, last, qty in reservations:
+            changes[first] += qty
+            changes[last + timedelta(days=1)] -= qty
+        self.days = sorted(changes)
+        self.levels = list(accumulate(changes[day] for day in self.days))
+
+    def booked_on(self, day):
+        i = bisect_right(self.days, day) - 1
+        return self.levels[i] if i >= 0 else 0
+
+    def peak(self, first, last):
+        """Most units booked on any day of ``first..last``."""
+        i = bisect_right(self.days, first) - 1
+        j = bisect_right(self.days, last)
+        return max(self.levels[max(i, 0):j], default=0)
+
+
+_EMPTY = ItemTimeline()
+
+
+def _chunks(values, size=_IN_CHUNK):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def load_reservations(item_ids=None, first=None, last=None, exclude_order_id=None):
+    """
+    ``{item_id: [(first, last, qty)]}`` for the holding order lines of
+    ``item_ids`` (all items when None) whose window overlaps ``first..last``
+    (either bound may be open).
+    """
+    columns = WINDOW_COLUMNS + (Order.event_date,)
+    query = (
+        select(OrderItem.item_id, OrderItem.qty, *columns)
+        .join(Order, Order.id == OrderItem.order_id)
+        .where(Order.status.not_in(RELEASED_STATUSES), OrderItem.qty > 0)
+    )
+    # A window overlaps the range when some date is on or after its first
+    # day and some date is on or before its last day
+    if first is not None:
+        query = query.where(or_(*(column >= first for column in columns)))
+    if last is not None:
+        query = query.where(or_(*(column <= last for column in columns)))
+    if exclude_order_id is not None:
+        query = query.where(Order.id != exclude_order_id)
+
+    reservations = defaultdict(list)
+    chunks = [None] if item_ids is None else list(_chunks(item_ids))
+    for chunk in chunks:
+        chunk_query = query if chunk is None else query.where(OrderItem.item_id.in_(chunk))
+        for item_id, qty, delivery, start, end, pickup, event_day in db.session.execute(chunk_query):
+            window = hold_window(delivery, start, end, pickup) or hold_window(event_day)
+            if window is None:
+                continue
+            if (first is None or window[1] >= first) and (last is None or window[0] <= last):
+                reservations[item_id].append((window[0], window[1], qty))
+    return reservations
+
+
+def _load_items(item_ids=None):
+    query = select(
+        InventoryItem.id, InventoryItem.name, InventoryItem.category, InventoryItem.stock_count, InventoryItem.rental_price
+    ).order_by(InventoryItem.name, InventoryItem.id)
+    chunks = [None] if item_ids is None else list(_chunks(item_ids))
+    items = {}
+    for chunk in chunks:
+        chunk_query = query if chunk is None else query.where(InventoryItem.id.in_(chunk))
+        for item_id, name, category, stock, rental_price in db.session.execute(chunk_query):
+            items[item_id] = {
+                "name": name,
+                "category": category,
+                "stock": int(stock or 0),
+                "rental_price": float(rental_price or 0),
+            }
+    return items
+
+
+def _row(item_id, item, booked, quantity):
+    row = {
+        "item_id": item_id,
+        "name": item["name"],
+        "category": item["category"],
+        "rental_price": item["rental_price"],
+        "stock": item["stock"],
+        "booked": booked,
+        "available": max(item["stock"] - booked, 0),
+    }
+    if quantity is not None:
+        row["enough"] = row["available"] >= quantity
+    return row
+
+
+def _lock_items(item_ids):
+    """Serialize bookings of these items until the transaction ends."""
+    ids = sorted(item_ids)
+    conn = db.session.connection()
+    for chunk in _chunks(ids):
+        if conn.dialect.name == "postgresql":
+            conn.execute(
+                select(InventoryItem.id).where(InventoryItem.id.in_(chunk)).order_by(InventoryItem.id).with_for_update()
+            )
+        else:
+            # No row locks elsewhere: a no-op write takes SQLite's database write lock
+            conn.execute(
+                update(InventoryItem.__table__)
+                .where(InventoryItem.__table__.c.id.in_(chunk))
+                .values(updated_at=InventoryItem.__table__.c.updated_at)
+            )
+
+
+class HireAvailability:
+    """Cached per-item booking timelines plus the locked reserve path."""
+
+    def __init__(self, ttl=300, history_days=90):
+        self.ttl = ttl
+        self.history_days = history_days
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._state = None
+        self._expires = 0.0
+        self._stale_items = set()
+        self._installed = False
+        self.builds = 0
+        self.refreshes = 0
+
+    def init_app(self, app):
+        self.ttl = app.config.get("HIRE_AVAILABILITY_TTL", self.ttl)
+        self.history_days = app.config.get("HIRE_AVAILABILITY_HISTORY_DAYS", self.history_days)
+        if not self._installed:
+            event.listen(db.session, "after_flush", self._after_flush)
+            event.listen(db.session, "after_commit", self._after_commit)
+            event.listen(db.session, "after_rollback", self._after_rollback)
+            self._installed = True
+
+    def uninstall(self):
+        """Detach the change-tracking listeners added by ``init_app``."""
+        if self._installed:
+            event.remove(db.session, "after_flush", self._after_flush)
+            event.remove(db.session, "after_commit", self._after_commit)
+            event.remove(db.session, "after_rollback", self._after_rollback)
+            self._installed = False
+
+    # ------------------------------------------------------------------
+    # Change tracking
+    # ------------------------------------------------------------------
+    def _after_flush(self, session, flush_context):
+        item_ids = set()
+        order_ids = set()
+        for obj in session.new | session.dirty | session.deleted:
+            if isinstance(obj, OrderItem):
+                item_ids.add(obj.item_id)
+                item_ids.update(sa_inspect(obj).attrs.item_id.history.deleted)
+            elif isinstance(obj, InventoryItem):
+                item_ids.add(obj.id)
+            elif isinstance(obj, Order) and obj not in session.new:
+                state = sa_inspect(obj)
+                if obj in session.deleted or any(state.attrs[a].history.has_changes() for a in _ORDER_ATTRS):
+                    order_ids.add(obj.id)
+        if order_ids:
+            rows = session.connection().execute(
+                select(OrderItem.item_id).where(OrderItem.order_id.in_(order_ids))
+            )
+            item_ids.update(item_id for (item_id,) in rows)
+        item_ids.discard(None)
+        if item_ids:
+            session.info.setdefault(_PENDING_KEY, set()).update(item_ids)
+
+    def _after_commit(self, session):
+        item_ids = session.info.pop(_PENDING_KEY, None)
+        if item_ids:
+            self.invalidate(item_ids)
+
+    def _after_rollback(self, session):
+        session.info.pop(_PENDING_KEY, None)
+
+    def invalidate(self, item_ids=None):
+        """Mark ``item_ids`` stale (rebuilt on the next read), or drop the whole index."""
+        with self._lock:
+            if item_ids is None:
+                self._state = None
+                self._stale_items.clear()
+            else:
+                self._stale_items.update(item_ids)
+
+    # ------------------------------------------------------------------
+    # Index
+    # ------------------------------------------------------------------
+    def _build(self):
+        floor = date.today() - timedelta(days=self.history_days)
+        reservations = load_reservations(first=floor)
+        return {
+            "floor": floor,
+            "items": _load_items(),
+            "timelines": {item_id: ItemTimeline(rows) for item_id, rows in reservations.items()},
+        }
+
+    def _refresh(self, state, item_ids):
+        """A copy of ``state`` with ``item_ids`` reloaded (readers may still be iterating the old one)."""
+        loaded = _load_items(item_ids)
+        reservations = load_reservations(item_ids, first=state["floor"])
+        items = dict(state["items"])
+        timelines = dict(state["timelines"])
+        for item_id in item_ids:
+            if item_id in loaded:
+                items[item_id] = loaded[item_id]
+            else:
+                items.pop(item_id, None)
+            if reservations.get(item_id):
+                timelines[item_id] = ItemTimeline(reservations[item_id])
+            else:
+                timelines.pop(item_id, None)
+        if any(item_id in loaded for item_id in item_ids):
+            # New or renamed items must keep the name order
+            items = dict(sorted(items.items(), key=lambda kv: (kv[1]["name"], kv[0])))
+        return {"floor": state["floor"], "items": items, "timelines": timelines}
+
+    def _index(self):
+        now = time.monotonic()
+        with self._lock:
+            if self._state is not None and self._expires > now and not self._stale_items:
+                return self._state
+        # One rebuild at a time; readers arriving meanwhile wait for it
+        with self._build_lock:
+            with self._lock:
+                state = self._state if self._expires > now else None
+                stale = set(self._stale_items)
+                self._stale_items.clear()
+            if state is None:
+                self.builds += 1
+                state = self._build()
+                with self._lock:
+                    self._state = state
+                    self._expires = now + self.ttl
+            elif stale:
+                # Items marked again while this runs stay in _stale_items
+                self.refreshes += 1
+                state = self._refresh(state, stale)
+                with self._lock:
+                    self._state = state
+        return state
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def availability(self, first, last, quantity=None, item_ids=None):
+        """
+        Free units of every item (or of ``item_ids``) over ``first..last``.
+
+        Returns ``[{"item_id", "name", "category", "rental_price", "stock",
+        "booked", "available"}]`` in name order; with ``quantity`` each row
+        also says whether that many are free (``"enough"``).
+        """
+        if last < first:
+            raise ValueError("End date must be after start date")
+        wanted = None if item_ids is None else set(item_ids)
+        state = self._index()
+        if first < state["floor"]:
+            # Older than the index: read the range straight from the database
+            items = _load_items(wanted)
+            reservations = load_reservations(wanted, first, last)
+            timelines = {item_id: ItemTimeline(rows) for item_id, rows in reservations.items()}
+        else:
+            items = state["items"]
+            timelines = state["timelines"]
+        return [
+            _row(item_id, item, timelines.get(item_id, _EMPTY).peak(first, last), quantity)
+            for item_id, item in items.items()
+            if wanted is None or item_id in wanted
+        ]
+
+    def available(self, item_id, first, last):
+        rows = self.availability(first, last, item_ids=[item_id])
+        return rows[0]["available"] if rows else 0
+
+    def reserve(self, order, lines):
+        """
+        Book ``lines`` (``[(item_id, qty, daily price)]``) on ``order``.
+
+        The items are locked first and their overlapping reservations are
+        read from the database, not the cache, so concurrent bookings of the
+        same units serialize and the second one sees the first.  Raises
+        ``InsufficientAvailability`` (adding nothing) when any item is short
+        for the order's dates; otherwise adds and returns the ``OrderItem``
+        rows.  The caller commits, which releases the lock.
+        """
+        window = order_window(order)
+        if window is None:
+            raise ValueError("Set the hire start and end dates before reserving items")
+        lines = [(int(item_id), int(qty), price) for item_id, qty, price in lines if int(qty) > 0]
+        wanted = defaultdict(int)
+        for item_id, qty, _price in lines:
+            wanted[item_id] += qty
+        if not wanted:
+            return []
+
+        _lock_items(wanted)
+        items = _load_items(wanted)
+        missing = sorted(set(wanted) - set(items))
+        if missing:
+            raise ValueError(f"Item ID {missing[0]} not found.")
+        reservations = load_reservations(wanted, window[0], window[1], exclude_order_id=order.id)
+        shortages = []
+        for item_id, qty in wanted.items():
+            booked = ItemTimeline(reservations.get(item_id, ())).peak(*window)
+            row = _row(item_id, items[item_id], booked, qty)
+            if not row["enough"]:
+                shortages.append({**row, "requested": qty})
+        if shortages:
+            raise InsufficientAvailability(shortages)
+
+        days = rental_days(order)
+        added = []
+        for item_id, qty, price in lines:
+            order_item = OrderItem(order_id=order.id, item_id=item_id, qty=qty, price=price, subtotal=qty * price * days)
+            db.session.add(order_item)
+            added.append(order_item)
+        return added
+
+
+hire_availability = HireAvailability()
+
+
+# ----------------------------------------------------------------------
+# CLI
+# ----------------------------------------------------------------------
+@click.group("hire-availability")
+def hire_availability_cli():
+    """Hire equipment availability."""
+
+
+@hire_availability_cli.command("restore-stock")
+@click.option("--apply", "apply_changes", is_flag=True, help="Write the corrected stock counts.")
+@with_appcontext
+def restore_stock_command(apply_changes):
+    """
+    Add back the units that booking used to deduct from stock_count.
+
+    Hire orders used to decrement InventoryItem.stock_count and nothing
+    ever added the units back; stock_count is now the owned quantity.
+    """
+    rows = db.session.execute(
+        select(OrderItem.item_id, db.func.sum(OrderItem.qty))
+        .join(Order, Order.id == OrderItem.order_id)
+        .where(Order.status.not_in(RELEASED_STATUSES))
+        .group_by(OrderItem.item_id)
+    ).all()
+    for item_id, qty in rows:
+        item = db.session.get(InventoryItem, item_id)
+        if item is None or not qty:
+            continue
+        click.echo(f"{item.name}: {item.stock_count} -> {item.stock_count + int(qty)}")
+        if apply_changes:
+            item.stock_count += int(qty)
+            if item.status == "Rented":
+                item.status = "Available"
+    if apply_changes:
+        db.session.commit()
+        click.echo("Stock counts updated.")
+    else:
+        click.echo("Dry run; re-run with --apply to write these counts.")
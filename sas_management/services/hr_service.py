@@ -1,6 +1,5 @@
 """HR Department Service Layer - Employee management, attendance, shifts, leave, payroll."""
 import os
-import csv
 from datetime import datetime, date, time
 from flask import current_app
 from werkzeug.utils import secure_filename
@@ -9,6 +8,8 @@ from sas_management.models import (
     db, Department, Position, Employee, Attendance, Shift, ShiftAssignment,
     LeaveRequest, PayrollExport, User
 )
+from sas_management.services.export_service import normalize_format, write_export
+from sas_management.services.payroll_engine import payroll_lines
 
 
 def create_employee(data, photo_file=None):
@@ -339,83 +340,62 @@ def request_leave(employee_id, data):
         return {"success": False, "error": str(e)}
 
 
-def generate_payroll_export(period_start, period_end, created_by=None):
-    """Generate payroll CSV export."""
+PAYROLL_EXPORT_HEADERS = ['Employee ID', 'Name', 'Email', 'Position', 'Department', 'Days Worked', 'Hours Worked', 'Basic Salary', 'Allowances', 'Deductions', 'Net Pay']
+
+
+def _payroll_rows(period_start, period_end, totals):
+    """Payroll rows for active employees; accumulates count/amount into ``totals``."""
+    for line in payroll_lines(period_start, period_end):
+        totals['employees'] += 1
+        totals['amount'] += line['net_pay']
+        yield [
+            line['employee_id'],
+            line['name'],
+            line['email'],
+            line['position'],
+            line['department'],
+            line['days_worked'],
+            line['hours_worked'],
+            line['basic_salary'],
+            line['allowances'],
+            line['deductions'],
+            line['net_pay'],
+        ]
+
+
+def generate_payroll_export(period_start, period_end, created_by=None, fmt='csv'):
+    """Generate payroll CSV (or XLSX) export, writing rows as they are computed."""
     try:
-        db.session.begin()
-        
         # Parse dates
         if isinstance(period_start, str):
             period_start = datetime.strptime(period_start, '%Y-%m-%d').date()
         if isinstance(period_end, str):
             period_end = datetime.strptime(period_end, '%Y-%m-%d').date()
-        
-        # Get active employees
-        employees = Employee.query.filter_by(status='active').all()
+        fmt = normalize_format(fmt)
         
         # Create export record
         export = PayrollExport(
             period_start=period_start,
             period_end=period_end,
-            employee_count=len(employees),
             created_by=created_by,
-            status='pending'
         )
         db.session.add(export)
         db.session.flush()
         
-        # Generate CSV file
+        # Generate export file
         upload_folder = os.path.join(current_app.instance_path, "hr_uploads", "docs")
         os.makedirs(upload_folder, exist_ok=True)
         
-        filename = f"payroll_export_{period_start}_{period_end}_{export.id}.csv"
+        filename = f"payroll_export_{period_start}_{period_end}_{export.id}.{fmt}"
         file_path = os.path.join(upload_folder, filename)
         
-        total_amount = 0
-        
-        with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
-            fieldnames = ['Employee ID', 'Name', 'Email', 'Position', 'Department', 'Days Worked', 'Hours Worked', 'Basic Salary', 'Allowances', 'Deductions', 'Net Pay']
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            
-            writer.writeheader()
-            
-            for employee in employees:
-                # Calculate attendance for period
-                attendances = Attendance.query.filter(
-                    Attendance.employee_id == employee.id,
-                    db.func.date(Attendance.clock_in) >= period_start,
-                    db.func.date(Attendance.clock_in) <= period_end,
-                    Attendance.approved == True
-                ).all()
-                
-                days_worked = len(set(a.clock_in.date() for a in attendances if a.clock_in))
-                hours_worked = sum([a.hours_worked or 0 for a in attendances])
-                
-                # Placeholder calculations (would integrate with actual payroll system)
-                basic_salary = 500000  # Placeholder
-                allowances = 100000
-                deductions = 50000
-                net_pay = basic_salary + allowances - deductions
-                total_amount += net_pay
-                
-                writer.writerow({
-                    'Employee ID': employee.id,
-                    'Name': employee.full_name,
-                    'Email': employee.email,
-                    'Position': employee.position.title if employee.position else 'N/A',
-                    'Department': employee.department.name if employee.department else 'N/A',
-                    'Days Worked': days_worked,
-                    'Hours Worked': round(hours_worked, 2),
-                    'Basic Salary': basic_salary,
-                    'Allowances': allowances,
-                    'Deductions': deductions,
-                    'Net Pay': net_pay
-                })
+        totals = {'employees': 0, 'amount': 0}
+        write_export(fmt, PAYROLL_EXPORT_HEADERS, _payroll_rows(period_start, period_end, totals), file_path, title="Payroll")
         
         # Update export record
         export.file_path = f"hr_uploads/docs/{filename}"
-        export.total_amount = total_amount
-        export.status = 'completed'
+        export.employee_count = totals['employees']
+        export.total_amount = totals['amount']
         
         db.session.commit()
         
@@ -443,12 +423,10 @@ def generate_payroll_pdf(period_start, period_end, created_by):
             REPORTLAB_AVAILABLE = False
             return {'success': False, 'error': 'ReportLab is not installed. Please install it using: pip install reportlab'}
         
-        db.session.begin()
-        
-        # Get all active employees with salaries
-        employees = Employee.query.filter_by(status='active').order_by(Employee.last_name.asc()).all()
+        # Active employees with attendance totals for the period
+        lines = payroll_lines(period_start, period_end)
         
-        if not employees:
+        if not lines:
             return {'success': False, 'error': 'No active employees found'}
         
         # Create PDF folder if it doesn't exist
@@ -513,17 +491,19 @@ def generate_payroll_pdf(period_start, period_end, created_by):
         elements.append(Spacer(1, 0.3*inch))
         
         # Calculate totals
-        total_salary = sum(float(emp.monthly_salary or 0) for emp in employees)
+        total_salary = sum(float(line['monthly_salary']) for line in lines)
         
         # Create table data
-        table_data = [['Employee', 'Department', 'Position', 'Monthly Salary']]
+        table_data = [['Employee', 'Department', 'Position', 'Days', 'Hours', 'Monthly Salary']]
         
-        for emp in employees:
-            salary = float(emp.monthly_salary or 0) if hasattr(emp, 'monthly_salary') else 0
+        for line in lines:
+            salary = float(line['monthly_salary'])
             table_data.append([
-                f"{emp.first_name} {emp.last_name}",
-                emp.department.name if emp.department else 'N/A',
-                emp.position or 'N/A',
+                line['name'],
+                line['department'],
+                line['position'],
+                str(line['days_worked']),
+                f"{line['hours_worked']:,.2f}",
                 f"UGX {salary:,.2f}" if salary > 0 else "N/A"
             ])
         
@@ -532,11 +512,13 @@ def generate_payroll_pdf(period_start, period_end, created_by):
             '<b>TOTAL</b>',
             '',
             '',
+            str(sum(line['days_worked'] for line in lines)),
+            f"{sum(line['hours_worked'] for line in lines):,.2f}",
             f"<b>UGX {total_salary:,.2f}</b>"
         ])
         
         # Create table
-        table = Table(table_data, colWidths=[2.5*inch, 1.5*inch, 1.5*inch, 1.5*inch])
+        table = Table(table_data, colWidths=[2.0*inch, 1.3*inch, 1.3*inch, 0.6*inch, 0.7*inch, 1.5*inch])
         table.setStyle(TableStyle([
             # Header row
             ('BACKGROUND', (0, 0), (-1, 0), brand_color),
@@ -564,7 +546,7 @@ def generate_payroll_pdf(period_start, period_end, created_by):
         elements.append(Spacer(1, 0.3*inch))
         
         # Summary statistics
-        elements.append(Paragraph(f"<b>Total Employees:</b> {len(employees)}", header_style))
+        elements.append(Paragraph(f"<b>Total Employees:</b> {len(lines)}", header_style))
         elements.append(Paragraph(f"<b>Total Payroll:</b> UGX {total_salary:,.2f}", header_style))
         
         # Build PDF
@@ -577,7 +559,7 @@ def generate_payroll_pdf(period_start, period_end, created_by):
             period_end=period_end,
             file_path=f"payroll_pdfs/{filename}",
             total_amount=total_salary,
-            employee_count=len(employees),
+            employee_count=len(lines),
             created_by=created_by
         )
         db.session.add(export)
@@ -589,7 +571,7 @@ def generate_payroll_pdf(period_start, period_end, created_by):
             'pdf_path': export.file_path,
             'filename': filename,
             'total_amount': total_salary,
-            'employee_count': len(employees)
+            'employee_count': len(lines)
         }
     except Exception as e:
         db.session.rollback()
@@ -1,4 +1,5 @@
 """Invoice service layer for PDF generation and business logic."""
+import logging
 import os
 from datetime import date, datetime
 from decimal import Decimal
@@ -10,7 +11,7 @@ try:
     from reportlab.lib.units import inch
     from reportlab.lib import colors
     from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image, HRFlowable
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, HRFlowable
     from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_LEFT
     REPORTLAB_AVAILABLE = True
 except ImportError:
@@ -18,15 +19,94 @@ except ImportError:
     pass
 
 from sas_management.models import Invoice, Event, Client, db
+from sas_management.services.document_renderer import (
+    as_namespace,
+    copy_to,
+    load_assets,
+    logo_flowable,
+    register_document,
+    renderer,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def invoice_document(invoice):
+    """Plain render data for ``invoice`` (the document cache key is derived from it)."""
+    event = invoice.event
+    client = event.client if event else None
+    return {
+        "invoice": {
+            "invoice_number": invoice.invoice_number,
+            "issue_date": invoice.issue_date,
+            "due_date": invoice.due_date,
+            "status": invoice.status.value if hasattr(invoice.status, "value") else str(invoice.status),
+            "total_amount_ugx": Decimal(str(invoice.total_amount_ugx or 0)),
+        },
+        "event": {
+            "event_name": event.event_name,
+            "event_date": event.event_date or event.date,
+            "guest_count": event.guest_count,
+            "venue": event.venue,
+        } if event else None,
+        "client": {
+            "name": client.name,
+            "contact_person": client.contact_person,
+            "email": client.email,
+            "phone": client.phone,
+            "company": client.company,
+            "address": client.address,
+        } if client else None,
+    }
+
+
+def _invoice_pdf_path(invoice):
+    pdf_relative_path = f"invoices/invoice_{invoice.invoice_number}.pdf"
+    return pdf_relative_path, os.path.abspath(os.path.join(current_app.instance_path, pdf_relative_path))
 
 
 def generate_invoice_pdf(invoice_id):
     """
     Generate professional PDF invoice with SAS Best Foods branding.
     
+    The PDF is rendered by the document pool (or served from its cache when
+    the invoice hasn't changed) and copied to ``instance/invoices``.
+    
     Args:
         invoice_id: Invoice ID to generate PDF for
     """
+    invoice = _load_invoice(invoice_id)
+    pdf_relative_path, full_path = _invoice_pdf_path(invoice)
+    renderer.publish("invoice", invoice_document(invoice), full_path)
+    
+    # Update invoice with PDF path (if field exists)
+    if hasattr(invoice, 'pdf_path'):
+        invoice.pdf_path = pdf_relative_path
+        db.session.commit()
+    
+    return full_path
+
+
+def prepare_invoice_pdf(invoice_id):
+    """
+    Non-blocking ``generate_invoice_pdf`` for request handlers.
+    
+    Returns the full path once the PDF is ready, or None while the document
+    pool is still rendering it (ask again shortly).
+    """
+    invoice = _load_invoice(invoice_id)
+    path = renderer.prepare("invoice", invoice_document(invoice))
+    if path is None:
+        return None
+    pdf_relative_path, full_path = _invoice_pdf_path(invoice)
+    copy_to(path, full_path)
+    if hasattr(invoice, 'pdf_path'):
+        invoice.pdf_path = pdf_relative_path
+        db.session.commit()
+    return full_path
+
+
+def _load_invoice(invoice_id):
     if not REPORTLAB_AVAILABLE:
         raise ImportError("ReportLab is not installed. Install it with: pip install reportlab")
     
@@ -36,40 +116,57 @@ def generate_invoice_pdf(invoice_id):
     
     if not invoice:
         raise ValueError(f"Invoice {invoice_id} not found")
+    return invoice
+
+
+def generate_invoice_pdfs(invoice_ids):
+    """
+    Render many invoices in parallel (month-end runs).
     
-    # Generate PDF path
-    invoices_folder = os.path.join(current_app.instance_path, "invoices")
-    os.makedirs(invoices_folder, exist_ok=True)
-    
-    pdf_relative_path = f"invoices/invoice_{invoice.invoice_number}.pdf"
-    full_path = os.path.join(current_app.instance_path, pdf_relative_path)
-    full_path = os.path.abspath(full_path)
-    
-    # Generate PDF
-    _generate_pdf_invoice(
-        pdf_path=full_path,
-        invoice=invoice,
-        event=invoice.event,
-        client=invoice.event.client if invoice.event else None
-    )
+    Returns ``{invoice_id: (full_path, error)}``; a failed invoice doesn't
+    stop the rest of the batch.
+    """
+    if not REPORTLAB_AVAILABLE:
+        raise ImportError("ReportLab is not installed. Install it with: pip install reportlab")
     
-    # Update invoice with PDF path (if field exists)
-    if hasattr(invoice, 'pdf_path'):
-        invoice.pdf_path = pdf_relative_path
-        db.session.commit()
+    invoices = Invoice.query.options(
+        db.joinedload(Invoice.event).joinedload(Event.client)
+    ).filter(Invoice.id.in_(list(invoice_ids))).all()
+    by_id = {invoice.id: invoice for invoice in invoices}
+    results = {invoice_id: (None, ValueError(f"Invoice {invoice_id} not found"))
+               for invoice_id in invoice_ids if invoice_id not in by_id}
     
-    return full_path
+    rendered = renderer.render_many("invoice", ((invoice.id, invoice_document(invoice)) for invoice in invoices))
+    for invoice_id, path, error in rendered:
+        if error is not None:
+            results[invoice_id] = (None, error)
+            continue
+        invoice = by_id[invoice_id]
+        pdf_relative_path, full_path = _invoice_pdf_path(invoice)
+        copy_to(path, full_path)
+        if hasattr(invoice, 'pdf_path'):
+            invoice.pdf_path = pdf_relative_path
+        results[invoice_id] = (full_path, None)
+    db.session.commit()
+    return results
+
+
+@register_document("invoice", version=1)
+def _render_invoice(pdf_path, data, assets):
+    doc = as_namespace(data)
+    _generate_pdf_invoice(pdf_path, doc.invoice, doc.event, doc.client, assets=assets)
 
 
-def _generate_pdf_invoice(pdf_path, invoice, event=None, client=None):
+def _generate_pdf_invoice(pdf_path, invoice, event=None, client=None, assets=None):
     """
     Generate professional single-page PDF invoice with SAS Best Foods branding.
     
     Args:
         pdf_path: Full path where PDF should be saved
-        invoice: Invoice object
+        invoice: Invoice object (or render data namespace)
         event: Event object (optional)
         client: Client object (optional)
+        assets: Preloaded document assets (logo); loaded on demand if omitted
     """
     if not REPORTLAB_AVAILABLE:
         raise ImportError("ReportLab is not installed. Install it with: pip install reportlab")
@@ -89,31 +186,9 @@ def _generate_pdf_invoice(pdf_path, invoice, event=None, client=None):
         story = []
         styles = getSampleStyleSheet()
         
-        # Try to load logo
-        logo_img = None
-        try:
-            logo_path = os.path.join(current_app.static_folder, 'images', 'sas_logo.png')
-            if os.path.exists(logo_path):
-                try:
-                    from PIL import Image as PILImage
-                    from io import BytesIO
-                    pil_img = PILImage.open(logo_path)
-                    if pil_img.mode in ('RGBA', 'LA', 'P'):
-                        rgb_img = PILImage.new('RGB', pil_img.size, (255, 255, 255))
-                        if pil_img.mode == 'P':
-                            pil_img = pil_img.convert('RGBA')
-                        rgb_img.paste(pil_img, mask=pil_img.split()[-1] if pil_img.mode == 'RGBA' else None)
-                        pil_img = rgb_img
-                    img_buffer = BytesIO()
-                    pil_img.save(img_buffer, format='PNG')
-                    img_buffer.seek(0)
-                    logo_img = Image(img_buffer, width=1.2*inch, height=1.2*inch)
-                except ImportError:
-                    logo_img = Image(logo_path, width=1.2*inch, height=1.2*inch)
-                except Exception:
-                    logo_img = None
-        except Exception:
-            logo_img = None
+        if assets is None:
+            assets = load_assets(current_app.static_folder)
+        logo_img = logo_flowable(assets, 1.2*inch, 1.2*inch)
         
         # ========== HEADER SECTION ==========
         header_data = []
@@ -348,9 +423,6 @@ def _generate_pdf_invoice(pdf_path, invoice, event=None, client=None):
         doc.build(story)
         
     except Exception as e:
-        try:
-            current_app.logger.exception(f"Error generating PDF invoice: {e}")
-        except:
-            pass
+        logger.exception(f"Error generating PDF invoice: {e}")
         raise
 
@@ -0,0 +1,455 @@
+"""
+Ledger reporting engine: trial balance, profit & loss and balance sheet.
+
+Every report reduces to "debit and credit totals per account over a date
+range", answered from two grouped queries:
+
+* whole calendar months inside the range are summed from
+  ``ledger_monthly_balance`` (at most one row per account per month);
+* the partial months at either end are summed from ``journal_entry_line``
+  joined to its entry over an indexed ``entry_date`` range.
+
+``ledger_monthly_balance`` is kept in step with the journal: a flush that
+adds, edits, moves or deletes a line, or re-dates or deletes an entry,
+re-folds just the (account, month) pairs it touched, in the same
+transaction.  Closed months are therefore never re-summed from lines.
+Journals posted before the table existed are folded in with
+``flask ledger rebuild``.
+
+Account types are matched case-insensitively: Asset, Liability, Equity,
+Income/Revenue and Expense/Cost of Sales.
+"""
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import and_, delete, event, func, inspect as sa_inspect, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from sas_management.models import Account, JournalEntry, JournalEntryLine, LedgerMonthlyBalance, db
+
+logger = logging.getLogger(__name__)
+
+ASSET, LIABILITY, EQUITY, INCOME, EXPENSE = "asset", "liability", "equity", "income", "expense"
+_TYPE_ALIASES = {
+    "asset": ASSET, "assets": ASSET,
+    "liability": LIABILITY, "liabilities": LIABILITY,
+    "equity": EQUITY, "capital": EQUITY,
+    "income": INCOME, "revenue": INCOME, "sales": INCOME,
+    "expense": EXPENSE, "expenses": EXPENSE, "cost of sales": EXPENSE, "cogs": EXPENSE,
+}
+# Accounts whose balance is normally a debit; the rest are credit-normal
+DEBIT_NORMAL = (ASSET, EXPENSE)
+
+# Attributes whose change moves a line between snapshot buckets
+_LINE_ATTRS = ("entry_id", "account_id", "debit", "credit")
+_ENTRY_ATTRS = ("entry_date",)
+
+_snapshot = LedgerMonthlyBalance.__table__
+_UPSERT_INSERTS = {"postgresql": pg_insert, "sqlite": sqlite_insert}
+_PENDING_KEY = "ledger_snapshot_buckets"
+_installed = False
+
+ZERO = Decimal("0.00")
+
+
+def _dec(value):
+    return Decimal(str(value or 0))
+
+
+def account_class(account_type):
+    """Normalised class (ASSET, ..., EXPENSE) of an account type, or None."""
+    return _TYPE_ALIASES.get((account_type or "").strip().lower())
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def next_month(day):
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def add_months(day, months):
+    """First day of the month ``months`` away from ``day``'s month."""
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+# ----------------------------------------------------------------------
+# Periods
+# ----------------------------------------------------------------------
+def month_period(year, month):
+    start = date(year, month, 1)
+    return start, next_month(start) - timedelta(days=1)
+
+
+def previous_period(start, end):
+    """The period of the same length immediately before [start, end]; whole months shift by months."""
+    if start.day == 1 and next_month(end) == end + timedelta(days=1):
+        months = (end.year - start.year) * 12 + end.month - start.month + 1
+        prior_start = add_months(start, -months)
+        return prior_start, start - timedelta(days=1)
+    length = (end - start).days + 1
+    return start - timedelta(days=length), start - timedelta(days=1)
+
+
+def same_period_last_year(start, end):
+    def shift(day):
+        try:
+            return day.replace(year=day.year - 1)
+        except ValueError:  # 29 February
+            return day.replace(year=day.year - 1, day=28)
+    return shift(start), shift(end)
+
+
+def comparative_period(start, end, compare):
+    """Resolve ``compare`` ("previous", "last_year" or a (start, end) pair) to a period."""
+    if not compare:
+        return None
+    if compare == "previous":
+        return previous_period(start, end)
+    if compare == "last_year":
+        return same_period_last_year(start, end)
+    compare_start, compare_end = compare
+    return compare_start, compare_end
+
+
+# ----------------------------------------------------------------------
+# Movements
+# ----------------------------------------------------------------------
+def _split(start, end):
+    """
+    Split [start, end] into whole months [first, last] (first-of-month
+    dates, or None) and the partial date ranges around them.
+    """
+    first = start if start is None or start.day == 1 else next_month(start)
+    last_day_month = next_month(end) == end + timedelta(days=1)
+    last = month_start(end) if last_day_month else add_months(end, -1)
+    if first is not None and first > last:
+        return None, None, [(start, end)]
+    partial = []
+    if start is not None and first != start:
+        partial.append((start, first - timedelta(days=1)))
+    if not last_day_month:
+        partial.append((month_start(end), end))
+    return first, last, partial
+
+
+def movements(start, end, connection=None):
+    """
+    {account_id: (debit, credit)} for journal lines dated ``start`` to
+    ``end`` inclusive (``start=None`` for everything up to ``end``).
+    """
+    conn = connection if connection is not None else db.session.connection()
+    first, last, partial = _split(start, end)
+    totals = defaultdict(lambda: [ZERO, ZERO])
+
+    if last is not None:
+        filters = [_snapshot.c.month <= last]
+        if first is not None:
+            filters.append(_snapshot.c.month >= first)
+        for account_id, debit, credit in conn.execute(
+            select(_snapshot.c.account_id, func.sum(_snapshot.c.debit), func.sum(_snapshot.c.credit))
+            .where(*filters)
+            .group_by(_snapshot.c.account_id)
+        ):
+            totals[account_id][0] += _dec(debit)
+            totals[account_id][1] += _dec(credit)
+
+    if partial:
+        ranges = [and_(JournalEntry.entry_date >= lo, JournalEntry.entry_date <= hi) for lo, hi in partial]
+        for account_id, debit, credit in conn.execute(
+            select(JournalEntryLine.account_id, func.sum(JournalEntryLine.debit), func.sum(JournalEntryLine.credit))
+            .join(JournalEntry, JournalEntry.id == JournalEntryLine.entry_id)
+            .where(or_(*ranges))
+            .group_by(JournalEntryLine.account_id)
+        ):
+            totals[account_id][0] += _dec(debit)
+            totals[account_id][1] += _dec(credit)
+    return {account_id: tuple(values) for account_id, values in totals.items()}
+
+
+def _accounts(conn):
+    return conn.execute(
+        select(Account.id, Account.account_code, Account.account_name, Account.account_type, Account.is_active)
+        .order_by(Account.account_code)
+    ).all()
+
+
+def _balance(kind, debit, credit):
+    """Signed balance on the account's normal side."""
+    return debit - credit if kind in DEBIT_NORMAL else credit - debit
+
+
+# ----------------------------------------------------------------------
+# Reports
+# ----------------------------------------------------------------------
+def trial_balance(start=None, end=None, connection=None):
+    """
+    Trial balance over [start, end] (cumulative to ``end`` when ``start`` is
+    None).  Each active account - or inactive account with activity - gets
+    its movements and its net balance on the debit or credit side.
+    """
+    conn = connection if connection is not None else db.session.connection()
+    end = end or date.today()
+    totals = movements(start, end, conn)
+    rows = []
+    for account_id, code, name, kind, is_active in _accounts(conn):
+        debit, credit = totals.get(account_id, (ZERO, ZERO))
+        if not is_active and not (debit or credit):
+            continue
+        net = debit - credit
+        rows.append({
+            "account_id": account_id,
+            "code": code,
+            "name": name,
+            "type": kind,
+            "total_debit": float(debit),
+            "total_credit": float(credit),
+            "debit": float(net) if net > 0 else 0.0,
+            "credit": float(-net) if net < 0 else 0.0,
+        })
+    return rows
+
+
+def _section(rows, kind, totals):
+    """Accounts of one class with a non-zero balance, and their total."""
+    lines, total = [], ZERO
+    for account_id, code, name, account_type, _ in rows:
+        if account_class(account_type) != kind:
+            continue
+        debit, credit = totals.get(account_id, (ZERO, ZERO))
+        amount = _balance(kind, debit, credit)
+        if amount:
+            lines.append({"account_id": account_id, "code": code, "name": name, "amount": float(amount)})
+            total += amount
+    return lines, total
+
+
+def profit_and_loss(start, end, connection=None):
+    """Income and expense accounts over [start, end]."""
+    conn = connection if connection is not None else db.session.connection()
+    totals = movements(start, end, conn)
+    accounts = _accounts(conn)
+    income, income_total = _section(accounts, INCOME, totals)
+    expenses, expense_total = _section(accounts, EXPENSE, totals)
+    return {
+        "start": start.isoformat() if start else None,
+        "end": end.isoformat(),
+        "income_accounts": income,
+        "expense_accounts": expenses,
+        "income": float(income_total),
+        "expenses": float(expense_total),
+        "profit": float(income_total - expense_total),
+    }
+
+
+def balance_sheet(as_of, connection=None):
+    """
+    Assets, liabilities and equity at ``as_of``.  Income less expenses not
+    yet closed to equity is shown as current earnings.
+    """
+    conn = connection if connection is not None else db.session.connection()
+    totals = movements(None, as_of, conn)
+    accounts = _accounts(conn)
+    assets, asset_total = _section(accounts, ASSET, totals)
+    liabilities, liability_total = _section(accounts, LIABILITY, totals)
+    equity, equity_total = _section(accounts, EQUITY, totals)
+    _, income_total = _section(accounts, INCOME, totals)
+    _, expense_total = _section(accounts, EXPENSE, totals)
+    earnings = income_total - expense_total
+    if earnings:
+        equity.append({"account_id": None, "code": None, "name": "Current Earnings", "amount": float(earnings)})
+        equity_total += earnings
+    return {
+        "as_of": as_of.isoformat(),
+        "asset_accounts": assets,
+        "liability_accounts": liabilities,
+        "equity_accounts": equity,
+        "assets": float(asset_total),
+        "liabilities": float(liability_total),
+        "equity": float(equity_total),
+        "balanced": asset_total == liability_total + equity_total,
+    }
+
+
+# ----------------------------------------------------------------------
+# Snapshot maintenance
+# ----------------------------------------------------------------------
+def fold_month(month, account_ids=None, connection=None):
+    """Re-fold one month's snapshot rows (optionally only some accounts) from journal lines."""
+    conn = connection if connection is not None else db.session.connection()
+    month = month_start(month)
+    stmt = (
+        select(
+            JournalEntryLine.account_id,
+            func.coalesce(func.sum(JournalEntryLine.debit), 0),
+            func.coalesce(func.sum(JournalEntryLine.credit), 0),
+            func.count(JournalEntryLine.id),
+        )
+        .join(JournalEntry, JournalEntry.id == JournalEntryLine.entry_id)
+        .where(JournalEntry.entry_date >= month, JournalEntry.entry_date < next_month(month))
+        .group_by(JournalEntryLine.account_id)
+    )
+    stale = delete(_snapshot).where(_snapshot.c.month == month)
+    if account_ids is not None:
+        account_ids = list(account_ids)
+        stmt = stmt.where(JournalEntryLine.account_id.in_(account_ids))
+        stale = stale.where(_snapshot.c.account_id.in_(account_ids))
+    now = datetime.utcnow()
+    rows = [
+        {"account_id": account_id, "month": month, "debit": _dec(debit), "credit": _dec(credit),
+         "line_count": count, "computed_at": now}
+        for account_id, debit, credit, count in conn.execute(stmt)
+    ]
+    present = [row["account_id"] for row in rows]
+    if present:
+        stale = stale.where(_snapshot.c.account_id.not_in(present))
+    conn.execute(stale)
+    _upsert(conn, rows)
+    return len(rows)
+
+
+def _upsert(conn, rows):
+    if not rows:
+        return
+    dialect_insert = _UPSERT_INSERTS.get(conn.dialect.name)
+    if dialect_insert is None:
+        for row in rows:
+            conn.execute(delete(_snapshot).where(
+                _snapshot.c.account_id == row["account_id"], _snapshot.c.month == row["month"]
+            ))
+        conn.execute(_snapshot.insert(), rows)
+        return
+    stmt = dialect_insert(_snapshot)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[_snapshot.c.account_id, _snapshot.c.month],
+        set_={col: stmt.excluded[col] for col in ("debit", "credit", "line_count", "computed_at")},
+    )
+    conn.execute(stmt, rows)
+
+
+def refresh_buckets(buckets, connection=None):
+    """Re-fold the given (account_id, month) pairs."""
+    conn = connection if connection is not None else db.session.connection()
+    by_month = defaultdict(set)
+    for account_id, month in buckets:
+        by_month[month_start(month)].add(account_id)
+    for month, account_ids in sorted(by_month.items()):
+        fold_month(month, account_ids, conn)
+
+
+def rebuild(connection=None):
+    """Re-fold every month that has journal entries; returns the number of months."""
+    conn = connection if connection is not None else db.session.connection()
+    first, last = conn.execute(select(func.min(JournalEntry.entry_date), func.max(JournalEntry.entry_date))).one()
+    conn.execute(delete(_snapshot))
+    if first is None:
+        return 0
+    months = 0
+    month = month_start(first)
+    while month <= last:
+        fold_month(month, connection=conn)
+        month = next_month(month)
+        months += 1
+    return months
+
+
+def _line_buckets(conn, line_ids=(), entry_ids=()):
+    """(account_id, month) of the given lines and of every line of the given entries, as stored."""
+    filters = []
+    if line_ids:
+        filters.append(JournalEntryLine.id.in_(line_ids))
+    if entry_ids:
+        filters.append(JournalEntryLine.entry_id.in_(entry_ids))
+    if not filters:
+        return set()
+    rows = conn.execute(
+        select(JournalEntryLine.account_id, JournalEntry.entry_date)
+        .join(JournalEntry, JournalEntry.id == JournalEntryLine.entry_id)
+        .where(or_(*filters))
+    )
+    return {(account_id, month_start(day)) for account_id, day in rows if day is not None}
+
+
+def _changed(obj, attrs):
+    state = sa_inspect(obj)
+    return any(state.attrs[attr].history.has_changes() for attr in attrs)
+
+
+def _before_flush(session, flush_context, instances):
+    # Where lines sit *before* this flush, read from the database
+    line_ids, entry_ids = set(), set()
+    for obj in session.dirty:
+        if isinstance(obj, JournalEntryLine) and _changed(obj, _LINE_ATTRS):
+            line_ids.add(obj.id)
+        elif isinstance(obj, JournalEntry) and _changed(obj, _ENTRY_ATTRS):
+            entry_ids.add(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, JournalEntryLine):
+            line_ids.add(obj.id)
+        elif isinstance(obj, JournalEntry):
+            entry_ids.add(obj.id)
+    line_ids.discard(None)
+    entry_ids.discard(None)
+    if line_ids or entry_ids:
+        buckets = _line_buckets(session.connection(), line_ids, entry_ids)
+        session.info.setdefault(_PENDING_KEY, set()).update(buckets)
+
+
+def _after_flush(session, flush_context):
+    buckets = session.info.pop(_PENDING_KEY, set())
+    line_ids, entry_ids = set(), set()
+    for obj in session.new | session.dirty:
+        if isinstance(obj, JournalEntryLine):
+            if obj in session.new or _changed(obj, _LINE_ATTRS):
+                line_ids.add(obj.id)
+        elif isinstance(obj, JournalEntry):
+            if obj not in session.new and _changed(obj, _ENTRY_ATTRS):
+                entry_ids.add(obj.id)
+    line_ids.discard(None)
+    buckets |= _line_buckets(session.connection(), line_ids, entry_ids)
+    if buckets:
+        refresh_buckets(buckets, session.connection())
+
+
+def install(session):
+    """Attach the snapshot maintenance listeners to a session (or session class)."""
+    global _installed
+    if _installed:
+        return
+    event.listen(session, "before_flush", _before_flush)
+    event.listen(session, "after_flush", _after_flush)
+    _installed = True
+
+
+def uninstall(session):
+    """Remove the snapshot maintenance listeners added by ``install``."""
+    global _installed
+    if not _installed:
+        return
+    event.remove(session, "before_flush", _before_flush)
+    event.remove(session, "after_flush", _after_flush)
+    _installed = False
+
+
+# ----------------------------------------------------------------------
+# CLI
+# ----------------------------------------------------------------------
+@click.group("ledger")
+def ledger_cli():
+    """Manage ledger reporting snapshots."""
+
+
+@ledger_cli.command("rebuild")
+@with_appcontext
+def rebuild_command():
+    """Re-fold all journal lines into the monthly balance snapshots."""
+    months = rebuild()
+    db.session.commit()
+    click.echo(f"Folded {months} months of journal lines.")
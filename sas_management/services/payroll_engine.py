@@ -0,0 +1,236 @@
+"""
+Set-based payroll engine.
+
+Days and hours worked for every employee in a period come from one grouped
+query over an indexed ``clock_in`` range (``ix_attendance_clock_in``)
+instead of one ``Attendance`` query per employee, and employees are loaded
+with their position and department in the same round trip.
+
+Results are kept per period in ``payroll_attendance_summary``.  Any flush
+that inserts, updates or deletes an attendance row removes the summary rows
+of that employee for the periods containing the affected day, so the next
+run only recomputes the employees whose attendance actually changed.
+``incremental=False`` forces a full recompute.
+
+Both the payroll CSV/XLSX export and the payroll PDF are built from
+``payroll_lines``.
+"""
+import logging
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from sqlalchemy import delete, event, func, inspect as sa_inspect, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.base import NO_VALUE
+
+from sas_management.models import Attendance, Employee, PayrollAttendanceSummary, db
+
+logger = logging.getLogger(__name__)
+
+# Placeholder pay components until the payroll system is integrated; basic
+# salary falls back to DEFAULT_BASIC_SALARY when no monthly salary is set
+DEFAULT_BASIC_SALARY = Decimal("500000")
+DEFAULT_ALLOWANCES = Decimal("100000")
+DEFAULT_DEDUCTIONS = Decimal("50000")
+
+# Attendance attributes that feed the summary
+_ATTENDANCE_ATTRS = ("employee_id", "clock_in", "hours_worked")
+
+_summary = PayrollAttendanceSummary.__table__
+_UPSERT_INSERTS = {"postgresql": pg_insert, "sqlite": sqlite_insert}
+_installed = False
+
+
+def _range(period_start, period_end):
+    """Half-open datetime range covering the period's days."""
+    return datetime.combine(period_start, time.min), datetime.combine(period_end + timedelta(days=1), time.min)
+
+
+def attendance_totals(period_start, period_end, employee_ids=None):
+    """{employee_id: (days_worked, hours_worked)} from one grouped query."""
+    start, end = _range(period_start, period_end)
+    stmt = (
+        select(
+            Attendance.employee_id,
+            func.count(func.distinct(func.date(Attendance.clock_in))),
+            func.coalesce(func.sum(Attendance.hours_worked), 0),
+        )
+        .where(Attendance.clock_in >= start, Attendance.clock_in < end)
+        .group_by(Attendance.employee_id)
+    )
+    if employee_ids is not None:
+        stmt = stmt.where(Attendance.employee_id.in_(employee_ids))
+    return {
+        employee_id: (int(days), Decimal(str(hours or 0)))
+        for employee_id, days, hours in db.session.execute(stmt)
+    }
+
+
+def _store(period_start, period_end, totals):
+    if not totals:
+        return
+    now = datetime.utcnow()
+    rows = [
+        {"period_start": period_start, "period_end": period_end, "employee_id": employee_id,
+         "days_worked": days, "hours_worked": hours, "computed_at": now}
+        for employee_id, (days, hours) in totals.items()
+    ]
+    conn = db.session.connection()
+    dialect_insert = _UPSERT_INSERTS.get(conn.dialect.name)
+    if dialect_insert is not None:
+        stmt = dialect_insert(_summary)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[_summary.c.period_start, _summary.c.period_end, _summary.c.employee_id],
+            set_={
+                "days_worked": stmt.excluded.days_worked,
+                "hours_worked": stmt.excluded.hours_worked,
+                "computed_at": stmt.excluded.computed_at,
+            },
+        )
+        conn.execute(stmt, rows)
+    else:
+        conn.execute(
+            delete(_summary).where(
+                _summary.c.period_start == period_start,
+                _summary.c.period_end == period_end,
+                _summary.c.employee_id.in_(list(totals)),
+            )
+        )
+        conn.execute(_summary.insert(), rows)
+
+
+def period_totals(period_start, period_end, employee_ids, incremental=True):
+    """
+    {employee_id: (days_worked, hours_worked)} for ``employee_ids``.
+
+    Reuses the stored summary for employees whose attendance has not changed
+    since the last run and recomputes the rest with one grouped query.
+    Returns (totals, recomputed_count).
+    """
+    employee_ids = list(employee_ids)
+    cached = {}
+    if incremental:
+        rows = db.session.execute(
+            select(_summary.c.employee_id, _summary.c.days_worked, _summary.c.hours_worked).where(
+                _summary.c.period_start == period_start, _summary.c.period_end == period_end
+            )
+        )
+        wanted = set(employee_ids)
+        cached = {
+            employee_id: (int(days), Decimal(str(hours)))
+            for employee_id, days, hours in rows
+            if employee_id in wanted
+        }
+    missing = [employee_id for employee_id in employee_ids if employee_id not in cached]
+    if not missing:
+        return cached, 0
+    fresh = attendance_totals(period_start, period_end, missing if cached else None)
+    zero = (0, Decimal("0.00"))
+    fresh = {employee_id: fresh.get(employee_id, zero) for employee_id in missing}
+    _store(period_start, period_end, fresh)
+    cached.update(fresh)
+    return cached, len(missing)
+
+
+def active_employees():
+    """Active employees with position and department eager-loaded."""
+    return (
+        Employee.query.options(joinedload(Employee.department), joinedload(Employee.position_obj))
+        .filter_by(status="active")
+        .order_by(Employee.last_name.asc(), Employee.first_name.asc(), Employee.id.asc())
+        .all()
+    )
+
+
+def payroll_lines(period_start, period_end, incremental=True):
+    """One dict per active employee with attendance totals and pay components."""
+    employees = active_employees()
+    totals, recomputed = period_totals(period_start, period_end, [e.id for e in employees], incremental)
+    logger.info(f"Payroll {period_start}..{period_end}: {len(employees)} employees, {recomputed} recomputed")
+    lines = []
+    for employee in employees:
+        days, hours = totals.get(employee.id, (0, Decimal("0.00")))
+        monthly_salary = Decimal(str(employee.monthly_salary or 0))
+        basic_salary = monthly_salary if monthly_salary > 0 else DEFAULT_BASIC_SALARY
+        lines.append({
+            "employee_id": employee.id,
+            "name": employee.full_name,
+            "email": employee.email,
+            "position": employee.position_obj.title if employee.position_obj else (employee.position or "N/A"),
+            "department": employee.department.name if employee.department else "N/A",
+            "monthly_salary": monthly_salary,
+            "days_worked": days,
+            "hours_worked": hours,
+            "basic_salary": basic_salary,
+            "allowances": DEFAULT_ALLOWANCES,
+            "deductions": DEFAULT_DEDUCTIONS,
+            "net_pay": basic_salary + DEFAULT_ALLOWANCES - DEFAULT_DEDUCTIONS,
+        })
+    return lines
+
+
+# ----------------------------------------------------------------------
+# Invalidation
+# ----------------------------------------------------------------------
+def _old(state, attr):
+    if attr in state.committed_state:
+        return state.committed_state[attr]
+    return getattr(state.obj(), attr)
+
+
+def _touched(obj, state, include_old):
+    """(employee_id, day) pairs affected by an attendance write; day None = unknown."""
+    pairs = {(obj.employee_id, obj.clock_in.date() if obj.clock_in else None)}
+    if include_old:
+        employee_id, clock_in = _old(state, "employee_id"), _old(state, "clock_in")
+        if employee_id is NO_VALUE:
+            employee_id = obj.employee_id
+        if clock_in is NO_VALUE:
+            pairs.add((employee_id, None))
+        elif clock_in is not None:
+            pairs.add((employee_id, clock_in.date()))
+    return pairs
+
+
+def _after_flush(session, flush_context):
+    touched = set()
+    for obj in session.new:
+        if isinstance(obj, Attendance):
+            touched |= _touched(obj, None, False)
+    for obj in session.dirty:
+        if isinstance(obj, Attendance):
+            state = sa_inspect(obj)
+            if any(state.attrs[attr].history.has_changes() for attr in _ATTENDANCE_ATTRS):
+                touched |= _touched(obj, state, True)
+    for obj in session.deleted:
+        if isinstance(obj, Attendance):
+            touched |= _touched(obj, sa_inspect(obj), True)
+    touched = {(employee_id, day) for employee_id, day in touched if employee_id}
+    if not touched:
+        return
+    conn = session.connection()
+    for employee_id, day in touched:
+        stmt = delete(_summary).where(_summary.c.employee_id == employee_id)
+        if day is not None:
+            stmt = stmt.where(_summary.c.period_start <= day, _summary.c.period_end >= day)
+        conn.execute(stmt)
+
+
+def install(session):
+    """Attach the summary invalidation listener to a session (or session class)."""
+    global _installed
+    if _installed:
+        return
+    event.listen(session, "after_flush", _after_flush)
+    _installed = True
+
+
+def uninstall(session):
+    """Remove the summary invalidation listener added by ``install``."""
+    global _installed
+    if not _installed:
+        return
+    event.remove(session, "after_flush", _after_flush)
+    _installed = False
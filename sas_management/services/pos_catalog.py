@@ -0,0 +1,207 @@
+"""
+POS product catalog snapshot.
+
+Every till loads the full sellable catalog - catering and bakery items at
+their current price plus custom POS products - when it opens or refreshes.
+The catalog is built with one query per source table plus a single
+window-function query that picks the latest ``PriceHistory`` row for every
+item, and is kept in process as a plain-data snapshot:
+
+* The snapshot ``version`` is a hash of its content, so it doubles as the
+  HTTP ETag and is the same in every worker that built the same catalog.
+* Any flush that writes a price, catering item, bakery item or POS product
+  invalidates the snapshot; ``POS_CATALOG_TTL`` bounds how long a worker
+  that did not see the write keeps serving its copy.
+* Recent versions are remembered so a terminal that already holds one can
+  ask for just the products that changed (``delta``).
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from flask import url_for
+from sqlalchemy import event, func
+
+from sas_management.models import BakeryItem, CateringItem, POSProduct, PriceHistory, db
+
+# Writes to these models change the catalog
+WATCHED_MODELS = (BakeryItem, CateringItem, POSProduct, PriceHistory)
+# Versions kept for deltas
+HISTORY_SIZE = 16
+
+
+def current_prices(item_type=None):
+    """``{(item_type, item_id): price}`` from the latest PriceHistory row of every item, in one query."""
+    rank = func.row_number().over(
+        partition_by=(PriceHistory.item_type, PriceHistory.item_id),
+        order_by=(PriceHistory.effective_date.desc(), PriceHistory.id.desc()),
+    ).label("rank")
+    ranked = db.session.query(PriceHistory.item_type, PriceHistory.item_id, PriceHistory.price_ugx, rank)
+    if item_type:
+        ranked = ranked.filter(PriceHistory.item_type == item_type)
+    ranked = ranked.subquery()
+    rows = db.session.query(ranked.c.item_type, ranked.c.item_id, ranked.c.price_ugx).filter(ranked.c.rank == 1)
+    return {(kind, item_id): price for kind, item_id, price in rows}
+
+
+def product_key(product):
+    """Catalog key of a product: ids are only unique within a source table."""
+    return f"{product['type']}:{product['id']}"
+
+
+def build_products():
+    """The sellable catalog in till order: catering, bakery, then custom POS products."""
+    prices = current_prices()
+    placeholder = url_for("static", filename="images/product-placeholder.svg")
+    products = []
+
+    catering = db.session.query(
+        CateringItem.id, CateringItem.name, CateringItem.selling_price_ugx, CateringItem.price_ugx
+    ).order_by(CateringItem.id)
+    for item_id, name, selling_price, legacy_price in catering:
+        key = ("CATERING", item_id)
+        price = prices[key] if key in prices else (selling_price or legacy_price)
+        if price and price > 0:  # Only include items with prices
+            products.append({
+                "id": item_id,
+                "name": name,
+                "type": "CATERING",
+                "price": float(price),
+                "category": "Catering",
+                "image_url": placeholder,
+            })
+
+    bakery = db.session.query(
+        BakeryItem.id, BakeryItem.name, BakeryItem.price_ugx, BakeryItem.category
+    ).filter(BakeryItem.status == "Active").order_by(BakeryItem.id)
+    for item_id, name, base_price, category in bakery:
+        key = ("BAKERY", item_id)
+        price = prices[key] if key in prices else base_price
+        if price and price > 0:
+            products.append({
+                "id": item_id,
+                "name": name,
+                "type": "BAKERY",
+                "price": float(price),
+                "category": category or "Bakery",
+                "image_url": placeholder,
+            })
+
+    pos_placeholder = url_for("static", filename="images/product-placeholder.png")
+    for item in POSProduct.query.filter_by(is_available=True).order_by(POSProduct.id):
+        products.append({
+            "id": f"POS-{item.id}",  # Prefix to distinguish from Catering/Bakery items
+            "name": item.name,
+            "type": "POS_PRODUCT",
+            "price": float(item.price or 0),
+            "category": item.category or "Custom",
+            "image_url": item.image_url or pos_placeholder,
+            "description": item.description,
+            "barcode": item.barcode,
+            "sku": item.sku,
+        })
+    return products
+
+
+def _version(products):
+    payload = json.dumps(products, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class PosCatalog:
+    """Builds, caches and diffs the POS catalog snapshot."""
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._snapshot = None
+        self._expires = 0.0
+        self._generation = 0
+        self._history = OrderedDict()
+        self._installed = False
+        self.builds = 0
+
+    def init_app(self, app):
+        self.ttl = app.config.get("POS_CATALOG_TTL", self.ttl)
+        if not self._installed:
+            event.listen(db.session, "after_flush", self._after_flush)
+            self._installed = True
+
+    def uninstall(self):
+        """Stop invalidating on flush (undoes ``init_app``)."""
+        if self._installed:
+            event.remove(db.session, "after_flush", self._after_flush)
+            self._installed = False
+
+    def _after_flush(self, session, flush_context):
+        for obj in session.new | session.dirty | session.deleted:
+            if isinstance(obj, WATCHED_MODELS):
+                self.invalidate()
+                return
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._snapshot = None
+
+    def _cached(self, now):
+        with self._lock:
+            if self._snapshot is not None and self._expires > now:
+                return self._snapshot, self._generation
+            return None, self._generation
+
+    def snapshot(self):
+        """``{"version", "products", "by_key"}``, rebuilt when stale or invalidated."""
+        now = time.monotonic()
+        cached, _generation = self._cached(now)
+        if cached is not None:
+            return cached
+        # One build at a time: tills opening together wait for it
+        with self._build_lock:
+            cached, generation = self._cached(now)
+            if cached is not None:
+                return cached
+            self.builds += 1
+            products = build_products()
+            snapshot = {
+                "version": _version(products),
+                "products": products,
+                "by_key": {product_key(product): product for product in products},
+            }
+            with self._lock:
+                self._history[snapshot["version"]] = snapshot["by_key"]
+                self._history.move_to_end(snapshot["version"])
+                while len(self._history) > HISTORY_SIZE:
+                    self._history.popitem(last=False)
+                # A write during the build makes this snapshot stale already
+                if generation == self._generation:
+                    self._snapshot = snapshot
+                    self._expires = now + self.ttl
+        return snapshot
+
+    def delta(self, since_version, snapshot=None):
+        """
+        Changes from ``since_version`` to the current catalog.
+
+        Returns ``{"version", "changed", "removed"}`` - ``removed`` holds
+        ``product_key`` strings - or None when that version is no longer
+        known (the caller should send the full list).
+        """
+        snapshot = snapshot or self.snapshot()
+        if since_version == snapshot["version"]:
+            return {"version": snapshot["version"], "changed": [], "removed": []}
+        with self._lock:
+            previous = self._history.get(since_version)
+        if previous is None:
+            return None
+        return {
+            "version": snapshot["version"],
+            "changed": [p for p in snapshot["products"] if previous.get(product_key(p)) != p],
+            "removed": [key for key in previous if key not in snapshot["by_key"]],
+        }
+
+
+pos_catalog = PosCatalog()
@@ -0,0 +1,378 @@
+"""
+Hourly POS sales cube.
+
+Paid orders are folded into ``pos_sales_cube`` buckets keyed by
+(date, hour, terminal, product category):
+
+    category '*'      orders, revenue (order totals), quantity, paid_amount
+    category <name>   orders containing the category, quantity, revenue
+                      (line totals) - products without a category fall
+                      under UNCATEGORIZED
+
+Every flush that pays, edits or deletes an order, or touches a line or
+payment of a paid order, re-folds just the affected hour/terminal buckets
+from ``pos_order`` (an indexed status + ``order_time`` range) and upserts them in
+bulk, in the same transaction.  Heatmaps, hourly trends, terminal and
+category comparisons then read at most days x 24 rows per terminal, however
+many orders there were.  Orders paid before the cube existed are folded in
+with ``flask pos-sales-cube rebuild --days 90``.
+
+Hours are those of ``POSOrder.order_time`` as stored (UTC).
+"""
+import logging
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import delete, event, func, inspect as sa_inspect, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm.util import identity_key
+
+from sas_management.models import POSDevice, POSOrder, POSOrderLine, POSPayment, POSProduct, POSSalesCube, db
+
+logger = logging.getLogger(__name__)
+
+PAID_STATUS = "paid"
+TOTAL_CATEGORY = "*"
+UNCATEGORIZED = "Uncategorized"
+NO_DEVICE = 0
+DAY_NAMES = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+# Attributes whose change moves an order into, out of or between buckets
+_ORDER_ATTRS = ("status", "order_time", "device_id", "total_amount")
+_LINE_ATTRS = ("order_id", "product_id", "qty", "line_total")
+_PAYMENT_ATTRS = ("order_id", "amount")
+
+_cube = POSSalesCube.__table__
+_UPSERT_INSERTS = {"postgresql": pg_insert, "sqlite": sqlite_insert}
+_installed = False
+
+_ANY = object()
+
+
+def _dec(value):
+    return Decimal(str(value or 0))
+
+
+def _bucket(order_time, device_id):
+    return order_time.date(), order_time.hour, device_id or NO_DEVICE
+
+
+# ----------------------------------------------------------------------
+# Folding raw orders into buckets
+# ----------------------------------------------------------------------
+def fold_orders(start, end, device_id=_ANY, connection=None):
+    """
+    Aggregate paid orders with ``start <= order_time < end`` into
+    {(date, hour, device_id, category): [orders, quantity, revenue, paid_amount]}.
+    """
+    conn = connection if connection is not None else db.session.connection()
+    filters = [POSOrder.status == PAID_STATUS, POSOrder.order_time >= start, POSOrder.order_time < end]
+    if device_id is not _ANY:
+        filters.append(POSOrder.device_id.is_(None) if device_id == NO_DEVICE else POSOrder.device_id == device_id)
+
+    buckets = defaultdict(lambda: [0, 0, Decimal("0.00"), Decimal("0.00")])
+    order_buckets = {}
+    orders = conn.execute(
+        select(POSOrder.id, POSOrder.order_time, POSOrder.device_id, POSOrder.total_amount).where(*filters)
+    )
+    for order_id, order_time, order_device, total in orders:
+        key = _bucket(order_time, order_device)
+        order_buckets[order_id] = key
+        totals = buckets[key + (TOTAL_CATEGORY,)]
+        totals[0] += 1
+        totals[2] += _dec(total)
+    if not order_buckets:
+        return {}
+
+    category = func.coalesce(POSProduct.category, UNCATEGORIZED)
+    lines = conn.execute(
+        select(
+            POSOrderLine.order_id,
+            category,
+            func.coalesce(func.sum(POSOrderLine.qty), 0),
+            func.coalesce(func.sum(POSOrderLine.line_total), 0),
+        )
+        .join(POSOrder, POSOrder.id == POSOrderLine.order_id)
+        .outerjoin(POSProduct, POSProduct.id == POSOrderLine.product_id)
+        .where(*filters)
+        .group_by(POSOrderLine.order_id, category)
+    )
+    for order_id, name, qty, line_total in lines:
+        key = order_buckets[order_id]
+        row = buckets[key + (name or UNCATEGORIZED,)]
+        row[0] += 1
+        row[1] += int(qty)
+        row[2] += _dec(line_total)
+        buckets[key + (TOTAL_CATEGORY,)][1] += int(qty)
+
+    payments = conn.execute(
+        select(POSPayment.order_id, func.coalesce(func.sum(POSPayment.amount), 0))
+        .join(POSOrder, POSOrder.id == POSPayment.order_id)
+        .where(*filters)
+        .group_by(POSPayment.order_id)
+    )
+    for order_id, amount in payments:
+        buckets[order_buckets[order_id] + (TOTAL_CATEGORY,)][3] += _dec(amount)
+    return dict(buckets)
+
+
+def _upsert(conn, buckets):
+    if not buckets:
+        return
+    rows = [
+        {"bucket_date": d, "hour": h, "device_id": dev, "category": cat,
+         "orders": orders, "quantity": qty, "revenue": revenue, "paid_amount": paid}
+        for (d, h, dev, cat), (orders, qty, revenue, paid) in buckets.items()
+    ]
+    dialect_insert = _UPSERT_INSERTS.get(conn.dialect.name)
+    if dialect_insert is None:
+        for row in rows:
+            conn.execute(delete(_cube).where(
+                _cube.c.bucket_date == row["bucket_date"], _cube.c.hour == row["hour"],
+                _cube.c.device_id == row["device_id"], _cube.c.category == row["category"],
+            ))
+        conn.execute(_cube.insert(), rows)
+        return
+    stmt = dialect_insert(_cube)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[_cube.c.bucket_date, _cube.c.hour, _cube.c.device_id, _cube.c.category],
+        set_={col: stmt.excluded[col] for col in ("orders", "quantity", "revenue", "paid_amount")},
+    )
+    conn.execute(stmt, rows)
+
+
+def refresh_buckets(keys, connection=None):
+    """Re-fold the given (date, hour, device_id) buckets from their orders."""
+    conn = connection if connection is not None else db.session.connection()
+    for bucket_date, hour, device_id in keys:
+        start = datetime.combine(bucket_date, time(hour))
+        folded = fold_orders(start, start + timedelta(hours=1), device_id, conn)
+        stale = delete(_cube).where(
+            _cube.c.bucket_date == bucket_date, _cube.c.hour == hour, _cube.c.device_id == device_id
+        )
+        categories = [cat for (_, _, _, cat) in folded]
+        if categories:
+            stale = stale.where(_cube.c.category.not_in(categories))
+        conn.execute(stale)
+        _upsert(conn, folded)
+
+
+def rebuild(start_date, end_date, connection=None):
+    """Re-fold every bucket between two dates (inclusive), one day at a time; returns the order count."""
+    conn = connection if connection is not None else db.session.connection()
+    orders = 0
+    day = start_date
+    while day <= end_date:
+        start = datetime.combine(day, time.min)
+        folded = fold_orders(start, start + timedelta(days=1), connection=conn)
+        conn.execute(delete(_cube).where(_cube.c.bucket_date == day))
+        _upsert(conn, folded)
+        orders += sum(v[0] for (_, _, _, cat), v in folded.items() if cat == TOTAL_CATEGORY)
+        day += timedelta(days=1)
+    return orders
+
+
+# ----------------------------------------------------------------------
+# Reads
+# ----------------------------------------------------------------------
+def _range_filters(start_date, end_date, device_id=None, category=TOTAL_CATEGORY):
+    filters = [_cube.c.bucket_date >= start_date, _cube.c.bucket_date <= end_date]
+    if category is not None:
+        filters.append(_cube.c.category == category)
+    if device_id is not None:
+        filters.append(_cube.c.device_id == device_id)
+    return filters
+
+
+def heatmap(start_date, end_date, device_id=None):
+    """{day_name: {hour: {"sales", "orders"}}} summed over the date range."""
+    matrix = {day: {hour: {"sales": 0.0, "orders": 0} for hour in range(24)} for day in DAY_NAMES}
+    rows = db.session.execute(
+        select(_cube.c.bucket_date, _cube.c.hour, func.sum(_cube.c.revenue), func.sum(_cube.c.orders))
+        .where(*_range_filters(start_date, end_date, device_id))
+        .group_by(_cube.c.bucket_date, _cube.c.hour)
+    )
+    for bucket_date, hour, revenue, orders in rows:
+        cell = matrix[DAY_NAMES[bucket_date.weekday()]][hour]
+        cell["sales"] += float(revenue or 0)
+        cell["orders"] += int(orders or 0)
+    return matrix
+
+
+def hourly_trend(start_date, end_date, device_id=None):
+    """Sales and orders per (date, hour), oldest first; empty hours are omitted."""
+    rows = db.session.execute(
+        select(_cube.c.bucket_date, _cube.c.hour, func.sum(_cube.c.revenue), func.sum(_cube.c.orders))
+        .where(*_range_filters(start_date, end_date, device_id))
+        .group_by(_cube.c.bucket_date, _cube.c.hour)
+        .order_by(_cube.c.bucket_date, _cube.c.hour)
+    )
+    return [
+        {"date": bucket_date.isoformat(), "hour": hour, "sales": float(revenue or 0), "orders": int(orders or 0)}
+        for bucket_date, hour, revenue, orders in rows
+    ]
+
+
+def terminal_comparison(start_date, end_date):
+    """Sales, orders, items and average ticket per terminal, best first."""
+    rows = db.session.execute(
+        select(
+            _cube.c.device_id,
+            func.sum(_cube.c.revenue),
+            func.sum(_cube.c.orders),
+            func.sum(_cube.c.quantity),
+            func.sum(_cube.c.paid_amount),
+        )
+        .where(*_range_filters(start_date, end_date))
+        .group_by(_cube.c.device_id)
+    ).all()
+    device_ids = [row[0] for row in rows if row[0] != NO_DEVICE]
+    names = dict(
+        db.session.execute(select(POSDevice.id, POSDevice.name).where(POSDevice.id.in_(device_ids))).all()
+    ) if device_ids else {}
+    result = []
+    for device_id, revenue, orders, quantity, paid in rows:
+        sales, orders = float(revenue or 0), int(orders or 0)
+        result.append({
+            "device_id": device_id or None,
+            "name": names.get(device_id, "No terminal" if device_id == NO_DEVICE else f"Terminal {device_id}"),
+            "sales": sales,
+            "orders": orders,
+            "items": int(quantity or 0),
+            "paid": float(paid or 0),
+            "avg_ticket": round(sales / orders, 2) if orders else 0.0,
+        })
+    return sorted(result, key=lambda r: r["sales"], reverse=True)
+
+
+def category_breakdown(start_date, end_date, device_id=None):
+    """Line sales, quantity and order count per product category, best first."""
+    rows = db.session.execute(
+        select(_cube.c.category, func.sum(_cube.c.revenue), func.sum(_cube.c.quantity), func.sum(_cube.c.orders))
+        .where(*_range_filters(start_date, end_date, device_id, category=None), _cube.c.category != TOTAL_CATEGORY)
+        .group_by(_cube.c.category)
+        .order_by(func.sum(_cube.c.revenue).desc())
+    )
+    return [
+        {"category": name, "sales": float(revenue or 0), "quantity": int(qty or 0), "orders": int(orders or 0)}
+        for name, revenue, qty, orders in rows
+    ]
+
+
+# ----------------------------------------------------------------------
+# Incremental maintenance
+# ----------------------------------------------------------------------
+_PENDING_KEY = "pos_sales_cube_old_buckets"
+
+
+def _order_state(session, order_id):
+    """(status, order_time, device_id) of an order, from the session if loaded."""
+    order = session.identity_map.get(identity_key(POSOrder, order_id))
+    if order is not None:
+        loaded = sa_inspect(order).dict
+        if all(attr in loaded for attr in ("status", "order_time", "device_id")):
+            return order.status, order.order_time, order.device_id
+    row = session.connection().execute(
+        select(POSOrder.status, POSOrder.order_time, POSOrder.device_id).where(POSOrder.id == order_id)
+    ).first()
+    return tuple(row) if row else None
+
+
+def _paid_order_bucket(session, order_id):
+    state = _order_state(session, order_id) if order_id else None
+    if state and state[0] == PAID_STATUS and state[1] is not None:
+        return _bucket(state[1], state[2])
+    return None
+
+
+def _changed(obj, attrs):
+    state = sa_inspect(obj)
+    return any(state.attrs[attr].history.has_changes() for attr in attrs)
+
+
+def _before_flush(session, flush_context, instances):
+    # The buckets orders are in *before* this flush, read from the database:
+    # an expired order can be moved or re-statused without its old values
+    # ever being loaded
+    order_ids = set()
+    for obj in session.dirty:
+        if isinstance(obj, POSOrder) and _changed(obj, _ORDER_ATTRS):
+            order_ids.add(obj.id)
+        elif isinstance(obj, POSOrderLine) and _changed(obj, _LINE_ATTRS):
+            order_ids |= {obj.order_id, *sa_inspect(obj).attrs.order_id.history.deleted}
+        elif isinstance(obj, POSPayment) and _changed(obj, _PAYMENT_ATTRS):
+            order_ids |= {obj.order_id, *sa_inspect(obj).attrs.order_id.history.deleted}
+    for obj in session.deleted:
+        if isinstance(obj, POSOrder):
+            order_ids.add(obj.id)
+        elif isinstance(obj, (POSOrderLine, POSPayment)):
+            order_ids.add(obj.order_id)
+    order_ids.discard(None)
+    if not order_ids:
+        return
+    rows = session.connection().execute(
+        select(POSOrder.order_time, POSOrder.device_id)
+        .where(POSOrder.id.in_(order_ids), POSOrder.status == PAID_STATUS, POSOrder.order_time.is_not(None))
+    )
+    session.info.setdefault(_PENDING_KEY, set()).update(_bucket(t, d) for t, d in rows)
+
+
+def _after_flush(session, flush_context):
+    keys = session.info.pop(_PENDING_KEY, set())
+    for obj in session.new | session.dirty:
+        if isinstance(obj, POSOrder):
+            if obj in session.new or _changed(obj, _ORDER_ATTRS):
+                if obj.status == PAID_STATUS and obj.order_time is not None:
+                    keys.add(_bucket(obj.order_time, obj.device_id))
+        elif isinstance(obj, (POSOrderLine, POSPayment)):
+            attrs = _LINE_ATTRS if isinstance(obj, POSOrderLine) else _PAYMENT_ATTRS
+            if obj in session.new or _changed(obj, attrs):
+                keys.add(_paid_order_bucket(session, obj.order_id))
+    keys.discard(None)
+    if keys:
+        refresh_buckets(sorted(keys), session.connection())
+
+
+def install(session):
+    """Attach the cube maintenance listeners to a session (or session class)."""
+    global _installed
+    if _installed:
+        return
+    event.listen(session, "before_flush", _before_flush)
+    event.listen(session, "after_flush", _after_flush)
+    _installed = True
+
+
+def uninstall(session):
+    """Remove the cube maintenance listeners added by ``install``."""
+    global _installed
+    if not _installed:
+        return
+    event.remove(session, "before_flush", _before_flush)
+    event.remove(session, "after_flush", _after_flush)
+    _installed = False
+
+
+# ----------------------------------------------------------------------
+# CLI
+# ----------------------------------------------------------------------
+@click.group("pos-sales-cube")
+def pos_sales_cube_cli():
+    """Manage the POS sales cube."""
+
+
+@pos_sales_cube_cli.command("rebuild")
+@click.option("--days", default=90, show_default=True, help="Rebuild this many days up to today.")
+@click.option("--start", "start_date", type=click.DateTime(formats=["%Y-%m-%d"]), default=None)
+@click.option("--end", "end_date", type=click.DateTime(formats=["%Y-%m-%d"]), default=None)
+@with_appcontext
+def rebuild_command(days, start_date, end_date):
+    """Re-fold paid orders into the cube."""
+    end = end_date.date() if end_date else date.today()
+    start = start_date.date() if start_date else end - timedelta(days=days - 1)
+    orders = rebuild(start, end)
+    db.session.commit()
+    click.echo(f"Folded {orders} paid orders from {start} to {end}.")
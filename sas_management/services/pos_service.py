@@ -1,8 +1,10 @@
 """POS service layer for business logic."""
 import json
+import uuid
 from datetime import datetime
 from decimal import Decimal
 
+from sqlalchemy import func
 from sqlalchemy.exc import SQLAlchemyError
 
 from sas_management.models import (
@@ -13,59 +15,70 @@ from sas_management.models import (
     POSOrderLine,
     POSPayment,
     POSReceipt,
+    POSReferenceBlock,
     POSShift,
     db,
 )
+from sas_management.services.pos_shift_counters import shift_report
+from sas_management.services.sequence_service import next_reference, reserve_block, seed_from_column
+
+PAYMENT_METHODS = ["cash", "pos", "mobile_money", "bank_transfer", "credit_card"]
+# Largest offline reference block a terminal may reserve at once
+MAX_REFERENCE_BLOCK = 500
 
 
 def generate_pos_order_reference():
     """Generate a unique POS order reference."""
-    prefix = "POS"
-    timestamp = datetime.now().strftime("%Y%m%d")
-    last_order = (
-        POSOrder.query.filter(POSOrder.reference.like(f"{prefix}-{timestamp}-%"))
-        .order_by(POSOrder.id.desc())
-        .first()
-    )
-    if last_order and last_order.reference:
-        try:
-            last_num = int(last_order.reference.split("-")[-1])
-            new_num = last_num + 1
-        except (ValueError, IndexError):
-            new_num = 1
-    else:
-        new_num = 1
-    return f"{prefix}-{timestamp}-{new_num:04d}"
+    return next_reference("POS", seed=seed_from_column(POSOrder.reference, POSOrder.id))
 
 
 def generate_pos_receipt_ref():
     """Generate a unique receipt reference."""
-    prefix = "RCPT"
-    timestamp = datetime.now().strftime("%Y%m%d")
-    last_receipt = (
-        POSReceipt.query.filter(POSReceipt.receipt_ref.like(f"{prefix}-{timestamp}-%"))
-        .order_by(POSReceipt.id.desc())
-        .first()
-    )
-    if last_receipt and last_receipt.receipt_ref:
-        try:
-            last_num = int(last_receipt.receipt_ref.split("-")[-1])
-            new_num = last_num + 1
-        except (ValueError, IndexError):
-            new_num = 1
-    else:
-        new_num = 1
-    return f"{prefix}-{timestamp}-{new_num:04d}"
+    return next_reference("RCPT", seed=seed_from_column(POSReceipt.receipt_ref, POSReceipt.id))
+
 
+def normalize_client_uuid(value):
+    """Canonical form of a terminal-generated order UUID, or None when there is none."""
+    if value in (None, ""):
+        return None
+    try:
+        return str(uuid.UUID(str(value)))
+    except ValueError:
+        raise ValueError(f"Invalid client_uuid '{value}'")
+
+
+def reserve_order_references(device_code, size):
+    """
+    Pre-allocate a block of POS order references for a terminal that will
+    number orders while offline (see ``sync_orders_for_offline``).
 
-def create_order(payload, device_code=None, shift_id=None):
+    The block is recorded against the device, so a synced order may only
+    carry a reference this device was given.
+    """
+    device = POSDevice.query.filter_by(terminal_code=device_code, is_active=True).first()
+    if not device:
+        raise ValueError(f"Device '{device_code}' not found or inactive")
+    if not 1 <= size <= MAX_REFERENCE_BLOCK:
+        raise ValueError(f"Block size must be between 1 and {MAX_REFERENCE_BLOCK}")
+    block = reserve_block("POS", size, seed=seed_from_column(POSOrder.reference, POSOrder.id))
+    db.session.add(POSReferenceBlock(
+        device_id=device.id, prefix=block["prefix"], period=block["period"], first=block["first"], last=block["last"],
+    ))
+    db.session.commit()
+    return block
+
+
+def create_order(payload, device_code=None, shift_id=None, reference=None):
     """
     Create a POS order with line items.
     
     Args:
         payload: Dict with 'items', 'client_id', 'is_delivery', 'delivery_address', 'delivery_date', 'discount_amount', 'tax_rate'
+            and optionally the terminal's 'client_uuid'; an order already stored under that
+            uuid is returned as is
         device_code: Optional device code
         shift_id: Optional shift ID
+        reference: Optional pre-allocated reference (offline block), generated when omitted
     
     Returns:
         POSOrder instance
@@ -76,6 +89,13 @@ def create_order(payload, device_code=None, shift_id=None):
         if not items or len(items) == 0:
             raise ValueError("Order must contain at least one item")
         
+        # A retried request (or one also queued for offline sync) gets the same order
+        client_uuid = normalize_client_uuid(payload.get("client_uuid"))
+        if client_uuid:
+            existing = POSOrder.query.filter_by(client_uuid=client_uuid).first()
+            if existing:
+                return existing
+        
         # Find device if provided
         device = None
         if device_code:
@@ -94,7 +114,8 @@ def create_order(payload, device_code=None, shift_id=None):
         
         # Create order
         order = POSOrder(
-            reference=generate_pos_order_reference(),
+            reference=reference or generate_pos_order_reference(),
+            client_uuid=client_uuid,
             shift_id=shift_id,
             device_id=device.id if device else None,
             client_id=payload.get("client_id"),
@@ -204,9 +225,8 @@ def add_payment(order_id, amount, method, ref=None, received_by=None):
             raise ValueError(f"Invalid payment amount: {str(e)}")
         
         # Validate method
-        valid_methods = ["cash", "pos", "mobile_money", "bank_transfer", "credit_card"]
-        if method and method not in valid_methods:
-            raise ValueError(f"Invalid payment method. Must be one of: {', '.join(valid_methods)}")
+        if method and method not in PAYMENT_METHODS:
+            raise ValueError(f"Invalid payment method. Must be one of: {', '.join(PAYMENT_METHODS)}")
         
         # Create payment record - this happens FIRST to track payment immediately
         payment = POSPayment(
@@ -231,9 +251,13 @@ def add_payment(order_id, amount, method, ref=None, received_by=None):
         db.session.add(receipt)
         db.session.flush()  # Flush to ensure receipt is saved
         
-        # Update order status based on total payments
-        # Recalculate total paid including this payment
-        total_paid = sum(Decimal(str(p.amount)) for p in order.payments) + payment_amount
+        # Update order status based on total payments (the flush above
+        # already wrote this payment, so the SUM includes it)
+        total_paid = Decimal(str(
+            db.session.query(func.coalesce(func.sum(POSPayment.amount), 0))
+            .filter(POSPayment.order_id == order.id)
+            .scalar()
+        ))
         if total_paid >= order.total_amount:
             order.status = "paid"
         elif total_paid > 0:
@@ -262,6 +286,10 @@ def close_shift(shift_id, ending_cash, cash_count=None):
     """
     Close a POS shift and generate Z-report.
     
+    Totals come from the shift's running counters (see
+    ``services.pos_shift_counters``), so closing takes the same time for ten
+    orders or ten thousand.
+    
     Args:
         shift_id: Shift ID
         ending_cash: Ending cash amount
@@ -271,8 +299,6 @@ def close_shift(shift_id, ending_cash, cash_count=None):
         Dict with shift summary and Z-report data
     """
     try:
-        db.session.begin()
-        
         shift = POSShift.query.get_or_404(shift_id)
         if shift.status == "closed":
             raise ValueError("Shift is already closed")
@@ -281,22 +307,8 @@ def close_shift(shift_id, ending_cash, cash_count=None):
         shift.ended_at = datetime.utcnow()
         shift.status = "closed"
         
-        # Get all orders for this shift
-        orders = POSOrder.query.filter_by(shift_id=shift_id).all()
-        
-        # Calculate totals
-        total_sales = sum(Decimal(str(o.total_amount)) for o in orders if o.status == "paid")
-        total_tax = sum(Decimal(str(o.tax_amount)) for o in orders if o.status == "paid")
-        total_discount = sum(Decimal(str(o.discount_amount)) for o in orders if o.status == "paid")
-        
-        # Group payments by method
-        payments_by_method = {}
-        for order in orders:
-            for payment in order.payments:
-                method = payment.method
-                if method not in payments_by_method:
-                    payments_by_method[method] = Decimal("0.00")
-                payments_by_method[method] += Decimal(str(payment.amount))
+        totals = shift_report(shift_id)
+        payments_by_method = totals["payments_by_method"]
         
         # Calculate variance
         expected_cash = Decimal(str(shift.starting_cash)) + payments_by_method.get("cash", Decimal("0.00"))
@@ -311,10 +323,10 @@ def close_shift(shift_id, ending_cash, cash_count=None):
             "ending_cash": float(shift.ending_cash),
             "expected_cash": float(expected_cash),
             "variance": float(variance),
-            "total_sales": float(total_sales),
-            "total_tax": float(total_tax),
-            "total_discount": float(total_discount),
-            "orders_count": len(orders),
+            "total_sales": float(totals["total_sales"]),
+            "total_tax": float(totals["total_tax"]),
+            "total_discount": float(totals["total_discount"]),
+            "orders_count": totals["orders_count"],
             "payments_by_method": {k: float(v) for k, v in payments_by_method.items()},
         }
         
@@ -371,59 +383,35 @@ def sync_orders_for_offline(device_code, orders_list):
     """
     Sync batched orders from offline terminal.
     
+    The whole batch is validated and written in one transaction by
+    ``services.pos_sync.ingest_orders``; each order carries the terminal's
+    'client_uuid', so sending the same batch again does not duplicate it.
+    
     Args:
         device_code: Device terminal code
-        orders_list: List of order dicts with temporary refs
+        orders_list: List of order dicts; orders numbered offline from a
+            ``reserve_order_references`` block carry it as 'reference'.  A
+            reference outside the blocks reserved for this device is replaced
+            by a fresh one ('reassigned_from' in that order's result)
     
     Returns:
-        Dict mapping temp_refs to final_refs
+        Dict with per-order 'results' (created / duplicate / rejected) and counts
     """
-    try:
-        device = POSDevice.query.filter_by(terminal_code=device_code, is_active=True).first()
-        if not device:
-            raise ValueError(f"Device {device_code} not found")
-        
-        device.last_seen = datetime.utcnow()
-        
-        ref_mapping = {}
-        for order_data in orders_list:
-            temp_ref = order_data.get("temp_ref")
-            # Create order with final reference
-            order = create_order(order_data, device_code=device_code)
-            ref_mapping[temp_ref] = order.reference
-        
-        db.session.commit()
-        return ref_mapping
-        
-    except Exception as e:
-        db.session.rollback()
-        raise
+    from sas_management.services.pos_sync import ingest_orders
+    return ingest_orders(device_code, orders_list)
 
 
 def generate_z_report(shift_id):
     """Generate Z-report for shift (same as close_shift but without closing)."""
     shift = POSShift.query.get_or_404(shift_id)
-    orders = POSOrder.query.filter_by(shift_id=shift_id).all()
-    
-    total_sales = sum(Decimal(str(o.total_amount)) for o in orders if o.status == "paid")
-    total_tax = sum(Decimal(str(o.tax_amount)) for o in orders if o.status == "paid")
-    total_discount = sum(Decimal(str(o.discount_amount)) for o in orders if o.status == "paid")
-    
-    payments_by_method = {}
-    for order in orders:
-        for payment in order.payments:
-            method = payment.method
-            if method not in payments_by_method:
-                payments_by_method[method] = Decimal("0.00")
-            payments_by_method[method] += Decimal(str(payment.amount))
+    totals = shift_report(shift_id)
     
     return {
         "shift_id": shift.id,
         "started_at": shift.started_at.isoformat(),
-        "total_sales": float(total_sales),
-        "total_tax": float(total_tax),
-        "total_discount": float(total_discount),
-        "orders_count": len(orders),
-        "payments_by_method": {k: float(v) for k, v in payments_by_method.items()},
+        "total_sales": float(totals["total_sales"]),
+        "total_tax": float(totals["total_tax"]),
+        "total_discount": float(totals["total_discount"]),
+        "orders_count": totals["orders_count"],
+        "payments_by_method": {k: float(v) for k, v in totals["payments_by_method"].items()},
     }
-
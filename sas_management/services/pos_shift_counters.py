@@ -0,0 +1,330 @@
+"""
+Running POS shift counters and SQL-side shift aggregation.
+
+Every flush that inserts, updates or deletes a ``POSOrder`` or ``POSPayment``
+adds its delta to the ``pos_shift_counter`` rows of the affected shift, in
+the same transaction:
+
+    orders              count of orders in the shift (any status)
+    paid                count / total_amount of orders with status 'paid'
+    tax, discount       tax_amount / discount_amount of paid orders
+    payment:<method>    count / amount of payments by method
+
+so the X (mid-shift) and Z (closing) reports read a few rows no matter how
+many orders the shift has.  ``compute_shift_totals`` produces the same shape
+with two GROUP BY queries; it seeds shifts that pre-date the counters and
+backs ``reconcile_shift``, which checks the counters against a full
+recompute (and optionally repairs them).
+"""
+import logging
+from collections import defaultdict
+from decimal import Decimal
+
+from sqlalchemy import case, delete, event, func, inspect as sa_inspect, select, update
+from sqlalchemy.orm.base import NO_VALUE
+
+from sas_management.models import POSOrder, POSPayment, POSShift, POSShiftCounter, db
+
+logger = logging.getLogger(__name__)
+
+PAID_STATUS = "paid"
+ORDERS_KEY = "orders"
+PAYMENT_PREFIX = "payment:"
+# Attributes whose change moves an order's contribution between counters
+_ORDER_ATTRS = ("shift_id", "status", "total_amount", "tax_amount", "discount_amount")
+_PAYMENT_ATTRS = ("order_id", "amount", "method")
+
+_counters = POSShiftCounter.__table__
+_installed = False
+
+
+def _dec(value):
+    return Decimal(str(value or 0))
+
+
+def _base_keys():
+    from sas_management.services.pos_service import PAYMENT_METHODS
+    return [ORDERS_KEY, PAID_STATUS, "tax", "discount"] + [PAYMENT_PREFIX + m for m in PAYMENT_METHODS]
+
+
+# ----------------------------------------------------------------------
+# Full recompute (two GROUP BY queries)
+# ----------------------------------------------------------------------
+def compute_shift_totals(shift_id, connection=None):
+    """{key: (count, amount)} for a shift, aggregated from its orders and payments."""
+    conn = connection if connection is not None else db.session.connection()
+    is_paid = POSOrder.status == PAID_STATUS
+    row = conn.execute(
+        select(
+            func.count(POSOrder.id),
+            func.coalesce(func.sum(case((is_paid, 1), else_=0)), 0),
+            func.coalesce(func.sum(case((is_paid, POSOrder.total_amount), else_=0)), 0),
+            func.coalesce(func.sum(case((is_paid, POSOrder.tax_amount), else_=0)), 0),
+            func.coalesce(func.sum(case((is_paid, POSOrder.discount_amount), else_=0)), 0),
+        ).where(POSOrder.shift_id == shift_id)
+    ).one()
+    totals = {key: (0, Decimal("0.00")) for key in _base_keys()}
+    totals[ORDERS_KEY] = (int(row[0]), Decimal("0.00"))
+    totals[PAID_STATUS] = (int(row[1]), _dec(row[2]))
+    totals["tax"] = (int(row[1]), _dec(row[3]))
+    totals["discount"] = (int(row[1]), _dec(row[4]))
+    payments = conn.execute(
+        select(POSPayment.method, func.count(POSPayment.id), func.coalesce(func.sum(POSPayment.amount), 0))
+        .join(POSOrder, POSOrder.id == POSPayment.order_id)
+        .where(POSOrder.shift_id == shift_id)
+        .group_by(POSPayment.method)
+    )
+    for method, count, amount in payments:
+        totals[PAYMENT_PREFIX + method] = (int(count), _dec(amount))
+    return totals
+
+
+def _write_totals(conn, shift_id, totals):
+    conn.execute(delete(_counters).where(_counters.c.shift_id == shift_id))
+    conn.execute(
+        _counters.insert(),
+        [{"shift_id": shift_id, "key": key, "count": count, "amount": amount} for key, (count, amount) in totals.items()],
+    )
+
+
+def read_shift_counters(shift_id):
+    """{key: (count, amount)} from the counter rows, seeding them if missing."""
+    conn = db.session.connection()
+    rows = conn.execute(
+        select(_counters.c.key, _counters.c.count, _counters.c.amount).where(_counters.c.shift_id == shift_id)
+    ).all()
+    totals = {key: (int(count), _dec(amount)) for key, count, amount in rows}
+    if ORDERS_KEY not in totals:
+        # Shift opened before the counters existed
+        totals = compute_shift_totals(shift_id, conn)
+        _write_totals(conn, shift_id, totals)
+    return totals
+
+
+def shift_report(shift_id):
+    """Sales, tax, discount, order count and payments by method for a shift."""
+    totals = read_shift_counters(shift_id)
+    return {
+        "total_sales": totals[PAID_STATUS][1],
+        "total_tax": totals["tax"][1],
+        "total_discount": totals["discount"][1],
+        "orders_count": totals[ORDERS_KEY][0],
+        "paid_orders_count": totals[PAID_STATUS][0],
+        "payments_by_method": {
+            key[len(PAYMENT_PREFIX):]: amount
+            for key, (count, amount) in totals.items()
+            if key.startswith(PAYMENT_PREFIX) and count
+        },
+    }
+
+
+def refresh_shift_counters(shift_ids, connection=None):
+    """
+    Rewrite the counters of ``shift_ids`` from a full recompute.
+
+    For writes that bypass the ORM flush (bulk inserts), which the
+    incremental listeners never see.
+    """
+    conn = connection if connection is not None else db.session.connection()
+    for shift_id in sorted(s for s in set(shift_ids) if s):
+        _write_totals(conn, shift_id, compute_shift_totals(shift_id, conn))
+
+
+def reconcile_shift(shift_id, repair=False):
+    """
+    Compare a shift's counters with a full recompute.
+
+    Returns {"shift_id", "ok", "mismatches": {key: {"counter": (c, a), "actual": (c, a)}}};
+    with ``repair=True`` the counters are rewritten from the recompute
+    (the caller commits).
+    """
+    conn = db.session.connection()
+    rows = conn.execute(
+        select(_counters.c.key, _counters.c.count, _counters.c.amount).where(_counters.c.shift_id == shift_id)
+    ).all()
+    stored = {key: (int(count), _dec(amount)) for key, count, amount in rows}
+    actual = compute_shift_totals(shift_id, conn)
+    zero = (0, Decimal("0.00"))
+    mismatches = {}
+    for key in set(stored) | set(actual):
+        if stored.get(key, zero) != actual.get(key, zero):
+            mismatches[key] = {"counter": stored.get(key, zero), "actual": actual.get(key, zero)}
+    if mismatches:
+        logger.warning(f"POS shift {shift_id} counters out of sync: {sorted(mismatches)}")
+        if repair:
+            _write_totals(conn, shift_id, actual)
+    return {"shift_id": shift_id, "ok": not mismatches, "mismatches": mismatches}
+
+
+# ----------------------------------------------------------------------
+# Incremental maintenance
+# ----------------------------------------------------------------------
+class _Unknown(Exception):
+    """An old attribute value was not loaded, so its delta can't be derived."""
+
+
+def _old_value(state, attr):
+    if attr in state.committed_state:
+        old = state.committed_state[attr]
+        if old is NO_VALUE:
+            # Changed without the previous value having been loaded
+            raise _Unknown(attr)
+        return old
+    return getattr(state.obj(), attr)
+
+
+def _order_deltas(values, sign):
+    """Counter deltas of one order given (shift_id, status, total, tax, discount)."""
+    shift_id, status, total, tax, discount = values
+    if not shift_id:
+        return []
+    deltas = [(shift_id, ORDERS_KEY, sign, 0)]
+    if status == PAID_STATUS:
+        deltas += [
+            (shift_id, PAID_STATUS, sign, sign * _dec(total)),
+            (shift_id, "tax", sign, sign * _dec(tax)),
+            (shift_id, "discount", sign, sign * _dec(discount)),
+        ]
+    return deltas
+
+
+def _order_shift_id(session, order_id):
+    from sqlalchemy.orm.util import identity_key
+    order = session.identity_map.get(identity_key(POSOrder, order_id))
+    if order is not None and "shift_id" in sa_inspect(order).dict:
+        return order.shift_id
+    return session.connection().execute(select(POSOrder.shift_id).where(POSOrder.id == order_id)).scalar()
+
+
+def _payment_deltas(session, values, sign):
+    order_id, amount, method = values
+    shift_id = _order_shift_id(session, order_id) if order_id else None
+    if not shift_id:
+        return []
+    return [(shift_id, PAYMENT_PREFIX + (method or "cash"), sign, sign * _dec(amount))]
+
+
+def _current(obj, attrs):
+    return tuple(getattr(obj, attr) for attr in attrs)
+
+
+def _changed(state, attrs):
+    return any(state.attrs[attr].history.has_changes() for attr in attrs)
+
+
+def _after_flush(session, flush_context):
+    deltas = []
+    resync = set()
+    new_shifts = set()
+    deleted_shifts = set()
+
+    for obj in session.new:
+        if isinstance(obj, POSOrder):
+            deltas += _order_deltas(_current(obj, _ORDER_ATTRS), 1)
+        elif isinstance(obj, POSPayment):
+            deltas += _payment_deltas(session, _current(obj, _PAYMENT_ATTRS), 1)
+        elif isinstance(obj, POSShift):
+            new_shifts.add(obj.id)
+
+    for obj in session.dirty:
+        if not isinstance(obj, (POSOrder, POSPayment)):
+            continue
+        state = sa_inspect(obj)
+        attrs = _ORDER_ATTRS if isinstance(obj, POSOrder) else _PAYMENT_ATTRS
+        if not _changed(state, attrs):
+            continue
+        if isinstance(obj, POSOrder) and state.attrs.shift_id.history.has_changes():
+            # The order's payments move shift with it; recompute both sides
+            history = state.attrs.shift_id.history
+            resync.update(history.deleted)
+            resync.update(history.added)
+            continue
+        try:
+            old = tuple(_old_value(state, attr) for attr in attrs)
+        except _Unknown:
+            if isinstance(obj, POSOrder):
+                resync.add(obj.shift_id)
+            else:
+                resync.add(_order_shift_id(session, obj.order_id))
+            continue
+        if isinstance(obj, POSOrder):
+            deltas += _order_deltas(old, -1) + _order_deltas(_current(obj, attrs), 1)
+        else:
+            deltas += _payment_deltas(session, old, -1) + _payment_deltas(session, _current(obj, attrs), 1)
+
+    for obj in session.deleted:
+        try:
+            if isinstance(obj, POSOrder):
+                state = sa_inspect(obj)
+                deltas += _order_deltas(tuple(_old_value(state, attr) for attr in _ORDER_ATTRS), -1)
+            elif isinstance(obj, POSPayment):
+                deltas += _payment_deltas(session, _current(obj, _PAYMENT_ATTRS), -1)
+            elif isinstance(obj, POSShift):
+                deleted_shifts.add(obj.id)
+        except Exception as e:
+            # reconcile_shift(..., repair=True) fixes whatever this misses
+            logger.warning(f"POS shift counters skipped a deleted {type(obj).__name__}: {e}")
+
+    if deltas or resync or new_shifts:
+        _apply(session.connection(), deltas, resync, new_shifts, deleted_shifts)
+
+
+def _before_flush(session, flush_context, instances):
+    # Counter rows reference pos_shift, so they must go before the shift does
+    shift_ids = [obj.id for obj in session.deleted if isinstance(obj, POSShift) and obj.id]
+    if shift_ids:
+        session.connection().execute(delete(_counters).where(_counters.c.shift_id.in_(shift_ids)))
+
+
+def _apply(conn, deltas, resync, new_shifts, deleted_shifts):
+    merged = defaultdict(lambda: [0, Decimal("0.00")])
+    for shift_id, key, count, amount in deltas:
+        merged[(shift_id, key)][0] += count
+        merged[(shift_id, key)][1] += amount
+
+    resync = {s for s in resync if s} | new_shifts
+    seeded = set()
+    for shift_id in {shift_id for shift_id, _ in merged} - resync - deleted_shifts:
+        exists = conn.execute(
+            select(_counters.c.count).where(_counters.c.shift_id == shift_id, _counters.c.key == ORDERS_KEY)
+        ).first()
+        if exists is None:
+            resync.add(shift_id)
+        else:
+            seeded.add(shift_id)
+
+    for (shift_id, key), (count, amount) in merged.items():
+        if shift_id not in seeded or (not count and not amount):
+            continue
+        result = conn.execute(
+            update(_counters)
+            .where(_counters.c.shift_id == shift_id, _counters.c.key == key)
+            .values(count=_counters.c.count + count, amount=_counters.c.amount + amount)
+        )
+        if result.rowcount == 0:
+            conn.execute(_counters.insert().values(shift_id=shift_id, key=key, count=count, amount=amount))
+
+    # The flush is already visible to this connection, so a recompute
+    # includes it
+    for shift_id in resync - deleted_shifts:
+        _write_totals(conn, shift_id, compute_shift_totals(shift_id, conn))
+
+
+def install(session):
+    """Attach the counter maintenance listeners to a session (or session class)."""
+    global _installed
+    if _installed:
+        return
+    event.listen(session, "before_flush", _before_flush)
+    event.listen(session, "after_flush", _after_flush)
+    _installed = True
+
+
+def uninstall(session):
+    """Remove the counter maintenance listeners added by ``install``."""
+    global _installed
+    if not _installed:
+        return
+    event.remove(session, "before_flush", _before_flush)
+    event.remove(session, "after_flush", _after_flush)
+    _installed = False
@@ -0,0 +1,488 @@
+"""
+Offline POS terminal sync.
+
+A terminal that loses its connection keeps selling: each sale is queued on
+the terminal with a ``client_uuid`` it generates itself and, once back
+online, the queue goes to ``POST /api/pos/sync`` in one request.
+``ingest_orders`` validates the whole batch up front with a few set-based
+lookups, then writes the accepted orders, lines, payments and receipts with
+one bulk INSERT per table in a single transaction, so hundreds of queued
+sales cost a handful of statements and one commit.
+
+* ``client_uuid`` is the idempotency key (unique on ``pos_order``).  An
+  order that is already stored, e.g. by an earlier attempt whose response
+  was lost, is reported as ``"duplicate"`` with its reference instead of
+  being created again.
+* Every order gets its own result (``created``, ``duplicate`` or
+  ``rejected`` with the reason), so one bad sale does not hold up the rest
+  of the queue.
+* A ``reference`` numbered offline must fall inside a block reserved for
+  the syncing device (``reserve_order_references``).  Anything else, e.g.
+  a number another terminal owns, is replaced by a fresh reference and the
+  order's result carries the original as ``reassigned_from``.
+* The bulk inserts bypass the ORM flush, so the shift counters, the sales
+  cube, the search index and the kitchen display are brought up to date
+  explicitly.
+
+``sync_terminal`` also returns the catalog changes since the terminal's
+cached version, so prices are refreshed in the same round trip.
+"""
+import logging
+from datetime import datetime, timezone
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from sas_management.models import (
+    BakeryItem,
+    CateringItem,
+    Client,
+    POSDevice,
+    POSOrder,
+    POSOrderLine,
+    POSPayment,
+    POSReceipt,
+    POSReferenceBlock,
+    POSShift,
+    db,
+)
+from sas_management.services.pos_catalog import pos_catalog
+from sas_management.services.pos_sales_cube import refresh_buckets
+from sas_management.services.pos_service import PAYMENT_METHODS, normalize_client_uuid
+from sas_management.services.pos_shift_counters import refresh_shift_counters
+from sas_management.services.search_index import search_index
+from sas_management.services.sequence_service import parse_reference, reserve_block, seed_from_column
+
+logger = logging.getLogger(__name__)
+
+# Most orders accepted in one sync request
+MAX_SYNC_BATCH = 1000
+# Keeps IN (...) lists under SQLite's bound-parameter limit
+_IN_CHUNK = 500
+
+_orders = POSOrder.__table__
+_lines = POSOrderLine.__table__
+_payments = POSPayment.__table__
+_receipts = POSReceipt.__table__
+
+
+class _Rejected(ValueError):
+    """One order of the batch is invalid; the others are still synced."""
+
+
+def _chunks(values, size=_IN_CHUNK):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _lookup(query_for, keys):
+    """Run ``query_for(chunk)`` over ``keys`` in chunks and concatenate the rows."""
+    rows = []
+    for chunk in _chunks(keys):
+        rows += db.session.execute(query_for(chunk)).all()
+    return rows
+
+
+def _money(value, field):
+    try:
+        amount = Decimal(str(value if value is not None else 0))
+    except (InvalidOperation, ValueError):
+        raise _Rejected(f"Invalid {field} '{value}'")
+    if not amount.is_finite():
+        raise _Rejected(f"Invalid {field} '{value}'")
+    return amount
+
+
+def _timestamp(value, field):
+    """Naive UTC datetime from an ISO string (terminals send local time with an offset)."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        raise _Rejected(f"Invalid {field} '{value}'")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _optional_id(value, field):
+    if value in (None, ""):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise _Rejected(f"Invalid {field} '{value}'")
+
+
+def _product_id(value):
+    # Custom POS products arrive as "POS-<id>" and have no catalog row
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _prepare(data):
+    """Validate one queued order and compute its totals the way ``create_order`` does."""
+    if not isinstance(data, dict):
+        raise _Rejected("Order must be an object")
+    try:
+        client_uuid = normalize_client_uuid(data.get("client_uuid"))
+    except ValueError as e:
+        raise _Rejected(str(e))
+    if not client_uuid:
+        raise _Rejected("client_uuid is required")
+
+    reference = data.get("reference")
+    if reference and not str(reference).startswith("POS-"):
+        raise _Rejected(f"Invalid offline reference '{reference}'")
+
+    items = data.get("items") or []
+    if not items:
+        raise _Rejected("Order must contain at least one item")
+
+    lines = []
+    subtotal = Decimal("0.00")
+    for idx, item in enumerate(items):
+        try:
+            qty = int(item.get("qty", 1))
+        except (AttributeError, TypeError, ValueError):
+            raise _Rejected(f"Invalid item data at index {idx}")
+        unit_price = _money(item.get("unit_price", 0), f"unit price of item {idx + 1}")
+        if qty <= 0:
+            raise _Rejected(f"Item {idx + 1}: Quantity must be greater than 0")
+        if unit_price < 0:
+            raise _Rejected(f"Item {idx + 1}: Unit price cannot be negative")
+        line_total = unit_price * qty
+        lines.append({
+            "product_id": _product_id(item.get("product_id")),
+            "product_name": item.get("product_name") or "Unknown Product",
+            "qty": qty,
+            "unit_price": unit_price,
+            "line_total": line_total,
+            "note": item.get("note"),
+            "is_kitchen_item": bool(item.get("is_kitchen_item", True)),
+        })
+        subtotal += line_total
+
+    discount = _money(data.get("discount_amount", 0), "discount")
+    tax = subtotal * _money(data.get("tax_rate", 0), "tax rate") / 100
+    total = max(subtotal + tax - discount, Decimal("0.00"))
+
+    payments = []
+    for idx, payment in enumerate(data.get("payments") or []):
+        if not isinstance(payment, dict):
+            raise _Rejected(f"Invalid payment at index {idx}")
+        amount = _money(payment.get("amount"), "payment amount")
+        method = payment.get("method") or "cash"
+        if amount <= 0:
+            raise _Rejected("Payment amount must be greater than 0")
+        if method not in PAYMENT_METHODS:
+            raise _Rejected(f"Invalid payment method. Must be one of: {', '.join(PAYMENT_METHODS)}")
+        payments.append({
+            "amount": amount,
+            "method": method,
+            "reference": payment.get("reference") or payment.get("ref"),
+            "created_at": _timestamp(payment.get("paid_at"), "paid_at"),
+        })
+
+    paid = sum((p["amount"] for p in payments), Decimal("0.00"))
+    if payments and paid >= total:
+        status = "paid"
+    elif paid > 0:
+        status = "partially_paid"
+    else:
+        status = "draft"
+
+    return {
+        "client_uuid": client_uuid,
+        "reference": reference,
+        "reassigned_from": None,
+        "shift_id": _optional_id(data.get("shift_id"), "shift_id"),
+        "client_id": _optional_id(data.get("client_id"), "client_id"),
+        "order_time": _timestamp(data.get("order_time"), "order_time"),
+        "is_delivery": bool(data.get("is_delivery", False)),
+        "delivery_address": data.get("delivery_address"),
+        "delivery_date": _timestamp(data.get("delivery_date"), "delivery_date"),
+        "discount_amount": discount,
+        "tax_amount": tax,
+        "total_amount": total,
+        "status": status,
+        "lines": lines,
+        "payments": payments,
+    }
+
+
+def _result(data, status, **fields):
+    data = data if isinstance(data, dict) else {}
+    return {"client_uuid": data.get("client_uuid"), "temp_ref": data.get("temp_ref"), "status": status, **fields}
+
+
+def _reserved_for(device, references):
+    """The subset of ``references`` inside the blocks reserved for ``device``."""
+    parsed = {ref: parse_reference(ref) for ref in references}
+    periods = {p[1] for p in parsed.values() if p}
+    blocks = _lookup(
+        lambda chunk: select(POSReferenceBlock.prefix, POSReferenceBlock.period, POSReferenceBlock.first,
+                             POSReferenceBlock.last)
+        .where(POSReferenceBlock.device_id == device.id, POSReferenceBlock.period.in_(chunk)),
+        periods,
+    )
+    return {
+        ref for ref, p in parsed.items()
+        if p and any(p[:2] == (prefix, period) and first <= p[2] <= last for prefix, period, first, last in blocks)
+    }
+
+
+def _validate(device, orders):
+    """
+    Split the batch into results for orders that need no insert and the
+    prepared orders that do, with every lookup done as one set query.
+    """
+    results = [None] * len(orders)
+    accepted = {}
+    by_uuid = {}
+    by_reference = {}
+    for index, data in enumerate(orders):
+        try:
+            order = _prepare(data)
+            if order["client_uuid"] in by_uuid:
+                raise _Rejected("client_uuid appears twice in this batch")
+            if order["reference"] and order["reference"] in by_reference:
+                raise _Rejected(f"Reference '{order['reference']}' appears twice in this batch")
+        except _Rejected as e:
+            results[index] = _result(data, "rejected", error=str(e))
+            continue
+        accepted[index] = order
+        by_uuid[order["client_uuid"]] = index
+        if order["reference"]:
+            by_reference[order["reference"]] = index
+
+    def reject(index, error):
+        results[index] = _result(orders[index], "rejected", error=error)
+        accepted.pop(index, None)
+
+    # Already synced: report the stored order instead of creating it again
+    for client_uuid, order_id, reference in _lookup(
+        lambda chunk: select(_orders.c.client_uuid, _orders.c.id, _orders.c.reference)
+        .where(_orders.c.client_uuid.in_(chunk)),
+        by_uuid,
+    ):
+        index = by_uuid[client_uuid]
+        results[index] = _result(orders[index], "duplicate", id=order_id, reference=reference)
+        accepted.pop(index, None)
+
+    # Offline numbers are only trusted inside this device's reserved blocks;
+    # anything else gets a fresh reference when the batch is numbered
+    references = [ref for ref, index in by_reference.items() if index in accepted]
+    reserved = _reserved_for(device, references)
+    for reference in set(references) - reserved:
+        order = accepted[by_reference.pop(reference)]
+        order["reference"], order["reassigned_from"] = None, reference
+    references = [ref for ref in references if ref in reserved]
+    for (reference,) in _lookup(
+        lambda chunk: select(_orders.c.reference).where(_orders.c.reference.in_(chunk)), references
+    ):
+        reject(by_reference[reference], f"Reference '{reference}' is already used by another order")
+
+    shift_ids = {order["shift_id"] for order in accepted.values() if order["shift_id"]}
+    shifts = dict(_lookup(lambda chunk: select(POSShift.id, POSShift.status).where(POSShift.id.in_(chunk)), shift_ids))
+    client_ids = {order["client_id"] for order in accepted.values() if order["client_id"]}
+    clients = {row[0] for row in _lookup(lambda chunk: select(Client.id).where(Client.id.in_(chunk)), client_ids)}
+    for index, order in list(accepted.items()):
+        shift_id = order["shift_id"]
+        if shift_id and shift_id not in shifts:
+            reject(index, f"Shift with ID {shift_id} not found")
+        elif shift_id and shifts[shift_id] != "open":
+            reject(index, f"Cannot create order for closed shift (ID: {shift_id})")
+        elif order["client_id"] and order["client_id"] not in clients:
+            reject(index, f"Client with ID {order['client_id']} not found")
+
+    return results, accepted
+
+
+def _product_names(orders):
+    """Catalog names for the batch's product ids (catering first, as ``create_order`` resolves them)."""
+    product_ids = {line["product_id"] for order in orders for line in order["lines"] if line["product_id"]}
+    names = {}
+    for model in (BakeryItem, CateringItem):
+        names.update(_lookup(lambda chunk: select(model.id, model.name).where(model.id.in_(chunk)), product_ids))
+    return names
+
+
+def _insert(device, orders):
+    """Bulk-insert prepared orders with their lines, payments and receipts; returns {client_uuid: id}."""
+    now = datetime.utcnow()
+    # Number everything before writing, in one allocation per sequence
+    unnumbered = [order for order in orders if not order["reference"]]
+    if unnumbered:
+        block = reserve_block("POS", len(unnumbered), seed=seed_from_column(POSOrder.reference, POSOrder.id))
+        for order, reference in zip(unnumbered, block["references"]):
+            order["reference"] = reference
+    payment_count = sum(len(order["payments"]) for order in orders)
+    receipt_refs = []
+    if payment_count:
+        receipt_refs = reserve_block(
+            "RCPT", payment_count, seed=seed_from_column(POSReceipt.receipt_ref, POSReceipt.id)
+        )["references"]
+
+    order_rows = []
+    for order in orders:
+        order["order_time"] = order["order_time"] or now
+        order_rows.append({
+            "reference": order["reference"],
+            "client_uuid": order["client_uuid"],
+            "shift_id": order["shift_id"],
+            "device_id": device.id,
+            "client_id": order["client_id"],
+            "order_time": order["order_time"],
+            "total_amount": order["total_amount"],
+            "tax_amount": order["tax_amount"],
+            "discount_amount": order["discount_amount"],
+            "status": order["status"],
+            "is_delivery": order["is_delivery"],
+            "delivery_date": order["delivery_date"],
+            "delivery_address": order["delivery_address"],
+            "created_at": now,
+            "updated_at": now,
+        })
+    ids = {
+        client_uuid: order_id
+        for order_id, client_uuid in db.session.execute(
+            _orders.insert().returning(_orders.c.id, _orders.c.client_uuid), order_rows
+        )
+    }
+
+    names = _product_names(orders)
+    line_rows = []
+    payment_rows = []
+    for order in orders:
+        order_id = ids[order["client_uuid"]]
+        for line in order["lines"]:
+            name = names.get(line["product_id"], line["product_name"])
+            line_rows.append({**line, "order_id": order_id, "product_name": name})
+        for payment in order["payments"]:
+            payment_rows.append({**payment, "order_id": order_id, "created_at": payment["created_at"] or now})
+    db.session.execute(_lines.insert(), line_rows)
+
+    if payment_rows:
+        # Any receipt number may go with any payment, so RETURNING order does not matter
+        stored = db.session.execute(
+            _payments.insert().returning(_payments.c.id, _payments.c.order_id, _payments.c.created_at), payment_rows
+        ).all()
+        db.session.execute(_receipts.insert(), [
+            {
+                "payment_id": payment_id,
+                "order_id": order_id,
+                "receipt_ref": receipt_ref,
+                "receipt_number": receipt_ref,
+                "issued_at": paid_at,
+                "created_at": now,
+            }
+            for (payment_id, order_id, paid_at), receipt_ref in zip(stored, receipt_refs)
+        ])
+
+    # The flush listeners and mapper hooks never saw these rows
+    search_index.index_ids("pos_orders", ids.values())
+    refresh_shift_counters({order["shift_id"] for order in orders})
+    refresh_buckets(sorted({
+        (order["order_time"].date(), order["order_time"].hour, device.id)
+        for order in orders if order["status"] == "paid"
+    }))
+    return ids
+
+
+def _ingest(device_code, orders):
+    device = POSDevice.query.filter_by(terminal_code=device_code, is_active=True).first()
+    if not device:
+        raise ValueError(f"Device '{device_code}' not found or inactive")
+    device.last_seen = datetime.utcnow()
+    db.session.flush()
+
+    results, accepted = _validate(device, orders)
+    created = []
+    if accepted:
+        indexes = sorted(accepted)
+        prepared = [accepted[index] for index in indexes]
+        ids = _insert(device, prepared)
+        for index, order in zip(indexes, prepared):
+            order_id = ids[order["client_uuid"]]
+            extra = {"reassigned_from": order["reassigned_from"]} if order["reassigned_from"] else {}
+            results[index] = _result(orders[index], "created", id=order_id, reference=order["reference"], **extra)
+            created.append({"id": order_id, "reference": order["reference"], "status": order["status"], "old_status": None})
+    return results, created
+
+
+def _publish_kitchen_orders(created):
+    from sas_management.services.event_bus import event_bus
+    for payload in created:
+        event_bus.publish("kds", "order", payload)
+
+
+def ingest_orders(device_code, orders):
+    """
+    Store a batch of orders queued by an offline terminal.
+
+    Each order is a dict shaped like the ``create_order`` payload plus
+    ``client_uuid`` (required), optional ``temp_ref``, ``reference`` (from a
+    ``reserve_order_references`` block), ``order_time`` and ``payments``
+    (``[{"amount", "method", "reference", "paid_at"}]``).
+
+    Returns {"results": [{"client_uuid", "temp_ref", "status", "id",
+    "reference" | "error"}] in batch order, "synced_count",
+    "duplicate_count", "failed_count"}.
+    """
+    if not isinstance(orders, list):
+        raise ValueError("orders must be a list")
+    if len(orders) > MAX_SYNC_BATCH:
+        raise ValueError(f"At most {MAX_SYNC_BATCH} orders can be synced at once")
+
+    for attempt in range(2):
+        try:
+            results, created = _ingest(device_code, orders)
+            db.session.commit()
+            break
+        except IntegrityError:
+            db.session.rollback()
+            # Another request synced some of these orders first; on the
+            # retry they show up as duplicates
+            if attempt:
+                raise ValueError("Orders could not be synced, please retry")
+            logger.info(f"POS sync for {device_code} raced another sync, retrying")
+        except Exception:
+            db.session.rollback()
+            raise
+
+    _publish_kitchen_orders(created)
+    counts = {"created": 0, "duplicate": 0, "rejected": 0}
+    for result in results:
+        counts[result["status"]] += 1
+    return {
+        "results": results,
+        "synced_count": counts["created"],
+        "duplicate_count": counts["duplicate"],
+        "failed_count": counts["rejected"],
+    }
+
+
+def catalog_changes(since_version):
+    """Catalog products changed since ``since_version``, or the full list when it is unknown."""
+    snapshot = pos_catalog.snapshot()
+    delta = pos_catalog.delta(since_version, snapshot) if since_version else None
+    if delta is not None:
+        return {"full": False, **delta}
+    return {"full": True, "version": snapshot["version"], "products": snapshot["products"]}
+
+
+def sync_terminal(device_code, orders, catalog_version=None):
+    """
+    One sync round trip: ingest the queued ``orders`` and, when the terminal
+    sends the ``catalog_version`` it holds, the catalog changes since then.
+    """
+    result = ingest_orders(device_code, orders)
+    if catalog_version:
+        result["catalog"] = catalog_changes(catalog_version)
+    return result
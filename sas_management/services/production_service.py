@@ -13,26 +13,12 @@ from sas_management.models import (
     Recipe,
     db,
 )
+from sas_management.services.sequence_service import next_reference, seed_from_column
 
 
 def generate_production_reference():
     """Generate a unique production order reference."""
-    prefix = "PROD"
-    timestamp = datetime.now().strftime("%Y%m%d")
-    last_order = (
-        ProductionOrder.query.filter(ProductionOrder.reference.like(f"{prefix}-{timestamp}-%"))
-        .order_by(ProductionOrder.id.desc())
-        .first()
-    )
-    if last_order and last_order.reference:
-        try:
-            last_num = int(last_order.reference.split("-")[-1])
-            new_num = last_num + 1
-        except (ValueError, IndexError):
-            new_num = 1
-    else:
-        new_num = 1
-    return f"{prefix}-{timestamp}-{new_num:04d}"
+    return next_reference("PROD", seed=seed_from_column(ProductionOrder.reference, ProductionOrder.id))
 
 
 def create_production_order(event_id, items, schedule_times):
@@ -0,0 +1,569 @@
+"""
+Delivery route planning: capacitated vehicle routing with time windows.
+
+A plan assigns drops to vehicles and orders each vehicle's stops so that the
+total distance driven is as small as the time budget allows, without
+exceeding vehicle capacity (``weight`` against ``capacity``) or arriving
+after a drop's window closes:
+
+* The distance/time matrix is computed once per plan, vectorized with NumPy
+  when it is installed.  Road distances and durations from the Google
+  Distance Matrix API (when ``GOOGLE_MAPS_API_KEY`` is set) are kept in a
+  SQLite file keyed by rounded coordinate pairs, so repeated addresses never
+  cost a second API call; pairs without road figures fall back to the
+  haversine distance at ``DISPATCH_AVERAGE_SPEED_KMH`` plus a traffic margin.
+* Construction inserts drops one at a time, highest ``priority`` and then
+  furthest from the depot first, at the cheapest feasible position over all
+  vehicles.
+* Local search then applies 2-opt (reverse a stretch of one route), Or-opt
+  (move a run of 1-3 stops, either way round, within or between routes) and
+  2-opt* (swap route tails) until no move helps or ``time_limit`` seconds
+  have passed.  Drops that fit nowhere are reported as ``unassigned``.
+
+Times are minutes after midnight; windows may be given as minutes, "HH:MM"
+strings or time/datetime objects.
+"""
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0
+# Approximate SAS location (Kampala), used when a plan has no start location
+DEFAULT_DEPOT = (0.3476, 32.5825)
+DEFAULT_SPEED_KMH = 40.0
+TRAFFIC_FACTOR = 1.2
+DEFAULT_SERVICE_MINUTES = 10
+DEFAULT_START = 8 * 60
+# Coordinates are rounded to ~1 m for cache keys
+COORD_DECIMALS = 5
+# Origins and destinations per Distance Matrix request (100 elements max)
+MATRIX_BLOCK = 10
+EPS = 1e-9
+
+
+def point_key(point):
+    """Cache key (and Distance Matrix location string) for a ``(lat, lng)`` point."""
+    return f"{point[0]:.{COORD_DECIMALS}f},{point[1]:.{COORD_DECIMALS}f}"
+
+
+def to_minutes(value, default=None):
+    """Minutes after midnight from minutes, "HH:MM" or a time/datetime; ``default`` when empty."""
+    if value is None or value == "":
+        return default
+    if hasattr(value, "hour"):
+        return value.hour * 60 + value.minute
+    if isinstance(value, (int, float)):
+        return float(value)
+    hours, _, minutes = str(value).strip().partition(":")
+    return int(hours) * 60 + int(minutes or 0)
+
+
+def format_minutes(minutes):
+    minutes = int(round(minutes))
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+# ----------------------------------------------------------------------
+# Distance / time matrix
+# ----------------------------------------------------------------------
+def haversine_matrix(points):
+    """Great-circle distance in km between every pair of ``(lat, lng)`` points, as nested lists."""
+    if not points:
+        return []
+    if NUMPY_AVAILABLE:
+        coords = np.radians(np.asarray(points, dtype=float))
+        lat, lng = coords[:, 0], coords[:, 1]
+        a = (np.sin((lat[:, None] - lat[None, :]) / 2) ** 2
+             + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin((lng[:, None] - lng[None, :]) / 2) ** 2)
+        return (2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))).tolist()
+    radians = [(math.radians(lat), math.radians(lng)) for lat, lng in points]
+    cosines = [math.cos(lat) for lat, _ in radians]
+    matrix = []
+    for i, (lat1, lng1) in enumerate(radians):
+        row = []
+        for j, (lat2, lng2) in enumerate(radians):
+            a = math.sin((lat2 - lat1) / 2) ** 2 + cosines[i] * cosines[j] * math.sin((lng2 - lng1) / 2) ** 2
+            row.append(2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(max(a, 0.0), 1.0))))
+        matrix.append(row)
+    return matrix
+
+
+class MatrixCache:
+    """Road ``(km, minutes)`` between coordinate pairs, kept in a SQLite file shared by all workers."""
+
+    def __init__(self, path, max_age_days=30):
+        self.path = path
+        self.max_age = max_age_days * 86400
+        self._ready = False
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=10)
+        if not self._ready:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS route_matrix ("
+                " origin TEXT NOT NULL, destination TEXT NOT NULL,"
+                " km REAL NOT NULL, minutes REAL NOT NULL, fetched_at REAL NOT NULL,"
+                " PRIMARY KEY (origin, destination))"
+            )
+            self._ready = True
+        return connection
+
+    def get_many(self, keys):
+        """``{(origin, destination): (km, minutes)}`` for cached pairs among ``keys``."""
+        keys = sorted(set(keys))
+        found = {}
+        if not keys:
+            return found
+        wanted = set(keys)
+        cutoff = time.time() - self.max_age
+        connection = self._connect()
+        try:
+            # Chunked to stay under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = connection.execute(
+                    f"SELECT origin, destination, km, minutes FROM route_matrix"
+                    f" WHERE fetched_at >= ? AND origin IN ({','.join('?' * len(chunk))})",
+                    [cutoff, *chunk],
+                )
+                for origin, destination, km, minutes in rows:
+                    if destination in wanted:
+                        found[(origin, destination)] = (km, minutes)
+        finally:
+            connection.close()
+        return found
+
+    def put_many(self, pairs):
+        if not pairs:
+            return
+        now = time.time()
+        connection = self._connect()
+        try:
+            with connection:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO route_matrix VALUES (?, ?, ?, ?, ?)",
+                    [(origin, destination, km, minutes, now) for (origin, destination), (km, minutes) in pairs.items()],
+                )
+        finally:
+            connection.close()
+
+
+def fetch_road_matrix(adapter, pairs):
+    """Road ``{(origin, destination): (km, minutes)}`` for ``pairs`` from the Distance Matrix API, in blocks."""
+    by_origin = {}
+    for origin, destination in pairs:
+        by_origin.setdefault(origin, set()).add(destination)
+    origins = sorted(by_origin)
+    fetched = {}
+    for start in range(0, len(origins), MATRIX_BLOCK):
+        block = origins[start:start + MATRIX_BLOCK]
+        destinations = sorted(set().union(*(by_origin[origin] for origin in block)))
+        for offset in range(0, len(destinations), MATRIX_BLOCK):
+            targets = destinations[offset:offset + MATRIX_BLOCK]
+            result = adapter.distance_matrix(block, targets)
+            if not result.get("success") or result.get("mock"):
+                logger.warning(f"Distance matrix unavailable, using straight-line distances: {result.get('error')}")
+                return fetched
+            for origin, row in zip(block, result.get("rows", [])):
+                for destination, element in zip(targets, row.get("elements", [])):
+                    if element.get("status", "OK") == "OK" and "distance" in element and "duration" in element:
+                        fetched[(origin, destination)] = (
+                            element["distance"]["value"] / 1000.0,
+                            element["duration"]["value"] / 60.0,
+                        )
+    return fetched
+
+
+def travel_matrix(points, adapter=None, cache=None, speed_kmh=DEFAULT_SPEED_KMH):
+    """
+    ``(km, minutes)`` matrices between every pair of ``points``.
+
+    Cached road figures are used where present and missing pairs are fetched
+    through ``adapter`` when it is enabled; everything else is the haversine
+    distance driven at ``speed_kmh`` slowed by ``TRAFFIC_FACTOR``.
+    """
+    km = haversine_matrix(points)
+    per_km = 60.0 * TRAFFIC_FACTOR / speed_kmh
+    minutes = [[distance * per_km for distance in row] for row in km]
+    online = adapter is not None and getattr(adapter, "enabled", False)
+    if cache is None and not online:
+        return km, minutes
+
+    keys = [point_key(point) for point in points]
+    unique = sorted(set(keys))
+    known = cache.get_many(unique) if cache is not None else {}
+    missing = [(a, b) for a in unique for b in unique if a != b and (a, b) not in known]
+    if missing and online:
+        fetched = fetch_road_matrix(adapter, missing)
+        known.update(fetched)
+        if cache is not None:
+            cache.put_many(fetched)
+    if known:
+        for i, origin in enumerate(keys):
+            for j, destination in enumerate(keys):
+                road = known.get((origin, destination))
+                if road is not None:
+                    km[i][j], minutes[i][j] = road
+    return km, minutes
+
+
+# ----------------------------------------------------------------------
+# Solver
+# ----------------------------------------------------------------------
+class _Solver:
+    """
+    Nodes are matrix indices with the depot at 0.  Routes are lists of
+    nodes without the depot, one per vehicle; ``loads`` tracks their demand.
+    """
+
+    def __init__(self, km, minutes, demand, service, windows, priority, capacity, start, end, deadline):
+        self.km = km
+        self.minutes = minutes
+        self.demand = demand
+        self.service = service
+        self.windows = windows
+        self.priority = priority
+        self.capacity = capacity
+        self.start = start
+        self.end = end
+        self.deadline = deadline
+        self.timed = end is not None or any(window != (-math.inf, math.inf) for window in windows[1:])
+
+    def expired(self):
+        return time.perf_counter() > self.deadline
+
+    def cost(self, route):
+        km = self.km
+        total, previous = 0.0, 0
+        for node in route:
+            total += km[previous][node]
+            previous = node
+        return total + km[previous][0]
+
+    def schedule(self, route):
+        """Arrival minute at each stop and the return time, or None if a window is missed."""
+        minutes, windows = self.minutes, self.windows
+        clock, previous, arrivals = self.start, 0, []
+        for node in route:
+            clock += minutes[previous][node]
+            ready, due = windows[node]
+            if clock < ready:
+                clock = ready
+            if clock > due + EPS:
+                return None
+            arrivals.append(clock)
+            clock += self.service[node]
+            previous = node
+        clock += minutes[previous][0]
+        if self.end is not None and clock > self.end + EPS:
+            return None
+        return arrivals, clock
+
+    def on_time(self, route):
+        return not self.timed or self.schedule(route) is not None
+
+    def insert(self, routes, loads, node):
+        """Insert ``node`` at its cheapest feasible position; False if it fits nowhere."""
+        km, demand = self.km, self.demand[node]
+        candidates = []
+        for vehicle, route in enumerate(routes):
+            if loads[vehicle] + demand > self.capacity[vehicle] + EPS:
+                continue
+            previous = 0
+            for position in range(len(route) + 1):
+                following = route[position] if position < len(route) else 0
+                candidates.append((km[previous][node] + km[node][following] - km[previous][following], vehicle, position))
+                previous = following
+        candidates.sort()
+        for _delta, vehicle, position in candidates:
+            trial = routes[vehicle][:position] + [node] + routes[vehicle][position:]
+            if self.on_time(trial):
+                routes[vehicle] = trial
+                loads[vehicle] += demand
+                return True
+        return False
+
+    def construct(self):
+        routes = [[] for _ in self.capacity]
+        loads = [0.0] * len(self.capacity)
+        order = sorted(range(1, len(self.demand)), key=lambda node: (-self.priority[node], -self.km[0][node], node))
+        unassigned = [node for node in order if not self.insert(routes, loads, node)]
+        return routes, loads, unassigned
+
+    def two_opt(self, route):
+        """Reverse stretches of one route while that shortens it."""
+        if len(route) < 2:
+            return False
+        km, improved = self.km, False
+        for i in range(len(route) - 1):
+            if self.expired():
+                break
+            previous = route[i - 1] if i else 0
+            for j in range(i + 1, len(route)):
+                following = route[j + 1] if j + 1 < len(route) else 0
+                delta = km[previous][route[j]] + km[route[i]][following] - km[previous][route[i]] - km[route[j]][following]
+                if delta < -EPS:
+                    # Exact check: with road distances the matrix need not be symmetric
+                    trial = route[:i] + route[i:j + 1][::-1] + route[j + 1:]
+                    if self.cost(trial) < self.cost(route) - EPS and self.on_time(trial):
+                        route[:] = trial
+                        improved = True
+        return improved
+
+    def _relocate(self, routes, loads, a, start, length):
+        """Move ``routes[a][start:start + length]`` to the first better place found."""
+        km = self.km
+        route = routes[a]
+        segment = route[start:start + length]
+        previous = route[start - 1] if start else 0
+        following = route[start + length] if start + length < len(route) else 0
+        gain = km[previous][segment[0]] + km[segment[-1]][following] - km[previous][following]
+        segment_load = sum(self.demand[node] for node in segment)
+        remainder = route[:start] + route[start + length:]
+        pieces = (segment, segment[::-1]) if length > 1 else (segment,)
+        before = self.cost(route)
+        for b, target in enumerate(routes):
+            same = b == a
+            if not same and loads[b] + segment_load > self.capacity[b] + EPS:
+                continue
+            base = remainder if same else target
+            left = 0
+            for position in range(len(base) + 1):
+                right = base[position] if position < len(base) else 0
+                edge = km[left][right]
+                for piece in pieces:
+                    if same and position == start and piece is segment:
+                        continue
+                    if km[left][piece[0]] + km[piece[-1]][right] - edge - gain >= -EPS:
+                        continue
+                    moved = base[:position] + piece + base[position:]
+                    if same:
+                        if self.cost(moved) < before - EPS and self.on_time(moved):
+                            routes[a] = moved
+                            return True
+                    elif (self.cost(remainder) + self.cost(moved) < before + self.cost(target) - EPS
+                          and self.on_time(remainder) and self.on_time(moved)):
+                        routes[a], routes[b] = remainder, moved
+                        loads[a] -= segment_load
+                        loads[b] += segment_load
+                        return True
+                left = right
+        return False
+
+    def or_opt(self, routes, loads):
+        improved = False
+        for a in range(len(routes)):
+            start = 0
+            while start < len(routes[a]):
+                if self.expired():
+                    return improved
+                moved = False
+                for length in (1, 2, 3):
+                    if start + length > len(routes[a]):
+                        break
+                    if self._relocate(routes, loads, a, start, length):
+                        improved = moved = True
+                        break
+                if not moved:
+                    start += 1
+        return improved
+
+    def _cross(self, routes, loads, a, b):
+        """2-opt*: swap the tails of routes ``a`` and ``b`` at the first improving cut."""
+        km, demand = self.km, self.demand
+        first, second = routes[a], routes[b]
+        head_a = [0.0]
+        for node in first:
+            head_a.append(head_a[-1] + demand[node])
+        head_b = [0.0]
+        for node in second:
+            head_b.append(head_b[-1] + demand[node])
+        for i in range(len(first) + 1):
+            before_a = first[i - 1] if i else 0
+            after_a = first[i] if i < len(first) else 0
+            for j in range(len(second) + 1):
+                before_b = second[j - 1] if j else 0
+                after_b = second[j] if j < len(second) else 0
+                delta = km[before_a][after_b] + km[before_b][after_a] - km[before_a][after_a] - km[before_b][after_b]
+                if delta >= -EPS:
+                    continue
+                load_a = head_a[i] + loads[b] - head_b[j]
+                load_b = head_b[j] + loads[a] - head_a[i]
+                if load_a > self.capacity[a] + EPS or load_b > self.capacity[b] + EPS:
+                    continue
+                new_a, new_b = first[:i] + second[j:], second[:j] + first[i:]
+                if self.on_time(new_a) and self.on_time(new_b):
+                    routes[a], routes[b] = new_a, new_b
+                    loads[a], loads[b] = load_a, load_b
+                    return True
+        return False
+
+    def two_opt_star(self, routes, loads):
+        improved = False
+        for a in range(len(routes)):
+            for b in range(a + 1, len(routes)):
+                if self.expired():
+                    return improved
+                if (routes[a] or routes[b]) and self._cross(routes, loads, a, b):
+                    improved = True
+        return improved
+
+    def improve(self, routes, loads):
+        improved = True
+        while improved and not self.expired():
+            improved = False
+            for route in routes:
+                improved |= self.two_opt(route)
+            improved |= self.or_opt(routes, loads)
+            improved |= self.two_opt_star(routes, loads)
+
+    def solve(self):
+        routes, loads, unassigned = self.construct()
+        self.improve(routes, loads)
+        # Shorter routes may have made room for drops that did not fit at first
+        unassigned = [node for node in unassigned if not self.insert(routes, loads, node)]
+        return routes, loads, unassigned
+
+
+def _number(value, default):
+    try:
+        return float(value) if value not in (None, "") else default
+    except (TypeError, ValueError):
+        return default
+
+
+# ----------------------------------------------------------------------
+# Planner
+# ----------------------------------------------------------------------
+class RoutePlanner:
+    """Plans dispatch routes; holds the solver settings and the road matrix cache."""
+
+    def __init__(self, time_limit=3.0, speed_kmh=DEFAULT_SPEED_KMH):
+        self.time_limit = time_limit
+        self.speed_kmh = speed_kmh
+        self.cache = None
+        self._adapter = None
+        self._adapter_loaded = False
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.time_limit = app.config.get("DISPATCH_SOLVER_TIME_LIMIT", self.time_limit)
+        self.speed_kmh = app.config.get("DISPATCH_AVERAGE_SPEED_KMH", self.speed_kmh)
+        path = app.config.get("ROUTE_MATRIX_CACHE_FILE") or os.path.join(app.instance_path, "route_matrix.sqlite3")
+        self.cache = MatrixCache(path, app.config.get("ROUTE_MATRIX_MAX_AGE_DAYS", 30))
+
+    @property
+    def adapter(self):
+        # Imported lazily: integrations.delivery imports this module through RouteOptimizer
+        with self._lock:
+            if not self._adapter_loaded:
+                try:
+                    from integrations.delivery.google_maps_adapter import GoogleMapsAdapter
+                    self._adapter = GoogleMapsAdapter()
+                except Exception as e:
+                    logger.info(f"Google Maps adapter unavailable, routing on straight-line distances: {e}")
+                self._adapter_loaded = True
+            return self._adapter
+
+    def matrix(self, points):
+        return travel_matrix(points, adapter=self.adapter, cache=self.cache, speed_kmh=self.speed_kmh)
+
+    def plan(self, stops, vehicles, depot=None, start_time=None, end_time=None, time_limit=None, matrix=None):
+        """
+        Assign ``stops`` to ``vehicles`` and order every route.
+
+        ``stops`` are dicts with ``latitude``/``longitude`` and optionally
+        ``weight``, ``estimated_time`` (minutes on site), ``priority``,
+        ``window_start`` and ``window_end``; ``vehicles`` are dicts with
+        ``id`` and ``capacity`` (None for unlimited).  The run leaves
+        ``depot`` (``(lat, lng)``) at ``start_time`` and, when ``end_time`` is
+        given, must be back by then.  ``matrix`` overrides the
+        ``(km, minutes)`` matrices, depot first.
+
+        Returns ``{"routes": [{"vehicle_id", "stops", "total_distance",
+        "total_time", "load", "capacity"}], "unassigned", "total_distance",
+        "vehicles_used", "solve_seconds", ...}``; each stop is the input dict
+        plus ``sequence``, ``arrival``, ``distance_from_previous`` and
+        ``cumulative_distance``.
+        """
+        started = time.perf_counter()
+        depot = tuple(depot or DEFAULT_DEPOT)
+        start = to_minutes(start_time, DEFAULT_START)
+        end = to_minutes(end_time)
+        km, minutes = matrix or self.matrix([depot] + [(float(s["latitude"]), float(s["longitude"])) for s in stops])
+
+        windows = [(-math.inf, math.inf)]
+        for stop in stops:
+            windows.append((to_minutes(stop.get("window_start"), -math.inf), to_minutes(stop.get("window_end"), math.inf)))
+        solver = _Solver(
+            km, minutes,
+            demand=[0.0] + [_number(s.get("weight"), 0.0) for s in stops],
+            service=[0.0] + [_number(s.get("estimated_time"), DEFAULT_SERVICE_MINUTES) for s in stops],
+            windows=windows,
+            priority=[0.0] + [_number(s.get("priority"), 0.0) for s in stops],
+            capacity=[_number(v.get("capacity"), math.inf) for v in vehicles],
+            start=start,
+            end=end,
+            deadline=started + (self.time_limit if time_limit is None else time_limit),
+        )
+        routes, loads, unassigned = solver.solve()
+
+        planned, total = [], 0.0
+        for vehicle, route, load in zip(vehicles, routes, loads):
+            if not route:
+                continue
+            arrivals, finish = solver.schedule(route)
+            visits, previous, distance = [], 0, 0.0
+            for sequence, (node, arrival) in enumerate(zip(route, arrivals), 1):
+                leg = km[previous][node]
+                distance += leg
+                visits.append({
+                    **stops[node - 1],
+                    "sequence": sequence,
+                    "arrival": format_minutes(arrival),
+                    "distance_from_previous": round(leg, 2),
+                    "cumulative_distance": round(distance, 2),
+                })
+                previous = node
+            return_distance = km[previous][0]
+            distance += return_distance
+            total += distance
+            planned.append({
+                "vehicle_id": vehicle.get("id"),
+                "stops": visits,
+                "total_stops": len(visits),
+                "total_distance": round(distance, 2),
+                "return_distance": round(return_distance, 2),
+                "total_time": int(round(finish - start)),
+                "departure": format_minutes(start),
+                "return": format_minutes(finish),
+                "load": round(load, 2),
+                "capacity": vehicle.get("capacity"),
+            })
+
+        return {
+            "success": True,
+            "routes": planned,
+            "unassigned": [stops[node - 1] for node in sorted(unassigned)],
+            "total_distance": round(total, 2),
+            "vehicles_used": len(planned),
+            "solve_seconds": round(time.perf_counter() - started, 3),
+            "optimization_method": "vrptw_local_search",
+            "start_location": {"latitude": depot[0], "longitude": depot[1]},
+        }
+
+
+route_planner = RoutePlanner()
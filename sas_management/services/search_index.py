@@ -0,0 +1,492 @@
+"""Inverted full-text index backing the global search.
+
+Every searchable model registers the columns whose text should be findable.
+Each record is flattened into one ``search_documents`` row that mapper hooks
+keep current on insert/update/delete, and a single ranked query answers a
+search regardless of how many model types are registered:
+
+* SQLite      -> FTS5 external-content table (bm25 ranking, prefix index)
+* PostgreSQL  -> ``to_tsvector`` expression with a GIN index (ts_rank)
+* anything else, or SQLite built without FTS5 -> in-process inverted index
+
+A type may also register ``visible`` column values (e.g. ``{"is_archived":
+False}``).  The document row stores whether the record currently matches
+them and every backend filters on it before the per-type limit, so hidden
+records never crowd visible ones out of the results.
+
+Rows written with Core statements (bulk inserts) bypass the mapper hooks;
+their writers call ``search_index.index_ids`` on the same connection.
+"""
+import math
+import re
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import event, inspect, select, text
+
+from sas_management.models import SearchDocument, db
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+documents = SearchDocument.__table__
+
+
+def tokenize(value):
+    """Split text into lowercase word tokens."""
+    if not value:
+        return []
+    return _TOKEN_RE.findall(str(value).lower())
+
+
+class SearchableType:
+    """A model registered for indexing under a global-search result key."""
+
+    def __init__(self, key, model, fields, visible=None):
+        self.key = key
+        self.model = model
+        self.fields = tuple(f for f in fields if f in model.__table__.columns)
+        self.visible = dict(visible or {})
+
+    def document_body(self, obj):
+        """Concatenate the indexed column values of ``obj``."""
+        parts = []
+        for field in self.fields:
+            value = getattr(obj, field, None)
+            if value is None:
+                continue
+            parts.append(str(getattr(value, "value", value)))
+        return " ".join(parts)
+
+    def columns(self):
+        """The table columns a document is built from (id, text, visibility)."""
+        table = self.model.__table__
+        return [table.c[name] for name in dict.fromkeys(("id", *self.fields, *self.visible))]
+
+    def is_visible(self, obj):
+        """Whether ``obj`` (an instance or a row) may appear in search results."""
+        return all(getattr(obj, column) == value for column, value in self.visible.items())
+
+    def document_row(self, obj):
+        return {
+            "entity": self.key,
+            "entity_id": obj.id,
+            "body": self.document_body(obj),
+            "visible": self.is_visible(obj),
+            "updated_at": datetime.utcnow(),
+        }
+
+    def indexed_fields_changed(self, obj):
+        state = inspect(obj)
+        return any(state.attrs[f].history.has_changes() for f in (*self.fields, *self.visible))
+
+
+class MemoryInvertedIndex:
+    """Pure-Python token -> postings index with prefix matching and idf scoring."""
+
+    def __init__(self):
+        self._postings = defaultdict(set)
+        self._doc_tokens = {}
+        self._sorted_tokens = []
+        self._tokens_dirty = False
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._doc_tokens)
+
+    def add(self, entity, entity_id, body):
+        key = (entity, entity_id)
+        tokens = frozenset(tokenize(body))
+        with self._lock:
+            self._discard(key)
+            self._doc_tokens[key] = tokens
+            for token in tokens:
+                if token not in self._postings:
+                    self._tokens_dirty = True
+                self._postings[token].add(key)
+
+    def remove(self, entity, entity_id):
+        with self._lock:
+            self._discard((entity, entity_id))
+
+    def clear(self):
+        with self._lock:
+            self._postings.clear()
+            self._doc_tokens.clear()
+            self._sorted_tokens = []
+            self._tokens_dirty = False
+
+    def _discard(self, key):
+        for token in self._doc_tokens.pop(key, ()):
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.discard(key)
+                if not postings:
+                    del self._postings[token]
+                    self._tokens_dirty = True
+
+    def _expand(self, term):
+        """Yield (token, weight) for every indexed token starting with ``term``."""
+        if self._tokens_dirty:
+            self._sorted_tokens = sorted(self._postings)
+            self._tokens_dirty = False
+        tokens = self._sorted_tokens
+        i = bisect_left(tokens, term)
+        while i < len(tokens) and tokens[i].startswith(term):
+            yield tokens[i], 1.0 if tokens[i] == term else 0.5
+            i += 1
+
+    def search(self, query, limit_per_type=20, entities=None):
+        """Return ``[(entity, entity_id, score)]``, best first, capped per entity."""
+        terms = tokenize(query)
+        if not terms:
+            return []
+        with self._lock:
+            total = max(len(self._doc_tokens), 1)
+            scores = None
+            for term in terms:
+                term_scores = defaultdict(float)
+                for token, weight in self._expand(term):
+                    postings = self._postings[token]
+                    idf = math.log(1 + total / len(postings))
+                    for key in postings:
+                        term_scores[key] = max(term_scores[key], weight * idf)
+                if scores is None:
+                    scores = dict(term_scores)
+                else:
+                    scores = {k: s + term_scores[k] for k, s in scores.items() if k in term_scores}
+                if not scores:
+                    return []
+
+        per_entity = defaultdict(list)
+        for (entity, entity_id), score in scores.items():
+            if entities is None or entity in entities:
+                per_entity[entity].append((entity, entity_id, score))
+        hits = []
+        for rows in per_entity.values():
+            rows.sort(key=lambda r: (-r[2], -r[1]))
+            hits.extend(rows[:limit_per_type])
+        return hits
+
+
+class _SQLiteFTSBackend:
+    name = "sqlite-fts5"
+
+    def ensure(self, conn):
+        created = not conn.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_documents_fts'"
+        )).first()
+        conn.execute(text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS search_documents_fts USING fts5("
+            "body, content='search_documents', content_rowid='id', "
+            "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        ))
+        conn.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS search_documents_ai AFTER INSERT ON search_documents BEGIN "
+            "INSERT INTO search_documents_fts(rowid, body) VALUES (new.id, new.body); END"
+        ))
+        conn.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS search_documents_ad AFTER DELETE ON search_documents BEGIN "
+            "INSERT INTO search_documents_fts(search_documents_fts, rowid, body) "
+            "VALUES ('delete', old.id, old.body); END"
+        ))
+        conn.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS search_documents_au AFTER UPDATE ON search_documents BEGIN "
+            "INSERT INTO search_documents_fts(search_documents_fts, rowid, body) "
+            "VALUES ('delete', old.id, old.body); "
+            "INSERT INTO search_documents_fts(rowid, body) VALUES (new.id, new.body); END"
+        ))
+        if created:
+            # Documents written before the FTS table existed (e.g. backfilled
+            # by a migration) are only indexed by a rebuild
+            self.after_rebuild(conn)
+
+    def search(self, conn, terms, limit_per_type, entities):
+        match = " ".join(f'"{t}"*' for t in terms)
+        entity_filter = ""
+        params = {"match": match, "limit": limit_per_type, "visible": True}
+        if entities is not None:
+            names = sorted(entities)
+            entity_filter = "AND d.entity IN (%s)" % ", ".join(f":e{i}" for i in range(len(names)))
+            params.update({f"e{i}": name for i, name in enumerate(names)})
+        rows = conn.execute(text(
+            "SELECT entity, entity_id, score FROM ("
+            " SELECT d.entity, d.entity_id, -f.rank AS score,"
+            "  ROW_NUMBER() OVER (PARTITION BY d.entity ORDER BY f.rank) AS rn"
+            " FROM search_documents_fts f JOIN search_documents d ON d.id = f.rowid"
+            f" WHERE search_documents_fts MATCH :match AND d.visible = :visible {entity_filter}"
+            ") WHERE rn <= :limit"
+        ), params)
+        return [tuple(r) for r in rows]
+
+    def after_rebuild(self, conn):
+        conn.execute(text("INSERT INTO search_documents_fts(search_documents_fts) VALUES ('rebuild')"))
+
+
+class _PostgresBackend:
+    name = "postgres-tsvector"
+
+    def ensure(self, conn):
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_search_documents_tsv "
+            "ON search_documents USING GIN (to_tsvector('simple', body))"
+        ))
+
+    def search(self, conn, terms, limit_per_type, entities):
+        params = {"tsquery": " & ".join(f"{t}:*" for t in terms), "limit": limit_per_type, "visible": True}
+        entity_filter = ""
+        if entities is not None:
+            entity_filter = "AND d.entity = ANY(:entities)"
+            params["entities"] = sorted(entities)
+        rows = conn.execute(text(
+            "SELECT entity, entity_id, score FROM ("
+            " SELECT d.entity, d.entity_id, ts_rank(to_tsvector('simple', d.body), q) AS score,"
+            "  ROW_NUMBER() OVER (PARTITION BY d.entity"
+            "   ORDER BY ts_rank(to_tsvector('simple', d.body), q) DESC) AS rn"
+            " FROM search_documents d, to_tsquery('simple', :tsquery) q"
+            f" WHERE to_tsvector('simple', d.body) @@ q AND d.visible = :visible {entity_filter}"
+            ") ranked WHERE rn <= :limit"
+        ), params)
+        return [tuple(r) for r in rows]
+
+    def after_rebuild(self, conn):
+        pass
+
+
+class _MemoryBackend:
+    """Serves searches from a MemoryInvertedIndex fed from ``search_documents``.
+
+    Upserts always insert a new row, so catching up on writes made by other
+    workers is an indexed ``id > high-water`` scan.  Only visible documents
+    are indexed; a record that becomes hidden is dropped when its new row is
+    caught up.  Deleted records are dropped when the caller hydrates hits
+    and finds no row.
+    """
+    name = "memory"
+
+    def __init__(self):
+        self.index = MemoryInvertedIndex()
+        self._high_water = 0
+        self._lock = threading.Lock()
+
+    def ensure(self, conn):
+        pass
+
+    def _catch_up(self, conn):
+        with self._lock:
+            rows = conn.execute(
+                documents.select()
+                .with_only_columns(
+                    documents.c.id, documents.c.entity, documents.c.entity_id, documents.c.body, documents.c.visible
+                )
+                .where(documents.c.id > self._high_water)
+                .order_by(documents.c.id)
+            )
+            for doc_id, entity, entity_id, body, visible in rows:
+                if visible:
+                    self.index.add(entity, entity_id, body)
+                else:
+                    self.index.remove(entity, entity_id)
+                self._high_water = doc_id
+
+    def search(self, conn, terms, limit_per_type, entities):
+        self._catch_up(conn)
+        return self.index.search(" ".join(terms), limit_per_type, entities)
+
+    def after_rebuild(self, conn):
+        with self._lock:
+            self.index.clear()
+            self._high_water = 0
+
+
+class SearchIndex:
+    """Registry of searchable models plus the active index backend."""
+
+    def __init__(self):
+        self._types = {}
+        self._by_model = defaultdict(list)
+        self.backend = None
+
+    @property
+    def types(self):
+        return dict(self._types)
+
+    def register(self, key, model, fields, visible=None):
+        """
+        Index ``fields`` of ``model`` under the global-search key ``key``.
+
+        ``visible`` maps columns to the values a record needs to be returned
+        by searches, e.g. ``{"is_archived": False}``.
+        """
+        searchable = SearchableType(key, model, fields, visible)
+        self._types[key] = searchable
+        if model not in self._by_model:
+            event.listen(model, "after_insert", self._after_insert)
+            event.listen(model, "after_update", self._after_update)
+            event.listen(model, "after_delete", self._after_delete)
+        self._by_model[model] = [t for t in self._by_model[model] if t.key != key] + [searchable]
+        return searchable
+
+    def ensure_schema(self):
+        """Create the engine-specific index structures and pick a backend."""
+        SearchDocument.__table__.create(db.engine, checkfirst=True)
+        dialect = db.engine.dialect.name
+        candidates = []
+        if dialect == "sqlite":
+            candidates.append(_SQLiteFTSBackend())
+        elif dialect == "postgresql":
+            candidates.append(_PostgresBackend())
+        candidates.append(_MemoryBackend())
+        for backend in candidates:
+            try:
+                with db.engine.begin() as conn:
+                    backend.ensure(conn)
+                self.backend = backend
+                break
+            except Exception as e:
+                current_app.logger.warning(f"Search backend {backend.name} unavailable: {e}")
+        return self.backend.name
+
+    # ------------------------------------------------------------------
+    # Mapper hooks - write through the flushing connection so the index
+    # commits or rolls back together with the record itself.
+    # ------------------------------------------------------------------
+    def _upsert(self, connection, searchable, target):
+        connection.execute(documents.delete().where(
+            documents.c.entity == searchable.key, documents.c.entity_id == target.id
+        ))
+        connection.execute(documents.insert().values(**searchable.document_row(target)))
+
+    def _after_insert(self, mapper, connection, target):
+        if self.backend is None:
+            return
+        for searchable in self._by_model.get(type(target), ()):
+            self._upsert(connection, searchable, target)
+
+    def _after_update(self, mapper, connection, target):
+        if self.backend is None:
+            return
+        for searchable in self._by_model.get(type(target), ()):
+            if searchable.indexed_fields_changed(target):
+                self._upsert(connection, searchable, target)
+
+    def _after_delete(self, mapper, connection, target):
+        if self.backend is None:
+            return
+        for searchable in self._by_model.get(type(target), ()):
+            connection.execute(documents.delete().where(
+                documents.c.entity == searchable.key, documents.c.entity_id == target.id
+            ))
+
+    # ------------------------------------------------------------------
+    # Query / maintenance
+    # ------------------------------------------------------------------
+    def search(self, query, limit_per_type=20, keys=None):
+        """Return ``{key: [entity_id, ...]}`` ranked best-first within each key."""
+        terms = tokenize(query)
+        if not terms or self.backend is None:
+            return {}
+        entities = set(keys) if keys is not None else None
+        hits = self.backend.search(db.session.connection(), terms, limit_per_type, entities)
+        hits.sort(key=lambda h: -h[2])
+        grouped = defaultdict(list)
+        for entity, entity_id, _score in hits:
+            if entity in self._types:
+                grouped[entity].append(entity_id)
+        return dict(grouped)
+
+    def index_ids(self, key, ids, connection=None):
+        """
+        Re-index the ``key`` records with primary keys ``ids``.
+
+        For rows written with Core inserts or updates, which the mapper hooks
+        never see.  Runs on ``connection`` (default: the session's), so the
+        documents commit or roll back together with the records.
+        """
+        ids = list(ids)
+        searchable = self._types.get(key)
+        if self.backend is None or searchable is None or not ids:
+            return 0
+        if connection is None:
+            connection = db.session.connection()
+        id_column = searchable.model.__table__.c.id
+        count = 0
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            connection.execute(documents.delete().where(
+                documents.c.entity == key, documents.c.entity_id.in_(chunk)
+            ))
+            rows = connection.execute(select(*searchable.columns()).where(id_column.in_(chunk))).all()
+            if rows:
+                connection.execute(documents.insert(), [searchable.document_row(row) for row in rows])
+            count += len(rows)
+        return count
+
+    def rebuild(self, keys=None, batch_size=1000, connection=None):
+        """
+        Re-index every record of the given keys (all keys by default).
+
+        Records are read with keyset-paged Core selects of just the indexed
+        columns.  Pass ``connection`` to run inside an existing transaction
+        (a migration); the caller then owns the schema and the commit.
+        """
+        if connection is None:
+            if self.backend is None:
+                self.ensure_schema()
+            with db.engine.begin() as conn:
+                counts = self.rebuild(keys, batch_size, connection=conn)
+            db.session.remove()
+            return counts
+
+        counts = {}
+        for key in list(self._types if keys is None else keys):
+            searchable = self._types[key]
+            table = searchable.model.__table__
+            columns = searchable.columns()
+            connection.execute(documents.delete().where(documents.c.entity == key))
+            count = 0
+            last_id = None
+            while True:
+                query = select(*columns).order_by(table.c.id).limit(batch_size)
+                if last_id is not None:
+                    query = query.where(table.c.id > last_id)
+                rows = connection.execute(query).all()
+                if not rows:
+                    break
+                connection.execute(documents.insert(), [searchable.document_row(row) for row in rows])
+                count += len(rows)
+                last_id = rows[-1].id
+            counts[key] = count
+        if self.backend is not None:
+            self.backend.after_rebuild(connection)
+        return counts
+
+
+search_index = SearchIndex()
+
+
+@click.group("search-index")
+def search_index_cli():
+    """Manage the global search index."""
+
+
+@search_index_cli.command("rebuild")
+@click.option("--type", "keys", multiple=True, help="Only rebuild these result keys (e.g. clients).")
+@click.option("--batch-size", default=1000, show_default=True)
+@with_appcontext
+def rebuild_command(keys, batch_size):
+    """Re-index all searchable records."""
+    from sas_management.services import search_service  # noqa: F401 - registers searchable models
+
+    unknown = set(keys) - set(search_index.types)
+    if unknown:
+        raise click.BadParameter(f"Unknown search types: {', '.join(sorted(unknown))}")
+    backend = search_index.ensure_schema()
+    counts = search_index.rebuild(keys or None, batch_size=batch_size)
+    for key, count in counts.items():
+        click.echo(f"{key}: {count}")
+    click.echo(f"Indexed {sum(counts.values())} records using {backend}.")
@@ -0,0 +1,164 @@
+"""
+Reference sequence service.
+
+Human-readable references (``POS-20260101-0001``, ``RCPT-…``, ``PROD-…``) are
+numbered from the ``sequences`` table - one row per (prefix, period) - with a
+single atomic increment instead of scanning the target table with
+``LIKE 'PREFIX-YYYYMMDD-%'``:
+
+PostgreSQL  ``UPDATE … RETURNING`` / ``INSERT … ON CONFLICT DO UPDATE`` on a
+            separate, immediately committed connection, so the row lock is
+            held for one statement rather than the caller's whole transaction.
+SQLite      the same statements inside ``BEGIN IMMEDIATE``.  When the
+            caller's session already holds the write lock the increment runs
+            on the session connection instead (a second connection would wait
+            on that lock).
+
+Values handed out by a transaction that later rolls back are not reused, so
+references are unique and increasing but may have gaps.
+
+The first reference of a prefix/period seeds its counter from the highest
+reference already stored in the target table (a one-off scan per day), so
+switching over mid-day never re-issues a number.
+"""
+import logging
+from datetime import datetime
+
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+
+from sas_management.models import ReferenceSequence, db
+
+logger = logging.getLogger(__name__)
+
+_sequences = ReferenceSequence.__table__
+_UPSERT_INSERTS = {"postgresql": pg_insert, "sqlite": sqlite_insert}
+
+
+def period_for(when=None):
+    """Daily period key, e.g. '20260101'."""
+    return (when or datetime.now()).strftime("%Y%m%d")
+
+
+def format_reference(prefix, period, value, width=4):
+    return f"{prefix}-{period}-{value:0{width}d}"
+
+
+def parse_reference(reference):
+    """(prefix, period, value) of a ``PREFIX-PERIOD-NNNN`` reference, or None."""
+    prefix, _, rest = str(reference or "").rpartition("-")
+    prefix, _, period = prefix.rpartition("-")
+    if not prefix or not period.isdigit() or not rest.isdigit():
+        return None
+    return prefix, period, int(rest)
+
+
+def seed_from_column(column, id_column):
+    """
+    Seed callable for ``allocate``: the numeric suffix of the newest
+    ``PREFIX-PERIOD-NNNN`` value already stored in ``column``.
+    """
+    def seed(conn, prefix, period):
+        latest = conn.execute(
+            select(column).where(column.like(f"{prefix}-{period}-%")).order_by(id_column.desc()).limit(1)
+        ).scalar()
+        if not latest:
+            return 0
+        try:
+            return int(latest.split("-")[-1])
+        except (ValueError, IndexError):
+            return 0
+    return seed
+
+
+def _increment(conn, prefix, period, count, seed):
+    """Add ``count`` to the counter on ``conn``; returns the new value."""
+    key = (_sequences.c.prefix == prefix) & (_sequences.c.period == period)
+    bump = update(_sequences).where(key).values(value=_sequences.c.value + count)
+    if conn.dialect.update_returning:
+        value = conn.execute(bump.returning(_sequences.c.value)).scalar()
+    elif conn.execute(bump).rowcount:
+        value = conn.execute(select(_sequences.c.value).where(key)).scalar()
+    else:
+        value = None
+    if value is not None:
+        return value
+
+    start = seed(conn, prefix, period) if seed else 0
+    dialect_insert = _UPSERT_INSERTS.get(conn.dialect.name)
+    if dialect_insert is not None:
+        # Another writer may create the row between our UPDATE and INSERT
+        stmt = (
+            dialect_insert(_sequences)
+            .values(prefix=prefix, period=period, value=start + count)
+            .on_conflict_do_update(
+                index_elements=[_sequences.c.prefix, _sequences.c.period],
+                set_={"value": _sequences.c.value + count},
+            )
+            .returning(_sequences.c.value)
+        )
+        return conn.execute(stmt).scalar()
+    try:
+        with conn.begin_nested():
+            conn.execute(_sequences.insert().values(prefix=prefix, period=period, value=start + count))
+        return start + count
+    except IntegrityError:
+        conn.execute(bump)
+        return conn.execute(select(_sequences.c.value).where(key)).scalar()
+
+
+def _session_holds_write_lock(conn):
+    driver = getattr(conn.connection, "driver_connection", None)
+    return bool(getattr(driver, "in_transaction", False))
+
+
+def allocate(prefix, period="", count=1, seed=None):
+    """
+    Reserve ``count`` consecutive values of the (prefix, period) sequence.
+
+    Returns the first value of the block.  ``seed(conn, prefix, period)``
+    supplies the highest value already in use and is only called when the
+    counter row does not exist yet.
+    """
+    if count < 1:
+        raise ValueError("count must be at least 1")
+    session_conn = db.session.connection()
+    dialect = session_conn.dialect.name
+    if dialect == "postgresql":
+        with db.engine.begin() as conn:
+            last = _increment(conn, prefix, period, count, seed)
+    elif dialect == "sqlite" and not _session_holds_write_lock(session_conn):
+        with db.engine.connect() as conn:
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+            last = _increment(conn, prefix, period, count, seed)
+            conn.commit()
+    else:
+        last = _increment(session_conn, prefix, period, count, seed)
+    return last - count + 1
+
+
+def next_reference(prefix, seed=None, when=None, width=4):
+    """Next ``PREFIX-YYYYMMDD-NNNN`` reference."""
+    period = period_for(when)
+    return format_reference(prefix, period, allocate(prefix, period, 1, seed), width)
+
+
+def reserve_block(prefix, size, seed=None, when=None, width=4):
+    """
+    Reserve ``size`` consecutive references in one increment, e.g. for a POS
+    terminal that will number orders while offline.
+
+    Returns {"prefix", "period", "first", "last", "references"}.
+    """
+    period = period_for(when)
+    first = allocate(prefix, period, size, seed)
+    last = first + size - 1
+    return {
+        "prefix": prefix,
+        "period": period,
+        "first": first,
+        "last": last,
+        "references": [format_reference(prefix, period, n, width) for n in range(first, last + 1)],
+    }
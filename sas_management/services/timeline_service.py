@@ -1,18 +1,87 @@
 """Timeline service."""
 from flask import current_app
 
+from sas_management.services.document_renderer import logo_flowable, register_document, renderer
+
+
+def timeline_document(event, items):
+    """Plain render data for an event's timeline (the document cache key is derived from it)."""
+    return {
+        "event": {
+            "id": event.id,
+            "title": event.title,
+            "date": event.date,
+            "venue": event.venue,
+        },
+        "items": [
+            {
+                "scheduled_time": item.scheduled_time,
+                "title": item.title,
+                "description": item.description,
+                "status": item.status,
+            }
+            for item in items
+        ],
+    }
+
+
 def export_timeline_pdf(event_id):
     """Export timeline as PDF."""
     try:
-        from sas_management.models import Timeline
-        timeline = Timeline.query.filter_by(event_id=event_id).first()
-        if not timeline:
+        from sas_management.models import Event, Timeline
+        items = Timeline.query.filter_by(event_id=event_id).order_by(Timeline.scheduled_time).all()
+        if not items:
             return {'success': False, 'error': 'Timeline not found'}
-        
-        # TODO: Implement PDF generation with ReportLab
-        return {'success': False, 'error': 'PDF export not implemented'}
+
+        event = items[0].event or Event.query.get(event_id)
+        path = renderer.render("event_timeline", timeline_document(event, items))
+        return {'success': True, 'path': path}
     except Exception as e:
         if current_app:
             current_app.logger.exception(f"Error exporting timeline: {e}")
         return {'success': False, 'error': str(e)}
 
+
+@register_document("event_timeline", version=1)
+def _render_timeline(pdf_path, data, assets):
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import inch
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+    sas_orange = colors.HexColor('#F26822')
+    styles = getSampleStyleSheet()
+    event = data["event"]
+    doc = SimpleDocTemplate(pdf_path, pagesize=A4,
+                            leftMargin=0.6*inch, rightMargin=0.6*inch,
+                            topMargin=0.5*inch, bottomMargin=0.4*inch)
+    story = []
+
+    logo_img = logo_flowable(assets, 0.9*inch, 0.9*inch)
+    if logo_img:
+        story.append(logo_img)
+    story.append(Paragraph(f"Event Timeline: {event['title']}", styles['Title']))
+    details = [event['date'].strftime('%B %d, %Y') if event['date'] else None, event['venue']]
+    story.append(Paragraph(" | ".join(d for d in details if d), styles['Normal']))
+    story.append(Spacer(1, 0.2*inch))
+
+    table_data = [['Time', 'Activity', 'Details', 'Status']]
+    for item in data["items"]:
+        table_data.append([
+            item['scheduled_time'].strftime('%d %b %H:%M') if item['scheduled_time'] else '',
+            Paragraph(item['title'] or '', styles['Normal']),
+            Paragraph(item['description'] or '', styles['Normal']),
+            item['status'] or '',
+        ])
+    table = Table(table_data, colWidths=[1.1*inch, 2.0*inch, 3.0*inch, 0.9*inch], repeatRows=1)
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), sas_orange),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#e0e0e0')),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f8f9fa')]),
+    ]))
+    story.append(table)
+    doc.build(story)
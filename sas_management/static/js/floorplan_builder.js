@@ -964,6 +964,19 @@ function loadInitialData() {
     }
 }
 
+let autosave = null;
+
+function existingLayout() {
+    if (!EXISTING_JSON) {
+        return null;
+    }
+    try {
+        return typeof EXISTING_JSON === 'string' ? JSON.parse(EXISTING_JSON) : EXISTING_JSON;
+    } catch (e) {
+        return null;
+    }
+}
+
 function saveFloorPlan() {
     // Use FLOORPLAN_ID if available, otherwise fallback to FLOOR_PLAN_ID
     const planId = (typeof FLOORPLAN_ID !== 'undefined' && FLOORPLAN_ID) 
@@ -972,22 +985,24 @@ function saveFloorPlan() {
         ? FLOOR_PLAN_ID
         : null;
     
-    // If we have a plan ID, use the direct save route
+    // If we have a plan ID, send only what changed since the last save
     if (planId) {
-        const json = stage.toJSON();
+        if (!autosave || autosave.planId !== planId) {
+            autosave = new FloorPlanAutosave({
+                url: `/floorplanner/${planId}/changes`,
+                revision: typeof FLOORPLAN_REVISION !== 'undefined' ? FLOORPLAN_REVISION : 0,
+                layout: planId === FLOORPLAN_ID ? existingLayout() : null,
+                // Last writer wins, as with the full saves this replaces
+                onConflict: () => true
+            });
+            autosave.planId = planId;
+        }
         
-        fetch(`/floor-plans/save/${planId}`, {
-            method: "POST",
-            headers: { "Content-Type": "application/json" },
-            body: JSON.stringify({ data: json })
-        })
-        .then(res => res.json())
+        autosave.save(JSON.parse(stage.toJSON()))
         .then(result => {
-            if (result.success) {
-                console.log("Saved successfully", result);
+            if (result.saved) {
                 // Silent save - no notifications
-            } else {
-                console.error("Save failed:", result.error);
+                console.log("Saved successfully", result);
             }
         })
         .catch(err => {
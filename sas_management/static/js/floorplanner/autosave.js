@@ -0,0 +1,155 @@
+/**
+ * Floor Plan Autosave - sends JSON-Patch deltas instead of whole layouts.
+ *
+ * Keeps the last layout the server acknowledged and its revision. save()
+ * diffs the current layout against it and posts only the changed paths with
+ * the revision they apply to; nothing is sent when nothing changed. A 409
+ * means the plan was saved elsewhere: onConflict(data) returns true to
+ * overwrite it with the local layout, false to leave it (e.g. to reload).
+ */
+(function (global) {
+    'use strict';
+
+    function isObject(value) {
+        return value !== null && typeof value === 'object' && !Array.isArray(value);
+    }
+
+    function escapeToken(key) {
+        return String(key).replace(/~/g, '~0').replace(/\//g, '~1');
+    }
+
+    function sameValue(a, b) {
+        if (a === b) return true;
+        if (Array.isArray(a)) {
+            if (!Array.isArray(b) || a.length !== b.length) return false;
+            for (let i = 0; i < a.length; i++) {
+                if (!sameValue(a[i], b[i])) return false;
+            }
+            return true;
+        }
+        if (isObject(a)) {
+            if (!isObject(b)) return false;
+            const keys = Object.keys(a);
+            if (keys.length !== Object.keys(b).length) return false;
+            return keys.every(key => Object.prototype.hasOwnProperty.call(b, key) && sameValue(a[key], b[key]));
+        }
+        return false;
+    }
+
+    function diff(before, after, path, ops) {
+        if (Array.isArray(before) && Array.isArray(after)) {
+            // Skip the unchanged head and tail so one insert or delete in a long
+            // object list is one operation rather than a rewrite of every later index
+            const common = Math.min(before.length, after.length);
+            let head = 0;
+            while (head < common && sameValue(before[head], after[head])) head++;
+            let tail = 0;
+            while (tail < common - head && sameValue(before[before.length - 1 - tail], after[after.length - 1 - tail])) tail++;
+            const oldItems = before.slice(head, before.length - tail);
+            const newItems = after.slice(head, after.length - tail);
+            const shared = Math.min(oldItems.length, newItems.length);
+            for (let i = 0; i < shared; i++) {
+                diff(oldItems[i], newItems[i], `${path}/${head + i}`, ops);
+            }
+            for (let i = oldItems.length - 1; i >= shared; i--) {
+                ops.push({ op: 'remove', path: `${path}/${head + i}` });
+            }
+            for (let i = shared; i < newItems.length; i++) {
+                ops.push({ op: 'add', path: `${path}/${head + i}`, value: newItems[i] });
+            }
+        } else if (isObject(before) && isObject(after)) {
+            Object.keys(before).forEach(key => {
+                if (!Object.prototype.hasOwnProperty.call(after, key)) {
+                    ops.push({ op: 'remove', path: `${path}/${escapeToken(key)}` });
+                }
+            });
+            Object.keys(after).forEach(key => {
+                const child = `${path}/${escapeToken(key)}`;
+                if (!Object.prototype.hasOwnProperty.call(before, key)) {
+                    ops.push({ op: 'add', path: child, value: after[key] });
+                } else {
+                    diff(before[key], after[key], child, ops);
+                }
+            });
+        } else if (!sameValue(before, after)) {
+            ops.push({ op: 'replace', path: path, value: after });
+        }
+        return ops;
+    }
+
+    function makePatch(before, after) {
+        return diff(before, after, '', []);
+    }
+
+    function clone(value) {
+        return JSON.parse(JSON.stringify(value));
+    }
+
+    function FloorPlanAutosave(options) {
+        this.url = options.url;
+        this.revision = options.revision || 0;
+        this.saved = options.layout ? clone(options.layout) : null;
+        this.onConflict = options.onConflict || null;
+        this.pending = null;
+    }
+
+    /**
+     * Save ``layout`` if it differs from the last saved one.
+     * Resolves to {saved, revision, bytes}; a save already in flight is
+     * returned as is and the next call picks up anything after it.
+     */
+    FloorPlanAutosave.prototype.save = function (layout) {
+        if (this.pending) return this.pending;
+        const current = clone(layout);
+        let body;
+        if (this.saved === null) {
+            body = { base_revision: this.revision, layout: current };
+        } else {
+            const patch = makePatch(this.saved, current);
+            if (!patch.length) {
+                return Promise.resolve({ saved: false, revision: this.revision, bytes: 0 });
+            }
+            body = { base_revision: this.revision, patch: patch };
+        }
+        this.pending = this._post(body, current).finally(() => {
+            this.pending = null;
+        });
+        return this.pending;
+    };
+
+    FloorPlanAutosave.prototype._post = function (body, current) {
+        const payload = JSON.stringify(body);
+        return fetch(this.url, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: payload
+        })
+        .then(response => response.json().then(data => ({ status: response.status, data: data })))
+        .then(({ status, data }) => {
+            if (status === 409) {
+                return this._conflict(data, current);
+            }
+            if (!data.success) {
+                if (status === 400) {
+                    // The server could not apply the patch; resync with the full layout next time
+                    this.saved = null;
+                }
+                throw new Error(data.error || 'Save failed');
+            }
+            this.revision = data.revision;
+            this.saved = current;
+            return { saved: true, revision: data.revision, bytes: payload.length };
+        });
+    };
+
+    FloorPlanAutosave.prototype._conflict = function (data, current) {
+        this.revision = data.revision;
+        if (this.onConflict && !this.onConflict(data)) {
+            return { saved: false, conflict: true, revision: data.revision, bytes: 0 };
+        }
+        return this._post({ base_revision: data.revision, layout: current }, current);
+    };
+
+    FloorPlanAutosave.makePatch = makePatch;
+    global.FloorPlanAutosave = FloorPlanAutosave;
+})(window);
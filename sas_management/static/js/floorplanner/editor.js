@@ -1169,7 +1169,28 @@ function rgbToHex(rgb) {
 // AUTOSAVE
 // ============================================================================
 
+const THUMBNAIL_INTERVAL = 120000; // Refresh the dashboard thumbnail at most every 2 minutes
+let autosave = null;
+let thumbnailSavedAt = 0;
+
 function startAutosave() {
+    if (typeof FLOORPLAN_ID === 'undefined' || !FLOORPLAN_ID) {
+        return;
+    }
+    autosave = new FloorPlanAutosave({
+        url: `/floorplanner/${FLOORPLAN_ID}/changes`,
+        revision: typeof FLOORPLAN_REVISION !== 'undefined' ? FLOORPLAN_REVISION : 0,
+        // Patches are made against the layout exactly as the server holds it
+        layout: typeof INITIAL_LAYOUT === 'object' && INITIAL_LAYOUT ? INITIAL_LAYOUT : null,
+        onConflict: function() {
+            if (confirm('This floor plan was changed elsewhere. Overwrite it with your version?')) {
+                return true;
+            }
+            location.reload();
+            return false;
+        }
+    });
+    thumbnailSavedAt = Date.now();
     autoSaveInterval = setInterval(function() {
         if (isDirty) {
             saveFloorPlan(true);
@@ -1177,20 +1198,7 @@ function startAutosave() {
     }, 5000); // Autosave every 5 seconds
 }
 
-function saveFloorPlan(isAutosave = false) {
-    if (typeof FLOORPLAN_ID === 'undefined' || !FLOORPLAN_ID) {
-        console.warn('Cannot save: Floor plan ID not available');
-        return;
-    }
-    
-    if (isAutosave) {
-        saveStatusEl.textContent = 'Autosaving...';
-        saveStatusEl.className = 'save-status saving';
-    } else {
-        saveStatusEl.textContent = 'Saving...';
-        saveStatusEl.className = 'save-status saving';
-    }
-    
+function currentLayout() {
     const layout = canvas.toJSON(['type', 'metadata']);
     layout.meta = {
         zoom: currentZoom,
@@ -1198,49 +1206,67 @@ function saveFloorPlan(isAutosave = false) {
         grid: gridEnabled,
         snap: snapEnabled
     };
-    
-    // Save layout
-    fetch(`/floorplanner/${FLOORPLAN_ID}/save`, {
+    return layout;
+}
+
+function saveThumbnail() {
+    thumbnailSavedAt = Date.now();
+    return fetch(`/floorplanner/${FLOORPLAN_ID}/save-thumbnail`, {
         method: 'POST',
         headers: {
             'Content-Type': 'application/json',
         },
-        body: JSON.stringify({ layout: layout })
-    })
-    .then(response => response.json())
-    .then(data => {
-        if (data.success) {
-            // Generate and save thumbnail
-            const thumbnail = canvas.toDataURL('image/png');
-            return fetch(`/floorplanner/${FLOORPLAN_ID}/save-thumbnail`, {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({ thumbnail: thumbnail })
-            });
-        } else {
-            throw new Error(data.error || 'Save failed');
-        }
+        body: JSON.stringify({ thumbnail: canvas.toDataURL('image/png') })
     })
     .then(response => response.json())
     .then(data => {
-        if (data.success) {
-            saveStatusEl.textContent = 'Saved ✓';
-            saveStatusEl.className = 'save-status saved';
-            isDirty = false;
-            
-            setTimeout(() => {
-                if (!isDirty) {
-                    saveStatusEl.textContent = 'Ready';
-                    saveStatusEl.className = 'save-status';
-                }
-            }, 2000);
-        } else {
+        if (!data.success) {
             throw new Error(data.error || 'Thumbnail save failed');
         }
+    });
+}
+
+function saveFloorPlan(isAutosave = false) {
+    if (!autosave) {
+        console.warn('Cannot save: Floor plan ID not available');
+        return;
+    }
+    
+    if (isAutosave) {
+        saveStatusEl.textContent = 'Autosaving...';
+        saveStatusEl.className = 'save-status saving';
+    } else {
+        saveStatusEl.textContent = 'Saving...';
+        saveStatusEl.className = 'save-status saving';
+    }
+    
+    // Only the changes since the last save are sent; edits made while this
+    // request is in flight stay dirty and go out with the next autosave
+    isDirty = false;
+    autosave.save(currentLayout())
+    .then(result => {
+        if (result.conflict) {
+            return;
+        }
+        // The thumbnail only feeds the dashboard: send it on an explicit save
+        // and otherwise at most every couple of minutes
+        if (result.saved && (!isAutosave || Date.now() - thumbnailSavedAt > THUMBNAIL_INTERVAL)) {
+            return saveThumbnail();
+        }
+    })
+    .then(() => {
+        saveStatusEl.textContent = 'Saved ✓';
+        saveStatusEl.className = 'save-status saved';
+        
+        setTimeout(() => {
+            if (!isDirty) {
+                saveStatusEl.textContent = 'Ready';
+                saveStatusEl.className = 'save-status';
+            }
+        }, 2000);
     })
     .catch(error => {
+        isDirty = true;
         console.error('Save error:', error);
         saveStatusEl.textContent = 'Error saving';
         saveStatusEl.className = 'save-status error';
@@ -0,0 +1,233 @@
+"""
+Index advisor - find queries that scan whole tables.
+
+Hooks SQLAlchemy's ``before_cursor_execute`` on every engine, records each
+distinct SELECT shape, asks the database for its plan (``EXPLAIN QUERY PLAN``
+on SQLite, ``EXPLAIN`` on PostgreSQL) and reports which shapes scan a table
+together with an index that would serve their filters and sort keys.
+
+Typical use is through the test suite::
+
+    python -m pytest --index-advisor
+
+or programmatically::
+
+    advisor = IndexAdvisor()
+    advisor.install()
+    ...  # exercise the app
+    print(advisor.report())
+    advisor.uninstall()
+"""
+
+import re
+from collections import OrderedDict, defaultdict
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_WS_RE = re.compile(r"\s+")
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM_RE = re.compile(r"%\(\w+\)s|:\w+|\?|%s")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_TABLE_RE = re.compile(r'\b(?:FROM|JOIN)\s+"?(\w+)"?(?:\s+(?:AS\s+)?"?(\w+)"?)?', re.IGNORECASE)
+_PREDICATE_RE = re.compile(
+    r'(?:"?(\w+)"?\.)?"?(\w+)"?\s*(=|!=|<>|>=|<=|>|<|\bIN\b|\bIS\b|\bBETWEEN\b|\bLIKE\b)',
+    re.IGNORECASE,
+)
+_ORDER_RE = re.compile(r"\bORDER BY\b(.*?)(?:\bLIMIT\b|\bOFFSET\b|$)", re.IGNORECASE | re.DOTALL)
+_WHERE_RE = re.compile(r"\bWHERE\b(.*?)(?:\bGROUP BY\b|\bORDER BY\b|\bLIMIT\b|$)", re.IGNORECASE | re.DOTALL)
+_SQL_KEYWORDS = {
+    "where", "on", "join", "left", "right", "inner", "outer", "group", "order",
+    "limit", "offset", "select", "from", "and", "or", "not", "as", "using",
+}
+
+_EQUALITY_OPS = {"=", "in", "is"}
+
+
+def normalize_sql(statement):
+    """Reduce a statement to its shape: literals and parameters become ``?``."""
+    sql = _STRING_RE.sub("?", statement)
+    sql = _PARAM_RE.sub("?", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = _WS_RE.sub(" ", sql).strip()
+    return _IN_LIST_RE.sub("(?)", sql)
+
+
+def _table_aliases(sql):
+    aliases = {}
+    for table, alias in _TABLE_RE.findall(sql):
+        aliases[table] = table
+        if alias and alias.lower() not in _SQL_KEYWORDS:
+            aliases[alias] = table
+    return aliases
+
+
+def suggest_indexes(statement):
+    """
+    Suggest one composite index per table referenced by ``statement``.
+
+    Equality columns come first, followed by a single range or sort column,
+    which is the column order a B-tree can use for both filter and ORDER BY.
+
+    Returns:
+        dict: {table: [column, ...]}
+    """
+    aliases = _table_aliases(statement)
+    if not aliases:
+        return {}
+    default_table = next(iter(aliases.values()))
+    equality = defaultdict(list)
+    trailing = defaultdict(list)
+
+    where = _WHERE_RE.search(statement)
+    if where:
+        for alias, column, op in _PREDICATE_RE.findall(where.group(1)):
+            if column.lower() in _SQL_KEYWORDS:
+                continue
+            table = aliases.get(alias, default_table) if alias else default_table
+            bucket = equality if op.lower() in _EQUALITY_OPS else trailing
+            if column not in bucket[table]:
+                bucket[table].append(column)
+
+    order = _ORDER_RE.search(statement)
+    if order:
+        for term in order.group(1).split(","):
+            parts = term.strip().split()
+            if not parts:
+                continue
+            ref = parts[0].replace('"', "")
+            alias, _, column = ref.rpartition(".")
+            table = aliases.get(alias, default_table) if alias else default_table
+            if column not in trailing[table]:
+                trailing[table].append(column)
+
+    suggestions = {}
+    for table in set(equality) | set(trailing):
+        columns = list(equality[table])
+        for column in trailing[table]:
+            if column not in columns:
+                columns.append(column)
+                break
+        if columns:
+            suggestions[table] = columns
+    return suggestions
+
+
+def _scanned_tables(dialect, plan_lines):
+    """Tables the plan reads in full (no index lookup)."""
+    scanned = []
+    for line in plan_lines:
+        if dialect == "sqlite":
+            match = re.match(r"\s*SCAN (?:TABLE )?(\w+)(.*)", line)
+            if match and match.group(1) != "CONSTANT" and "USING" not in match.group(2):
+                scanned.append(match.group(1))
+        else:
+            match = re.search(r"Seq Scan on (\w+)", line)
+            if match:
+                scanned.append(match.group(1))
+    return scanned
+
+
+class QueryShape:
+    """One distinct SELECT shape seen during capture."""
+
+    def __init__(self, sql, statement):
+        self.sql = sql
+        self.statement = statement
+        self.count = 0
+        self.plan = []
+        self.scanned = []
+        self.suggestions = {}
+        self.error = None
+
+
+class IndexAdvisor:
+    """Capture query shapes from all engines and explain each one once."""
+
+    def __init__(self, max_shapes=2000):
+        self.max_shapes = max_shapes
+        self.shapes = OrderedDict()
+        self._installed = False
+
+    def install(self):
+        if not self._installed:
+            event.listen(Engine, "before_cursor_execute", self._before_cursor_execute)
+            self._installed = True
+        return self
+
+    def uninstall(self):
+        if self._installed:
+            event.remove(Engine, "before_cursor_execute", self._before_cursor_execute)
+            self._installed = False
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if executemany:
+            return
+        head = statement.lstrip()[:6].upper()
+        if not (head.startswith("SELECT") or head.startswith("WITH")):
+            return
+        sql = normalize_sql(statement)
+        shape = self.shapes.get(sql)
+        if shape is None:
+            if len(self.shapes) >= self.max_shapes:
+                return
+            shape = QueryShape(sql, statement)
+            self.shapes[sql] = shape
+            self._explain(conn, shape, statement, parameters)
+        shape.count += 1
+
+    def _explain(self, conn, shape, statement, parameters):
+        dialect = conn.dialect.name
+        prefix = "EXPLAIN QUERY PLAN " if dialect == "sqlite" else "EXPLAIN "
+        explain_cursor = None
+        try:
+            # A separate DBAPI cursor so the statement about to run is untouched
+            explain_cursor = conn.connection.cursor()
+            explain_cursor.execute(prefix + statement, parameters or ())
+            rows = explain_cursor.fetchall()
+            if dialect == "sqlite":
+                shape.plan = [row[-1] for row in rows]
+            else:
+                shape.plan = [row[0] for row in rows]
+        except Exception as e:
+            shape.error = str(e)
+            return
+        finally:
+            if explain_cursor is not None:
+                try:
+                    explain_cursor.close()
+                except Exception:
+                    pass
+        aliases = _table_aliases(statement)
+        shape.scanned = [
+            aliases.get(t, t) for t in _scanned_tables(dialect, shape.plan)
+            if not t.startswith(("sqlite_", "pg_"))
+        ]
+        if shape.scanned:
+            suggestions = suggest_indexes(statement)
+            shape.suggestions = {t: cols for t, cols in suggestions.items() if t in shape.scanned}
+
+    def scanning_shapes(self):
+        """Shapes whose plan reads at least one table in full, most frequent first."""
+        return sorted((s for s in self.shapes.values() if s.scanned), key=lambda s: -s.count)
+
+    def report(self):
+        """Human-readable summary of scans and the indexes that would serve them."""
+        scanning = self.scanning_shapes()
+        lines = [
+            "Index advisor: %d query shapes captured, %d scan a table"
+            % (len(self.shapes), len(scanning))
+        ]
+        for shape in scanning:
+            lines.append("")
+            lines.append("[%dx] %s" % (shape.count, shape.sql[:300]))
+            lines.append("  plan: " + " | ".join(shape.plan))
+            for table, columns in shape.suggestions.items():
+                lines.append(
+                    "  suggest: CREATE INDEX ix_%s_%s ON %s (%s)"
+                    % (table, "_".join(columns), table, ", ".join(columns))
+                )
+            if not shape.suggestions:
+                lines.append("  suggest: none (no filter or sort column on the scanned table)")
+        return "\n".join(lines)
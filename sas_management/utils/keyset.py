@@ -0,0 +1,89 @@
+"""
+Keyset (cursor) pagination over an increasing integer id.
+
+Instead of OFFSET, pages are addressed by the id of the last row the client
+already has:
+
+    after_id=N    rows with id > N (new rows since the client last looked)
+    before_id=N   the newest ``limit`` rows with id < N (scroll back)
+    neither       the newest ``limit`` rows
+
+With a (scope, id) index every page is a short range scan, however long the
+thread is.  Items always come back oldest first.
+"""
+from sqlalchemy import func
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 500
+
+
+def parse_cursor(value):
+    """Positive int from a query-string value, else None."""
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return None
+    return value if value > 0 else None
+
+
+def clamp_limit(value, default=DEFAULT_LIMIT, maximum=MAX_LIMIT):
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(value, maximum))
+
+
+class KeysetPage:
+    """One page of rows plus the cursors to fetch its neighbours."""
+
+    __slots__ = ("items", "has_more", "after_id", "before_id")
+
+    def __init__(self, items, has_more, after_id=None, before_id=None):
+        self.items = items
+        # after_id pages: more new rows follow; otherwise: older rows exist
+        self.has_more = has_more
+        self.after_id = after_id
+        self.before_id = before_id
+
+    @property
+    def first_id(self):
+        return self.items[0].id if self.items else None
+
+    @property
+    def last_id(self):
+        return self.items[-1].id if self.items else None
+
+    def cursors(self):
+        """Cursors for the next poll and the previous (older) page."""
+        return {
+            "next_after_id": self.last_id or self.after_id,
+            "prev_before_id": self.first_id if self.has_more and not self.after_id else None,
+            "has_more": self.has_more,
+        }
+
+
+def keyset_page(query, id_column, after_id=None, before_id=None, limit=DEFAULT_LIMIT):
+    """
+    Apply keyset pagination to ``query`` on ``id_column``.
+
+    ``query`` is a legacy ``Query`` already filtered to one scope (channel,
+    thread, department); one extra row is fetched to compute ``has_more``.
+    """
+    if after_id:
+        rows = query.filter(id_column > after_id).order_by(id_column.asc()).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        return KeysetPage(rows[:limit], has_more, after_id=after_id)
+
+    if before_id:
+        query = query.filter(id_column < before_id)
+    rows = query.order_by(id_column.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    rows.reverse()
+    return KeysetPage(rows, has_more, before_id=before_id)
+
+
+def scope_head(query, id_column):
+    """Highest id in the (filtered) scope - cheap with a (scope, id) index."""
+    return query.with_entities(func.max(id_column)).scalar() or 0
@@ -2,9 +2,10 @@
 PDF Generator Utility for Event Briefs
 Generates professional PDF documents for events with SAS Best Foods branding.
 """
-import os
-from datetime import datetime
-from flask import current_app, url_for
+from datetime import date, datetime
+from flask import url_for
+
+from sas_management.services.document_renderer import register_document, renderer
 try:
     from weasyprint import HTML, CSS
     WEASYPRINT_AVAILABLE = True
@@ -21,33 +22,45 @@ def generate_event_brief_pdf(event):
     """
     Generate a PDF event brief for the given event.
     
+    The HTML is built here; laying it out as a PDF happens in the document
+    pool, and an unchanged brief is served from the document cache.
+    
     Returns:
         str: Path to the generated PDF file
     """
+    return renderer.render("event_brief", _event_brief_document(event))
+
+
+def prepare_event_brief_pdf(event):
+    """
+    Non-blocking ``generate_event_brief_pdf`` for request handlers.
+    
+    Returns:
+        str: Path to the PDF, or None while the document pool is still rendering it
+    """
+    return renderer.prepare("event_brief", _event_brief_document(event))
+
+
+def _event_brief_document(event):
     if not WEASYPRINT_AVAILABLE and not PDFKIT_AVAILABLE:
         raise Exception("No PDF library available. Install weasyprint or pdfkit.")
     
-    # Generate HTML content
-    html_content = _generate_event_brief_html(event)
-    
-    # Create output directory
-    output_dir = os.path.join(current_app.instance_path, "..", "static", "pdfs")
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # Generate filename
-    filename = f"event_brief_{event.id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-    filepath = os.path.join(output_dir, filename)
-    
-    # Generate PDF
+    # Dated (not timestamped) so a brief is reused for the rest of the day
+    html_content = _generate_event_brief_html(event, generated_on=date.today())
+    return {"event_id": event.id, "html": html_content}
+
+
+@register_document("event_brief", version=1)
+def _render_event_brief(pdf_path, data, assets):
     if WEASYPRINT_AVAILABLE:
-        HTML(string=html_content).write_pdf(filepath)
+        HTML(string=data["html"]).write_pdf(pdf_path)
     elif PDFKIT_AVAILABLE:
-        pdfkit.from_string(html_content, filepath)
-    
-    return filepath
+        pdfkit.from_string(data["html"], pdf_path)
+    else:
+        raise Exception("No PDF library available. Install weasyprint or pdfkit.")
 
 
-def _generate_event_brief_html(event):
+def _generate_event_brief_html(event, generated_on=None):
     """Generate HTML content for event brief."""
     
     # Format dates
@@ -276,7 +289,7 @@ def _generate_event_brief_html(event):
         {f'<div class="section"><div class="section-title">Notes</div><p>{event.notes}</p></div>' if event.notes else ''}
         
         <div class="footer">
-            <p>Generated on {datetime.now().strftime("%B %d, %Y at %I:%M %p")}</p>
+            <p>Generated on {generated_on.strftime("%B %d, %Y") if generated_on else datetime.now().strftime("%B %d, %Y at %I:%M %p")}</p>
             <p>SAS Best Foods Management System</p>
         </div>
     </body>
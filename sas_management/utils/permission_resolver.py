@@ -0,0 +1,160 @@
+"""
+Permission resolution engine.
+
+A user's effective permissions (primary ``role_id`` role plus every role in
+``user_roles``) are loaded with one query and compiled into an
+``EffectivePermissions`` object holding frozensets, so each check is a set
+lookup.  Results are cached per request in ``flask.g`` and across requests in
+an LRU keyed by (user_id, RBAC version).  The RBAC version is bumped by any
+flush that writes roles, permissions, role assignments or RoleAssignmentLog
+rows (see ``sas_management.utils.rbac_version``).
+
+Wildcards work in both directions: a granted ``events.*`` (or ``*``) allows
+``events.view``, and asking for ``events.*`` is true when any ``events.``
+permission is granted.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from flask import g, has_app_context
+from sqlalchemy import or_, select
+
+from sas_management.utils import rbac_version
+
+ADMIN_ROLE_NAME = "Admin"
+
+
+def _prefixes(code):
+    """'a.b.c' -> ['a', 'a.b']"""
+    parts = code.split(".")
+    return [".".join(parts[:i]) for i in range(1, len(parts))]
+
+
+class EffectivePermissions:
+    """Compiled, immutable permission set for one user."""
+
+    __slots__ = ("user_id", "is_admin", "role_names", "codes", "_granted_wildcards", "_code_prefixes")
+
+    def __init__(self, user_id, is_admin=False, role_names=(), codes=()):
+        self.user_id = user_id
+        self.is_admin = is_admin
+        self.role_names = frozenset(role_names)
+        codes = frozenset(c for c in codes if c)
+        self.codes = codes
+        # "events.*" grants -> {"events"}; "*" -> {""}
+        self._granted_wildcards = frozenset(c[:-2] if c != "*" else "" for c in codes if c == "*" or c.endswith(".*"))
+        self._code_prefixes = frozenset(p for c in codes for p in _prefixes(c))
+
+    def allows(self, code):
+        if self.is_admin or code in self.codes:
+            return True
+        if not code:
+            return False
+        if self._granted_wildcards:
+            if "" in self._granted_wildcards:
+                return True
+            for prefix in _prefixes(code):
+                if prefix in self._granted_wildcards:
+                    return True
+        if code.endswith(".*"):
+            return code[:-2] in self._code_prefixes
+        return False
+
+    def allows_any(self, *codes):
+        return any(self.allows(code) for code in codes)
+
+    def has_role(self, *names):
+        return not self.role_names.isdisjoint(names)
+
+
+def load_effective_permissions(user):
+    """Query the roles and permission codes of ``user`` (one round trip)."""
+    from sas_management.models import Permission, Role, RolePermission, UserRole, db, user_roles
+
+    in_roles = Role.id.in_(select(user_roles.c.role_id).where(user_roles.c.user_id == user.id))
+    if user.role_id:
+        in_roles = or_(in_roles, Role.id == user.role_id)
+    stmt = (
+        select(Role.name, Permission.code)
+        .select_from(Role)
+        .outerjoin(RolePermission, RolePermission.role_id == Role.id)
+        .outerjoin(Permission, Permission.id == RolePermission.permission_id)
+        .where(in_roles)
+    )
+    role_names = set()
+    codes = set()
+    for role_name, code in db.session.execute(stmt):
+        role_names.add(role_name)
+        if code:
+            codes.add(code)
+    is_admin = user.role == UserRole.Admin or ADMIN_ROLE_NAME in role_names
+    return EffectivePermissions(user.id, is_admin, role_names, codes)
+
+
+class PermissionResolver:
+    """LRU of compiled permission sets, shared by all requests in the process."""
+
+    def __init__(self, max_size=2048, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def configure(self, app):
+        self.max_size = app.config.get("PERMISSION_CACHE_SIZE", self.max_size)
+        self.ttl = app.config.get("PERMISSION_CACHE_TTL", self.ttl)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def resolve(self, user):
+        """Effective permissions of ``user``; queries only on a cache miss."""
+        user_id = getattr(user, "id", None)
+        if not user_id:
+            return EffectivePermissions(None)
+        if rbac_version.user_roles_changed(user):
+            # Unflushed role edits on this instance - answer from them, uncached
+            return load_effective_permissions(user)
+
+        version = rbac_version.current_version()
+        key = (user_id, version)
+        per_request = None
+        if has_app_context():
+            per_request = g.setdefault("_effective_permissions", {})
+            cached = per_request.get(key)
+            if cached is not None:
+                return cached
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] > now:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                if per_request is not None:
+                    per_request[key] = entry[1]
+                return entry[1]
+
+        self.misses += 1
+        effective = load_effective_permissions(user)
+        with self._lock:
+            self._cache[key] = (now + self.ttl, effective)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+        if per_request is not None:
+            per_request[key] = effective
+        return effective
+
+    def stats(self):
+        return {"size": len(self._cache), "capacity": self.max_size, "hits": self.hits, "misses": self.misses}
+
+
+permission_resolver = PermissionResolver()
+
+
+def resolve_permissions(user):
+    return permission_resolver.resolve(user)
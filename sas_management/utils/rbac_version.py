@@ -0,0 +1,84 @@
+"""
+Process-wide RBAC version counter.
+
+Anything cached from roles and permissions (navigation menus, resolved
+permission sets) is keyed by ``current_version()``.  The counter is bumped
+whenever a flush touches a role, permission, role/permission link, a user's
+role assignment or writes a RoleAssignmentLog row, and on bulk
+``query.delete()`` / ``query.update()`` against those models, so callers
+rarely need to call ``bump_version()`` themselves.
+
+The counter is per process: other workers pick up changes when their cache
+entries expire (see ``NAVIGATION_CACHE_TTL``).
+"""
+import threading
+
+from sqlalchemy import event, inspect as sa_inspect
+
+_lock = threading.Lock()
+_version = 0
+_installed = False
+
+# User attributes that change what a user is allowed to see
+_USER_ROLE_ATTRS = ("role_id", "role", "roles")
+
+
+def current_version():
+    return _version
+
+
+def bump_version():
+    """Invalidate everything keyed by the current RBAC version."""
+    global _version
+    with _lock:
+        _version += 1
+        return _version
+
+
+def _rbac_models():
+    from sas_management.models import Permission, Role, RoleAssignmentLog, RolePermission
+    return (Role, Permission, RolePermission, RoleAssignmentLog)
+
+
+def user_roles_changed(user):
+    """True when ``user`` has unflushed changes to its role assignment."""
+    state = sa_inspect(user)
+    if not state.modified:
+        return False
+    for attr in _USER_ROLE_ATTRS:
+        try:
+            if state.attrs[attr].history.has_changes():
+                return True
+        except KeyError:
+            continue
+    return False
+
+
+def _after_flush(session, flush_context):
+    from sas_management.models import User
+    rbac_models = _rbac_models()
+    for obj in session.new | session.dirty | session.deleted:
+        if isinstance(obj, rbac_models):
+            bump_version()
+            return
+        if isinstance(obj, User) and (obj in session.new or obj in session.deleted or user_roles_changed(obj)):
+            bump_version()
+            return
+
+
+def _do_orm_execute(orm_execute_state):
+    if not (orm_execute_state.is_delete or orm_execute_state.is_update):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and issubclass(mapper.class_, _rbac_models()):
+        bump_version()
+
+
+def install(session):
+    """Attach the invalidation listeners to a session (or session class)."""
+    global _installed
+    if _installed:
+        return
+    event.listen(session, "after_flush", _after_flush)
+    event.listen(session, "do_orm_execute", _do_orm_execute)
+    _installed = True
@@ -0,0 +1,126 @@
+"""
+Benchmark floor plan autosave payloads and writes on a large layout.
+
+Builds a layout of N objects (default 2,000 tables, chairs and labels shaped
+like the editor's canvas JSON) and replays a session of typical autosaves:
+nudging a few tables, adding one, deleting one, toggling the grid.  For each
+it reports the JSON-Patch sent against the full layout the editor used to
+post, the time to diff and apply it, and the time to store it through
+``apply_changes`` in a throwaway SQLite database (including the periodic
+compaction).  The stored layout is checked against the editor's copy at the
+end.
+
+    python scripts/bench_floorplan_autosave.py
+    python scripts/bench_floorplan_autosave.py --objects 5000 --saves 200
+"""
+import argparse
+import copy
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from flask import Flask  # noqa: E402
+
+from sas_management.models import FloorPlan, db  # noqa: E402
+from sas_management.services.floorplanner_service import (  # noqa: E402
+    apply_changes, apply_patch, current_layout, make_patch,
+)
+
+
+def build_app(url, compact_every):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = url
+    app.config["FLOORPLAN_COMPACT_EVERY"] = compact_every
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def canvas_object(rng, n):
+    kind = rng.choice(["table", "chair", "chair", "chair", "label"])
+    return {
+        "type": "group", "version": "5.3.0", "originX": "left", "originY": "top",
+        "left": rng.randint(0, 4000), "top": rng.randint(0, 3000), "width": 60, "height": 60,
+        "fill": "#D4AF37", "stroke": "#0A1A44", "strokeWidth": 1, "angle": rng.choice([0, 0, 45, 90]),
+        "scaleX": 1, "scaleY": 1, "opacity": 1, "visible": True,
+        "metadata": {"kind": kind, "id": f"{kind}-{n}", "seats": 8 if kind == "table" else None, "label": f"{kind} {n}"},
+    }
+
+
+def edit(layout, rng, counter):
+    objects = layout["objects"]
+    roll = rng.random()
+    if roll < 0.7:
+        for obj in rng.sample(objects, 3):
+            obj["left"] += rng.randint(-40, 40)
+            obj["top"] += rng.randint(-40, 40)
+    elif roll < 0.8:
+        objects.insert(rng.randrange(len(objects)), canvas_object(rng, counter))
+    elif roll < 0.9:
+        del objects[rng.randrange(len(objects))]
+    else:
+        layout["meta"]["grid"] = not layout["meta"]["grid"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--objects", type=int, default=2000)
+    parser.add_argument("--saves", type=int, default=100)
+    parser.add_argument("--compact-every", type=int, default=50)
+    args = parser.parse_args()
+    rng = random.Random(7)
+
+    layout = {"objects": [canvas_object(rng, n) for n in range(args.objects)],
+              "meta": {"zoom": 1, "pan": {"x": 0, "y": 0}, "grid": True, "snap": True}}
+    tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    app = build_app(f"sqlite:///{tmp.name}", args.compact_every)
+    patch_bytes, full_bytes, diff_ms, apply_ms, store_ms = [], [], [], [], []
+    with app.app_context():
+        floorplan = FloorPlan(name="Bench", data=json.dumps(layout, separators=(",", ":")))
+        db.session.add(floorplan)
+        db.session.commit()
+        plan_id, revision = floorplan.id, floorplan.revision
+
+        for n in range(args.saves):
+            before = copy.deepcopy(layout)
+            edit(layout, rng, args.objects + n)
+            full_bytes.append(len(json.dumps({"layout": layout})))
+
+            started = time.perf_counter()
+            patch = make_patch(before, layout)
+            diff_ms.append((time.perf_counter() - started) * 1000)
+            patch_bytes.append(len(json.dumps({"base_revision": revision, "patch": patch})))
+
+            started = time.perf_counter()
+            apply_patch(before, patch)
+            apply_ms.append((time.perf_counter() - started) * 1000)
+
+            started = time.perf_counter()
+            revision = apply_changes(plan_id, revision, patch)
+            store_ms.append((time.perf_counter() - started) * 1000)
+
+        stored = current_layout(plan_id)["layout"]
+        db.session.remove()
+
+    def median(values):
+        return sorted(values)[len(values) // 2]
+
+    print(f"layout:   {args.objects} objects, {args.saves} autosaves, compaction every {args.compact_every}")
+    print(f"payload:  {median(patch_bytes)} B patch vs {median(full_bytes) / 1024:.0f} KB full layout (median)")
+    print(f"total:    {sum(patch_bytes) / 1024:.1f} KB sent vs {sum(full_bytes) / 1024 / 1024:.1f} MB before")
+    print(f"diff:     {median(diff_ms):.1f} ms   apply: {median(apply_ms):.2f} ms   "
+          f"store: {median(store_ms):.1f} ms (max {max(store_ms):.0f} ms, compaction)")
+    ok = stored == layout
+    print(f"stored layout matches: {'yes' if ok else 'NO'}")
+    os.unlink(tmp.name)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
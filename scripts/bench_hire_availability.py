@@ -0,0 +1,135 @@
+"""
+Benchmark hire equipment availability over a large booking history.
+
+Seeds a throwaway SQLite database with N items (default 10,000) and M hire
+orders (default 100,000, 1-3 lines each, spread over the last two years and
+the next six months), then times:
+
+* building the availability index;
+* "what is free over these three days" for the whole catalog;
+* refreshing the index after one more booking is committed;
+* a locked ``reserve`` of one item.
+
+The catalog answer is checked against a day-by-day brute force for a sample
+of items.
+
+    python scripts/bench_hire_availability.py
+    python scripts/bench_hire_availability.py --items 2000 --orders 20000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from flask import Flask  # noqa: E402
+
+from sas_management.models import InventoryItem, Order, OrderItem, db  # noqa: E402
+from sas_management.services.hire_availability import HireAvailability, load_reservations  # noqa: E402
+
+
+def build_app(url):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = url
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def seed(item_count, order_count, rng):
+    today = date.today()
+    db.session.execute(InventoryItem.__table__.insert(), [
+        {"name": f"Item {n:05d}", "stock_count": rng.randint(20, 600), "unit_price_ugx": 0, "status": "Available"}
+        for n in range(item_count)
+    ])
+    orders = []
+    for n in range(order_count):
+        first = today + timedelta(days=rng.randint(-730, 180))
+        orders.append({
+            "client_name": f"Client {n}",
+            "start_date": first,
+            "end_date": first + timedelta(days=rng.randint(0, 4)),
+            "status": rng.choice(["Pending", "Confirmed", "Completed", "Completed", "Cancelled"]),
+            "total_cost": 0, "discount_amount": 0, "amount_paid": 0, "balance_due": 0,
+        })
+    db.session.execute(Order.__table__.insert(), orders)
+    db.session.execute(OrderItem.__table__.insert(), [
+        {"order_id": order_id, "item_id": rng.randint(1, item_count), "qty": rng.randint(1, 40), "price": 1000, "subtotal": 0}
+        for order_id in range(1, order_count + 1)
+        for _ in range(rng.randint(1, 3))
+    ])
+    db.session.commit()
+
+
+def brute_force(item_id, first, last):
+    reservations = load_reservations([item_id], first, last).get(item_id, [])
+    days = [first + timedelta(days=n) for n in range((last - first).days + 1)]
+    return max((sum(qty for a, b, qty in reservations if a <= d <= b) for d in days), default=0)
+
+
+def timed(fn, repeat=1):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--orders", type=int, default=100000)
+    parser.add_argument("--sample", type=int, default=50, help="items checked against the brute force")
+    args = parser.parse_args()
+    rng = random.Random(7)
+
+    tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    app = build_app(f"sqlite:///{tmp.name}")
+    engine = HireAvailability(ttl=3600, history_days=90)
+    engine.init_app(app)
+    failures = 0
+    with app.app_context():
+        _, seed_ms = timed(lambda: seed(args.items, args.orders, rng))
+        first = date.today() + timedelta(days=30)
+        last = first + timedelta(days=2)
+
+        _, build_ms = timed(engine._index)
+        rows, query_ms = timed(lambda: engine.availability(first, last, quantity=300), repeat=10)
+        booked = {row["item_id"]: row["booked"] for row in rows}
+        for item_id in rng.sample(sorted(booked), min(args.sample, len(booked))):
+            if booked[item_id] != brute_force(item_id, first, last):
+                failures += 1
+                print(f"MISMATCH: item {item_id}")
+
+        item_id = rng.randint(1, args.items)
+        order = Order(client_name="Bench", start_date=first, end_date=last, status="Pending")
+        db.session.add(order)
+        db.session.flush()
+
+        def reserve():
+            engine.reserve(order, [(item_id, 1, Decimal("1000"))])
+            db.session.commit()
+        _, reserve_ms = timed(reserve)
+        _, refresh_ms = timed(engine._index)
+        if engine.available(item_id, first, last) != max(rows[item_id - 1]["stock"] - booked[item_id] - 1, 0):
+            failures += 1
+            print("MISMATCH: refreshed item")
+        db.session.remove()
+
+    print(f"catalog:  {args.items} items, {args.orders} orders (seeded in {seed_ms / 1000:.1f}s)")
+    print(f"build:    {build_ms:.0f} ms")
+    print(f"query:    {query_ms:.1f} ms for the whole catalog over 3 days")
+    print(f"reserve:  {reserve_ms:.1f} ms (lock, check, insert, commit)")
+    print(f"refresh:  {refresh_ms:.1f} ms (1 item)")
+    print(f"checked:  {min(args.sample, len(booked))} items, {failures} mismatches")
+    os.unlink(tmp.name)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
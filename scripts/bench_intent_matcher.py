@@ -0,0 +1,150 @@
+"""
+Benchmark SAS AI intent classification: compiled matcher vs keyword scanning.
+
+Registers the keyword groups of every chat engine (by importing them), then
+times a corpus of chat questions two ways:
+
+* ``scan``: the old approach, ``kw in text`` for every keyword of every label;
+* ``compiled``: one pass of the shared Aho-Corasick matcher.
+
+Both must agree on every label's score.  The run is repeated with extra
+synthetic intents registered to show that the compiled cost stays flat as
+intents are added while the scan grows linearly.
+
+    python scripts/bench_intent_matcher.py
+    python scripts/bench_intent_matcher.py --rounds 200 --extra 0 500 2000
+"""
+import argparse
+import importlib
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sas_management.ai import intent_matcher  # noqa: E402
+
+# Importing an engine registers its keyword groups
+ENGINES = (
+    "sas_management.ai.chat_engine",
+    "sas_management.ai.engine",
+    "sas_management.ai.sas_ai_engine",
+    "sas_management.ai.services.ai_chat",
+    "sas_management.sas_ai.reasoning",
+)
+for _engine in ENGINES:
+    importlib.import_module(_engine)
+
+# Questions users ask SAS AI (the suggested prompts plus typical variants)
+CORPUS = (
+    "How many events this month?",
+    "Show revenue this month",
+    "What tasks are due today?",
+    "How much profit did we make?",
+    "What is food safety?",
+    "Any issues today?",
+    "How many staff members do we have?",
+    "Show upcoming events",
+    "Which venues are available next week?",
+    "List low stock items in inventory",
+    "What about bakery orders?",
+    "How about hire orders in the last 30 days",
+    "Generate a revenue summary report",
+    "Summarize events for the quarter",
+    "Explain the revenue trend on the dashboard",
+    "Why did sales drop last month?",
+    "How many clients do we have",
+    "Outstanding invoices and payments",
+    "Show me POS orders from today",
+    "Which production orders are still pending?",
+    "Staff performance analysis",
+    "Draft an email to a client about their quotation",
+    "Write a proposal template for a corporate wedding",
+    "Is the inventory predictor enabled?",
+    "Pricing recommendation for a 300 guest wedding",
+    "What does this mean for our cashbook?",
+    "Who is the president of Uganda",
+    "hello",
+    "Thanks, what can you do?",
+    "The POS terminal is not working",
+    "Payroll for this month",
+    "Floor plan seating for the gala dinner",
+    "Kitchen display tickets for table 12",
+    "Dispatch deliveries scheduled for tomorrow",
+    "Equipment hire availability for chairs and tents",
+    "Menu builder: create a new menu package",
+    "Food safety compliance checklist",
+    "Leads in the CRM pipeline this quarter",
+    "Timeline for the Nakato wedding",
+    "What is 25% of 80,000?",
+)
+
+
+def synthetic_groups(count, rng):
+    """``count`` extra intents of five random 5-9 letter keywords each."""
+    def word():
+        return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(5, 9)))
+    return {f"synthetic_{n}": [word() for _ in range(5)] for n in range(count)}
+
+
+def scan(groups, text):
+    text = text.lower()
+    scores = {}
+    for group, (labels, _whole_words) in groups.items():
+        for label, keywords in labels.items():
+            score = sum(1 for kw in keywords if kw in text)
+            if score:
+                scores.setdefault(group, {})[label] = score
+    return scores
+
+
+def compiled(group_names, text):
+    found = intent_matcher._match_lower.__wrapped__(text.lower())
+    return {group: found.scores(group) for group in group_names if found.has(group)}
+
+
+def timed(fn, rounds):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for question in CORPUS:
+            fn(question)
+    return (time.perf_counter() - started) / (rounds * len(CORPUS)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rounds", type=int, default=100)
+    parser.add_argument("--extra", type=int, nargs="*", default=[0, 200, 1000],
+                        help="synthetic intents to add for each run")
+    args = parser.parse_args()
+    rng = random.Random(42)
+
+    print(f"corpus: {len(CORPUS)} questions x {args.rounds} rounds")
+    print(f"{'intents':>8} {'keywords':>9} {'scan us/q':>10} {'compiled us/q':>14} {'speedup':>8}")
+    failures = 0
+    for extra in args.extra:
+        intent_matcher.register("bench.synthetic", synthetic_groups(extra, rng))
+        groups = dict(intent_matcher._groups)
+        # Whole-word groups are scored differently; compare the substring groups
+        substring_groups = {g: v for g, v in groups.items() if not v[1]}
+        intent_matcher._automaton()
+
+        for question in CORPUS:
+            if scan(substring_groups, question) != compiled(substring_groups, question):
+                failures += 1
+                print(f"MISMATCH: {question!r}")
+
+        intents = sum(len(labels) for labels, _w in groups.values())
+        keywords = len(intent_matcher._automaton().automaton.keywords)
+        scan_us = timed(lambda q: scan(substring_groups, q), args.rounds)
+        compiled_us = timed(lambda q: compiled(substring_groups, q), args.rounds)
+        print(f"{intents:>8} {keywords:>9} {scan_us:>10.1f} {compiled_us:>14.1f} {scan_us / compiled_us:>7.1f}x")
+
+    intent_matcher.register("bench.synthetic", {})
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+"""
+Benchmark ledger reports over five years of journal lines.
+
+Seeds a throwaway SQLite database with a chart of accounts and N two-line
+journal entries (default 250,000 entries, 500,000 lines) spread over the
+last five years, folds the monthly snapshots with ``rebuild`` and then
+times:
+
+* a month-end trial balance (cumulative to the last day of a month);
+* a profit and loss for a month and for the year to date, each with its
+  previous-period comparative;
+* a balance sheet at a mid-month date (whole months from snapshots, the
+  partial month from lines);
+* a backdated entry, which re-folds one (account, month) pair per line.
+
+Every report is checked against a plain SUM over the journal lines.
+
+    python scripts/bench_ledger_reports.py
+    python scripts/bench_ledger_reports.py --entries 50000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from flask import Flask  # noqa: E402
+from sqlalchemy import func  # noqa: E402
+
+from sas_management.models import Account, Journal, JournalEntry, JournalEntryLine, db  # noqa: E402
+from sas_management.services import ledger_reports  # noqa: E402
+
+ACCOUNT_TYPES = ["Asset"] * 12 + ["Liability"] * 6 + ["Equity"] * 2 + ["Income"] * 10 + ["Expense"] * 20
+
+
+def build_app(url):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = url
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def seed(entry_count, first, days, rng):
+    db.session.execute(Account.__table__.insert(), [
+        {"account_code": f"{n:04d}", "account_name": f"{kind} {n}", "account_type": kind, "is_active": True}
+        for n, kind in enumerate(ACCOUNT_TYPES, 1)
+    ])
+    db.session.execute(Journal.__table__.insert(), [{"journal_number": "BENCH", "description": "Bench"}])
+    db.session.execute(JournalEntry.__table__.insert(), [
+        {"journal_id": 1, "entry_date": first + timedelta(days=rng.randrange(days)), "description": "Bench"}
+        for _ in range(entry_count)
+    ])
+    lines = []
+    for entry_id in range(1, entry_count + 1):
+        debit, credit = rng.sample(range(1, len(ACCOUNT_TYPES) + 1), 2)
+        amount = Decimal(rng.randint(1000, 5000000)) / 100
+        lines.append({"entry_id": entry_id, "account_id": debit, "debit": amount, "credit": 0})
+        lines.append({"entry_id": entry_id, "account_id": credit, "debit": 0, "credit": amount})
+    db.session.execute(JournalEntryLine.__table__.insert(), lines)
+    db.session.commit()
+
+
+def brute_force(start, end):
+    query = (
+        db.session.query(JournalEntryLine.account_id, func.sum(JournalEntryLine.debit), func.sum(JournalEntryLine.credit))
+        .join(JournalEntry, JournalEntry.id == JournalEntryLine.entry_id)
+        .filter(JournalEntry.entry_date <= end)
+    )
+    if start is not None:
+        query = query.filter(JournalEntry.entry_date >= start)
+    return {account_id: (debit, credit) for account_id, debit, credit in query.group_by(JournalEntryLine.account_id)}
+
+
+def timed(fn, repeat=5):
+    result = fn()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--entries", type=int, default=250000)
+    args = parser.parse_args()
+    rng = random.Random(7)
+    today = date.today()
+    first = date(today.year - 5, today.month, 1)
+
+    tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    app = build_app(f"sqlite:///{tmp.name}")
+    failures = 0
+    with app.app_context():
+        started = time.perf_counter()
+        seed(args.entries, first, (today - first).days, rng)
+        seed_s = time.perf_counter() - started
+        started = time.perf_counter()
+        months = ledger_reports.rebuild()
+        db.session.commit()
+        rebuild_s = time.perf_counter() - started
+        ledger_reports.install(db.session)
+
+        month_end = ledger_reports.month_start(today) - timedelta(days=1)
+        month_first = ledger_reports.month_start(month_end)
+        year_first = date(month_end.year, 1, 1)
+        mid_month = month_first + timedelta(days=14)
+
+        def check(name, start, end):
+            nonlocal failures
+            expected = brute_force(start, end)
+            actual = ledger_reports.movements(start, end)
+            # SQLite sums numerics as floats, so compare to the cent
+            if any(
+                abs(float(actual.get(account_id, (0, 0))[side]) - float(pair[side])) >= 0.01
+                for account_id, pair in expected.items() for side in (0, 1)
+            ) or set(account_id for account_id, pair in actual.items() if any(pair)) - set(expected):
+                failures += 1
+                print(f"MISMATCH: {name}")
+
+        def pnl(start, end):
+            previous = ledger_reports.previous_period(start, end)
+            return ledger_reports.profit_and_loss(start, end), ledger_reports.profit_and_loss(*previous)
+
+        _, naive_ms = timed(lambda: brute_force(None, month_end))
+        _, tb_ms = timed(lambda: ledger_reports.trial_balance(None, month_end))
+        _, month_ms = timed(lambda: pnl(month_first, month_end))
+        _, ytd_ms = timed(lambda: pnl(year_first, month_end))
+        _, bs_ms = timed(lambda: ledger_reports.balance_sheet(mid_month))
+        check("trial balance", None, month_end)
+        check("month", month_first, month_end)
+        check("year to date", year_first, month_end)
+        check("balance sheet", None, mid_month)
+
+        def backdate():
+            entry = JournalEntry(journal_id=1, entry_date=first + timedelta(days=40), description="Backdated")
+            entry.lines = [
+                JournalEntryLine(account_id=1, debit=Decimal("100.00"), credit=0),
+                JournalEntryLine(account_id=2, debit=0, credit=Decimal("100.00")),
+            ]
+            db.session.add(entry)
+            db.session.commit()
+        _, backdate_ms = timed(backdate, repeat=1)
+        check("after backdated entry", None, month_end)
+        ledger_reports.uninstall(db.session)
+        db.session.remove()
+
+    print(f"ledger:        {args.entries} entries, {args.entries * 2} lines over {months} months "
+          f"(seeded in {seed_s:.1f}s, snapshots built in {rebuild_s:.1f}s)")
+    print(f"plain SUM:     {naive_ms:.0f} ms (cumulative, every line)")
+    print(f"trial balance: {tb_ms:.1f} ms (month end)")
+    print(f"P&L:           {month_ms:.1f} ms (month + comparative), {ytd_ms:.1f} ms (year to date + comparative)")
+    print(f"balance sheet: {bs_ms:.1f} ms (mid-month)")
+    print(f"backdated:     {backdate_ms:.1f} ms (insert, re-fold, commit)")
+    print(f"checked:       5 reports, {failures} mismatches")
+    os.unlink(tmp.name)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
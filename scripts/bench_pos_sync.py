@@ -0,0 +1,123 @@
+"""
+Benchmark offline POS sync: batched ingestion vs replaying orders one by one.
+
+Queues N paid sales (default 500, three lines each) for one terminal and
+syncs them two ways into separate shifts of the same database:
+
+* ``replay``: the old path, ``create_order`` + ``add_payment`` per sale,
+  each with its own lookups and commit;
+* ``batch``: one ``ingest_orders`` call (validation queries, bulk inserts,
+  one commit).
+
+The shift counter and sales cube listeners are installed as in the app, and
+both shifts must end up with the same X-report totals.
+
+    python scripts/bench_pos_sync.py
+    python scripts/bench_pos_sync.py --orders 1000
+    DATABASE_URL=postgresql://... python scripts/bench_pos_sync.py
+
+Without DATABASE_URL a throwaway SQLite file is used.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from flask import Flask  # noqa: E402
+
+from sas_management.models import POSDevice, POSShift, db  # noqa: E402
+from sas_management.services import pos_sales_cube, pos_shift_counters  # noqa: E402
+from sas_management.services.pos_service import add_payment, create_order  # noqa: E402
+from sas_management.services.pos_shift_counters import shift_report  # noqa: E402
+from sas_management.services.pos_sync import ingest_orders  # noqa: E402
+
+
+def build_app(url):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = url
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        pos_shift_counters.install(db.session)
+        pos_sales_cube.install(db.session)
+    return app
+
+
+def queued_sales(count, shift_id):
+    sales = []
+    for n in range(count):
+        items = [
+            {"product_id": "POS-1", "product_name": "Soda", "qty": 1 + n % 3, "unit_price": 1500},
+            {"product_id": "POS-2", "product_name": "Samosa", "qty": 2, "unit_price": 1000},
+            {"product_id": "POS-3", "product_name": "Chapati", "qty": 1, "unit_price": 800},
+        ]
+        subtotal = sum(item["qty"] * item["unit_price"] for item in items)
+        sales.append({
+            "client_uuid": str(uuid.uuid4()),
+            "temp_ref": f"offline-{n}",
+            "shift_id": shift_id,
+            "tax_rate": 18,
+            "items": items,
+            "payments": [{"amount": subtotal * 118 / 100, "method": "cash" if n % 2 else "mobile_money"}],
+        })
+    return sales
+
+
+def replay(device_code, sales):
+    for sale in sales:
+        order = create_order(sale, device_code=device_code, shift_id=sale["shift_id"])
+        for payment in sale["payments"]:
+            add_payment(order.id, payment["amount"], payment["method"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--orders", type=int, default=500)
+    args = parser.parse_args()
+
+    url = os.environ.get("DATABASE_URL")
+    tmp = None
+    if not url:
+        tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        url = f"sqlite:///{tmp.name}"
+    app = build_app(url)
+
+    with app.app_context():
+        code = f"BENCH-{uuid.uuid4().hex[:8]}"
+        device = POSDevice(name="Bench till", terminal_code=code)
+        db.session.add(device)
+        db.session.flush()
+        shifts = [POSShift(device_id=device.id, user_id=1, status="open") for _ in range(2)]
+        db.session.add_all(shifts)
+        db.session.commit()
+        replay_shift, batch_shift = (shift.id for shift in shifts)
+
+        started = time.perf_counter()
+        replay(code, queued_sales(args.orders, replay_shift))
+        replay_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        result = ingest_orders(code, queued_sales(args.orders, batch_shift))
+        batch_s = time.perf_counter() - started
+
+        db.session.expire_all()
+        replay_report, batch_report = shift_report(replay_shift), shift_report(batch_shift)
+        db.session.remove()
+
+    same = replay_report == batch_report and result["synced_count"] == args.orders
+    print(f"database: {url.split('@')[-1]}")
+    print(f"orders:   {args.orders} (3 lines + 1 payment each)")
+    print(f"replay:   {replay_s:.2f}s ({args.orders / replay_s:.0f} orders/s)")
+    print(f"batch:    {batch_s:.2f}s ({args.orders / batch_s:.0f} orders/s), {replay_s / batch_s:.1f}x faster")
+    print(f"reports:  {'identical' if same else 'DIFFERENT'}")
+    if tmp is not None:
+        os.unlink(tmp.name)
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
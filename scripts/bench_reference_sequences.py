@@ -0,0 +1,100 @@
+"""
+Benchmark the reference sequence allocator under concurrent writers.
+
+Starts N threads (default 32), each with its own app context and session,
+that draw references from the same prefix/day as fast as they can, then
+checks that no reference was handed out twice.
+
+    python scripts/bench_reference_sequences.py
+    python scripts/bench_reference_sequences.py --writers 32 --per-writer 200 --block 10
+    DATABASE_URL=postgresql://... python scripts/bench_reference_sequences.py
+
+Without DATABASE_URL a throwaway SQLite file is used.  Only the
+``sequences`` table is created; nothing else in the database is touched.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from flask import Flask  # noqa: E402
+
+from sas_management.models import ReferenceSequence, db  # noqa: E402
+from sas_management.services.sequence_service import next_reference, reserve_block  # noqa: E402
+
+
+def build_app(url):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = url
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {"pool_size": 40, "max_overflow": 10} if url.startswith("postgres") else {}
+    db.init_app(app)
+    with app.app_context():
+        ReferenceSequence.__table__.create(db.engine, checkfirst=True)
+    return app
+
+
+def run(app, writers, per_writer, block, prefix):
+    issued = [[] for _ in range(writers)]
+    errors = []
+    barrier = threading.Barrier(writers)
+
+    def writer(slot):
+        with app.app_context():
+            barrier.wait()
+            try:
+                for _ in range(per_writer):
+                    if block > 1:
+                        issued[slot].extend(reserve_block(prefix, block)["references"])
+                    else:
+                        issued[slot].append(next_reference(prefix))
+                    db.session.commit()
+            except Exception as e:
+                errors.append(e)
+            finally:
+                db.session.remove()
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    return [ref for refs in issued for ref in refs], errors, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--writers", type=int, default=32)
+    parser.add_argument("--per-writer", type=int, default=100)
+    parser.add_argument("--block", type=int, default=1, help="references reserved per call (offline blocks)")
+    args = parser.parse_args()
+
+    url = os.environ.get("DATABASE_URL")
+    tmp = None
+    if not url:
+        tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        url = f"sqlite:///{tmp.name}"
+    app = build_app(url)
+    prefix = f"BENCH{int(time.time()) % 100000}"
+
+    refs, errors, elapsed = run(app, args.writers, args.per_writer, args.block, prefix)
+    duplicates = [ref for ref, n in Counter(refs).items() if n > 1]
+    calls = args.writers * args.per_writer
+    print(f"database:    {url.split('@')[-1]}")
+    print(f"writers:     {args.writers} x {args.per_writer} calls (block {args.block})")
+    print(f"references:  {len(refs)} in {elapsed:.2f}s ({calls / elapsed:.0f} allocations/s)")
+    print(f"duplicates:  {len(duplicates)}")
+    print(f"errors:      {len(errors)}" + (f" (first: {errors[0]})" if errors else ""))
+    if tmp is not None:
+        os.unlink(tmp.name)
+    return 1 if duplicates or errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""
+Benchmark dispatch route planning against the previous heuristic.
+
+Generates drops around the Kampala depot and plans them three ways per
+scenario:
+
+* ``previous``: deliveries assigned to the least-loaded vehicle with room,
+  then each vehicle's stops ordered greedily by priority-weighted nearest
+  neighbour (the old ``group_deliveries_by_vehicle`` + ``optimize_route``);
+* ``planner``: ``RoutePlanner.plan`` with the given time budget.
+
+Scenarios: drops spread uniformly, drops clustered around a few venues, and
+the uniform drops with two-to-three-hour delivery windows.  Straight-line
+distances are used throughout so both sides see the same matrix; windows
+missed by the previous heuristic are counted, not enforced.
+
+    python scripts/bench_route_planner.py
+    python scripts/bench_route_planner.py --drops 400 --vehicles 25 --time-limit 5
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sas_management.services.route_planner import (  # noqa: E402
+    DEFAULT_DEPOT, DEFAULT_SERVICE_MINUTES, DEFAULT_SPEED_KMH, DEFAULT_START, NUMPY_AVAILABLE, TRAFFIC_FACTOR,
+    RoutePlanner, format_minutes, haversine_matrix, to_minutes,
+)
+
+
+def uniform(rng, count, spread=0.15):
+    lat, lng = DEFAULT_DEPOT
+    return [(lat + rng.uniform(-spread, spread), lng + rng.uniform(-spread, spread)) for _ in range(count)]
+
+
+def clustered(rng, count, venues=8):
+    lat, lng = DEFAULT_DEPOT
+    centres = [(lat + rng.uniform(-0.2, 0.2), lng + rng.uniform(-0.2, 0.2)) for _ in range(venues)]
+    points = []
+    for _ in range(count):
+        c_lat, c_lng = rng.choice(centres)
+        points.append((c_lat + rng.gauss(0, 0.01), c_lng + rng.gauss(0, 0.01)))
+    return points
+
+
+def drops_for(points, rng, windows=False):
+    drops = []
+    for n, (lat, lng) in enumerate(points):
+        drop = {"id": n, "latitude": lat, "longitude": lng, "weight": rng.randint(1, 10), "priority": rng.randint(0, 5)}
+        if windows:
+            opens = rng.choice(range(8 * 60, 14 * 60, 30))
+            drop["window_start"] = format_minutes(opens)
+            drop["window_end"] = format_minutes(opens + rng.choice((120, 180)))
+        drops.append(drop)
+    return drops
+
+
+def previous_heuristic(drops, vehicles, km):
+    """Load-factor assignment, then priority-weighted nearest neighbour per vehicle (depot is index 0)."""
+    assigned = {v["id"]: [] for v in vehicles}
+    used = {v["id"]: 0 for v in vehicles}
+    for n, drop in sorted(enumerate(drops, 1), key=lambda item: item[1]["priority"], reverse=True):
+        best, best_score = None, math.inf
+        for vehicle in vehicles:
+            if used[vehicle["id"]] + drop["weight"] <= vehicle["capacity"]:
+                score = used[vehicle["id"]] / vehicle["capacity"]
+                if score < best_score:
+                    best, best_score = vehicle["id"], score
+        if best is not None:
+            assigned[best].append(n)
+            used[best] += drop["weight"]
+
+    total, late, routes = 0.0, 0, 0
+    per_minute = 60.0 * TRAFFIC_FACTOR / DEFAULT_SPEED_KMH
+    for nodes in assigned.values():
+        current, clock, remaining = 0, DEFAULT_START, list(nodes)
+        routes += bool(nodes)
+        while remaining:
+            node = min(remaining, key=lambda m: km[current][m] * max(0.1, 1.0 - drops[m - 1]["priority"] / 10.0))
+            total += km[current][node]
+            clock = max(clock + km[current][node] * per_minute, to_minutes(drops[node - 1].get("window_start"), 0))
+            late += clock > to_minutes(drops[node - 1].get("window_end"), math.inf)
+            clock += DEFAULT_SERVICE_MINUTES
+            current = node
+            remaining.remove(node)
+        total += km[current][0]
+    unassigned = len(drops) - sum(len(nodes) for nodes in assigned.values())
+    return total, routes, late, unassigned
+
+
+def run(name, drops, vehicles, time_limit):
+    points = [DEFAULT_DEPOT] + [(d["latitude"], d["longitude"]) for d in drops]
+    started = time.perf_counter()
+    km = haversine_matrix(points)
+    matrix_ms = (time.perf_counter() - started) * 1000
+    per_minute = 60.0 * TRAFFIC_FACTOR / DEFAULT_SPEED_KMH
+    minutes = [[distance * per_minute for distance in row] for row in km]
+
+    before, before_routes, late, dropped = previous_heuristic(drops, vehicles, km)
+    started = time.perf_counter()
+    plan = RoutePlanner(time_limit=time_limit).plan(drops, vehicles, depot=DEFAULT_DEPOT, matrix=(km, minutes))
+    solve_s = time.perf_counter() - started
+
+    print(f"{name}: {len(drops)} drops, {len(vehicles)} vehicles (matrix {matrix_ms:.0f} ms)")
+    print(f"  previous: {before:8.1f} km, {before_routes} routes, {late} late, {dropped} unassigned")
+    print(f"  planner:  {plan['total_distance']:8.1f} km, {plan['vehicles_used']} routes, 0 late, "
+          f"{len(plan['unassigned'])} unassigned in {solve_s:.2f}s ({1 - plan['total_distance'] / before:.0%} shorter)")
+    return solve_s <= time_limit * 1.5 + 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--drops", type=int, default=200)
+    parser.add_argument("--vehicles", type=int, default=15)
+    parser.add_argument("--capacity", type=int, default=120)
+    parser.add_argument("--time-limit", type=float, default=3.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    vehicles = [{"id": f"V{n + 1}", "capacity": args.capacity} for n in range(args.vehicles)]
+
+    print(f"numpy: {'yes' if NUMPY_AVAILABLE else 'no (pure-Python matrix)'}")
+    points = uniform(rng, args.drops)
+    ok = all([
+        run("uniform", drops_for(points, rng), vehicles, args.time_limit),
+        run("clustered", drops_for(clustered(rng, args.drops), rng), vehicles, args.time_limit),
+        run("windows", drops_for(points, rng, windows=True), vehicles, args.time_limit),
+    ])
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
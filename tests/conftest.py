@@ -0,0 +1,71 @@
+"""Shared pytest configuration."""
+import pytest
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--index-advisor",
+        action="store_true",
+        default=False,
+        help="Explain every SELECT run by the tests and report the ones that scan a table.",
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "listeners(*modules): services whose install(session)/uninstall(session) the app fixture runs",
+    )
+    if config.getoption("--index-advisor"):
+        from sas_management.utils.index_advisor import IndexAdvisor
+
+        config._index_advisor = IndexAdvisor().install()
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    advisor = getattr(config, "_index_advisor", None)
+    if advisor is not None:
+        advisor.uninstall()
+        terminalreporter.write_sep("=", "index advisor")
+        terminalreporter.write_line(advisor.report())
+
+
+@pytest.fixture
+def app(request, tmp_path):
+    """
+    Bare Flask app on a throwaway SQLite database, inside an app context.
+
+    Services that keep derived tables current from session hooks are named
+    with ``@pytest.mark.listeners(module, ...)``.  Their listeners are
+    installed on ``db.session`` for this test only and removed again at
+    teardown, so one module's hooks never run in another module's tests.
+    """
+    from flask import Flask
+
+    from sas_management.models import db
+
+    app = Flask(__name__, instance_path=str(tmp_path))
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'test.db'}"
+    db.init_app(app)
+    modules = [module for marker in request.node.iter_markers("listeners") for module in marker.args]
+    with app.app_context():
+        db.create_all()
+        for module in modules:
+            module.install(db.session)
+        try:
+            yield app
+        finally:
+            db.session.remove()
+            for module in modules:
+                module.uninstall(db.session)
+
+
+@pytest.fixture
+def search_backend(app):
+    """The global search index with every searchable model registered."""
+    from sas_management.services import search_service  # noqa: F401 - registers searchable models
+    from sas_management.services.search_index import search_index
+
+    yield search_index.ensure_schema()
+    # The mapper hooks only write documents while a backend is set
+    search_index.backend = None
@@ -0,0 +1,57 @@
+"""Unit tests for the batched ActivityLog writer."""
+import os
+import tempfile
+
+from sqlalchemy import create_engine, func, select
+
+from sas_management.models import ActivityLog
+from sas_management.services.activity_log_writer import ActivityLogWriter
+
+
+def _writer(**kwargs):
+    path = os.path.join(tempfile.mkdtemp(), "activity.db")
+    engine = create_engine(f"sqlite:///{path}")
+    ActivityLog.__table__.create(engine)
+    writer = ActivityLogWriter(**kwargs)
+    writer._engine = engine
+    return writer, engine
+
+
+def _count(engine):
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(ActivityLog.__table__)).scalar()
+
+
+def test_rows_are_bulk_written_on_stop():
+    writer, engine = _writer(batch_size=50, flush_interval_ms=10000)
+    for i in range(120):
+        assert writer.record(1, "core.dashboard", "127.0.0.1", f"/dashboard?page={i}")
+    writer.stop()
+    assert _count(engine) == 120
+    assert writer.stats()["written"] == 120
+
+
+def test_excluded_and_static_endpoints_are_skipped():
+    writer, engine = _writer(exclude_endpoints={"chat.api_get_messages"})
+    assert not writer.record(1, "chat.api_get_messages")
+    assert not writer.record(1, "hr.static")
+    assert not writer.record(1, None)
+    writer.stop()
+    assert _count(engine) == 0
+    assert writer.stats()["excluded"] == 3
+
+
+def test_sampling_drops_the_configured_fraction():
+    writer, _engine = _writer(sample_rates={"kds.screen": 0.0})
+    assert not writer.record(1, "kds.screen")
+    assert writer.stats()["sampled_out"] == 1
+    writer.stop()
+
+
+def test_full_queue_drops_instead_of_blocking():
+    writer, _engine = _writer(max_queue_size=2, flush_interval_ms=10000)
+    writer._ensure_thread = lambda: None  # keep the queue from draining
+    results = [writer.record(1, "core.dashboard") for _ in range(5)]
+    assert results == [True, True, False, False, False]
+    assert writer.stats()["dropped"] == 3
+    writer.flush()
@@ -0,0 +1,138 @@
+"""Unit tests for the shared SAS AI metrics provider."""
+import threading
+import time
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from sas_management.models import Client, Event, Invoice, InvoiceStatus, db
+from sas_management.services import ai_metrics as metrics_module
+from sas_management.services.ai_metrics import AIMetricsProvider, MetricRestricted
+
+ADMIN = SimpleNamespace(id=1, is_admin=True)
+STAFF = SimpleNamespace(id=2, is_admin=False)
+
+
+@pytest.fixture
+def provider():
+    return AIMetricsProvider(ttl=60)
+
+
+@pytest.fixture
+def app(app, provider):
+    provider.init_app(app)
+    yield app
+    provider.uninstall()
+
+
+def _event(day, title="Wedding"):
+    row = Event(title=title, client_name="ACME", client=Client(name="ACME"), date=day, event_date=day)
+    db.session.add(row)
+    return row
+
+
+def test_values_are_cached_until_a_write(app, provider):
+    today = date.today()
+    _event(today)
+    db.session.commit()
+
+    assert provider.get("events.total") == 1
+    assert provider.get("events.total") == 1
+    assert provider.computes == 1
+
+    _event(today + timedelta(days=3), title="Gala")
+    db.session.commit()
+    assert provider.get("events.total") == 2
+    assert provider.get("clients.total") == 2
+    assert provider.computes == 3
+
+    upcoming = provider.get("events.upcoming")
+    assert upcoming["count"] == 1
+    assert upcoming["events"][0]["title"] == "Gala"
+
+
+def test_revenue_month_is_sensitive(app, provider):
+    row = _event(date.today())
+    db.session.flush()
+    month_start = date.today().replace(day=1)
+    for n, (amount, status) in enumerate([(1000, InvoiceStatus.Paid), (500, InvoiceStatus.Issued),
+                                         (300, InvoiceStatus.Cancelled)]):
+        db.session.add(Invoice(event_id=row.id, invoice_number=f"INV-{n}", issue_date=month_start,
+                               due_date=month_start, total_amount_ugx=amount, status=status))
+    db.session.commit()
+
+    revenue = provider.get("revenue.month", ADMIN)
+    assert (revenue["invoices_count"], revenue["total_amount"], revenue["paid_amount"]) == (2, 1500.0, 1000.0)
+
+    with pytest.raises(MetricRestricted):
+        provider.get("revenue.month", STAFF)
+    # Engines with their own financial role rules can vouch for the user
+    assert provider.get("revenue.month", STAFF, can_view_sensitive=True) == revenue
+
+    visible = provider.many(["events.total", "revenue.month", "invoices.overview"], STAFF)
+    assert visible == {"events.total": 1}
+
+
+def test_concurrent_requests_share_one_query(app, provider, monkeypatch):
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        release.wait(5)
+        return 42
+
+    monkeypatch.setitem(metrics_module._registry, "test.slow", metrics_module._Metric("test.slow", slow, (), False, None))
+    results = []
+
+    def request():
+        # Each request thread has its own app context (and session)
+        with app.app_context():
+            results.append(provider.get("test.slow"))
+
+    threads = [threading.Thread(target=request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    while not provider._inflight:
+        time.sleep(0.01)
+    # Give the followers time to find the in-flight computation
+    time.sleep(0.2)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == [42] * 8
+    assert len(calls) == 1
+    assert provider.coalesced == 7
+
+
+def test_failed_metric_is_not_cached(app, provider, monkeypatch):
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("database is locked")
+        return 7
+
+    monkeypatch.setitem(metrics_module._registry, "test.flaky", metrics_module._Metric("test.flaky", flaky, (), False, None))
+    assert provider.get("test.flaky") is None
+    assert provider.get("test.flaky") == 7
+    assert provider.get("test.flaky") == 7
+    assert len(attempts) == 2
+
+
+def test_failed_metric_leaves_the_callers_session_alone(app, provider, monkeypatch):
+    def broken():
+        return db.session.execute(db.text("SELECT COUNT(*) FROM no_such_table")).scalar()
+
+    monkeypatch.setitem(metrics_module._registry, "test.broken", metrics_module._Metric("test.broken", broken, (), False, None))
+    _event(date.today(), title="Pending")
+    db.session.flush()
+    kept = _event(date.today(), title="Unflushed")
+
+    assert provider.get("test.broken") is None
+    assert kept in db.session
+    db.session.commit()
+    assert {e.title for e in Event.query} == {"Pending", "Unflushed"}
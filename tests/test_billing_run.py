@@ -0,0 +1,147 @@
+"""Unit tests for month-end billing runs."""
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from sas_management.models import BillingRunItem, Invoice, db
+from sas_management.services import billing_run
+from sas_management.services.document_renderer import renderer
+
+
+@pytest.fixture
+def app(app):
+    app.config["DOCUMENT_RENDER_WORKERS"] = 0
+    app.config["BILLING_RUN_CHUNK_SIZE"] = 2
+    renderer.init_app(app)
+    return app
+
+
+class FakeSendGrid:
+    def __init__(self):
+        self.sent = []
+
+    def send_email(self, to_email, subject, html_content, attachments=None, **kwargs):
+        self.sent.append((to_email, attachments[0]["filename"]))
+        return {"success": True, "message_id": f"msg-{len(self.sent)}"}
+
+
+def _event(day, quoted=500000, status="Completed", email="client@example.com"):
+    from sas_management.models import Client, Event
+    client = Client(name="ACME", email=email)
+    event = Event(title=f"Event {day}", client_name="ACME", client=client, date=day,
+                  quoted_value=quoted, status=status)
+    db.session.add(event)
+    db.session.flush()
+    return event
+
+
+def test_plan_selects_unbilled_events(app):
+    from sas_management.models import EventRevenueItem, InvoiceStatus
+    quoted = _event(date(2026, 1, 5))
+    itemised = _event(date(2026, 1, 10))
+    db.session.add(EventRevenueItem(event_id=itemised.id, description="Buffet", amount=750000))
+    _event(date(2026, 1, 12), status="Cancelled")
+    _event(date(2026, 1, 15), quoted=0)
+    _event(date(2026, 2, 1))
+    invoiced = _event(date(2026, 1, 20))
+    db.session.add(Invoice(event_id=invoiced.id, invoice_number="INV-X-0001", due_date=date(2026, 2, 20),
+                           total_amount_ugx=1, status=InvoiceStatus.Issued))
+    db.session.commit()
+
+    assert billing_run.billable_events(date(2026, 1, 1), date(2026, 1, 31)) == [
+        (quoted.id, Decimal("500000.00")),
+        (itemised.id, Decimal("750000.00")),
+    ]
+
+
+def test_run_invoices_renders_and_sends(app):
+    events = [_event(date(2026, 3, d)) for d in (1, 2, 3)]
+    no_email = _event(date(2026, 3, 4), email=None)
+    db.session.commit()
+    adapter = FakeSendGrid()
+
+    run = billing_run.create_run(date(2026, 3, 1), date(2026, 3, 31), send_emails=True, issue_date=date(2026, 4, 1))
+    summary = billing_run.execute(run.id, adapter=adapter)
+    assert summary["status"] == "completed_with_errors"
+    assert summary["total"] == 4
+    assert summary["done"] == 3
+    assert summary["errors"] == [{"event_id": no_email.id, "invoice_id": summary["errors"][0]["invoice_id"],
+                                  "stage": "rendered", "error": "Client has no email address"}]
+    assert len(adapter.sent) == 3
+
+    invoices = Invoice.query.order_by(Invoice.invoice_number).all()
+    assert [inv.invoice_number for inv in invoices] == [f"INV-20260401-{n:04d}" for n in range(1, 5)]
+    assert {inv.event_id for inv in invoices} == {e.id for e in events} | {no_email.id}
+    assert all(item.pdf_path for item in BillingRunItem.query.filter_by(run_id=run.id))
+
+    # Fix the address and resume: only the failed item is retried
+    no_email.client.email = "late@example.com"
+    db.session.commit()
+    summary = billing_run.execute(run.id, adapter=adapter)
+    assert summary["status"] == "completed"
+    assert summary["stages"]["sent"] == 4
+    assert adapter.sent[-1][0] == "late@example.com"
+    assert Invoice.query.count() == 4
+
+
+def test_resume_after_failed_render_does_not_duplicate_invoices(app, monkeypatch):
+    from sas_management.services import invoice_service
+    for d in (1, 2, 3):
+        _event(date(2026, 5, d))
+    db.session.commit()
+
+    def broken(invoice_ids):
+        raise OSError("disk full")
+    real = invoice_service.generate_invoice_pdfs
+    monkeypatch.setattr(invoice_service, "generate_invoice_pdfs", broken)
+    run = billing_run.create_run(date(2026, 5, 1), date(2026, 5, 31))
+    summary = billing_run.execute(run.id)
+    assert summary["failed"] == 3
+    assert summary["stages"]["invoiced"] == 3
+
+    monkeypatch.setattr(invoice_service, "generate_invoice_pdfs", real)
+    summary = billing_run.execute(run.id)
+    assert summary["status"] == "completed"
+    assert summary["stages"]["rendered"] == 3
+    assert Invoice.query.count() == 3
+    assert BillingRunItem.query.filter(BillingRunItem.attempts == 1).count() == 3
+
+
+def test_quote_conversions_share_the_billing_run_sequence(app):
+    from sas_management.blueprints.quotes import _generate_invoice_number
+    from sas_management.models import InvoiceStatus
+    today = date.today()
+
+    def convert_quote(event):
+        # What quotes.convert_to_invoice stores
+        db.session.add(Invoice(event_id=event.id, invoice_number=_generate_invoice_number(), issue_date=today,
+                               due_date=today, total_amount_ugx=1, status=InvoiceStatus.Issued))
+        db.session.commit()
+
+    for d in (1, 2):
+        _event(date(2026, 6, d))
+    db.session.commit()
+    billing_run.execute(billing_run.create_run(date(2026, 6, 1), date(2026, 6, 30), issue_date=today).id)
+    convert_quote(_event(date(2026, 7, 1)))
+    for d in (2, 3):
+        _event(date(2026, 7, d))
+    db.session.commit()
+    billing_run.execute(billing_run.create_run(date(2026, 7, 2), date(2026, 7, 31), issue_date=today).id)
+    convert_quote(_event(date(2026, 8, 1)))
+
+    prefix = f"INV-{today:%Y%m%d}"
+    numbers = [inv.invoice_number for inv in Invoice.query.order_by(Invoice.id)]
+    assert numbers == [f"{prefix}-{n:04d}" for n in range(1, 7)]
+
+
+def test_run_invoices_are_searchable(app, search_backend):
+    from sas_management.services.search_index import search_index
+    for d in (1, 2):
+        _event(date(2026, 9, d))
+    db.session.commit()
+    billing_run.execute(billing_run.create_run(date(2026, 9, 1), date(2026, 9, 30), issue_date=date(2026, 10, 1)).id)
+
+    second = Invoice.query.filter_by(invoice_number="INV-20261001-0002").one()
+    assert search_index.search("INV-20261001-0002")["invoices"] == [second.id]
+    assert len(search_index.search("20261001")["invoices"]) == 2
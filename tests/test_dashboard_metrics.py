@@ -0,0 +1,35 @@
+"""Unit tests for the dashboard metrics snapshot helpers."""
+from datetime import date
+
+from sas_management.services.dashboard_metrics_service import DashboardMetricsService, _bucket, _month_windows
+
+
+def test_month_windows_cover_six_months_oldest_first():
+    windows = _month_windows(date(2026, 10, 16))
+    assert [label for label, _, _ in windows] == [
+        "May 2026", "Jun 2026", "Jul 2026", "Aug 2026", "Sep 2026", "Oct 2026",
+    ]
+    assert windows[-1][1] == date(2026, 10, 1) and windows[-1][2] == date(2026, 10, 31)
+
+
+def test_bucket_sums_rows_into_months():
+    windows = _month_windows(date(2026, 10, 16))
+    rows = [(date(2026, 10, 2), 5), (date(2026, 10, 30), 1.5), (date(2026, 5, 1), 2), (date(2025, 1, 1), 99), (None, 7)]
+    assert _bucket(rows, windows) == [2.0, 0.0, 0.0, 0.0, 0.0, 6.5]
+
+
+def test_cached_snapshot_is_reused_until_invalidated():
+    service = DashboardMetricsService(ttl=60)
+
+    def build(today):
+        service.builds += 1
+        return {"today": today, "n": service.builds}
+
+    service._build = build
+    today = date(2026, 10, 16)
+    assert service.snapshot(today)["n"] == 1
+    assert service.snapshot(today)["n"] == 1
+    service.invalidate()
+    assert service.snapshot(today)["n"] == 2
+    # A new day rebuilds even inside the TTL
+    assert service.snapshot(date(2026, 10, 17))["n"] == 3
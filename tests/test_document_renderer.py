@@ -0,0 +1,132 @@
+"""Unit tests for the document rendering pool and cache."""
+import os
+import time
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from flask import Flask
+
+from sas_management.services import document_renderer
+from sas_management.services.document_renderer import DocumentRenderer, register_document
+
+calls = []
+
+
+@register_document("test_note", version=1)
+def _render_note(path, data, assets):
+    if data.get("fail"):
+        raise ValueError("bad row")
+    time.sleep(data.get("sleep", 0))
+    calls.append(data["text"])
+    with open(path, "w") as handle:
+        handle.write(f"{data['text']}|{bool(assets.get('logo'))}")
+
+
+@pytest.fixture
+def renderer(tmp_path):
+    app = Flask(__name__)
+    app.config["DOCUMENT_RENDER_WORKERS"] = 0
+    app.config["DOCUMENT_CACHE_FOLDER"] = str(tmp_path / "documents")
+    calls.clear()
+    renderer = DocumentRenderer()
+    renderer.init_app(app)
+    yield renderer
+    renderer.stop()
+
+
+def test_content_key_is_canonical():
+    a = {"amount": Decimal("10.50"), "day": date(2026, 1, 31), "lines": [1, 2]}
+    b = {"lines": [1, 2], "day": date(2026, 1, 31), "amount": Decimal("10.50")}
+    assert document_renderer.content_key("test_note", a) == document_renderer.content_key("test_note", b)
+    assert document_renderer.content_key("test_note", a) != document_renderer.content_key("test_note", {**a, "lines": [2, 1]})
+    with pytest.raises(ValueError):
+        document_renderer.content_key("no_such_document", a)
+
+
+def test_unchanged_data_is_served_from_cache(renderer):
+    first = renderer.render("test_note", {"text": "hello"})
+    second = renderer.render("test_note", {"text": "hello"})
+    assert first == second
+    assert calls == ["hello"]
+    assert renderer.cached("test_note", {"text": "hello"}) == first
+    assert renderer.cached("test_note", {"text": "changed"}) is None
+
+    renderer.render("test_note", {"text": "changed"})
+    assert calls == ["hello", "changed"]
+
+
+def test_template_version_bump_invalidates(renderer, monkeypatch):
+    data = {"text": "v"}
+    old = renderer.render("test_note", data)
+    fn, _version, module = document_renderer._registry["test_note"]
+    monkeypatch.setitem(document_renderer._registry, "test_note", (fn, 2, module))
+    assert renderer.render("test_note", data) != old
+    assert calls == ["v", "v"]
+
+
+def test_render_many_reports_failures_per_item(renderer):
+    items = [(i, {"text": f"doc {i}"}) for i in range(4)] + [("bad", {"text": "x", "fail": True})]
+    results = {tag: (path, error) for tag, path, error in renderer.render_many("test_note", items)}
+    assert len(results) == 5
+    assert isinstance(results["bad"][1], ValueError) and results["bad"][0] is None
+    for i in range(4):
+        path, error = results[i]
+        assert error is None
+        with open(path) as handle:
+            assert handle.read().startswith(f"doc {i}|")
+    # No half-written files are left behind
+    assert not [f for _r, _d, files in os.walk(renderer.folder) for f in files if f.endswith(".tmp")]
+
+
+def test_render_many_gives_up_on_a_stuck_batch(renderer):
+    renderer.max_workers = 1
+    items = [("stuck", {"text": "slow", "sleep": 3})]
+    started = time.monotonic()
+    [(tag, path, error)] = renderer.render_many("test_note", items, timeout=0.5)
+    assert time.monotonic() - started < 2.5
+    assert (tag, path) == ("stuck", None)
+    assert isinstance(error, TimeoutError)
+
+
+def test_publish_places_copy(renderer, tmp_path):
+    dest = tmp_path / "invoices" / "invoice_1.pdf"
+    renderer.publish("test_note", {"text": "copy"}, str(dest))
+    assert dest.read_text().startswith("copy|")
+
+
+def test_process_pool_renders(renderer):
+    renderer.max_workers = 1
+    path = renderer.render("test_note", {"text": "pooled"})
+    with open(path) as handle:
+        assert handle.read().startswith("pooled|")
+    # Rendered in a spawned worker, not here
+    assert calls == []
+    assert renderer._executor._mp_context.get_start_method() == "spawn"
+
+
+def test_prepare_does_not_wait_for_the_pool(renderer):
+    renderer.max_workers = 1
+    data = {"text": "later"}
+    assert renderer.prepare("test_note", data) is None
+    renderer.render("test_note", data)
+    path = renderer.prepare("test_note", data)
+    assert path == renderer.cached("test_note", data)
+    assert calls == []
+
+
+def test_prepare_reports_a_failed_render(renderer):
+    renderer.max_workers = 1
+    data = {"text": "x", "fail": True}
+    assert renderer.prepare("test_note", data) is None
+    with pytest.raises(ValueError):
+        renderer.render("test_note", data)
+    with pytest.raises(ValueError):
+        renderer.prepare("test_note", data)
+
+
+def test_pending_response_asks_to_retry():
+    with Flask(__name__).test_request_context():
+        response = document_renderer.pending_response(retry_after=3)
+    assert response.status_code == 202
+    assert response.headers["Retry-After"] == "3"
@@ -0,0 +1,99 @@
+"""Unit tests for the in-process event bus and SSE framing."""
+import threading
+import time
+
+import pytest
+
+from sas_management.models import Message, User, db
+from sas_management.services.event_bus import EventBus, InProcessBroker
+
+
+def test_since_filters_by_topic_and_cursor():
+    broker = InProcessBroker(history_size=10)
+    broker.publish("chat:General", "message", {"id": 1})
+    first = broker.last_id
+    broker.publish("kds", "order", {"id": 7})
+    broker.publish("chat:General", "message", {"id": 2})
+    assert [e.data["id"] for e in broker.since({"chat:General"}, 0)] == [1, 2]
+    assert [e.data["id"] for e in broker.since({"chat:General"}, first)] == [2]
+    assert broker.since({"chat:Sales"}, 0) == []
+
+
+def test_history_is_bounded_and_ids_increase():
+    broker = InProcessBroker(history_size=3)
+    for i in range(5):
+        broker.publish("kds", "order", {"id": i})
+    events = broker.since({"kds"}, 0)
+    assert [e.data["id"] for e in events] == [2, 3, 4]
+    assert events[0].id < events[1].id < events[2].id
+
+
+def test_subscriber_receives_only_new_events_on_its_topic():
+    bus = EventBus(heartbeat=0.05)
+    bus.publish("chat:General", "message", {"id": 1})
+    frames = bus.subscribe(["chat:General"])
+    assert next(frames).startswith("retry:")
+
+    def publish():
+        time.sleep(0.05)
+        bus.publish("kds", "order", {"id": 99})
+        bus.publish("chat:General", "message", {"id": 2})
+
+    threading.Thread(target=publish).start()
+    frame = next(f for f in frames if not f.startswith(":"))
+    assert "event: message" in frame and '"id":2' in frame
+
+
+def test_last_event_id_replays_missed_events():
+    bus = EventBus(heartbeat=0.05)
+    bus.publish("chat:General", "message", {"id": 1})
+    cursor = bus.broker.last_id
+    bus.publish("chat:General", "message", {"id": 2})
+    frames = bus.subscribe(["chat:General"], last_event_id=cursor)
+    next(frames)
+    assert '"id":2' in next(frames)
+
+
+def test_stream_releases_the_request_session(app):
+    bus = EventBus(heartbeat=0.05)
+    db.session.execute(db.select(User.id)).all()
+    assert db.session.registry.has()
+    with app.test_request_context():
+        response = bus.stream(["kds"])
+    assert not db.session.registry.has()
+    frames = response.response
+    assert next(frames).startswith("retry:")
+    bus.publish("kds", "order", {"id": 5})
+    assert '"id":5' in next(f for f in frames if not f.startswith(":"))
+
+
+@pytest.fixture
+def bus(app):
+    bus = EventBus(heartbeat=0.05)
+    bus.init_app(app, db.session)
+    yield bus
+    bus.uninstall()
+
+
+def _published(bus):
+    return [e.data["content"] for e in bus.broker.since({"chat:General"}, 0)]
+
+
+def test_changes_rolled_back_are_never_published(bus):
+    user = User(email="ann@example.com", password_hash="x")
+    db.session.add(user)
+    db.session.commit()
+
+    db.session.add(Message(user_id=user.id, channel="General", content="kept"))
+    with db.session.begin_nested() as savepoint:
+        db.session.add(Message(user_id=user.id, channel="General", content="undone"))
+        db.session.flush()
+        savepoint.rollback()
+    db.session.commit()
+    assert _published(bus) == ["kept"]
+
+    db.session.add(Message(user_id=user.id, channel="General", content="abandoned"))
+    db.session.flush()
+    db.session.rollback()
+    db.session.commit()
+    assert _published(bus) == ["kept"]
@@ -0,0 +1,114 @@
+"""Unit tests for the event profitability rollups."""
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from sas_management.models import BIEventProfitability, db
+from sas_management.services import event_profitability_rollup as rollup
+
+
+pytestmark = pytest.mark.listeners(rollup)
+
+
+def _event(quoted=1000000, status="Completed", **costs):
+    from sas_management.models import Event
+    event = Event(title="Gala", client_name="ACME", date=date(2026, 3, 1),
+                  quoted_value=quoted, status=status, **costs)
+    db.session.add(event)
+    db.session.flush()
+    return event
+
+
+def _rollups():
+    return {row.event_id: row for row in BIEventProfitability.query.all()}
+
+
+def _drain():
+    while rollup.refresh_dirty(batch_size=2):
+        pass
+    db.session.commit()
+
+
+def test_writes_mark_events_dirty_until_refreshed(app):
+    from sas_management.models import EventCostItem
+    event = _event(ingredients_cost=200000)
+    db.session.commit()
+    assert rollup.pending_count() == 1
+    assert _rollups() == {}
+
+    _drain()
+    row = _rollups()[event.id]
+    assert row.revenue == Decimal("1000000.00")
+    assert row.cost_of_goods == Decimal("200000.00")
+    assert row.overhead_cost == Decimal("100000.00")
+    assert rollup.pending_count() == 0
+
+    db.session.add(EventCostItem(event_id=event.id, description="Chefs", amount=150000, category="Labor"))
+    db.session.add(EventCostItem(event_id=event.id, description="Beef", amount=300000, category="Food"))
+    db.session.commit()
+    assert rollup.pending_count() == 1
+    _drain()
+    row = _rollups()[event.id]
+    assert row.cost_of_goods == Decimal("300000.00")
+    assert row.labor_cost == Decimal("150000.00")
+    assert row.profit == Decimal("450000.00")
+    assert row.margin_percent == 45.0
+
+
+def test_revenue_items_and_staff_hours(app):
+    from sas_management.models import EventRevenueItem, EventStaffAssignment
+    event = _event(quoted=0)
+    db.session.add(EventRevenueItem(event_id=event.id, description="Buffet", amount=800000))
+    db.session.add(EventStaffAssignment(event_id=event.id, staff_name="A", role="waiter", assigned_hours=4))
+    db.session.add(EventStaffAssignment(event_id=event.id, staff_name="B", role="chef"))
+    db.session.commit()
+    _drain()
+
+    row = _rollups()[event.id]
+    assert row.revenue == Decimal("800000.00")
+    # 4 h + 8 h default
+    assert row.labor_cost == Decimal("12") * rollup.LABOR_HOURLY_RATE
+
+
+def test_events_leaving_completed_lose_their_rollup(app):
+    event = _event()
+    _event(status="Planning")
+    db.session.commit()
+    _drain()
+    assert set(_rollups()) == {event.id}
+
+    event.status = "Cancelled"
+    db.session.commit()
+    _drain()
+    assert _rollups() == {}
+
+
+def test_refresh_all_backfills_and_clears_queue(app):
+    events = [_event(quoted=100000 * (i + 1)) for i in range(5)]
+    db.session.commit()
+    assert rollup.refresh_all(batch_size=2) == 5
+    db.session.commit()
+    assert rollup.pending_count() == 0
+    assert {row.event_id: row.revenue for row in _rollups().values()} == {
+        event.id: Decimal(str(event.quoted_value)).quantize(Decimal("0.01")) for event in events
+    }
+
+
+def test_profitability_pdf_is_prepared_without_waiting(app, monkeypatch, tmp_path):
+    from sas_management.services import bi_service
+    from sas_management.services.document_renderer import renderer
+    monkeypatch.setattr(renderer, "max_workers", 1)
+    monkeypatch.setattr(renderer, "folder", str(tmp_path / "documents"))
+    _event(ingredients_cost=200000)
+    db.session.commit()
+    _drain()
+
+    try:
+        assert bi_service.prepare_profitability_pdf_report() is None
+        path = bi_service.generate_profitability_pdf_report()
+        assert bi_service.prepare_profitability_pdf_report() == path
+        with open(path, "rb") as handle:
+            assert handle.read(5) == b"%PDF-"
+    finally:
+        renderer.stop()
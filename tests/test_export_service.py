@@ -0,0 +1,36 @@
+"""Unit tests for the streaming export writers."""
+import csv
+import io
+from decimal import Decimal
+from enum import Enum
+
+from sas_management.services.export_service import csv_chunks, normalize_format, write_xlsx
+
+
+class Kind(Enum):
+    Income = "Income"
+
+
+def test_csv_chunks_stream_rows_in_bounded_chunks():
+    rows = ([i, Kind.Income, Decimal("1.50"), None] for i in range(1200))
+    chunks = list(csv_chunks(["n", "kind", "amount", "note"], rows, chunk_rows=500))
+    assert len(chunks) == 3
+    parsed = list(csv.reader(io.StringIO("".join(chunks))))
+    assert parsed[0] == ["n", "kind", "amount", "note"]
+    assert parsed[1] == ["0", "Income", "1.50", ""]
+    assert len(parsed) == 1201
+
+
+def test_write_xlsx_uses_write_only_workbook(tmp_path):
+    from openpyxl import load_workbook
+
+    path = tmp_path / "out.xlsx"
+    count = write_xlsx(["n", "kind", "amount"], ([i, Kind.Income, Decimal("2.25")] for i in range(10)), path, "Sheet")
+    assert count == 10
+    sheet = load_workbook(path, read_only=True).active
+    values = list(sheet.iter_rows(values_only=True))
+    assert values[0] == ("n", "kind", "amount") and values[1] == (0, "Income", 2.25)
+
+
+def test_unknown_format_falls_back_to_csv():
+    assert normalize_format("XLSX") == "xlsx" and normalize_format("pdf") == "csv" and normalize_format(None) == "csv"
@@ -0,0 +1,126 @@
+"""Unit tests for revisioned floor plan saves."""
+import copy
+import json
+import random
+
+import pytest
+from sqlalchemy import inspect
+
+from sas_management.models import FloorPlan, FloorPlanChange, db
+from sas_management.services import floorplanner_service
+from sas_management.services.floorplanner_service import (
+    FloorPlanConflict,
+    PatchError,
+    apply_changes,
+    apply_patch,
+    current_layout,
+    list_floorplans,
+    make_patch,
+    save_layout,
+)
+
+
+def _table(n):
+    return {"type": "group", "left": 40 * n, "top": 25, "metadata": {"kind": "table", "seats": 8, "label/no~": n}}
+
+
+@pytest.fixture
+def app(app):
+    app.config["FLOORPLAN_COMPACT_EVERY"] = 5
+    floorplanner_service._layouts.clear()
+    return app
+
+
+@pytest.fixture
+def plan(app):
+    floorplan = FloorPlan(name="Hall", data=floorplanner_service._dumps({"objects": [_table(n) for n in range(20)]}))
+    db.session.add(floorplan)
+    db.session.commit()
+    return floorplan.id
+
+
+def test_patch_roundtrip_and_minimal_list_edits():
+    rng = random.Random(4)
+    before = {"objects": [_table(n) for n in range(200)], "meta": {"zoom": 1}}
+    for _ in range(50):
+        after = copy.deepcopy(before)
+        objects = after["objects"]
+        objects[rng.randrange(len(objects))]["left"] += 10
+        objects.insert(rng.randrange(len(objects)), _table(-1))
+        del objects[rng.randrange(len(objects))]
+        after["meta"]["grid"] = rng.random() < 0.5
+        patch = make_patch(before, after)
+        assert apply_patch(copy.deepcopy(before), patch) == after
+    # Moving one table in a long list touches only that table
+    after = copy.deepcopy(before)
+    after["objects"][120]["left"] = 999
+    assert make_patch(before, after) == [{"op": "replace", "path": "/objects/120/left", "value": 999}]
+    with pytest.raises(PatchError):
+        apply_patch(before, [{"op": "remove", "path": "/objects/500"}])
+
+
+def test_stale_revision_is_a_conflict(plan):
+    layout = current_layout(plan)["layout"]
+    layout["objects"][0]["left"] = 5
+    assert save_layout(plan, layout, base_revision=0) == 1
+
+    with pytest.raises(FloorPlanConflict) as conflict:
+        apply_changes(plan, 0, [{"op": "replace", "path": "/objects/1/left", "value": 7}])
+    assert conflict.value.revision == 1
+    assert apply_changes(plan, 1, [{"op": "replace", "path": "/objects/1/left", "value": 7}]) == 2
+    assert [o["left"] for o in current_layout(plan)["layout"]["objects"][:2]] == [5, 7]
+
+
+def test_patch_values_are_not_shared_with_the_layout(plan):
+    patch = [
+        {"op": "add", "path": "/objects/0", "value": _table(99)},
+        {"op": "replace", "path": "/objects/0/left", "value": 7},
+        {"op": "add", "path": "/objects/0/metadata/seats", "value": 10},
+        {"op": "replace", "path": "/objects/1", "value": {"type": "rect", "left": 1}},
+        {"op": "replace", "path": "/objects/1/left", "value": 2},
+    ]
+    sent = copy.deepcopy(patch)
+    assert apply_changes(plan, 0, patch) == 1
+    # Later operations edited the layout, not the patch that is stored and replayed
+    assert patch == sent
+    assert json.loads(FloorPlanChange.query.one().patch) == sent
+    cached = current_layout(plan)["layout"]
+    patch[0]["value"]["top"] = -1
+    floorplanner_service._layouts.clear()
+    replayed = current_layout(plan)["layout"]
+    assert replayed == cached
+    assert replayed["objects"][:2] == [
+        {**_table(99), "left": 7, "metadata": {**_table(99)["metadata"], "seats": 10}},
+        {"type": "rect", "left": 2},
+    ]
+
+
+def test_unchanged_layout_writes_nothing(plan):
+    before = db.session.get(FloorPlan, plan).updated_at
+    assert save_layout(plan, current_layout(plan)["layout"]) == 0
+    assert apply_changes(plan, 0, []) == 0
+    assert db.session.get(FloorPlan, plan).updated_at == before
+    assert FloorPlanChange.query.count() == 0
+
+
+def test_changes_are_compacted_into_the_snapshot(plan):
+    for revision in range(4):
+        apply_changes(plan, revision, [{"op": "replace", "path": f"/objects/{revision}/top", "value": revision}])
+    floorplan = db.session.get(FloorPlan, plan)
+    assert (floorplan.revision, floorplan.snapshot_revision, FloorPlanChange.query.count()) == (4, 0, 4)
+
+    apply_changes(plan, 4, [{"op": "remove", "path": "/objects/19"}])
+    floorplan = db.session.get(FloorPlan, plan)
+    assert (floorplan.revision, floorplan.snapshot_revision, FloorPlanChange.query.count()) == (5, 5, 0)
+    floorplanner_service._layouts.clear()
+    layout = current_layout(plan)["layout"]
+    assert [o["top"] for o in layout["objects"][:5]] == [0, 1, 2, 3, 25]
+    assert len(layout["objects"]) == 19
+
+
+def test_listing_leaves_thumbnails_unloaded(plan):
+    db.session.get(FloorPlan, plan).thumbnail = b"\x89PNG"
+    db.session.commit()
+    db.session.expunge_all()
+    (floorplan,) = list_floorplans()
+    assert "thumbnail" in inspect(floorplan).unloaded
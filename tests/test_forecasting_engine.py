@@ -0,0 +1,56 @@
+"""Unit tests for the batch forecasting engine."""
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from sas_management.models import BakeryItem, BakeryOrder, BakeryOrderItem, BIBakeryDemand, db
+from sas_management.services import forecasting_engine
+from sas_management.services.forecasting_engine import _seasonal_python, forecast_bakery_demand
+
+MONDAY = date(2026, 1, 5)
+
+
+def _weekly_series(weeks, weekday=10.0, weekend=20.0):
+    return [weekend if (MONDAY + timedelta(days=t)).weekday() >= 5 else weekday for t in range(weeks * 7)]
+
+
+def test_weekday_pattern_is_carried_into_the_forecast():
+    predictions, confidence = _seasonal_python([_weekly_series(8)], MONDAY, MONDAY + timedelta(days=56), 7)
+    week = predictions[0]
+    assert week[5] > week[0] * 1.5 and week[6] > week[0] * 1.5
+    assert confidence[0] > 0.9
+
+
+def test_numpy_and_python_models_agree():
+    np = pytest.importorskip("numpy")
+    rng = random.Random(7)
+    history = [[rng.choice([0, rng.uniform(0, 50)]) for _ in range(56)] for _ in range(20)] + [[0.0] * 56]
+    start, ahead = MONDAY + timedelta(days=3), MONDAY + timedelta(days=60)
+    expected, expected_conf = _seasonal_python(history, start, ahead, 14)
+    actual, actual_conf = forecasting_engine._seasonal_numpy(np.array(history), start, ahead, 14)
+    assert np.allclose(actual, expected)
+    assert np.allclose(actual_conf, expected_conf)
+
+
+def test_bakery_demand_is_one_batch_and_upserts(app):
+    today = date(2026, 3, 2)
+    items = [BakeryItem(name=f"Item {i}", status="Active") for i in range(3)]
+    db.session.add_all(items)
+    db.session.flush()
+    for offset in range(1, 29):
+        order = BakeryOrder(order_date=today - timedelta(days=offset), status="Completed")
+        order.items.append(BakeryOrderItem(bakery_item_id=items[0].id, quantity=4))
+        db.session.add(order)
+    db.session.commit()
+
+    result = forecast_bakery_demand(horizon=7, today=today)
+    db.session.commit()
+    assert set(result) == {item.id for item in items}
+    assert [f["predicted_qty"] for f in result[items[0].id]] == [4] * 7
+    # Items without sales keep the default weekday/weekend placeholder
+    assert {f["predicted_qty"] for f in result[items[1].id]} == {5, 9}
+
+    forecast_bakery_demand(horizon=7, today=today)
+    db.session.commit()
+    assert BIBakeryDemand.query.count() == 21
@@ -0,0 +1,98 @@
+"""Unit tests for the hire equipment availability engine."""
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+
+from sas_management.models import InventoryItem, Order, OrderItem, db
+from sas_management.services.hire_availability import (
+    HireAvailability,
+    InsufficientAvailability,
+    ItemTimeline,
+)
+
+DAY = date.today() + timedelta(days=60)
+
+
+def day(n):
+    return DAY + timedelta(days=n)
+
+
+@pytest.fixture
+def engine():
+    return HireAvailability(ttl=60)
+
+
+@pytest.fixture
+def app(app, engine):
+    engine.init_app(app)
+    yield app
+    engine.uninstall()
+
+
+def _book(item, qty, first, last, status="Pending"):
+    order = Order(client_name="Client", start_date=first, end_date=last, status=status)
+    order.items.append(OrderItem(item_id=item.id, qty=qty, price=Decimal("1000"), subtotal=Decimal("0")))
+    db.session.add(order)
+    db.session.commit()
+    return order
+
+
+@pytest.fixture
+def catalog(app):
+    chairs = InventoryItem(name="Chairs", stock_count=500, category="Seating")
+    tents = InventoryItem(name="Tents", stock_count=10, category="Shelter")
+    db.session.add_all([chairs, tents])
+    db.session.commit()
+    _book(chairs, 300, day(0), day(2))
+    _book(chairs, 150, day(2), day(5), status="Confirmed")
+    _book(chairs, 400, day(2), day(2), status="Cancelled")
+    return chairs, tents
+
+
+def test_timeline_peak_is_the_busiest_day_of_the_range():
+    timeline = ItemTimeline([(day(0), day(2), 300), (day(2), day(5), 150)])
+    assert timeline.peak(day(-3), day(-1)) == 0
+    assert timeline.peak(day(1), day(1)) == 300
+    assert timeline.peak(day(0), day(9)) == 450
+    assert timeline.peak(day(3), day(9)) == 150
+    assert timeline.booked_on(day(6)) == 0
+
+
+def test_availability_deducts_overlapping_bookings_only(catalog, engine):
+    chairs, tents = catalog
+    rows = {row["name"]: row for row in engine.availability(day(2), day(4), quantity=300)}
+    assert (rows["Chairs"]["booked"], rows["Chairs"]["available"], rows["Chairs"]["enough"]) == (450, 50, False)
+    assert (rows["Tents"]["available"], rows["Tents"]["enough"]) == (10, False)
+    assert engine.available(chairs.id, day(3), day(4)) == 350
+    assert engine.available(chairs.id, day(6), day(8)) == 500
+
+
+def test_commits_refresh_only_the_touched_items(catalog, engine):
+    chairs, tents = catalog
+    assert engine.available(tents.id, day(0), day(0)) == 10
+    _book(tents, 4, day(0), day(1))
+    assert engine.available(tents.id, day(0), day(0)) == 6
+    assert engine.available(chairs.id, day(0), day(0)) == 200
+
+    order = Order.query.filter_by(status="Confirmed").one()
+    order.status = "Cancelled"
+    db.session.commit()
+    assert engine.available(chairs.id, day(3), day(3)) == 500
+    assert (engine.builds, engine.refreshes) == (1, 2)
+
+
+def test_reserve_refuses_to_overbook(catalog, engine):
+    chairs, tents = catalog
+    order = Order(client_name="Late client", start_date=day(1), end_date=day(2), status="Pending")
+    db.session.add(order)
+    db.session.flush()
+    with pytest.raises(InsufficientAvailability) as error:
+        engine.reserve(order, [(chairs.id, 100, Decimal("500")), (tents.id, 2, Decimal("5000"))])
+    assert [(s["name"], s["available"], s["requested"]) for s in error.value.shortages] == [("Chairs", 50, 100)]
+    assert order.items == []
+
+    added = engine.reserve(order, [(chairs.id, 50, Decimal("500")), (tents.id, 2, Decimal("5000"))])
+    db.session.commit()
+    assert [line.subtotal for line in added] == [Decimal("50000"), Decimal("20000")]
+    assert engine.available(chairs.id, day(1), day(2)) == 0
@@ -0,0 +1,43 @@
+"""Unit tests for the index advisor."""
+from sqlalchemy import create_engine, text
+
+from sas_management.utils.index_advisor import IndexAdvisor, normalize_sql, suggest_indexes
+
+
+def test_normalize_sql_collapses_literals_and_in_lists():
+    sql = normalize_sql("SELECT * FROM event WHERE id IN (1, 2, 3) AND status = 'Draft'  AND x = :x")
+    assert sql == "SELECT * FROM event WHERE id IN (?) AND status = ? AND x = ?"
+
+
+def test_suggest_indexes_puts_equality_before_range_and_sort():
+    sql = (
+        "SELECT e.id FROM event AS e JOIN client c ON c.id = e.client_id "
+        "WHERE e.status = ? AND e.event_date >= ? ORDER BY e.event_date"
+    )
+    assert suggest_indexes(sql) == {"event": ["status", "event_date"]}
+
+
+def test_advisor_reports_scans_and_not_index_lookups():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE message (id INTEGER PRIMARY KEY, channel TEXT, timestamp TEXT)"))
+        conn.execute(text("CREATE TABLE activity_logs (id INTEGER PRIMARY KEY, timestamp TEXT)"))
+        conn.execute(text("CREATE INDEX ix_activity_logs_timestamp ON activity_logs (timestamp)"))
+
+    advisor = IndexAdvisor().install()
+    try:
+        with engine.connect() as conn:
+            for channel in ("general", "kitchen"):
+                conn.execute(
+                    text("SELECT * FROM message WHERE channel = :c ORDER BY timestamp DESC LIMIT 100"),
+                    {"c": channel},
+                ).fetchall()
+            conn.execute(text("SELECT * FROM activity_logs WHERE timestamp >= :t"), {"t": "2025-01-01"}).fetchall()
+    finally:
+        advisor.uninstall()
+
+    scanning = advisor.scanning_shapes()
+    assert len(scanning) == 1
+    assert scanning[0].count == 2
+    assert scanning[0].suggestions == {"message": ["channel", "timestamp"]}
+    assert "CREATE INDEX ix_message_channel_timestamp ON message (channel, timestamp)" in advisor.report()
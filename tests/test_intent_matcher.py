@@ -0,0 +1,65 @@
+"""Unit tests for the compiled SAS AI keyword matcher."""
+import random
+
+import pytest
+
+from sas_management.ai import intent_matcher
+from sas_management.ai.intent_matcher import KeywordAutomaton
+from sas_management.sas_ai.reasoning import classify_question, extract_entities
+
+
+def test_automaton_finds_the_same_keywords_as_substring_checks():
+    rng = random.Random(7)
+    keywords = ["".join(rng.choice("abc ") for _ in range(rng.randint(1, 5))) for _ in range(200)]
+    automaton = KeywordAutomaton(keywords)
+    for _ in range(500):
+        text = "".join(rng.choice("abcd ") for _ in range(40))
+        found = {automaton.keywords[i] for i in automaton.find(text)}
+        assert found == {kw for kw in set(keywords) if kw and kw in text}
+
+
+@pytest.fixture
+def intents_group():
+    intent_matcher.register("test.intents", {
+        "inventory": ["inventory", "stock", "low stock"],
+        "revenue": ["revenue", "sales"],
+        "pos": ["pos", "sales", "terminal"],
+    })
+    yield "test.intents"
+    intent_matcher.unregister("test.intents")
+
+
+def test_scores_follow_registration_order(intents_group):
+    found = intent_matcher.match("Low STOCK report and sales by terminal")
+    assert found.scores("test.intents") == {"inventory": 2, "revenue": 1, "pos": 2}
+    # Ties go to the earliest registered label, as max() over INTENTS did
+    assert found.best("test.intents") == ("inventory", 2)
+    assert found.first("test.intents") == "inventory"
+    assert intent_matcher.match("nothing relevant").best("test.intents") == (None, 0)
+
+
+def test_unregistered_group_stops_matching(intents_group):
+    assert intent_matcher.match("stock").has("test.intents")
+    intent_matcher.unregister(intents_group)
+    # The cached match for the same text is dropped too
+    assert not intent_matcher.match("stock").has("test.intents")
+
+
+def test_whole_word_groups_ignore_partial_words():
+    assert intent_matcher.match("mobile staff app").entities()["topics"] == ["staff", "mobile_staff"]
+    assert "bi" in intent_matcher.match("open the BI dashboard").entities()["topics"]
+    assert intent_matcher.match("Is the inventory predictor on?").entities()["features"] == ["inventory_predictor"]
+
+
+def test_reasoning_classification_is_unchanged():
+    assert classify_question("Hello there") == ("greeting", 0.95)
+    assert classify_question("Explain the revenue report") == ("system", 0.8)
+    assert classify_question("The printer is not working") == ("error", 0.85)
+    assert classify_question("Count events for the quarter") == ("system", 0.9)
+    assert classify_question("Who is the president of Uganda") == ("web_required", 0.8)
+    assert extract_entities("Show revenue and events for this month") == {
+        "time_periods": ["this month"],
+        "topics": ["event", "events", "revenue"],
+        "actions": ["show"],
+        "features": [],
+    }
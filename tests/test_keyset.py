@@ -0,0 +1,52 @@
+"""Unit tests for keyset (cursor) pagination."""
+from sqlalchemy import Column, Integer, String, create_engine
+from sqlalchemy.orm import Session, declarative_base
+
+from sas_management.utils.keyset import clamp_limit, keyset_page, parse_cursor, scope_head
+
+Base = declarative_base()
+
+
+class Row(Base):
+    __tablename__ = "row"
+    id = Column(Integer, primary_key=True)
+    scope = Column(String(10))
+
+
+def _session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = Session(engine)
+    session.add_all([Row(id=i, scope="a" if i % 2 else "b") for i in range(1, 21)])
+    session.commit()
+    return session
+
+
+def test_latest_and_older_pages_are_oldest_first():
+    session = _session()
+    query = session.query(Row).filter(Row.scope == "a")  # ids 1, 3, ..., 19
+    page = keyset_page(query, Row.id, limit=4)
+    assert [r.id for r in page.items] == [13, 15, 17, 19]
+    assert page.has_more and page.cursors()["prev_before_id"] == 13
+
+    older = keyset_page(query, Row.id, before_id=13, limit=4)
+    assert [r.id for r in older.items] == [5, 7, 9, 11]
+    last = keyset_page(query, Row.id, before_id=5, limit=4)
+    assert [r.id for r in last.items] == [1, 3] and not last.has_more
+
+
+def test_after_id_returns_only_new_rows():
+    session = _session()
+    query = session.query(Row).filter(Row.scope == "b")
+    page = keyset_page(query, Row.id, after_id=14, limit=10)
+    assert [r.id for r in page.items] == [16, 18, 20]
+    assert page.cursors()["next_after_id"] == 20
+    empty = keyset_page(query, Row.id, after_id=20)
+    assert empty.items == [] and empty.cursors()["next_after_id"] == 20
+    assert scope_head(query, Row.id) == 20
+
+
+def test_cursor_parsing():
+    assert parse_cursor("12") == 12
+    assert parse_cursor("0") is None and parse_cursor("x") is None and parse_cursor(None) is None
+    assert clamp_limit("9999") == 500 and clamp_limit("0") == 1 and clamp_limit(None) == 100
@@ -0,0 +1,103 @@
+"""Unit tests for the ledger reporting engine."""
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from sas_management.models import LedgerMonthlyBalance, db
+from sas_management.services import ledger_reports
+
+
+pytestmark = pytest.mark.listeners(ledger_reports)
+
+
+@pytest.fixture
+def accounts(app):
+    from sas_management.models import Account
+    accounts = {
+        code: Account(account_code=code, account_name=name, account_type=kind)
+        for code, name, kind in [
+            ("1000", "Cash", "Asset"),
+            ("2000", "Accounts Payable", "Liability"),
+            ("3000", "Capital", "Equity"),
+            ("4000", "Sales Revenue", "Income"),
+            ("5000", "Cost of Goods Sold", "Expense"),
+        ]
+    }
+    db.session.add_all(accounts.values())
+    db.session.flush()
+    return accounts
+
+
+def _post(day, debit_account, credit_account, amount):
+    from sas_management.models import Journal, JournalEntry, JournalEntryLine
+    journal = Journal(journal_number=f"J-{day}-{debit_account.id}-{credit_account.id}-{amount}", description="Test")
+    entry = JournalEntry(journal=journal, entry_date=day, description="Test")
+    entry.lines = [
+        JournalEntryLine(account_id=debit_account.id, debit=amount, credit=0),
+        JournalEntryLine(account_id=credit_account.id, debit=0, credit=amount),
+    ]
+    db.session.add(journal)
+    db.session.commit()
+    return entry
+
+
+def test_snapshots_follow_journal_writes(app, accounts):
+    entry = _post(date(2026, 1, 10), accounts["1000"], accounts["4000"], 500)
+    _post(date(2026, 1, 20), accounts["1000"], accounts["4000"], 250)
+    snapshot = db.session.get(LedgerMonthlyBalance, (accounts["1000"].id, date(2026, 1, 1)))
+    assert snapshot.debit == Decimal("750.00")
+    assert snapshot.line_count == 2
+
+    # Re-dating an entry moves its lines to the other month
+    entry.entry_date = date(2026, 2, 3)
+    db.session.commit()
+    db.session.expire_all()
+    assert db.session.get(LedgerMonthlyBalance, (accounts["1000"].id, date(2026, 1, 1))).debit == Decimal("250.00")
+    assert db.session.get(LedgerMonthlyBalance, (accounts["4000"].id, date(2026, 2, 1))).credit == Decimal("500.00")
+
+    db.session.delete(entry)
+    db.session.commit()
+    assert LedgerMonthlyBalance.query.filter_by(month=date(2026, 2, 1)).count() == 0
+
+
+def test_movements_combine_whole_and_partial_months(app, accounts):
+    for day in (date(2026, 1, 5), date(2026, 1, 25), date(2026, 2, 14), date(2026, 3, 2), date(2026, 3, 30)):
+        _post(day, accounts["1000"], accounts["4000"], 100)
+    cash = accounts["1000"].id
+    assert ledger_reports.movements(date(2026, 1, 20), date(2026, 3, 15))[cash] == (Decimal("300.00"), Decimal("0.00"))
+    assert ledger_reports.movements(date(2026, 1, 6), date(2026, 1, 24)).get(cash) is None
+    assert ledger_reports.movements(None, date(2026, 2, 28))[cash][0] == Decimal("300.00")
+    assert ledger_reports.movements(date(2026, 1, 1), date(2026, 3, 31))[cash][0] == Decimal("500.00")
+
+
+def test_statements_balance(app, accounts):
+    _post(date(2026, 1, 2), accounts["1000"], accounts["3000"], 10000)
+    _post(date(2026, 1, 15), accounts["1000"], accounts["4000"], 4000)
+    _post(date(2026, 1, 16), accounts["5000"], accounts["2000"], 1500)
+    _post(date(2026, 2, 15), accounts["1000"], accounts["4000"], 3000)
+
+    rows = {row["code"]: row for row in ledger_reports.trial_balance(None, date(2026, 2, 28))}
+    assert rows["1000"]["debit"] == 17000.0
+    assert rows["4000"]["credit"] == 7000.0
+    assert sum(r["debit"] for r in rows.values()) == sum(r["credit"] for r in rows.values())
+
+    pnl = ledger_reports.profit_and_loss(date(2026, 1, 1), date(2026, 1, 31))
+    assert (pnl["income"], pnl["expenses"], pnl["profit"]) == (4000.0, 1500.0, 2500.0)
+    prior = ledger_reports.profit_and_loss(*ledger_reports.previous_period(date(2026, 2, 1), date(2026, 2, 28)))
+    assert prior["profit"] == pnl["profit"]
+
+    sheet = ledger_reports.balance_sheet(date(2026, 2, 28))
+    assert sheet["assets"] == 17000.0
+    assert sheet["liabilities"] == 1500.0
+    assert sheet["equity"] == 15500.0
+    assert sheet["balanced"]
+
+
+def test_rebuild_matches_incremental_snapshots(app, accounts):
+    _post(date(2025, 12, 31), accounts["1000"], accounts["4000"], 80)
+    _post(date(2026, 2, 1), accounts["5000"], accounts["1000"], 30)
+    before = {(r.account_id, r.month, r.debit, r.credit) for r in LedgerMonthlyBalance.query.all()}
+    assert ledger_reports.rebuild() == 3
+    db.session.commit()
+    assert {(r.account_id, r.month, r.debit, r.credit) for r in LedgerMonthlyBalance.query.all()} == before
@@ -0,0 +1,50 @@
+"""Unit tests for the cached navigation registry."""
+from flask import Flask
+
+from sas_management.navigation.registry import (
+    DASHBOARD_MENU, SIDEBAR_MENU, NavEntry, UserProfile, build_menu,
+)
+from sas_management.utils import rbac_version
+from sas_management.utils.permission_resolver import EffectivePermissions
+
+
+def _app(endpoints):
+    app = Flask(__name__)
+    for endpoint in endpoints:
+        app.add_url_rule("/" + endpoint.replace(".", "/"), endpoint, lambda: "")
+    return app
+
+
+def test_visibility_rules():
+    admin = UserProfile(True)
+    accountant = UserProfile(False, {"ACCOUNTING"}, EffectivePermissions(2, codes={"view_pos"}))
+    assert NavEntry("x", "a.b").visible_to(admin)
+    assert not NavEntry("x", "a.b").visible_to(accountant)
+    assert NavEntry("x", "a.b", roles=("ACCOUNTING",)).visible_to(accountant)
+    assert NavEntry("x", "a.b", permissions=("view_all", "view_pos")).visible_to(accountant)
+    assert NavEntry("x", "a.b", admin=False, members=True).visible_to(accountant)
+    assert not NavEntry("x", "a.b", admin=False, members=True).visible_to(admin)
+
+
+def test_non_admin_sidebar_and_missing_endpoints():
+    app = _app(["accounting.dashboard", "quotes.list_quotes", "university.dashboard",
+                "ai.chat", "communication.announcements_list"])
+    with app.test_request_context("/"):
+        menu = build_menu(SIDEBAR_MENU, UserProfile(False, {"ACCOUNTING"}), app.config)
+    assert [m["name"] for m in menu] == ["Accounting Department", "Employee University", "SAS AI", "Announcements"]
+    # Children whose blueprint is not registered are dropped, not fatal
+    assert [c["name"] for c in menu[0]["children"]] == ["Accounting Overview", "Quotations"]
+
+
+def test_config_flags_hide_entries():
+    app = _app(["core.dashboard", "ai.chat"])
+    app.config["AI_MODULE_ENABLED"] = app.config["SAS_AI_ENABLED"] = False
+    with app.test_request_context("/"):
+        menu = build_menu(DASHBOARD_MENU, UserProfile(False), app.config)
+    assert [m["name"] for m in menu] == ["Dashboard"]
+
+
+def test_bump_version_is_monotonic():
+    before = rbac_version.current_version()
+    assert rbac_version.bump_version() == before + 1
+    assert rbac_version.current_version() == before + 1
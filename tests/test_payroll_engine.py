@@ -0,0 +1,77 @@
+"""Unit tests for the set-based payroll engine."""
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+from sas_management.models import db
+from sas_management.services import payroll_engine
+from sas_management.services.payroll_engine import DEFAULT_BASIC_SALARY, payroll_lines
+
+
+pytestmark = pytest.mark.listeners(payroll_engine)
+
+
+def _employee(first, salary=0, position=None):
+    from sas_management.models import Employee
+    employee = Employee(first_name=first, last_name="Test", email=f"{first.lower()}@example.com",
+                        monthly_salary=salary, position=position, status="active")
+    db.session.add(employee)
+    db.session.flush()
+    return employee
+
+
+def _attend(employee, when, hours):
+    from sas_management.models import Attendance
+    row = Attendance(employee_id=employee.id, date=when.date(), clock_in=when, hours_worked=hours)
+    db.session.add(row)
+    db.session.flush()
+    return row
+
+
+JAN = (date(2026, 1, 1), date(2026, 1, 31))
+
+
+def test_totals_count_distinct_days_within_period(app):
+    ann = _employee("Ann", salary=800000, position="Chef")
+    bob = _employee("Bob")
+    _attend(ann, datetime(2026, 1, 5, 8), 4)
+    _attend(ann, datetime(2026, 1, 5, 14), 3.5)
+    _attend(ann, datetime(2026, 1, 31, 23, 30), 1)
+    _attend(ann, datetime(2026, 2, 1, 0, 0), 8)  # outside the period
+    db.session.commit()
+
+    lines = {line["name"]: line for line in payroll_lines(*JAN)}
+    assert lines["Ann Test"]["days_worked"] == 2
+    assert lines["Ann Test"]["hours_worked"] == Decimal("8.50")
+    assert lines["Ann Test"]["basic_salary"] == Decimal("800000.00")
+    assert lines["Ann Test"]["position"] == "Chef"
+    # An employee with no attendance still gets a line, on the default salary
+    assert lines["Bob Test"]["employee_id"] == bob.id
+    assert (lines["Bob Test"]["days_worked"], lines["Bob Test"]["hours_worked"]) == (0, Decimal("0.00"))
+    assert lines["Bob Test"]["basic_salary"] == DEFAULT_BASIC_SALARY
+
+
+def test_incremental_run_only_recomputes_changed_employees(app):
+    ann = _employee("Ann")
+    bob = _employee("Bob")
+    _attend(ann, datetime(2026, 1, 5, 8), 8)
+    row = _attend(bob, datetime(2026, 1, 6, 8), 8)
+    db.session.commit()
+    payroll_lines(*JAN)
+    db.session.commit()
+
+    assert payroll_engine.period_totals(*JAN, [ann.id, bob.id])[1] == 0
+
+    row.hours_worked = 6
+    db.session.commit()
+    totals, recomputed = payroll_engine.period_totals(*JAN, [ann.id, bob.id])
+    assert recomputed == 1
+    assert totals[bob.id] == (1, Decimal("6.00"))
+
+    # Moving a row out of the period invalidates it too
+    row.clock_in = datetime(2026, 2, 3, 8)
+    db.session.commit()
+    totals, recomputed = payroll_engine.period_totals(*JAN, [ann.id, bob.id])
+    assert recomputed == 1
+    assert totals[bob.id] == (0, Decimal("0.00"))
@@ -0,0 +1,29 @@
+"""Unit tests for the compiled permission sets."""
+from sas_management.utils.permission_resolver import EffectivePermissions, PermissionResolver
+
+
+def test_exact_and_wildcard_grants():
+    perms = EffectivePermissions(1, codes={"view_pos", "events.*", "accounting.invoices.view"})
+    assert perms.allows("view_pos")
+    assert perms.allows("events.view")
+    assert perms.allows("events.staff.assign")
+    assert not perms.allows("hire.view")
+    # Asking for a wildcard matches any granted code under it
+    assert perms.allows("accounting.*")
+    assert perms.allows("accounting.invoices.*")
+    assert not perms.allows("hr.*")
+    assert perms.allows_any("hr.view", "view_pos")
+
+
+def test_admin_and_star_allow_everything():
+    assert EffectivePermissions(1, is_admin=True).allows("anything")
+    assert EffectivePermissions(1, codes={"*"}).allows("hr.view")
+    assert not EffectivePermissions(None).allows("hr.view")
+
+
+def test_anonymous_user_resolves_to_empty_set():
+    class Anonymous:
+        id = None
+
+    perms = PermissionResolver().resolve(Anonymous())
+    assert perms.codes == frozenset() and not perms.is_admin
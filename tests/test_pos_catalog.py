@@ -0,0 +1,76 @@
+"""Unit tests for the cached POS product catalog."""
+from datetime import date
+
+import pytest
+
+from sas_management.models import BakeryItem, CateringItem, POSProduct, PriceHistory, db
+from sas_management.services.pos_catalog import PosCatalog, current_prices
+
+
+@pytest.fixture
+def catalog():
+    return PosCatalog(ttl=60)
+
+
+@pytest.fixture
+def app(app, catalog):
+    catalog.init_app(app)
+    # build_products() links the placeholder images with url_for("static", ...)
+    with app.test_request_context():
+        yield app
+    catalog.uninstall()
+
+
+def _seed():
+    soup = CateringItem(name="Soup", selling_price_ugx=5000, price_ugx=0)
+    rice = CateringItem(name="Rice", selling_price_ugx=0, price_ugx=3000)
+    bread = BakeryItem(name="Bread", price_ugx=2000, status="Active")
+    cake = BakeryItem(name="Cake", price_ugx=9000, status="Archived")
+    soda = POSProduct(name="Soda", price=1500, is_available=True)
+    db.session.add_all([soup, rice, bread, cake, soda])
+    db.session.flush()
+    db.session.add_all([
+        PriceHistory(item_id=soup.id, item_type="CATERING", price_ugx=6000, effective_date=date(2026, 1, 1)),
+        PriceHistory(item_id=soup.id, item_type="CATERING", price_ugx=6500, effective_date=date(2026, 3, 1)),
+        PriceHistory(item_id=bread.id, item_type="BAKERY", price_ugx=2500, effective_date=date(2026, 2, 1)),
+    ])
+    db.session.commit()
+    return soup, rice, bread, soda
+
+
+def test_current_prices_pick_latest_row_per_item(app):
+    soup, _rice, bread, _soda = _seed()
+    assert current_prices() == {("CATERING", soup.id): 6500, ("BAKERY", bread.id): 2500}
+    assert current_prices("BAKERY") == {("BAKERY", bread.id): 2500}
+
+
+def test_snapshot_is_cached_until_a_price_changes(app, catalog):
+    soup, rice, bread, soda = _seed()
+    first = catalog.snapshot()
+    assert [(p["id"], p["price"]) for p in first["products"]] == [
+        (soup.id, 6500.0), (rice.id, 3000.0), (bread.id, 2500.0), (f"POS-{soda.id}", 1500.0),
+    ]
+    assert catalog.snapshot() is first
+    assert catalog.builds == 1
+
+    db.session.add(PriceHistory(item_id=rice.id, item_type="CATERING", price_ugx=3500, effective_date=date(2026, 4, 1)))
+    db.session.commit()
+    second = catalog.snapshot()
+    assert catalog.builds == 2
+    assert second["version"] != first["version"]
+
+
+def test_delta_lists_changed_and_removed_products(app, catalog):
+    soup, rice, bread, soda = _seed()
+    old = catalog.snapshot()["version"]
+
+    soda.is_available = False
+    db.session.add(PriceHistory(item_id=bread.id, item_type="BAKERY", price_ugx=2700, effective_date=date(2026, 5, 1)))
+    db.session.add(POSProduct(name="Water", price=1000, is_available=True))
+    db.session.commit()
+
+    delta = catalog.delta(old)
+    assert [p["name"] for p in delta["changed"]] == ["Bread", "Water"]
+    assert delta["removed"] == [f"POS_PRODUCT:POS-{soda.id}"]
+    assert catalog.delta(delta["version"]) == {"version": delta["version"], "changed": [], "removed": []}
+    assert catalog.delta("unknown") is None
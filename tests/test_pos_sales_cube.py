@@ -0,0 +1,65 @@
+"""Unit tests for the hourly POS sales cube."""
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+from sas_management.models import POSOrder, POSOrderLine, POSPayment, POSProduct, POSSalesCube, db
+from sas_management.services import pos_sales_cube
+
+
+pytestmark = pytest.mark.listeners(pos_sales_cube)
+
+
+def _order(ref, when, total, status="draft", lines=()):
+    order = POSOrder(reference=ref, order_time=when, total_amount=total, status=status)
+    for product, qty, line_total in lines:
+        order.lines.append(POSOrderLine(product_id=product.id, product_name=product.name, qty=qty, line_total=line_total))
+    db.session.add(order)
+    db.session.commit()
+    return order
+
+
+def _cube_row(when, category="*"):
+    return db.session.get(POSSalesCube, (when.date(), when.hour, 0, category))
+
+
+def test_paying_an_order_folds_it_into_its_hour(app):
+    bread = POSProduct(name="Bread", category="Bakery", price=5000)
+    db.session.add(bread)
+    db.session.commit()
+    when = datetime(2026, 3, 2, 9, 15)  # a Monday
+    order = _order("POS-1", when, 10000, lines=[(bread, 2, 10000)])
+    assert _cube_row(when) is None
+
+    order.status = "paid"
+    order.payments.append(POSPayment(amount=10000, method="cash"))
+    db.session.commit()
+    totals = _cube_row(when)
+    assert (totals.orders, totals.quantity, totals.revenue, totals.paid_amount) == (1, 2, Decimal("10000.00"), Decimal("10000.00"))
+    assert _cube_row(when, "Bakery").revenue == Decimal("10000.00")
+
+    matrix = pos_sales_cube.heatmap(date(2026, 3, 1), date(2026, 3, 31))
+    assert matrix["Mon"][9] == {"sales": 10000.0, "orders": 1}
+
+    # Moving the order to another hour empties the old bucket
+    later = datetime(2026, 3, 2, 11, 0)
+    order.order_time = later
+    db.session.commit()
+    assert _cube_row(when) is None
+    assert _cube_row(later).orders == 1
+
+
+def test_rebuild_matches_incremental_maintenance(app):
+    when = datetime(2026, 3, 3, 18, 40)
+    _order("POS-2", when, 3000, status="paid")
+    _order("POS-3", when, 7000, status="paid")
+    _order("POS-4", when, 9999)  # unpaid
+    before = _cube_row(when)
+    expected = (before.orders, before.revenue)
+
+    db.session.query(POSSalesCube).delete()
+    assert pos_sales_cube.rebuild(date(2026, 3, 1), date(2026, 3, 31)) == 2
+    db.session.commit()
+    assert (_cube_row(when).orders, _cube_row(when).revenue) == expected == (2, Decimal("10000.00"))
+    assert pos_sales_cube.terminal_comparison(date(2026, 3, 1), date(2026, 3, 31))[0]["avg_ticket"] == 5000.0
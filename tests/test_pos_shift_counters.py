@@ -0,0 +1,137 @@
+"""Unit tests for the POS shift counter deltas."""
+from decimal import Decimal
+
+import pytest
+
+from sas_management.models import POSOrder, POSPayment, POSShift, POSShiftCounter, db
+from sas_management.services import pos_shift_counters
+from sas_management.services.pos_shift_counters import (
+    _order_deltas,
+    compute_shift_totals,
+    read_shift_counters,
+    reconcile_shift,
+    shift_report,
+)
+
+
+pytestmark = pytest.mark.listeners(pos_shift_counters)
+
+
+def test_unpaid_order_only_counts_towards_orders():
+    assert _order_deltas((3, "draft", 100, 18, 0), 1) == [(3, "orders", 1, 0)]
+    assert _order_deltas((None, "paid", 100, 18, 0), 1) == []
+
+
+def test_paid_order_moves_sales_tax_and_discount():
+    added = _order_deltas((3, "paid", "118.00", "18.00", "5.00"), 1)
+    removed = _order_deltas((3, "paid", "118.00", "18.00", "5.00"), -1)
+    assert (3, "paid", 1, Decimal("118.00")) in added
+    assert (3, "tax", 1, Decimal("18.00")) in added
+    assert (3, "discount", -1, Decimal("-5.00")) in removed
+
+
+def _shift():
+    shift = POSShift(user_id=1, status="open")
+    db.session.add(shift)
+    db.session.commit()
+    return shift
+
+
+def _order(shift, ref, total, status="draft", tax="0", discount="0", payments=()):
+    order = POSOrder(reference=ref, shift_id=shift.id, total_amount=Decimal(total), tax_amount=Decimal(tax),
+                     discount_amount=Decimal(discount), status=status)
+    for amount, method in payments:
+        order.payments.append(POSPayment(amount=Decimal(amount), method=method))
+    db.session.add(order)
+    db.session.commit()
+    return order
+
+
+def _assert_in_sync(shift):
+    # The counter rows were kept by the listeners, not seeded on read
+    assert POSShiftCounter.query.filter_by(shift_id=shift.id, key="orders").count() == 1
+    assert reconcile_shift(shift.id)["ok"]
+    assert read_shift_counters(shift.id) == compute_shift_totals(shift.id)
+
+
+def test_placing_editing_and_voiding_orders_keeps_counters_in_sync(app):
+    shift, other = _shift(), _shift()
+    _assert_in_sync(shift)
+
+    first = _order(shift, "POS-1", "118.00", status="paid", tax="18.00", payments=[("118.00", "cash")])
+    second = _order(shift, "POS-2", "59.00", tax="9.00")
+    _assert_in_sync(shift)
+    report = shift_report(shift.id)
+    assert (report["orders_count"], report["paid_orders_count"], report["total_sales"]) == (2, 1, Decimal("118.00"))
+
+    # Edit with the old values loaded (delta path) ...
+    assert first.total_amount == Decimal("118.00")
+    first.total_amount = Decimal("100.00")
+    first.discount_amount = Decimal("18.00")
+    db.session.commit()
+    _assert_in_sync(shift)
+    # ... and on an expired instance, where the old value is unknown (resync path)
+    db.session.expire(second)
+    second.status = "paid"
+    second.payments.append(POSPayment(amount=Decimal("40.00"), method="mobile_money"))
+    second.payments.append(POSPayment(amount=Decimal("19.00"), method="cash"))
+    db.session.commit()
+    _assert_in_sync(shift)
+
+    first.payments[0].method = "credit_card"
+    first.status = "void"
+    db.session.commit()
+    _assert_in_sync(shift)
+
+    db.session.delete(second.payments[1])
+    second.shift_id = other.id
+    db.session.commit()
+    _assert_in_sync(shift)
+    _assert_in_sync(other)
+    report = shift_report(shift.id)
+    assert (report["orders_count"], report["paid_orders_count"], report["total_sales"]) == (1, 0, Decimal("0.00"))
+    assert report["payments_by_method"] == {"credit_card": Decimal("118.00")}
+    assert shift_report(other.id)["payments_by_method"] == {"mobile_money": Decimal("40.00")}
+
+    db.session.delete(second)
+    db.session.commit()
+    _assert_in_sync(other)
+    assert shift_report(other.id)["orders_count"] == 0
+
+
+def test_existing_shift_is_seeded_lazily(app):
+    shift = _shift()
+    _order(shift, "POS-1", "50.00", status="paid", payments=[("50.00", "cash")])
+    _order(shift, "POS-2", "20.00")
+    # A shift opened before the counters existed has no rows at all
+    POSShiftCounter.query.filter_by(shift_id=shift.id).delete()
+    db.session.commit()
+
+    assert shift_report(shift.id)["total_sales"] == Decimal("50.00")
+    db.session.commit()
+    _assert_in_sync(shift)
+
+    # The first order flushed into an unseeded shift seeds it from a recompute
+    POSShiftCounter.query.filter_by(shift_id=shift.id).delete()
+    db.session.commit()
+    _order(shift, "POS-3", "30.00", status="paid", payments=[("30.00", "pos")])
+    _assert_in_sync(shift)
+    assert shift_report(shift.id)["total_sales"] == Decimal("80.00")
+
+
+def test_reconcile_reports_and_repairs_drift(app):
+    shift = _shift()
+    _order(shift, "POS-1", "75.00", status="paid", payments=[("75.00", "cash")])
+    counter = POSShiftCounter.query.filter_by(shift_id=shift.id, key="payment:cash").one()
+    counter.amount = Decimal("70.00")
+    db.session.commit()
+
+    result = reconcile_shift(shift.id)
+    assert not result["ok"]
+    assert result["mismatches"] == {
+        "payment:cash": {"counter": (1, Decimal("70.00")), "actual": (1, Decimal("75.00"))},
+    }
+    reconcile_shift(shift.id, repair=True)
+    db.session.commit()
+    assert reconcile_shift(shift.id)["ok"]
+    assert shift_report(shift.id)["payments_by_method"] == {"cash": Decimal("75.00")}
@@ -0,0 +1,141 @@
+"""Unit tests for batched offline POS sync."""
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from sas_management.models import POSDevice, POSOrder, POSOrderLine, POSReceipt, POSSalesCube, POSShift, db
+from sas_management.services.pos_service import create_order, reserve_order_references
+from sas_management.services.pos_shift_counters import shift_report
+from sas_management.services.pos_sync import ingest_orders
+
+UUIDS = [f"00000000-0000-4000-8000-00000000000{n}" for n in range(1, 6)]
+
+
+@pytest.fixture
+def till(app):
+    device = POSDevice(name="Till 1", terminal_code="T1")
+    db.session.add(device)
+    db.session.flush()
+    shift = POSShift(device_id=device.id, user_id=1, status="open")
+    closed = POSShift(device_id=device.id, user_id=1, status="closed")
+    db.session.add_all([shift, closed])
+    db.session.commit()
+    return device, shift, closed
+
+
+def _sale(client_uuid, shift_id, price="1000", paid=None, **extra):
+    order = {
+        "client_uuid": client_uuid,
+        "shift_id": shift_id,
+        "order_time": "2026-03-02T09:15:00+00:00",
+        "tax_rate": 18,
+        "items": [{"product_id": "POS-1", "product_name": "Soda", "qty": 2, "unit_price": price}],
+        **extra,
+    }
+    if paid:
+        order["payments"] = [{"amount": paid, "method": "cash"}]
+    return order
+
+
+def test_batch_is_stored_once_and_retries_report_duplicates(till):
+    device, shift, closed = till
+    batch = [
+        _sale(UUIDS[0], shift.id, paid="2360", temp_ref="t1"),
+        _sale(UUIDS[1], shift.id, temp_ref="t2"),
+        _sale(UUIDS[2], closed.id),
+        _sale("not-a-uuid", shift.id),
+        _sale(UUIDS[0], shift.id),
+    ]
+    result = ingest_orders("T1", batch)
+    assert [r["status"] for r in result["results"]] == ["created", "created", "rejected", "rejected", "rejected"]
+    assert (result["synced_count"], result["duplicate_count"], result["failed_count"]) == (2, 0, 3)
+    assert "closed shift" in result["results"][2]["error"]
+
+    paid = POSOrder.query.filter_by(client_uuid=UUIDS[0]).one()
+    assert (paid.status, paid.total_amount, paid.device_id) == ("paid", Decimal("2360.00"), device.id)
+    assert paid.order_time == datetime(2026, 3, 2, 9, 15)
+    assert result["results"][0]["reference"] == paid.reference
+    assert POSOrder.query.filter_by(client_uuid=UUIDS[1]).one().status == "draft"
+    assert POSOrderLine.query.count() == 2
+    assert POSReceipt.query.filter_by(order_id=paid.id).count() == 1
+
+    retry = ingest_orders("T1", batch[:2])
+    assert [r["status"] for r in retry["results"]] == ["duplicate", "duplicate"]
+    assert retry["results"][0]["reference"] == paid.reference
+    assert POSOrder.query.count() == 2
+
+
+def test_bulk_inserts_update_shift_counters_and_sales_cube(till):
+    device, shift, _closed = till
+    ingest_orders("T1", [
+        _sale(UUIDS[0], shift.id, paid="2360"),
+        _sale(UUIDS[1], shift.id, price="500", paid="1180"),
+        _sale(UUIDS[2], shift.id),
+    ])
+    report = shift_report(shift.id)
+    assert report["orders_count"] == 3
+    assert report["total_sales"] == Decimal("3540.00")
+    assert report["payments_by_method"] == {"cash": Decimal("3540.00")}
+
+    bucket = db.session.get(POSSalesCube, (datetime(2026, 3, 2).date(), 9, device.id, "*"))
+    assert (bucket.orders, bucket.revenue) == (2, Decimal("3540.00"))
+
+
+def test_offline_references_must_be_unused(till):
+    _device, shift, _closed = till
+    block = reserve_order_references("T1", 2)
+    reference = block["references"][0]
+    first = ingest_orders("T1", [_sale(UUIDS[0], shift.id, reference=reference)])
+    assert first["results"][0]["reference"] == reference
+    second = ingest_orders("T1", [
+        _sale(UUIDS[1], shift.id, reference=reference),
+        _sale(UUIDS[2], shift.id, reference="INV-1"),
+    ])
+    assert [r["status"] for r in second["results"]] == ["rejected", "rejected"]
+
+    with pytest.raises(ValueError):
+        ingest_orders("UNKNOWN", [])
+
+
+def test_offline_references_outside_the_device_block_are_reassigned(till):
+    _device, shift, _closed = till
+    db.session.add(POSDevice(name="Till 2", terminal_code="T2"))
+    db.session.commit()
+    mine = reserve_order_references("T1", 2)
+    theirs = reserve_order_references("T2", 2)
+    forged = f"POS-{mine['period']}-{mine['last'] + 500:04d}"
+
+    result = ingest_orders("T1", [
+        _sale(UUIDS[0], shift.id, reference=mine["references"][1]),
+        _sale(UUIDS[1], shift.id, reference=theirs["references"][0]),
+        _sale(UUIDS[2], shift.id, reference=forged),
+    ])
+    kept, stolen, made_up = result["results"]
+    assert kept["reference"] == mine["references"][1] and "reassigned_from" not in kept
+    assert stolen["status"] == made_up["status"] == "created"
+    assert stolen["reassigned_from"] == theirs["references"][0]
+    assert made_up["reassigned_from"] == forged
+    assert not {stolen["reference"], made_up["reference"]} & set(mine["references"] + theirs["references"] + [forged])
+
+    # Till 2 can still sync the number it was given
+    other = ingest_orders("T2", [_sale(UUIDS[3], shift.id, reference=theirs["references"][0])])
+    assert other["results"][0]["reference"] == theirs["references"][0]
+
+
+def test_online_order_with_a_synced_uuid_is_not_created_twice(till):
+    _device, shift, _closed = till
+    ingest_orders("T1", [_sale(UUIDS[0], shift.id)])
+    order = create_order(_sale(UUIDS[0], shift.id), device_code="T1", shift_id=shift.id)
+    assert order.client_uuid == UUIDS[0]
+    assert POSOrder.query.count() == 1
+
+
+def test_synced_orders_are_searchable(till, search_backend):
+    from sas_management.services.search_index import search_index
+    _device, shift, _closed = till
+    result = ingest_orders("T1", [_sale(UUIDS[0], shift.id), _sale(UUIDS[1], shift.id, paid="2360")])
+    for client_uuid, outcome in zip(UUIDS, result["results"]):
+        order = POSOrder.query.filter_by(client_uuid=client_uuid).one()
+        assert search_index.search(outcome["reference"])["pos_orders"] == [order.id]
+    assert len(search_index.search("paid")["pos_orders"]) == 1
@@ -0,0 +1,98 @@
+"""Unit tests for the dispatch route planner."""
+import math
+import random
+
+from sas_management.services.dispatch_service import calculate_distance, group_deliveries_by_vehicle
+from sas_management.services.route_planner import MatrixCache, RoutePlanner, haversine_matrix, travel_matrix
+
+DEPOT = (0.3476, 32.5825)
+
+
+def _drops(count, seed=5, **extra):
+    rng = random.Random(seed)
+    return [
+        {"id": n, "latitude": DEPOT[0] + rng.uniform(-0.1, 0.1), "longitude": DEPOT[1] + rng.uniform(-0.1, 0.1),
+         "weight": rng.randint(1, 8), **extra}
+        for n in range(count)
+    ]
+
+
+class CountingMaps:
+    """Stands in for GoogleMapsAdapter: road distance is 1.5x the straight line."""
+
+    enabled = True
+
+    def __init__(self):
+        self.elements = 0
+
+    def distance_matrix(self, origins, destinations, mode="driving"):
+        self.elements += len(origins) * len(destinations)
+        points = [tuple(map(float, key.split(","))) for key in origins + destinations]
+        km = haversine_matrix(points)
+        rows = [
+            {"elements": [{"status": "OK", "distance": {"value": km[i][len(origins) + j] * 1500},
+                           "duration": {"value": 120}} for j in range(len(destinations))]}
+            for i in range(len(origins))
+        ]
+        return {"success": True, "rows": rows, "mock": False}
+
+
+def test_haversine_matrix_matches_the_scalar_formula():
+    points = [DEPOT, (0.3136, 32.5811), (0.4244, 32.5380), (-0.6072, 30.6545)]
+    matrix = haversine_matrix(points)
+    for i, a in enumerate(points):
+        for j, b in enumerate(points):
+            assert math.isclose(matrix[i][j], calculate_distance(a[0], a[1], b[0], b[1]), abs_tol=1e-6)
+
+
+def test_plan_respects_capacity_and_time_windows():
+    drops = _drops(60)
+    for n, drop in enumerate(drops):
+        drop["window_start"], drop["window_end"] = ("08:00", "10:30") if n % 3 == 0 else ("11:00", "16:00")
+    vehicles = [{"id": f"V{n}", "capacity": 70} for n in range(5)]
+    plan = RoutePlanner(time_limit=2).plan(drops, vehicles, depot=DEPOT, start_time="08:00", end_time="18:00")
+
+    assert not plan["unassigned"]
+    assert sorted(stop["id"] for route in plan["routes"] for stop in route["stops"]) == list(range(60))
+    for route in plan["routes"]:
+        assert sum(stop["weight"] for stop in route["stops"]) <= 70
+        assert all(stop["window_start"] <= stop["arrival"] <= stop["window_end"] for stop in route["stops"])
+        assert route["return"] <= "18:00"
+
+
+def test_plan_is_shorter_than_nearest_neighbour():
+    drops = _drops(80, seed=11)
+    vehicles = [{"id": n, "capacity": None} for n in range(3)]
+    plan = RoutePlanner(time_limit=2).plan(drops, vehicles, depot=DEPOT)
+
+    here, remaining, greedy = DEPOT, list(drops), 0.0
+    while remaining:
+        nearest = min(remaining, key=lambda d: calculate_distance(*here, d["latitude"], d["longitude"]))
+        greedy += calculate_distance(*here, nearest["latitude"], nearest["longitude"])
+        here = (nearest["latitude"], nearest["longitude"])
+        remaining.remove(nearest)
+    greedy += calculate_distance(*here, *DEPOT)
+    assert plan["total_distance"] < greedy
+
+
+def test_road_distances_are_fetched_once_per_coordinate_pair(tmp_path):
+    maps, cache = CountingMaps(), MatrixCache(str(tmp_path / "matrix.sqlite3"))
+    points = [DEPOT, (0.3136, 32.5811), (0.4244, 32.5380), (0.3136, 32.5811)]
+    km, minutes = travel_matrix(points, adapter=maps, cache=cache)
+    assert maps.elements == 9  # one 3x3 request for the three distinct points
+    assert math.isclose(km[0][1], 1.5 * haversine_matrix(points)[0][1], rel_tol=1e-6)
+    assert minutes[0][2] == 2.0 and km[1][3] == 0.0
+
+    again, _ = travel_matrix(points[:3], adapter=maps, cache=MatrixCache(cache.path))
+    assert maps.elements == 9
+    assert again[0][1] == km[0][1]
+
+
+def test_grouping_orders_each_vehicle_and_fills_capacity_without_coordinates():
+    drops = _drops(20) + [{"id": "walk-in", "weight": 3}]
+    groups = group_deliveries_by_vehicle(drops, [{"id": "A", "capacity": 60}, {"id": "B", "capacity": 60}])
+    assigned = [stop["id"] for stops in groups.values() for stop in stops]
+    assert sorted(assigned, key=str) == sorted([n for n in range(20)] + ["walk-in"], key=str)
+    for stops in groups.values():
+        located = [stop for stop in stops if "sequence" in stop]
+        assert [stop["sequence"] for stop in located] == list(range(1, len(located) + 1))
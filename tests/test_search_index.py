@@ -0,0 +1,89 @@
+"""Unit tests for the global search inverted index."""
+from sas_management.models import Client, SearchDocument, db
+from sas_management.services.search_index import MemoryInvertedIndex, search_index, tokenize
+from sas_management.services.search_service import global_search
+
+
+def test_tokenize_lowercases_and_splits_words():
+    assert tokenize("Elite Weddings Ltd., INV-0042") == ["elite", "weddings", "ltd", "inv", "0042"]
+    assert tokenize(None) == []
+
+
+def test_prefix_search_ranks_exact_matches_first():
+    index = MemoryInvertedIndex()
+    index.add("clients", 1, "Elite Weddings Ltd")
+    index.add("clients", 2, "Elitetech Corporate Events")
+    index.add("events", 7, "Elite wedding reception")
+
+    hits = index.search("elite")
+    assert {(entity, entity_id) for entity, entity_id, _ in hits} == {
+        ("clients", 1), ("clients", 2), ("events", 7)
+    }
+    clients = [h for h in hits if h[0] == "clients"]
+    assert max(clients, key=lambda h: h[2])[1] == 1
+
+
+def test_all_terms_must_match():
+    index = MemoryInvertedIndex()
+    index.add("clients", 1, "Elite Weddings")
+    index.add("clients", 2, "Elite Catering")
+
+    hits = index.search("eli wed")
+    assert [(e, i) for e, i, _ in hits] == [("clients", 1)]
+
+
+def test_update_and_remove_replace_postings():
+    index = MemoryInvertedIndex()
+    index.add("clients", 1, "Zebra Catering")
+    index.add("clients", 1, "Quokka Ltd")
+    assert index.search("zebra") == []
+    assert len(index.search("quokka")) == 1
+
+    index.remove("clients", 1)
+    assert index.search("quokka") == []
+    assert len(index) == 0
+
+
+def test_limit_per_type_and_entity_filter():
+    index = MemoryInvertedIndex()
+    for i in range(10):
+        index.add("clients", i, f"acme branch {i}")
+        index.add("events", i, f"acme gala {i}")
+
+    hits = index.search("acme", limit_per_type=3)
+    assert sum(1 for h in hits if h[0] == "clients") == 3
+    assert sum(1 for h in hits if h[0] == "events") == 3
+
+    hits = index.search("acme", limit_per_type=3, entities={"events"})
+    assert {h[0] for h in hits} == {"events"}
+
+
+def test_hidden_records_do_not_crowd_out_visible_ones(search_backend):
+    # Short archived names rank above the long active ones
+    db.session.add_all([Client(name=f"Acme {n}", is_archived=True) for n in range(5)])
+    live = [Client(name=f"Acme catering and events services branch {n}") for n in range(2)]
+    db.session.add_all(live)
+    db.session.commit()
+
+    assert sorted(search_index.search("acme", limit_per_type=2)["clients"]) == sorted(c.id for c in live)
+    assert {c["id"] for c in global_search("acme", limit_per_type=2)["results"]["clients"]} == {c.id for c in live}
+
+    # Changing only a visibility column re-indexes the record
+    live[0].is_archived = True
+    db.session.commit()
+    assert search_index.search("acme", limit_per_type=2)["clients"] == [live[1].id]
+
+
+def test_rebuild_backfills_documents_written_without_hooks(app):
+    db.session.add_all([Client(name="Zebra Events"), Client(name="Zebra Old", is_archived=True)])
+    db.session.commit()
+    assert SearchDocument.query.count() == 0
+
+    search_index.ensure_schema()
+    try:
+        with db.engine.begin() as conn:
+            assert search_index.rebuild(["clients"], batch_size=1, connection=conn) == {"clients": 2}
+        assert [d.visible for d in SearchDocument.query.order_by(SearchDocument.entity_id)] == [True, False]
+        assert len(search_index.search("zebra")["clients"]) == 1
+    finally:
+        search_index.backend = None
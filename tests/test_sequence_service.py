@@ -0,0 +1,46 @@
+"""Unit tests for the reference sequence allocator."""
+from datetime import datetime
+
+from sas_management.models import db
+from sas_management.services.sequence_service import (
+    allocate,
+    format_reference,
+    next_reference,
+    parse_reference,
+    reserve_block,
+)
+
+
+def test_references_increase_per_prefix_and_day(app):
+    day = datetime(2026, 1, 2)
+    assert next_reference("POS", when=day) == "POS-20260102-0001"
+    assert next_reference("POS", when=day) == "POS-20260102-0002"
+    assert next_reference("RCPT", when=day) == "RCPT-20260102-0001"
+    assert next_reference("POS", when=datetime(2026, 1, 3)) == "POS-20260103-0001"
+
+
+def test_seed_only_used_when_counter_is_created(app):
+    calls = []
+
+    def seed(conn, prefix, period):
+        calls.append(period)
+        return 41
+
+    assert allocate("PROD", "20260102", seed=seed) == 42
+    assert allocate("PROD", "20260102", seed=seed) == 43
+    assert calls == ["20260102"]
+
+
+def test_blocks_do_not_overlap_single_allocations(app):
+    day = datetime(2026, 1, 2)
+    block = reserve_block("POS", 3, when=day)
+    assert block["references"] == [format_reference("POS", "20260102", n) for n in (1, 2, 3)]
+    assert next_reference("POS", when=day) == "POS-20260102-0004"
+    db.session.commit()
+
+
+def test_parse_reference_round_trips():
+    assert parse_reference(format_reference("POS", "20260102", 7)) == ("POS", "20260102", 7)
+    assert parse_reference("POS-20260102-0007-X") is None
+    assert parse_reference("INV-1") is None
+    assert parse_reference(None) is None